@@ -0,0 +1,124 @@
+"""
+Cold start benchmark of the layers: imports each module in a fresh interpreter with python -X importtime,
+reports its cumulative import time with the heaviest dependencies and fails when a module goes over its budget
+or imports a module that it must load lazily (boto3 and SQLAlchemy for the lightweight handlers).
+
+    python dev_tools/benchmarks/cold_start.py
+    python dev_tools/benchmarks/cold_start.py --module core_http.utils:150 --forbid core_http.utils:boto3
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LAYER_PATHS = [
+    os.path.join(BASE_DIR, 'src', 'layers', 'core', 'python'),
+    os.path.join(BASE_DIR, 'src', 'layers', 'databases', 'python'),
+]
+
+## Budget (ms) of the cumulative import time of each module, generous enough for a cold Lambda sandbox
+DEFAULT_BUDGETS = {
+    'core_http.utils': 150,
+    'core_aws.secret_manager': 200,
+    'core_db.DBConnection': 800,
+    'core_http.BaseController': 1000,
+}
+
+## Modules that must not be imported by each module (they are loaded on first use)
+DEFAULT_FORBIDDEN = {
+    'core_http.utils': ['boto3', 'sqlalchemy', 'dotenv'],
+    'core_aws.secret_manager': ['boto3'],
+    'core_db.DBConnection': ['boto3'],
+}
+
+
+def parse_importtime(output: str) -> dict[str, tuple[int, int]]:
+    """ Parse the stderr of python -X importtime
+
+    Returns:
+        dict[str, tuple[int, int]]: Self and cumulative microseconds by module
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module: str, python: str = sys.executable) -> dict[str, tuple[int, int]]:
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(LAYER_PATHS + [os.environ.get('PYTHONPATH', '')])}
+    # The variables of a deployed function: the .env file is not read
+    env.setdefault('AWS_LAMBDA_FUNCTION_NAME', 'cold-start-benchmark')
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=BASE_DIR
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Cannot import {module}:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def benchmark(module: str, repeat: int = 5) -> tuple[float, dict[str, tuple[int, int]]]:
+    """ Best cumulative import time of a module over several fresh interpreters
+
+    Returns:
+        tuple[float, dict[str, tuple[int, int]]]: Milliseconds and the import times of the best run
+    """
+    best_ms, best_times = None, {}
+    for _ in range(repeat):
+        times = measure(module)
+        elapsed_ms = times.get(module, (0, 0))[1] / 1000
+        if best_ms is None or elapsed_ms < best_ms:
+            best_ms, best_times = elapsed_ms, times
+    return best_ms, best_times
+
+
+def parse_pairs(values: list[str], cast=str) -> dict:
+    pairs = {}
+    for value in values:
+        module, _, item = value.partition(':')
+        pairs.setdefault(module, []).append(cast(item))
+    return pairs
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import time of the layer modules with regression thresholds")
+    parser.add_argument('--module', action='append', default=[], help="module:budget_ms (repeatable), defaults to the layer entry points")
+    parser.add_argument('--forbid', action='append', default=[], help="module:forbidden_module (repeatable)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="Heaviest dependencies listed by module")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    budgets = {module: values[-1] for module, values in parse_pairs(args.module, float).items()} or DEFAULT_BUDGETS
+    forbidden = parse_pairs(args.forbid) or DEFAULT_FORBIDDEN
+
+    report, failures = [], []
+    for module, budget_ms in budgets.items():
+        elapsed_ms, times = benchmark(module, args.repeat)
+        loaded = [name for name in forbidden.get(module, []) if name in times]
+        heaviest = sorted(((name, values[1] / 1000) for name, values in times.items() if name != module and '.' not in name), key=lambda item: -item[1])[:args.top]
+        report.append({'module': module, 'ms': round(elapsed_ms, 1), 'budget_ms': budget_ms, 'forbidden_loaded': loaded, 'heaviest': heaviest})
+        if elapsed_ms > budget_ms:
+            failures.append(f"{module} takes {elapsed_ms:.1f} ms (budget {budget_ms} ms)")
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for item in report:
+            print(f"{item['module']:<32} {item['ms']:>8.1f} ms  (budget {item['budget_ms']} ms)")
+            for name, elapsed_ms in item['heaviest']:
+                print(f"    {name:<40} {elapsed_ms:>8.1f} ms")
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
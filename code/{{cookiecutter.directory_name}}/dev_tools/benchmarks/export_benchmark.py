@@ -0,0 +1,135 @@
+"""
+Benchmark of the export engine (core_db.export) against the former exportToCSV over a SQLite table.
+
+- legacy: ORM objects of the whole result, csv.DictWriter and a getattr per field (former exportToCSV)
+- csv, ndjson, arrow, parquet: BaseService.export, rows read from the cursor in batches of EXPORT_BATCH_ROWS
+
+Every path exports the same filtered rows and columns to memory, the time includes the query. arrow and parquet
+need pyarrow.
+
+    python dev_tools/benchmarks/export_benchmark.py --rows 1000000
+"""
+import io
+import os
+import csv
+import sys
+import time
+import random
+import argparse
+import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(BASE_DIR, 'src', 'layers', 'core', 'python'))
+sys.path.append(os.path.join(BASE_DIR, 'src', 'layers', 'databases', 'python'))
+
+from sqlalchemy import Column, DateTime, Integer, Numeric, String, create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from core_db.BaseModel import BaseModel  # noqa: E402
+from core_db.BaseService import BaseService  # noqa: E402
+from core_db.export import EXPORT_WRITERS, ExportFormatUnavailable, get_export_columns  # noqa: E402
+
+STATUSES = ['new', 'done', 'hold']
+
+COLUMN_ALIASES = {
+    'id': {'alias': 'Id'},
+    'name': {'alias': 'Name'},
+    'status': {'alias': 'Status'},
+    'amount': {'alias': 'Amount'},
+    'created_at': {'alias': 'Created'},
+}
+
+
+class ExportItem(BaseModel):
+    __tablename__ = 'export_items'
+    id = Column("IdItem", Integer, primary_key=True)
+    name = Column(String(120))
+    status = Column(String(20))
+    amount = Column(Numeric(10, 2))
+    created_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+    model_path_name = "export-item"
+
+
+def create_database(path: str, rows: int):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    BaseModel.metadata.create_all(engine, tables=[ExportItem.__table__])
+    random.seed(7)
+    start = datetime.datetime(2024, 1, 1)
+
+    with engine.begin() as connection:
+        batch = []
+        for i in range(1, rows + 1):
+            batch.append({
+                'IdItem': i,
+                'name': f"item {i}",
+                'status': random.choice(STATUSES),
+                'amount': round(random.uniform(1, 5000), 2),
+                'created_at': start + datetime.timedelta(minutes=i),
+            })
+            if len(batch) == 50000:
+                connection.execute(insert(ExportItem.__table__), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(ExportItem.__table__), batch)
+    return engine
+
+
+def legacy_export(session, filters: list) -> bytes:
+    statement = ExportItem.apply_order(ExportItem.apply_filters(select(ExportItem), filters))
+    elements = session.scalars(statement).all()
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=[info['alias'] for info in COLUMN_ALIASES.values()])
+    writer.writeheader()
+    for item in elements:
+        writer.writerow({info['alias']: getattr(item, field, None) for field, info in COLUMN_ALIASES.items()})
+    return output.getvalue().encode('utf-8')
+
+
+def engine_export(session, filters: list, export_format: str) -> bytes:
+    columns = get_export_columns(COLUMN_ALIASES)
+    output = io.BytesIO()
+    writer = EXPORT_WRITERS[export_format](ExportItem, columns, output)
+    BaseService(ExportItem).export(session, writer, filters, columns)
+    writer.close()
+    return output.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', default='legacy,csv,ndjson,arrow,parquet')
+    parser.add_argument('--database', default='/tmp/export_benchmark.db')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = create_database(args.database, args.rows)
+    print(f"Loaded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    session_factory = sessionmaker(bind=engine)
+    filters = [{'deleted_at': None}]
+
+    print(f"{'format':>8}{'seconds':>10}{'rows/s':>12}{'MB':>10}{'vs legacy':>11}")
+    legacy_size = None
+    for export_format in args.formats.split(','):
+        session = session_factory()
+        start = time.perf_counter()
+        try:
+            content = legacy_export(session, filters) if export_format == 'legacy' else engine_export(session, filters, export_format)
+        except ExportFormatUnavailable as e:
+            print(f"{export_format:>8}  skipped: {e}")
+            continue
+        finally:
+            session.close()
+        seconds = time.perf_counter() - start
+        legacy_size = legacy_size or (len(content) if export_format == 'legacy' else None)
+        ratio = f"{len(content) / legacy_size:>10.2f}x" if legacy_size else f"{'':>11}"
+        print(f"{export_format:>8}{seconds:>10.2f}{args.rows / seconds:>12,.0f}{len(content) / 1024 / 1024:>10.1f}{ratio}")
+
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark of the read-only row mode of BaseService against the ORM path over a SQLite table.
+
+Both paths run the same filters, order and page size and end in the JSON of the response:
+- orm: multiple_filters returns ORM objects that go through the identity map and AlchemyEncoder (to_dict)
+- rows: multiple_filters_rows returns mappings of the projected columns that are encoded directly
+
+    python dev_tools/benchmarks/row_mode_benchmark.py --rows 100000 --per-page 100,1000,10000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import statistics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(BASE_DIR, 'src', 'layers', 'core', 'python'))
+sys.path.append(os.path.join(BASE_DIR, 'src', 'layers', 'databases', 'python'))
+
+from sqlalchemy import Column, DateTime, Integer, Numeric, String, create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from core_db.BaseModel import BaseModel  # noqa: E402
+from core_db.BaseService import BaseService  # noqa: E402
+from core_db.DBConnection import AlchemyEncoder  # noqa: E402
+
+STATUSES = ['new', 'done', 'hold']
+
+
+class BenchmarkItem(BaseModel):
+    __tablename__ = 'benchmark_items'
+    id = Column("IdItem", Integer, primary_key=True)
+    name = Column(String(120))
+    status = Column(String(20))
+    amount = Column(Numeric(10, 2))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+    model_path_name = "benchmark-item"
+    filter_columns = ["status"]
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "name", "status", "amount", "created_at", "updated_at", "deleted_at"]
+
+    @classmethod
+    def property_map(cls_):
+        return {"id": "IdItem"}
+
+
+def create_database(path: str, rows: int):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    BaseModel.metadata.create_all(engine, tables=[BenchmarkItem.__table__])
+    random.seed(7)
+    start = datetime.datetime(2024, 1, 1)
+
+    with engine.begin() as connection:
+        batch = []
+        for i in range(1, rows + 1):
+            batch.append({
+                'IdItem': i,
+                'name': f"item {i}",
+                'status': random.choice(STATUSES),
+                'amount': round(random.uniform(1, 5000), 2),
+                'created_at': start + datetime.timedelta(minutes=i),
+                'updated_at': start + datetime.timedelta(minutes=i),
+            })
+            if len(batch) == 50000:
+                connection.execute(insert(BenchmarkItem.__table__), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(BenchmarkItem.__table__), batch)
+    return engine
+
+
+def orm_path(service: BaseService, session, filters: list, per_page: int) -> str:
+    _, elements = service.multiple_filters(session, filters, True, 1, per_page)
+    data = [element.to_dict(jsonEncoder=AlchemyEncoder) for element in elements]
+    return json.dumps({'data': data}, cls=AlchemyEncoder)
+
+
+def rows_path(service: BaseService, session, filters: list, per_page: int) -> str:
+    _, rows = service.multiple_filters_rows(session, filters, True, 1, per_page)
+    return json.dumps({'data': rows}, cls=AlchemyEncoder)
+
+
+def measure(session_factory, path, service: BaseService, filters: list, per_page: int, repeat: int) -> tuple[float, int]:
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        # A new session per run, like a handler invocation (empty identity map)
+        session = session_factory()
+        start = time.perf_counter()
+        response = path(service, session, filters, per_page)
+        timings.append(time.perf_counter() - start)
+        rows = len(json.loads(response)['data'])
+        session.close()
+    return statistics.median(timings), rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--per-page', default='100,1000,10000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database', default='/tmp/row_mode_benchmark.db')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = create_database(args.database, args.rows)
+    print(f"Loaded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    session_factory = sessionmaker(bind=engine)
+    service = BaseService(BenchmarkItem)
+    filters = [{'status': 'new'}, {'deleted_at': None}]
+
+    print(f"{'per page':>10}{'orm rows/s':>14}{'rows rows/s':>14}{'speedup':>10}")
+    for per_page in [int(value) for value in args.per_page.split(',')]:
+        orm_seconds, rows = measure(session_factory, orm_path, service, filters, per_page, args.repeat)
+        rows_seconds, _ = measure(session_factory, rows_path, service, filters, per_page, args.repeat)
+        print(f"{per_page:>10}{rows / orm_seconds:>14,.0f}{rows / rows_seconds:>14,.0f}{orm_seconds / rows_seconds:>9.1f}x")
+
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of the search modes of core_db.search over a SQLite table.
+
+SQLite stands in for the project database: contains and prefix run the SQL generated by core_db.search,
+and the fulltext mode is measured with an FTS5 table (MySQL FULLTEXT / PostgreSQL GIN play that role in production).
+
+    python dev_tools/benchmarks/search_benchmark.py --rows 1000000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(BASE_DIR, 'src', 'layers', 'databases', 'python'))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, select  # noqa: E402
+from sqlalchemy.dialects import sqlite  # noqa: E402
+
+from core_db.search import SEARCH_CONTAINS, SEARCH_PREFIX, search_condition  # noqa: E402
+
+WORDS = [
+    'acero', 'bomba', 'cable', 'disco', 'engrane', 'filtro', 'goma', 'hoja', 'iman', 'junta', 'llave', 'manguera',
+    'niple', 'opresor', 'perno', 'resorte', 'sello', 'tornillo', 'valvula', 'yugo', 'zapata', 'buje', 'codo', 'tuerca'
+]
+
+metadata = MetaData()
+items = Table('items', metadata, Column('id', Integer, primary_key=True), Column('name', String(120)))
+
+
+def create_database(path: str, rows: int) -> sqlite3.Connection:
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name VARCHAR(120))")
+    random.seed(7)
+
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append((i, f"{random.choice(WORDS)} {random.choice(WORDS)} {random.randint(1, 99999)}"))
+        if len(batch) == 50000:
+            connection.executemany("INSERT INTO items VALUES (?, ?)", batch)
+            batch = []
+    if batch:
+        connection.executemany("INSERT INTO items VALUES (?, ?)", batch)
+
+    # LIKE is case insensitive in SQLite, the index must be NOCASE to serve prefix searches
+    connection.execute("CREATE INDEX ix_items_name ON items (name COLLATE NOCASE)")
+    connection.execute("CREATE VIRTUAL TABLE items_fts USING fts5(name, content='items', content_rowid='id')")
+    connection.execute("INSERT INTO items_fts (rowid, name) SELECT id, name FROM items")
+    connection.commit()
+    return connection
+
+
+def compile_search(mode: str, value: str) -> tuple[str, tuple]:
+    statement = select(items.c.id).where(search_condition(items.c.name, value, mode, 'sqlite')).limit(50)
+    compiled = statement.compile(dialect=sqlite.dialect())
+    return str(compiled), tuple(compiled.params[name] for name in compiled.positiontup)
+
+
+def measure(connection: sqlite3.Connection, sql: str, params: tuple, repeat: int) -> tuple[float, int, str]:
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(connection.execute(sql, params).fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    plan = ' | '.join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+    return statistics.median(timings), rows, plan
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--term', default='valv')
+    parser.add_argument('--database', default='/tmp/search_benchmark.db')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    connection = create_database(args.database, args.rows)
+    print(f"Loaded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    cases = {
+        SEARCH_CONTAINS: compile_search(SEARCH_CONTAINS, args.term),
+        SEARCH_PREFIX: compile_search(SEARCH_PREFIX, args.term),
+        'fulltext (fts5)': ("SELECT rowid FROM items_fts WHERE items_fts MATCH ? LIMIT 50", (f'"{args.term}"*',)),
+    }
+
+    # Searches that match only a few rows force the contains mode to scan the whole table
+    rare_term = str(random.randint(1, 99999))
+    cases[f"{SEARCH_CONTAINS} (rare)"] = compile_search(SEARCH_CONTAINS, f"x{rare_term}")
+    cases[f"{SEARCH_PREFIX} (rare)"] = compile_search(SEARCH_PREFIX, f"x{rare_term}")
+    cases['fulltext (fts5, rare)'] = ("SELECT rowid FROM items_fts WHERE items_fts MATCH ? LIMIT 50", (f'"x{rare_term}"*',))
+
+    print(f"{'mode':<24}{'median ms':>12}{'rows':>8}  plan")
+    for name, (sql, params) in cases.items():
+        median, rows, plan = measure(connection, sql, params, args.repeat)
+        print(f"{name:<24}{median:>12.2f}{rows:>8}  {plan}")
+
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
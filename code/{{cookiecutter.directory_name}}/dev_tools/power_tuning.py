@@ -0,0 +1,248 @@
+"""
+Power tuning of a function: replays recorded events against the handler for several memory sizes, estimates the
+duration and the cost of each one and writes the recommended memory/timeout in src/lambdas/<name>/function_config.json
+(read by the infra_config.py of the function).
+
+Lambda assigns CPU in proportion to the memory (1769 MB = 1 vCPU). Each memory size runs in a fresh worker process:
+- with --cgroup (cgroup v2 delegated to the user, e.g. in a container) the worker is limited with cpu.max and memory.max
+- otherwise the CPU time of each invocation is scaled by the CPU share of the memory size and the peak RSS is
+  compared with the memory (resource module)
+
+    python dev_tools/power_tuning.py hello_world --events dev_tools/events/hello_world --memory 128,256,512,1024 --write
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+from pathlib import Path
+from uuid import uuid4
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LAMBDAS_PATH = BASE_DIR / "src" / "lambdas"
+LAYER_PATHS = [BASE_DIR / "src" / "layers" / "core" / "python", BASE_DIR / "src" / "layers" / "databases" / "python"]
+FUNCTION_CONFIG_FILE = "function_config.json"
+
+DEFAULT_MEMORY_SIZES = [128, 256, 512, 1024, 1769, 3008]
+## Memory that gets a full vCPU
+FULL_VCPU_MEMORY = 1769
+## Price by GB-second and by request (us-east-1)
+PRICE_GB_SECOND = {"x86_64": 0.0000166667, "arm64": 0.0000133334}
+PRICE_REQUEST = 0.0000002
+## Synchronous invocations through API Gateway are cut at 29 seconds
+MAX_API_TIMEOUT = 29
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+DEFAULT_EVENT = {
+    "httpMethod": "GET",
+    "path": "/",
+    "headers": {"Accept-Encoding": "gzip"},
+    "queryStringParameters": None,
+    "pathParameters": {},
+    "requestContext": {"requestId": "power-tuning"},
+    "body": None,
+    "isBase64Encoded": False
+}
+
+
+class MockContext:
+    def __init__(self, function_name: str, memory: int, timeout: int = MAX_API_TIMEOUT):
+        self.function_name = function_name
+        self.memory_limit_in_mb = memory
+        self.invoked_function_arn = f"arn:aws:lambda:us-east-1:123456789012:function:{function_name}"
+        self.aws_request_id = str(uuid4())
+        self._deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self._deadline - time.monotonic()) * 1000)
+
+
+def load_events(path: str | None) -> list[dict]:
+    if not path:
+        return [DEFAULT_EVENT]
+    files = sorted(Path(path).glob("*.json")) if Path(path).is_dir() else [Path(path)]
+    return [json.loads(file.read_text()) for file in files]
+
+
+def cpu_share(memory: int) -> float:
+    return min(memory / FULL_VCPU_MEMORY, 1.0)
+
+
+def worker(function_name: str, events: list[dict], memory: int, invocations: int, simulate: bool) -> dict:
+    """ Run in the worker process: import the handler (init) and invoke it with the events """
+    sys.path[:0] = [str(LAMBDAS_PATH / function_name)] + [str(path) for path in LAYER_PATHS]
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    from lambda_function import lambda_handler
+    init = (time.perf_counter() - start, time.process_time() - cpu_start)
+
+    durations = []
+    for index in range(invocations):
+        event = events[index % len(events)]
+        start, cpu_start = time.perf_counter(), time.process_time()
+        lambda_handler(json.loads(json.dumps(event)), MockContext(function_name, memory))
+        durations.append((time.perf_counter() - start, time.process_time() - cpu_start))
+
+    def estimate(wall: float, cpu: float) -> float:
+        # The CPU bound part runs slower with a fraction of a vCPU, the waits (network, database) don't change
+        return (max(wall - cpu, 0) + cpu / cpu_share(memory)) * 1000 if simulate else wall * 1000
+
+    return {
+        "init_ms": estimate(*init),
+        "durations_ms": [estimate(*duration) for duration in durations],
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def create_cgroup(memory: int) -> Path | None:
+    """ Child cgroup with the CPU and memory of the memory size, None when cgroup v2 is not writable """
+    controllers = CGROUP_ROOT / "cgroup.subtree_control"
+    if not controllers.exists() or not {"cpu", "memory"} <= set(controllers.read_text().split()):
+        return None
+    group = CGROUP_ROOT / f"power-tuning-{memory}-{os.getpid()}"
+    try:
+        group.mkdir()
+        (group / "cpu.max").write_text(f"{int(100000 * cpu_share(memory))} 100000")
+        (group / "memory.max").write_text(str(memory * 1024 * 1024))
+        return group
+    except OSError:
+        if group.exists():
+            group.rmdir()
+        return None
+
+
+def remove_cgroup(group: Path, retries: int = 20) -> None:
+    # The kernel releases the cgroup of an exited process asynchronously
+    for _ in range(retries):
+        try:
+            group.rmdir()
+            return
+        except OSError:
+            time.sleep(0.05)
+    print(f"Cannot remove {group}", file=sys.stderr)
+
+
+def run_memory_size(function_name: str, events_path: str | None, memory: int, invocations: int, use_cgroup: bool) -> dict:
+    group = create_cgroup(memory) if use_cgroup else None
+    if use_cgroup and group is None:
+        print(f"cgroup v2 is not writable, {memory} MB is simulated with the CPU share", file=sys.stderr)
+
+    command = [sys.executable, __file__, function_name, "--worker", "--memory", str(memory), "--invocations", str(invocations)]
+    if events_path:
+        command += ["--events", events_path]
+    if group is None:
+        command.append("--simulate")
+
+    def join_cgroup():
+        # The worker enters the cgroup before exec, the import of the handler is already limited
+        (group / "cgroup.procs").write_text(str(os.getpid()))
+
+    env = {**os.environ, "AWS_LAMBDA_FUNCTION_MEMORY_SIZE": str(memory), "AWS_LAMBDA_FUNCTION_NAME": function_name}
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env, cwd=BASE_DIR, preexec_fn=join_cgroup if group is not None else None)
+        stdout, stderr = process.communicate()
+    finally:
+        if group is not None:
+            remove_cgroup(group)
+
+    if process.returncode != 0:
+        return {"memory": memory, "error": stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {process.returncode}"}
+    return {"memory": memory, **json.loads(stdout.strip().splitlines()[-1])}
+
+
+def summarize(result: dict, architecture: str) -> dict:
+    durations = sorted(result["durations_ms"])
+    p95 = durations[min(len(durations) - 1, math.ceil(len(durations) * 0.95) - 1)]
+    average = statistics.mean(durations)
+    # Lambda bills by millisecond
+    cost = math.ceil(average) / 1000 * result["memory"] / 1024 * PRICE_GB_SECOND[architecture] + PRICE_REQUEST
+    return {
+        "memory": result["memory"],
+        "avg_ms": round(average, 2),
+        "p95_ms": round(p95, 2),
+        "max_ms": round(durations[-1], 2),
+        "init_ms": round(result["init_ms"], 2),
+        "max_rss_mb": round(result["max_rss_mb"], 1),
+        "fits": result["max_rss_mb"] < result["memory"],
+        "cost_per_million": round(cost * 1_000_000, 4),
+    }
+
+
+def recommend(summaries: list[dict], strategy: str, tolerance: float, slack_ms: float) -> dict | None:
+    """ cost: cheapest size, speed: fastest p95, balanced: cheapest size whose p95 is within the tolerance (relative or
+    slack_ms absolute) of the fastest p95 """
+    candidates = [summary for summary in summaries if summary["fits"]]
+    if not candidates:
+        return None
+    if strategy == "cost":
+        return min(candidates, key=lambda summary: (summary["cost_per_million"], summary["p95_ms"]))
+    fastest = min(candidates, key=lambda summary: summary["p95_ms"])
+    if strategy == "speed":
+        return fastest
+    limit = max(fastest["p95_ms"] * (1 + tolerance), fastest["p95_ms"] + slack_ms)
+    return min((summary for summary in candidates if summary["p95_ms"] <= limit), key=lambda summary: (summary["cost_per_million"], summary["memory"]))
+
+
+def recommend_timeout(summary: dict) -> int:
+    """ Three times the worst invocation (plus the init of a cold start), between 3 and 29 seconds """
+    return min(MAX_API_TIMEOUT, max(3, math.ceil((summary["max_ms"] + summary["init_ms"]) * 3 / 1000)))
+
+
+def write_function_config(function_name: str, memory: int, timeout: int, architecture: str, summaries: list[dict]) -> Path:
+    path = LAMBDAS_PATH / function_name / FUNCTION_CONFIG_FILE
+    config = json.loads(path.read_text()) if path.exists() else {}
+    config.update({"memory_size": memory, "timeout": timeout, "architecture": architecture, "tuning": summaries})
+    path.write_text(json.dumps(config, indent=4) + "\n")
+    return path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Memory and timeout tuning of a function with recorded events")
+    parser.add_argument("function", help="Folder of the function in src/lambdas")
+    parser.add_argument("--events", help="Event JSON file or folder of recorded events")
+    parser.add_argument("--memory", default=",".join(str(memory) for memory in DEFAULT_MEMORY_SIZES), help="Comma separated memory sizes (MB)")
+    parser.add_argument("--invocations", type=int, default=20)
+    parser.add_argument("--architecture", choices=list(PRICE_GB_SECOND), default="x86_64")
+    parser.add_argument("--strategy", choices=["cost", "speed", "balanced"], default="balanced")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative slowdown accepted by the balanced strategy")
+    parser.add_argument("--slack-ms", type=float, default=5, help="Absolute slowdown (ms) accepted by the balanced strategy")
+    parser.add_argument("--cgroup", action="store_true", help="Limit the workers with cgroup v2 instead of simulating the CPU share")
+    parser.add_argument("--write", action="store_true", help=f"Write the recommendation in {FUNCTION_CONFIG_FILE}")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--simulate", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.function, load_events(args.events), int(args.memory), args.invocations, args.simulate)))
+        return 0
+
+    summaries = []
+    for memory in [int(value) for value in args.memory.split(",")]:
+        result = run_memory_size(args.function, args.events, memory, args.invocations, args.cgroup)
+        if "error" in result:
+            print(f"{memory:>6} MB  failed: {result['error']}")
+            continue
+        summary = summarize(result, args.architecture)
+        summaries.append(summary)
+        print(f"{memory:>6} MB  avg {summary['avg_ms']:>9.2f} ms  p95 {summary['p95_ms']:>9.2f} ms  init {summary['init_ms']:>8.2f} ms  "
+              f"rss {summary['max_rss_mb']:>6.1f} MB{'' if summary['fits'] else ' (OOM)'}  ${summary['cost_per_million']:.4f} / 1M")
+
+    best = recommend(summaries, args.strategy, args.tolerance, args.slack_ms)
+    if best is None:
+        print("No memory size can run the function", file=sys.stderr)
+        return 1
+
+    timeout = recommend_timeout(best)
+    print(f"Recommended ({args.strategy}): memory_size={best['memory']} timeout={timeout} architecture={args.architecture}")
+    if args.write:
+        path = write_function_config(args.function, best["memory"], timeout, args.architecture, summaries)
+        print(f"Written {path.relative_to(BASE_DIR)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
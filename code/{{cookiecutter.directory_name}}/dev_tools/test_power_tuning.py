@@ -0,0 +1,73 @@
+import pytest
+
+from power_tuning import MAX_API_TIMEOUT, PRICE_GB_SECOND, PRICE_REQUEST, recommend, recommend_timeout, summarize
+
+
+def size(memory: int, p95_ms: float, cost: float, fits: bool = True) -> dict:
+    return {"memory": memory, "p95_ms": p95_ms, "cost_per_million": cost, "fits": fits}
+
+
+SUMMARIES = [
+    size(128, 200, 0.25, fits=False),
+    size(256, 100, 0.30),
+    size(512, 52, 0.40),
+    size(1024, 50, 0.70),
+    size(1769, 48, 1.10),
+]
+
+
+def test_summarize():
+    result = {"memory": 1024, "durations_ms": [float(value) for value in range(20, 0, -1)], "init_ms": 350.123, "max_rss_mb": 80.04}
+
+    summary = summarize(result, "arm64")
+
+    assert summary == {
+        "memory": 1024,
+        "avg_ms": 10.5,
+        "p95_ms": 19.0,
+        "max_ms": 20.0,
+        "init_ms": 350.12,
+        "max_rss_mb": 80.0,
+        "fits": True,
+        # Billed by millisecond: 11 ms of 1 GB
+        "cost_per_million": round((0.011 * PRICE_GB_SECOND["arm64"] + PRICE_REQUEST) * 1_000_000, 4),
+    }
+    assert summarize({**result, "max_rss_mb": 1024}, "x86_64")["fits"] is False
+
+
+@pytest.mark.parametrize('strategy, tolerance, slack_ms, memory', [
+    # The cheapest size that fits, the 128 MB one runs out of memory
+    ("cost", 0.1, 5, 256),
+    ("speed", 0.1, 5, 1769),
+    # p95 within max(48 * 1.1, 48 + 5) = 53 ms
+    ("balanced", 0.1, 5, 512),
+    ("balanced", 0.0, 0, 1769),
+    ("balanced", 0.0, 60, 256),
+    ("balanced", 1.5, 0, 256),
+], ids=["cost", "speed", "balanced", "balanced-strict", "balanced-slack", "balanced-tolerance"])
+def test_recommend(strategy, tolerance, slack_ms, memory):
+    assert recommend(SUMMARIES, strategy, tolerance, slack_ms)["memory"] == memory
+
+
+def test_recommend_ties():
+    # Same cost: the fastest for cost, the smallest memory for balanced
+    summaries = [size(512, 40, 0.5), size(256, 45, 0.5), size(1024, 39, 0.9)]
+
+    assert recommend(summaries, "cost", 0.1, 5)["memory"] == 512
+    assert recommend(summaries, "balanced", 0.2, 0)["memory"] == 256
+
+
+@pytest.mark.parametrize('strategy', ["cost", "speed", "balanced"])
+def test_no_size_fits(strategy):
+    assert recommend([size(128, 10, 0.1, fits=False), size(256, 9, 0.2, fits=False)], strategy, 0.1, 5) is None
+    assert recommend([], strategy, 0.1, 5) is None
+
+
+@pytest.mark.parametrize('max_ms, init_ms, timeout', [
+    (100, 200, 3),
+    (2000, 1000, 9),
+    (2100, 0, 7),
+    (12000, 0, MAX_API_TIMEOUT),
+], ids=["minimum", "with-init", "rounded-up", "api-limit"])
+def test_recommend_timeout(max_ms, init_ms, timeout):
+    assert recommend_timeout({"max_ms": max_ms, "init_ms": init_ms}) == timeout
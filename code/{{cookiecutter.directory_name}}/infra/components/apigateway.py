@@ -1,3 +1,4 @@
+import re
 import json
 import logging
 import hashlib
@@ -9,10 +10,14 @@ from typing import Optional
 from enum import Enum
 from pathlib import Path
 from typing import cast
+from utils.lambda_config import INVOKE_ARNS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+## Function name in the uri of a lambda proxy integration
+LAMBDA_URI_PATTERN = re.compile(r":function:([^:/]+)")
+
 class HttpMethod (Enum):
     """
     Enum class representing HTTP methods.
@@ -333,7 +338,7 @@ class ApiGatewayStack(pulumi.ComponentResource):
             "api_resource_path": self.api_resource.id
         })
 
-    def build_openapi_file(self) -> tuple[str, str]:
+    def build_openapi_file(self) -> tuple[pulumi.Output[str], pulumi.Output[str]]:
         # Read openApi file
         raw_spec = (Path(__file__).parent / self.OPEN_API_SPEC).read_text(encoding="utf-8")
 
@@ -344,8 +349,31 @@ class ApiGatewayStack(pulumi.ComponentResource):
         # Modify the spec as needed
         spec['info']['title'] = f"{project_config.APP_NAME} API"
 
-        # Serialize json
-        openapi_body = json.dumps(spec)
-        openapi_sha = hashlib.sha256(openapi_body.encode("utf-8")).hexdigest()
+        # The lambda integrations invoke the ARN registered by their function stack (the alias of the primed
+        # versions), so the function stacks must be created before the gateway
+        openapi_body = pulumi.Output.all(**INVOKE_ARNS).apply(lambda invoke_arns: json.dumps(self.replace_integration_uris(spec, invoke_arns or {})))
+        openapi_sha = openapi_body.apply(lambda body: hashlib.sha256(body.encode("utf-8")).hexdigest())
 
         return (openapi_body, openapi_sha)
+
+    @staticmethod
+    def replace_integration_uris(spec: dict, invoke_arns: dict[str, str]) -> dict:
+        """
+        Point the lambda proxy integrations of the spec at the invoke ARN registered for their function.
+
+        Args:
+            spec (dict): OpenAPI specification
+            invoke_arns (dict[str, str]): Invoke ARN by function name
+
+        Returns:
+            dict: The same specification with the uris replaced
+        """
+        for path_item in spec.get('paths', {}).values():
+            for operation in path_item.values():
+                integration = operation.get('x-amazon-apigateway-integration') if isinstance(operation, dict) else None
+                if not integration or integration.get('type') != 'aws_proxy':
+                    continue
+                match = LAMBDA_URI_PATTERN.search(str(integration.get('uri', '')))
+                if match and match.group(1) in invoke_arns:
+                    integration['uri'] = invoke_arns[match.group(1)]
+        return spec
@@ -6,6 +6,7 @@ import config as project_config
 
 from typing import Optional
 from pathlib import Path
+from utils.lambda_config import LAMBDA_RUNTIME
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,17 +19,20 @@ class LambdaLayersStack(pulumi.ComponentResource):
         super().__init__("{{ cookiecutter.project_name }}:components:lambdaLayersStack", name, {}, opts)
 
         output_path = Path.cwd().joinpath("../tmp_build_layer")
+        for layer in ("core", "databases"):
+            if not (output_path / layer / "python").exists():
+                logger.warning(f"Layer {layer} is not built, run python infra/utils/build_layer.py")
 
         self.core_layer = aws.lambda_.LayerVersion(f"{name}-core-layer",
             layer_name=f"{project_config.ENVIRONMENT}-{project_config.APP_NAME}-core-layer",
-            compatible_runtimes=[aws.lambda_.Runtime.PYTHON3D11],
+            compatible_runtimes=[LAMBDA_RUNTIME],
             code=pulumi.FileArchive(str((output_path / "core").resolve())),
             description="Core layer for Lambda functions"
         )
 
         self.databases_layer = aws.lambda_.LayerVersion(f"{name}-databases-layer",
             layer_name=f"{project_config.ENVIRONMENT}-{project_config.APP_NAME}-databases-layer",
-            compatible_runtimes=[aws.lambda_.Runtime.PYTHON3D11],
+            compatible_runtimes=[LAMBDA_RUNTIME],
             code=pulumi.FileArchive(str((output_path / "databases").resolve())),
             description="Databases layer for Lambda functions"
         )
\ No newline at end of file
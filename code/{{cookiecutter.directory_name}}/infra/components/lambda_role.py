@@ -78,6 +78,30 @@ class LambdaRoleStack(pulumi.ComponentResource):
                             "Resource": ["*"],
                         }],
                     }),
+                }, {
+                    "name": "lambda-export-jobs-policy",
+                    "policy": json.dumps({
+                        "Version": "2012-10-17",
+                        "Statement": [{
+                            "Action": [
+                                "sqs:GetQueueUrl",
+                                "sqs:SendMessage",
+                                "sqs:ReceiveMessage",
+                                "sqs:DeleteMessage",
+                                "sqs:GetQueueAttributes"
+                            ],
+                            "Effect": "Allow",
+                            "Resource": [f"arn:aws:sqs:*:*:{project_config.ENVIRONMENT}-{project_config.APP_NAME}-exports"],
+                        }, {
+                            "Action": [
+                                "s3:GetObject",
+                                "s3:PutObject",
+                                "s3:AbortMultipartUpload"
+                            ],
+                            "Effect": "Allow",
+                            "Resource": [f"arn:aws:s3:::{project_config.ENVIRONMENT}-{project_config.APP_NAME}-exports/*".lower()],
+                        }],
+                    }),
                 }
             ],
             managed_policy_arns=[
@@ -0,0 +1,28 @@
+from components.apigateway import ApiGatewayStack
+
+FUNCTION_URI = "arn:aws:apigateway:us-east-2:lambda:path/2015-03-31/functions/arn:aws:lambda:us-east-2:123456789012:function:{}/invocations"
+
+
+def integration(function_name: str, type: str = "aws_proxy") -> dict:
+    return {"x-amazon-apigateway-integration": {"type": type, "httpMethod": "POST", "uri": FUNCTION_URI.format(function_name)}}
+
+
+def test_only_matching_lambda_proxy_uris_are_replaced():
+    spec = {
+        "paths": {
+            "/notes": {"get": integration("dev-notes"), "post": integration("dev-notes"), "parameters": [{"name": "id"}]},
+            "/hello": {"get": integration("dev-hello")},
+            "/mock": {"get": integration("dev-notes", type="mock"), "options": {"responses": {}}},
+        }
+    }
+    alias_arn = FUNCTION_URI.format("dev-notes:live")
+
+    replaced = ApiGatewayStack.replace_integration_uris(spec, {"dev-notes": alias_arn})
+
+    paths = replaced["paths"]
+    assert paths["/notes"]["get"]["x-amazon-apigateway-integration"]["uri"] == alias_arn
+    assert paths["/notes"]["post"]["x-amazon-apigateway-integration"]["uri"] == alias_arn
+    # Functions without registered ARN and integrations that aren't lambda proxies keep their uri
+    assert paths["/hello"]["get"]["x-amazon-apigateway-integration"]["uri"] == FUNCTION_URI.format("dev-hello")
+    assert paths["/mock"]["get"]["x-amazon-apigateway-integration"]["uri"] == FUNCTION_URI.format("dev-notes")
+    assert ApiGatewayStack.replace_integration_uris({}, {"dev-notes": alias_arn}) == {}
@@ -0,0 +1,24 @@
+"""
+Tests of the infrastructure (test_*.py next to the modules). The programs run with the mocks of the Pulumi SDK:
+no engine, no stack and no AWS calls, config.py reads the PULUMI_CONFIG of the tests.
+"""
+import os
+import json
+
+import pulumi
+
+os.environ.setdefault("PULUMI_CONFIG", json.dumps({"global:app-name": "tests", "global:env": "dev", "aws:region": "us-east-2"}))
+
+
+class InfraMocks(pulumi.runtime.Mocks):
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        return [f"{args.name}_id", args.inputs]
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        if args.token == "aws:index/getCallerIdentity:getCallerIdentity":
+            return {"accountId": "123456789012", "arn": "arn:aws:iam::123456789012:user/tests", "userId": "tests", "id": "123456789012"}
+        return {}
+
+
+# Before the test modules import config.py and the components
+pulumi.runtime.set_mocks(InfraMocks(), preview=False)
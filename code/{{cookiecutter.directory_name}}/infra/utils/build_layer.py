@@ -0,0 +1,304 @@
+"""
+Build of the Lambda layers in ../tmp_build_layer/<layer>/python (the folders that LambdaLayersStack zips):
+
+1. Copies the code of the layer and installs its requirements.txt for the Lambda platform (manylinux wheels).
+2. Removes the packages that the runtime already provides and the ones that the core layer ships (the layers
+   are attached together, the databases layer only keeps what the core layer doesn't have).
+3. Strips tests, docs, examples, caches, type stubs and sources of extensions.
+4. Precompiles the bytecode with the target python (unchecked-hash pyc, no stat of the sources at import).
+5. Reports the size of each layer and the import time of its entry points.
+
+    python infra/utils/build_layer.py [--arch arm64] [--python python3.11]
+"""
+import os
+import re
+import sys
+import shutil
+import zipfile
+import logging
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROOT_PROJECT = Path(__file__).resolve().parent.parent.parent
+LAYERS_PATH = ROOT_PROJECT / "src" / "layers"
+OUTPUT_PATH = ROOT_PROJECT / "tmp_build_layer"
+
+## Order matters: the packages of the first layers are removed from the next ones
+LAYERS = ["core", "databases"]
+
+PYTHON_VERSION = "3.11"
+PLATFORMS = {
+    "x86_64": "manylinux2014_x86_64",
+    "arm64": "manylinux2014_aarch64",
+}
+
+## Packages included in the Lambda python runtime
+RUNTIME_PACKAGES = ["boto3", "botocore", "s3transfer"]
+
+STRIP_DIRS = {"__pycache__"}
+## Tests, docs and examples of the packages, kept when the rest of the package imports them (e.g. testing helpers)
+STRIP_PACKAGE_DIRS = {"tests", "test", "docs", "doc", "examples"}
+STRIP_SUFFIXES = (".pyi", ".pyx", ".pxd", ".c", ".h", ".cpp")
+
+## Modules imported to measure the cold start of each layer
+IMPORT_CHECKS = {
+    "core": ["core_http.utils", "core_aws.secret_manager"],
+    "databases": ["core_db.DBConnection"],
+}
+
+## Unzipped size limit of a function with all its layers
+LAMBDA_UNZIPPED_LIMIT = 250 * 1024 * 1024
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_distributions(site_path: Path) -> dict[str, tuple[str, Path]]:
+    """ Installed distributions of a folder
+
+    Returns:
+        dict[str, tuple[str, Path]]: Version and dist-info path by normalized name
+    """
+    distributions = {}
+    for dist_info in site_path.glob("*.dist-info"):
+        name, _, version = dist_info.name[:-len(".dist-info")].partition("-")
+        distributions[normalize_name(name)] = (version, dist_info)
+    return distributions
+
+
+def remove_distribution(site_path: Path, dist_info: Path) -> int:
+    """ Remove the files of a distribution listed in its RECORD
+
+    Returns:
+        int: Removed bytes
+    """
+    removed = 0
+    record = dist_info / "RECORD"
+    paths = [line.split(",")[0] for line in record.read_text().splitlines() if line] if record.exists() else []
+    for relative in paths:
+        path = (site_path / relative).resolve()
+        if site_path.resolve() in path.parents and path.is_file():
+            removed += path.stat().st_size
+            path.unlink()
+    shutil.rmtree(dist_info, ignore_errors=True)
+
+    # Folders left empty by the distribution
+    for folder in sorted({(site_path / relative).parent for relative in paths}, key=lambda p: -len(p.parts)):
+        if folder.exists() and folder != site_path and not any(folder.iterdir()):
+            folder.rmdir()
+    return removed
+
+
+def install_requirements(requirements: Path, target: Path, arch: str) -> None:
+    logger.info(f"Installing {requirements} for {PLATFORMS[arch]} (python {PYTHON_VERSION})")
+    subprocess.run([
+        sys.executable, "-m", "pip", "install",
+        "-r", str(requirements),
+        "--target", str(target),
+        "--platform", PLATFORMS[arch],
+        "--implementation", "cp",
+        "--python-version", PYTHON_VERSION,
+        "--only-binary=:all:",
+        "--no-compile",
+        "--upgrade",
+        "--quiet",
+    ], check=True)
+
+
+def copy_layer_code(layer: str, target: Path) -> None:
+    source = LAYERS_PATH / layer / "python"
+    shutil.copytree(source, target, dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__", "*.pyc", "requirements.txt", "test_*.py"))
+
+
+def dedupe(target: Path, shared: dict[str, tuple[str, Path]]) -> list[str]:
+    """ Remove the distributions that a previous layer already ships with the same version
+
+    Returns:
+        list[str]: Removed distributions
+    """
+    removed = []
+    for name, (version, dist_info) in get_distributions(target).items():
+        if name not in shared:
+            continue
+        if shared[name][0] != version:
+            logger.warning(f"{name} {version} differs from {shared[name][0]} of a previous layer, both are kept")
+            continue
+        remove_distribution(target, dist_info)
+        removed.append(f"{name}=={version}")
+    return removed
+
+
+def is_imported(target: Path, folder: Path) -> bool:
+    """ Check if the modules of its top level package outside of a package folder import it
+
+    Args:
+        target (Path): Folder of the layer (site-packages)
+        folder (Path): Package folder
+
+    Returns:
+        bool: True if the folder is a package imported by the rest of the code
+    """
+    if not (folder / "__init__.py").exists():
+        return False
+    parts = folder.relative_to(target).parts
+    parent = re.escape(".".join(parts[:-1]))
+    name = re.escape(folder.name)
+    patterns = [rf"\b{re.escape('.'.join(parts))}\b", rf"^\s*from\s+\.{name}\b", rf"^\s*from\s+\.?\s+import\s+[^\n]*\b{name}\b"]
+    if parent:
+        patterns.append(rf"^\s*from\s+{parent}\s+import\s+[^\n]*\b{name}\b")
+    imports = re.compile("|".join(patterns), re.MULTILINE)
+    for source in (target / parts[0]).rglob("*.py"):
+        if folder in source.parents:
+            continue
+        if imports.search(source.read_text(encoding="utf-8", errors="ignore")):
+            return True
+    return False
+
+
+def strip(target: Path) -> int:
+    """ Remove tests, docs, examples, caches, type stubs and sources of compiled extensions
+
+    Returns:
+        int: Removed bytes
+    """
+    removed = 0
+    for path in sorted(target.rglob("*"), key=lambda p: -len(p.parts)):
+        if not path.exists():
+            continue
+        if path.is_dir() and (path.name in STRIP_DIRS or (path.name in STRIP_PACKAGE_DIRS and not is_imported(target, path))):
+            removed += sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+            shutil.rmtree(path)
+        elif path.is_file() and path.suffix in STRIP_SUFFIXES:
+            removed += path.stat().st_size
+            path.unlink()
+    return removed
+
+
+def compile_bytecode(target: Path, python: str) -> None:
+    """ Precompile the layer with the python of the runtime. The unchecked-hash pycs are used without comparing
+    the mtime of the sources, which the zip of the layer doesn't keep reliably
+    """
+    version = subprocess.run([python, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"], capture_output=True, text=True, check=True).stdout.strip()
+    if version != PYTHON_VERSION:
+        logger.warning(f"{python} is python {version}, the runtime ignores the bytecode of other versions (use --python python{PYTHON_VERSION})")
+    subprocess.run([python, "-m", "compileall", "-q", "-j", "0", "--invalidation-mode", "unchecked-hash", str(target)], check=False)
+
+
+def get_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def get_zip_size(path: Path) -> int:
+    with tempfile.TemporaryFile() as file:
+        with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as archive:
+            for item in path.rglob("*"):
+                if item.is_file():
+                    archive.write(item, item.relative_to(path))
+        return file.tell()
+
+
+def measure_import(modules: list[str], python_paths: list[Path], python: str) -> dict[str, float | None]:
+    """ Cumulative import time (ms) of each module in a fresh interpreter with the built layers
+
+    Returns:
+        dict[str, float | None]: Milliseconds by module, None when the module can't be imported in this platform
+    """
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(str(path) for path in python_paths), "AWS_LAMBDA_FUNCTION_NAME": "build-layer"}
+    times = {}
+    for module in modules:
+        result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, env=env)
+        times[module] = None
+        if result.returncode != 0:
+            continue
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and line.rstrip().endswith(f"| {module}"):
+                times[module] = int(line.split("|")[1]) / 1000
+    return times
+
+
+def build(layers: list[str] = LAYERS, arch: str = "x86_64", python: str = sys.executable, keep_runtime_packages: bool = False, output_path: Path = OUTPUT_PATH) -> dict:
+    """ Build the layers and report their size
+
+    Returns:
+        dict: Report by layer
+    """
+    report = {}
+    shipped: dict[str, tuple[str, Path]] = {}
+    python_paths = []
+
+    # Layers built before that are not rebuilt now still dedupe the next ones
+    for layer in LAYERS[:LAYERS.index(layers[0])] if layers else []:
+        previous = output_path / layer / "python"
+        if previous.exists():
+            shipped.update(get_distributions(previous))
+            python_paths.append(previous)
+
+    for layer in layers:
+        target = output_path / layer / "python"
+        shutil.rmtree(output_path / layer, ignore_errors=True)
+        target.mkdir(parents=True)
+
+        copy_layer_code(layer, target)
+        requirements = LAYERS_PATH / layer / "python" / "requirements.txt"
+        if requirements.exists():
+            install_requirements(requirements, target, arch)
+
+        removed = []
+        if not keep_runtime_packages:
+            distributions = get_distributions(target)
+            for name in RUNTIME_PACKAGES:
+                if name in distributions:
+                    remove_distribution(target, distributions[name][1])
+                    removed.append(name)
+        removed += dedupe(target, shipped)
+        stripped = strip(target)
+        compile_bytecode(target, python)
+
+        shipped.update(get_distributions(target))
+        python_paths.append(target)
+        report[layer] = {
+            "size": get_size(target),
+            "zip_size": get_zip_size(output_path / layer),
+            "stripped": stripped,
+            "removed": removed,
+            "import_ms": measure_import(IMPORT_CHECKS.get(layer, []), python_paths, python),
+        }
+    return report
+
+
+def print_report(report: dict) -> None:
+    total = 0
+    for layer, item in report.items():
+        total += item["size"]
+        logger.info(f"{layer}: {item['size'] / 1024 / 1024:.1f} MB unzipped, {item['zip_size'] / 1024 / 1024:.1f} MB zipped, {item['stripped'] / 1024 / 1024:.1f} MB stripped")
+        if item["removed"]:
+            logger.info(f"    removed (runtime / previous layers): {', '.join(item['removed'])}")
+        for module, elapsed_ms in item["import_ms"].items():
+            logger.info(f"    import {module}: " + (f"{elapsed_ms:.1f} ms" if elapsed_ms is not None else "not importable in this platform"))
+    if total > LAMBDA_UNZIPPED_LIMIT:
+        logger.error(f"The layers take {total / 1024 / 1024:.1f} MB, over the 250 MB unzipped limit of Lambda")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the Lambda layers in tmp_build_layer")
+    parser.add_argument("--layer", action="append", choices=LAYERS, help="Layer to build (repeatable), defaults to all")
+    parser.add_argument("--arch", choices=list(PLATFORMS), default="x86_64")
+    parser.add_argument("--python", default=sys.executable, help=f"Interpreter used to precompile the bytecode (python {PYTHON_VERSION})")
+    parser.add_argument("--keep-runtime-packages", action="store_true", help="Ship boto3/botocore in the layers")
+    parser.add_argument("--output", default=str(OUTPUT_PATH))
+    args = parser.parse_args(argv)
+
+    layers = [layer for layer in LAYERS if layer in (args.layer or LAYERS)]
+    report = build(layers, args.arch, args.python, args.keep_runtime_packages, Path(args.output))
+    print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
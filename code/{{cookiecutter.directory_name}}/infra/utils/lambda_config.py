@@ -0,0 +1,80 @@
+import json
+import logging
+import pulumi
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+## File with the settings of each function (written by dev_tools/power_tuning.py)
+FUNCTION_CONFIG_FILE = "function_config.json"
+
+## Runtime of the functions and the layers, build the layers with the same python (build_layer.py --python)
+LAMBDA_RUNTIME = "python3.11"
+## First python runtime with SnapStart
+SNAP_START_MIN_PYTHON = (3, 12)
+
+## ARN that API Gateway invokes for each function name: the alias of the primed versions or the function itself
+INVOKE_ARNS: dict[str, pulumi.Output[str]] = {}
+
+DEFAULT_FUNCTION_CONFIG = {
+    "memory_size": 128,
+    "timeout": 5,
+    "architecture": "x86_64",
+    # Instances initialized in advance (published version + alias), the layers prime them with core_utils.priming
+    "provisioned_concurrency": 0,
+    # SnapStart of the published versions (python 3.12+ runtimes)
+    "snap_start": False,
+}
+
+
+def get_function_config(function_directory: Path) -> dict:
+    """
+    Read the memory, timeout, architecture and init settings of a function from its function_config.json.
+
+    Args:
+        function_directory (Path): Folder of the function (src/lambdas/<name>)
+
+    Raises:
+        ValueError: SnapStart requested on a runtime that doesn't support it
+
+    Returns:
+        dict: Settings of the function, the missing ones take the defaults
+    """
+    config_path = Path(function_directory) / FUNCTION_CONFIG_FILE
+    config = dict(DEFAULT_FUNCTION_CONFIG)
+    if config_path.exists():
+        try:
+            config.update({key: value for key, value in json.loads(config_path.read_text()).items() if key in DEFAULT_FUNCTION_CONFIG})
+        except ValueError as e:
+            logger.error(f"Invalid {config_path}: {e}")
+
+    if config["snap_start"] and get_python_version(LAMBDA_RUNTIME) < SNAP_START_MIN_PYTHON:
+        raise ValueError(f"{config_path}: snap_start needs python {'.'.join(map(str, SNAP_START_MIN_PYTHON))}+ and the functions run on {LAMBDA_RUNTIME}, use provisioned_concurrency")
+    return config
+
+
+def get_python_version(runtime: str) -> tuple[int, ...]:
+    """
+    Version of a python runtime name (python3.11 -> (3, 11)).
+    """
+    return tuple(int(part) for part in runtime.removeprefix("python").split("."))
+
+
+def needs_alias(config: dict) -> bool:
+    """
+    Provisioned concurrency and SnapStart only apply to published versions invoked through an alias.
+    """
+    return bool(config["provisioned_concurrency"]) or bool(config["snap_start"])
+
+
+def register_invoke_arn(function_name: str, invoke_arn: pulumi.Output[str]) -> None:
+    """
+    Register the ARN of a function for the API Gateway integrations (ApiGatewayStack replaces the uri of the
+    integrations of the function with it).
+
+    Args:
+        function_name (str): Name of the function in AWS
+        invoke_arn (pulumi.Output[str]): Invoke ARN of the alias or of the function
+    """
+    INVOKE_ARNS[function_name] = invoke_arn
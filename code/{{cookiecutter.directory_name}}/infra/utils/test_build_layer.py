@@ -0,0 +1,92 @@
+import pytest
+
+from utils.build_layer import dedupe, get_distributions, remove_distribution, strip
+
+
+def write(path, content: str = "") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def install(site, name: str, version: str, files: dict[str, str]) -> None:
+    """ Distribution with its RECORD, as pip --target leaves it """
+    for relative, content in files.items():
+        write(site / relative, content)
+    dist_info = f"{name}-{version}.dist-info"
+    record = [f"{relative},sha256=,{len(content)}" for relative, content in files.items()] + [f"{dist_info}/RECORD,,"]
+    write(site / dist_info / "RECORD", "\n".join(record) + "\n")
+    write(site / dist_info / "METADATA", f"Name: {name}\nVersion: {version}\n")
+
+
+@pytest.fixture
+def site(tmp_path):
+    site = tmp_path / "python"
+    install(site, "typing_extensions", "4.12.2", {"typing_extensions.py": "x = 1\n"})
+    install(site, "SQLAlchemy", "2.0.41", {"sqlalchemy/__init__.py": "", "sqlalchemy/orm/__init__.py": "", "sqlalchemy/orm/session.py": "y = 2\n"})
+    install(site, "PyMySQL", "1.1.1", {"pymysql/__init__.py": ""})
+    return site
+
+
+def test_remove_distribution(site, tmp_path):
+    outside = tmp_path / "outside.py"
+    write(outside, "keep")
+    install(site, "evil", "1.0", {"evil.py": "z = 3\n"})
+    record = site / "evil-1.0.dist-info" / "RECORD"
+    record.write_text(record.read_text() + "../outside.py,,\n")
+
+    record_size = (site / "SQLAlchemy-2.0.41.dist-info" / "RECORD").stat().st_size
+    assert remove_distribution(site, site / "SQLAlchemy-2.0.41.dist-info") == len("y = 2\n") + record_size
+    assert not (site / "sqlalchemy").exists()
+    assert not (site / "SQLAlchemy-2.0.41.dist-info").exists()
+
+    remove_distribution(site, site / "evil-1.0.dist-info")
+    assert not (site / "evil.py").exists()
+    # RECORD entries outside of the layer are never removed
+    assert outside.read_text() == "keep"
+
+
+def test_dedupe_removes_the_same_versions_of_previous_layers(site, tmp_path):
+    core = tmp_path / "core"
+    install(core, "Typing_Extensions", "4.12.2", {"typing_extensions.py": "x = 1\n"})
+    install(core, "sqlalchemy", "2.0.40", {"sqlalchemy/__init__.py": ""})
+
+    removed = dedupe(site, get_distributions(core))
+
+    assert removed == ["typing-extensions==4.12.2"]
+    assert not (site / "typing_extensions.py").exists()
+    # Different versions are kept in both layers
+    assert sorted(get_distributions(site)) == ["pymysql", "sqlalchemy"]
+
+
+def test_strip_keeps_the_imported_test_packages(tmp_path):
+    site = tmp_path / "python"
+    write(site / "library" / "__init__.py", "from library.core import run\n")
+    write(site / "library" / "core.py", "def run(): pass\n")
+    write(site / "library" / "core.pyi", "def run() -> None: ...\n")
+    write(site / "library" / "tests" / "__init__.py")
+    write(site / "library" / "tests" / "test_core.py", "assert True\n")
+    write(site / "library" / "docs" / "index.rst", "Library\n")
+    write(site / "library" / "examples" / "demo.py", "import library\n")
+    write(site / "library" / "__pycache__" / "core.cpython-311.pyc", "bytecode")
+    write(site / "helpers" / "__init__.py")
+    write(site / "helpers" / "testing.py", "from helpers.tests.fixtures import build\n")
+    write(site / "helpers" / "tests" / "__init__.py")
+    write(site / "helpers" / "tests" / "fixtures.py", "def build(): pass\n")
+    write(site / "relative" / "__init__.py", "from . import test\n")
+    write(site / "relative" / "test" / "__init__.py")
+    write(site / "tests" / "test_top_level.py", "assert True\n")
+
+    removed = strip(site)
+
+    remaining = sorted(str(path.relative_to(site)) for path in site.rglob("*") if path.is_file())
+    assert remaining == [
+        "helpers/__init__.py",
+        "helpers/testing.py",
+        "helpers/tests/__init__.py",
+        "helpers/tests/fixtures.py",
+        "library/__init__.py",
+        "library/core.py",
+        "relative/__init__.py",
+        "relative/test/__init__.py",
+    ]
+    assert removed == sum(len(content) for content in ("def run() -> None: ...\n", "assert True\n", "Library\n", "import library\n", "bytecode", "assert True\n"))
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from utils import lambda_config
+from utils.lambda_config import DEFAULT_FUNCTION_CONFIG, get_function_config, get_python_version, needs_alias
+
+
+def write_config(directory, config) -> None:
+    (directory / lambda_config.FUNCTION_CONFIG_FILE).write_text(config if isinstance(config, str) else json.dumps(config))
+
+
+def test_missing_settings_take_the_defaults(tmp_path):
+    assert get_function_config(tmp_path) == DEFAULT_FUNCTION_CONFIG
+
+    write_config(tmp_path, {"memory_size": 512, "timeout": 10, "unknown": True})
+    assert get_function_config(tmp_path) == {**DEFAULT_FUNCTION_CONFIG, "memory_size": 512, "timeout": 10}
+
+    write_config(tmp_path, "{not json")
+    assert get_function_config(tmp_path) == DEFAULT_FUNCTION_CONFIG
+
+
+def test_snap_start_needs_python_3_12(tmp_path, monkeypatch):
+    write_config(tmp_path, {"snap_start": True})
+    with pytest.raises(ValueError, match="snap_start needs python 3.12"):
+        get_function_config(tmp_path)
+
+    monkeypatch.setattr(lambda_config, 'LAMBDA_RUNTIME', "python3.12")
+    assert get_function_config(tmp_path)["snap_start"] is True
+
+
+def test_primed_functions_need_an_alias():
+    assert get_python_version("python3.11") == (3, 11)
+    assert needs_alias(DEFAULT_FUNCTION_CONFIG) is False
+    assert needs_alias({**DEFAULT_FUNCTION_CONFIG, "provisioned_concurrency": 2}) is True
+    assert needs_alias({**DEFAULT_FUNCTION_CONFIG, "snap_start": True}) is True
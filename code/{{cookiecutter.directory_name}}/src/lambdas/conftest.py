@@ -0,0 +1,35 @@
+"""
+Every lambda has its own lambda_function.py and test_lambda_function.py, the modules of different lambdas share their
+names. Before the tests of a lambda are collected and run its folder goes first in sys.path and the modules of the
+previous lambda are dropped, so pytest tests all the lambdas in the same session.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+TEST_MODULE = "test_lambda_function"
+HANDLER_MODULE = "lambda_function"
+
+
+def use_lambda_folder(folder: Path, modules: tuple) -> None:
+    for module in modules:
+        sys.modules.pop(module, None)
+    path = str(folder)
+    if path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
+
+
+def pytest_collectstart(collector):
+    if isinstance(collector, pytest.Module) and collector.path.stem == TEST_MODULE:
+        use_lambda_folder(collector.path.parent, (TEST_MODULE, HANDLER_MODULE))
+
+
+@pytest.fixture(autouse=True)
+def lambda_folder(request):
+    if request.path.stem == TEST_MODULE:
+        use_lambda_folder(request.path.parent, (HANDLER_MODULE,))
+        # Classes of the test imported by their path (e.g. the model of an export job) come from its own module
+        sys.modules[TEST_MODULE] = request.module
+    yield
@@ -0,0 +1,150 @@
+import logging
+import pulumi
+import pulumi_aws as aws
+from pathlib import Path
+
+from typing import Optional
+from utils.lambda_config import LAMBDA_RUNTIME, get_function_config, needs_alias
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+## Days that the files of the export jobs are kept
+EXPORT_FILES_RETENTION_DAYS = 7
+## Deliveries of a range before it goes to the dead letter queue
+EXPORT_MAX_RECEIVE_COUNT = 3
+
+class LambdaExportWorkerStack(pulumi.ComponentResource):
+    def __init__(self,
+                 name: str,
+                 environment: str,
+                 app_name: str,
+                 lambda_execution_role_arn: pulumi.Output[str],
+                 layers: list[pulumi.Output[str]] | None = None,
+                 sg_ids: list[str] | None = None,
+                 subnets_ids: list[str] | None = None,
+                 tags: Optional[dict] = None,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__("{{ cookiecutter.project_name }}:lambdas:LambdaExportWorkerStack", name, {}, opts)
+
+        self.name = name
+        self.tags = tags or {}
+
+        lambda_function_name = "export_worker"
+        cur_directory = Path(__file__).parent
+        # Memory, timeout and architecture from function_config.json (see dev_tools/power_tuning.py)
+        function_config = get_function_config(cur_directory)
+
+        # Files, manifests and progress of the export jobs (core_http.export_jobs)
+        self.exports_bucket = aws.s3.BucketV2(
+            f"{name}-exports-bucket",
+            bucket=f"{environment}-{app_name}-exports".lower(),
+            force_destroy=True,
+            tags=self.tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        aws.s3.BucketLifecycleConfigurationV2(
+            f"{name}-exports-bucket-lifecycle",
+            bucket=self.exports_bucket.id,
+            rules=[{
+                "id": "expire-exports",
+                "status": "Enabled",
+                "filter": {},
+                "expiration": {"days": EXPORT_FILES_RETENTION_DAYS},
+                "abort_incomplete_multipart_upload": {"days_after_initiation": 1},
+            }],
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        aws.s3.BucketPublicAccessBlock(
+            f"{name}-exports-bucket-public-access",
+            bucket=self.exports_bucket.id,
+            block_public_acls=True,
+            block_public_policy=True,
+            ignore_public_acls=True,
+            restrict_public_buckets=True,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Ranges of the jobs, the ones that keep failing go to the dead letter queue
+        self.dead_letter_queue = aws.sqs.Queue(
+            f"{name}-exports-dlq",
+            name=f"{environment}-{app_name}-exports-dlq",
+            message_retention_seconds=1209600,
+            tags=self.tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.exports_queue = aws.sqs.Queue(
+            f"{name}-exports-queue",
+            name=f"{environment}-{app_name}-exports",
+            # Longer than the timeout of the worker, a running range is not delivered twice
+            visibility_timeout_seconds=function_config["timeout"] * 6,
+            redrive_policy=pulumi.Output.json_dumps({
+                "deadLetterTargetArn": self.dead_letter_queue.arn,
+                "maxReceiveCount": EXPORT_MAX_RECEIVE_COUNT,
+            }),
+            tags=self.tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Create a log group for the lambda function
+        self.lambda_log_group = aws.cloudwatch.LogGroup(
+            f"{name}-{lambda_function_name}lambda-log-group",
+            name=f"/aws/lambda/{environment}-{app_name}-{lambda_function_name}",
+            retention_in_days=5,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Create a lambda function
+        self.lambda_function = aws.lambda_.Function(
+            f"{name}-lambda-function",
+            name=f"{environment}-{app_name}-{lambda_function_name}",
+            description="Export jobs worker",
+            role=lambda_execution_role_arn,
+            handler="lambda_function.lambda_handler",
+            runtime=LAMBDA_RUNTIME,
+            code=pulumi.asset.AssetArchive({
+                ".": pulumi.asset.FileArchive(str(cur_directory.resolve()))
+            }),
+            memory_size=function_config["memory_size"],
+            timeout=function_config["timeout"],
+            architectures=[function_config["architecture"]],
+            publish=needs_alias(function_config),
+            snap_start=aws.lambda_.FunctionSnapStartArgs(apply_on="PublishedVersions") if function_config["snap_start"] else None,
+            tags=self.tags,
+            layers=layers,
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={
+                "ENVIRONMENT": environment,
+                "APP_NAME": app_name,
+                "LOG_LEVEL": "INFO",
+                "EXPORT_JOB_QUEUE": self.exports_queue.name,
+                "EXPORT_JOB_STORAGE_URL": self.exports_bucket.bucket.apply(lambda bucket: f"s3://{bucket}/jobs"),
+            }),
+            vpc_config=aws.lambda_.FunctionVpcConfigArgs(
+                security_group_ids=sg_ids,
+                subnet_ids=subnets_ids
+            ),
+            logging_config={
+                "log_format": "Text",
+            },
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # One range per invocation, the failed ones return to the queue (partial batch response)
+        self.event_source_mapping = aws.lambda_.EventSourceMapping(
+            f"{name}-exports-queue-mapping",
+            event_source_arn=self.exports_queue.arn,
+            function_name=self.lambda_function.arn,
+            batch_size=1,
+            function_response_types=["ReportBatchItemFailures"],
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.register_outputs({
+            "lambda_function_name": self.lambda_function.name,
+            "exports_queue_name": self.exports_queue.name,
+            "exports_bucket_name": self.exports_bucket.bucket
+        })
@@ -0,0 +1,10 @@
+from aws_lambda_powertools import Logger
+from core_http.export_jobs import process_export_records
+
+logger = Logger()
+
+
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event, context):
+    # Every message is a range of an export job (core_http.export_jobs), the failed ones return to the queue
+    return process_export_records(event)
@@ -0,0 +1,141 @@
+import os
+import sys
+import csv
+import io
+import json
+import logging
+import tempfile
+from unittest import TestCase, TestLoader, TextTestRunner
+from uuid import uuid4
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, Integer, String
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.DBConnection import DBConnection
+from core_db.config import CONNECTIONS
+from core_db.export import ExportColumn
+from core_http.export_jobs import DONE, MemoryExportQueue, MemoryExportStorage, create_export_job, get_export_job_status, set_export_queue, set_export_storage
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+load_dotenv(override=True)
+
+# The jobs of the tests read their rows from their own SQLite database, the database of the .env is never touched
+TESTS_DATABASE = os.path.join(tempfile.mkdtemp(prefix="export-worker-tests-"), "tests.db")
+os.environ["EXPORT_WORKER_TESTS_DATABASE_CONNECTION_STRING"] = f"sqlite:///{TESTS_DATABASE}"
+os.environ["EXPORT_WORKER_TESTS_DATABASE_DEBUG_MODE"] = "false"
+
+CONNECTIONS['export_worker_tests'] = {
+    'config_name': 'export_worker_tests',
+    # Never read, the connection string comes from EXPORT_WORKER_TESTS_DATABASE_CONNECTION_STRING
+    'secret_name': 'export_worker_tests',
+    'driver': '',
+    'prefix': 'EXPORT_WORKER_TESTS',
+    'replicas': [],
+    'tenant_map': ''
+}
+
+
+class ExportWorkerNote(BaseModel):
+    __tablename__ = 'export_worker_notes'
+    __connection_config_name__ = 'export_worker_tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+
+    model_path_name = "note"
+
+
+class MockContext:
+    def __init__(self):
+        self.function_name = "export_worker"
+        self.memory_limit_in_mb = 1024
+        self.invoked_function_arn = "arn:aws:lambda:aws-region-1:123456789012:function:export_worker"
+        self.aws_request_id = str(uuid4())
+
+
+def sqs_event(*messages):
+    return {
+        "Records": [
+            {"messageId": str(uuid4()), "body": json.dumps(message), "eventSource": "aws:sqs"}
+            for message in messages
+        ]
+    }
+
+
+class TestExportWorker(TestCase):
+
+    def setUp(self) -> None:
+        self.storage = MemoryExportStorage()
+        self.queue = MemoryExportQueue()
+        set_export_storage(self.storage)
+        set_export_queue(self.queue)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        set_export_storage(None)
+        set_export_queue(None)
+        return super().tearDown()
+
+    def test_job_is_exported(self, *_, **__):
+        from lambda_function import lambda_handler
+        connection = DBConnection(**ExportWorkerNote.get_connection_params())
+        tables = [ExportWorkerNote.__table__]
+        BaseModel.metadata.drop_all(connection.get_engine(), tables=tables)
+        BaseModel.metadata.create_all(connection.get_engine(), tables=tables)
+        self.addCleanup(BaseModel.metadata.drop_all, connection.get_engine(), tables=tables)
+
+        service = BaseService(ExportWorkerNote)
+        session = connection.get_session()
+        try:
+            session.add_all([ExportWorkerNote(title=f"Note {number}") for number in range(1, 4)])
+            session.commit()
+            id_range = service.get_id_range(session, [])
+        finally:
+            session.close()
+
+        columns = [ExportColumn("Id", "id"), ExportColumn("Title", "title")]
+        job = create_export_job(service, columns, "csv", {}, id_range)
+        output = lambda_handler(self.queue.to_event(), MockContext())
+        logging.info(output)
+        self.assertEqual(output, {"batchItemFailures": []})
+
+        status = get_export_job_status(job["job_id"])
+        self.assertEqual(status["status"], DONE)
+        self.assertEqual(status["rows_written"], 3)
+        key = f"_/{job['job_id']}/export-00000.csv"
+        self.assertEqual(status["download_url"], f"memory://{key}")
+
+        rows = list(csv.reader(io.StringIO(self.storage.get(key).decode("utf-8-sig"))))
+        self.assertEqual(rows[0], ["Id", "Title"])
+        self.assertEqual([row[1] for row in rows[1:]], ["Note 1", "Note 2", "Note 3"])
+
+    def test_missing_job_is_dropped(self, *_, **__):
+        from lambda_function import lambda_handler
+        event = sqs_event({"job_id": uuid4().hex, "tenant": None, "partition": 0})
+        output = lambda_handler(event, MockContext())
+        logging.info(output)
+        self.assertEqual(output, {"batchItemFailures": []})
+
+    def test_failed_range_returns_to_the_queue(self, *_, **__):
+        from lambda_function import lambda_handler
+        job_id = uuid4().hex
+        job = {
+            "job_id": job_id, "tenant": None, "format": "csv", "rows": 1, "partitions": [[1, 1]],
+            "service": "builtins.dict", "model": "builtins.dict", "columns": [["Id", "id", None, None]],
+            "query": {}, "created_at": "2024-01-01T00:00:00+00:00",
+        }
+        self.storage.put(f"_/{job_id}/job.json", json.dumps(job).encode("utf-8"))
+        event = sqs_event({"job_id": job_id, "tenant": None, "partition": 0})
+
+        output = lambda_handler(event, MockContext())
+        self.assertEqual(output, {"batchItemFailures": [{"itemIdentifier": event["Records"][0]["messageId"]}]})
+        progress = json.loads(self.storage.get(f"_/{job_id}/partitions/00000.json"))
+        self.assertEqual(progress["status"], "failed")
+        self.assertEqual(self.storage.uploads, {})
+
+test_suite = TestLoader().loadTestsFromTestCase(TestExportWorker)
+
+runner = TextTestRunner()
+runner.run(test_suite)
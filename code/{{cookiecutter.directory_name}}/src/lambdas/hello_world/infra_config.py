@@ -4,6 +4,7 @@ import pulumi_aws as aws
 from pathlib import Path
 
 from typing import Optional
+from utils.lambda_config import LAMBDA_RUNTIME, get_function_config, needs_alias, register_invoke_arn
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +27,8 @@ class LambdaHelloWorldStack(pulumi.ComponentResource):
 
         lambda_function_name = "hello_world"
         cur_directory = Path(__file__).parent
+        # Memory, timeout and architecture from function_config.json (see dev_tools/power_tuning.py)
+        function_config = get_function_config(cur_directory)
 
         # Create a log group for the lambda function
         self.lambda_log_group = aws.cloudwatch.LogGroup(
@@ -42,12 +45,15 @@ class LambdaHelloWorldStack(pulumi.ComponentResource):
             description="Lambda function",
             role=lambda_execution_role_arn,
             handler="lambda_function.lambda_handler",
-            runtime=aws.lambda_.Runtime.PYTHON3D11,
+            runtime=LAMBDA_RUNTIME,
             code=pulumi.asset.AssetArchive({
                 ".": pulumi.asset.FileArchive(str(cur_directory.resolve()))
             }),
-            memory_size=128,
-            timeout=5,
+            memory_size=function_config["memory_size"],
+            timeout=function_config["timeout"],
+            architectures=[function_config["architecture"]],
+            publish=needs_alias(function_config),
+            snap_start=aws.lambda_.FunctionSnapStartArgs(apply_on="PublishedVersions") if function_config["snap_start"] else None,
             tags=self.tags,
             layers=layers,
             environment=aws.lambda_.FunctionEnvironmentArgs(
@@ -66,7 +72,29 @@ class LambdaHelloWorldStack(pulumi.ComponentResource):
             opts=pulumi.ResourceOptions(parent=self)
         )
 
-       
+        # API Gateway invokes the alias to use the primed instances (ApiGatewayStack reads the registered invoke_arn)
+        self.lambda_alias = None
+        self.invoke_arn = self.lambda_function.invoke_arn
+        if needs_alias(function_config):
+            self.lambda_alias = aws.lambda_.Alias(
+                f"{name}-lambda-alias",
+                name="live",
+                function_name=self.lambda_function.name,
+                function_version=self.lambda_function.version,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+            self.invoke_arn = self.lambda_alias.invoke_arn
+        register_invoke_arn(f"{environment}-{app_name}-{lambda_function_name}", self.invoke_arn)
+
+        if function_config["provisioned_concurrency"]:
+            self.provisioned_concurrency = aws.lambda_.ProvisionedConcurrencyConfig(
+                f"{name}-provisioned-concurrency",
+                function_name=self.lambda_function.name,
+                qualifier=self.lambda_alias.name,
+                provisioned_concurrent_executions=function_config["provisioned_concurrency"],
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
 
         self.register_outputs({
             "lambda_function_name": self.lambda_function.name
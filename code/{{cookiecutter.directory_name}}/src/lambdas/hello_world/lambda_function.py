@@ -1,11 +1,23 @@
+import importlib
+
 from aws_lambda_powertools import Logger
 from core_http.utils import build_response
+from core_utils.priming import prime_on_init
 
 logger = Logger()
 
+## Controller of the model served by the function (core_http.controllers.<model>), empty for a plain endpoint
+CONTROLLER_MODULE = ""
+controller = importlib.import_module(CONTROLLER_MODULE) if CONTROLLER_MODULE else None
+
+# Warmers of the layers (registered by the controller imports) run in the init of provisioned concurrency and SnapStart
+prime_on_init()
+
 
 @logger.inject_lambda_context(log_event=True)
 def lambda_handler(event, context):
     logger.info(event)
+    if controller is not None:
+        # The context bounds the database work by the remaining time of the invocation
+        return controller.handle(event, context)
     return build_response(200, {"statusCode": 200, "body": "Success"})
-
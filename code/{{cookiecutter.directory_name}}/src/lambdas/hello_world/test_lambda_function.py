@@ -1,6 +1,7 @@
 import os
 import sys
 import logging
+import subprocess
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -9,6 +10,10 @@ load_dotenv(override=True)
 from unittest import TestCase, TestLoader, TestSuite, TextTestRunner, mock
 from uuid import uuid4
 
+## Cold start budget of the handler imports (ms) and modules that it must not load
+COLD_START_MAX_MS = float(os.environ.get("COLD_START_MAX_MS", 300))
+COLD_START_FORBIDDEN = ["boto3", "sqlalchemy"]
+
 
 class MockContext:
     def __init__(self):
@@ -88,6 +93,25 @@ class TestHelloWorld(TestCase):
         output = lambda_handler(event, MockContext())
         logging.info(output)
 
+    def test_cold_start_imports(self, *_, **__):
+        # Same import path of the test run (layers added by PYTHONPATH or the pythonpath of pytest)
+        env = {**os.environ, "AWS_LAMBDA_FUNCTION_NAME": "hello_world", "PYTHONPATH": os.pathsep.join(sys.path)}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import lambda_function"],
+            capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "self [us]" not in line:
+                _, cumulative_us, name = line[len("import time:"):].split("|")
+                times[name.strip()] = int(cumulative_us) / 1000
+
+        for module in COLD_START_FORBIDDEN:
+            self.assertNotIn(module, times, f"{module} must be imported on first use")
+        self.assertLess(times["lambda_function"], COLD_START_MAX_MS)
+
 test = TestHelloWorld()
 test.setUp()
 test_suite = TestLoader().loadTestsFromTestCase(TestHelloWorld)
@@ -0,0 +1,48 @@
+"""
+Tests of the layers (test_*.py next to the modules). They run against their own SQLite database through the
+"tests" connection, the models of the tests declare __connection_config_name__ = 'tests' so the database of
+the .env is never touched.
+"""
+import os
+import tempfile
+
+import pytest
+
+from core_db.config import CONNECTIONS
+from core_db.BaseModel import BaseModel
+from core_db.DBConnection import DBConnection
+
+# Read by DBConfig when the first model of the tests opens the connection
+TESTS_DATABASE = os.path.join(tempfile.mkdtemp(prefix="layers-tests-"), "tests.db")
+os.environ["TESTS_DATABASE_CONNECTION_STRING"] = f"sqlite:///{TESTS_DATABASE}"
+os.environ["TESTS_DATABASE_DEBUG_MODE"] = "false"
+
+CONNECTIONS['tests'] = {
+    'config_name': 'tests',
+    # Never read, the connection string comes from TESTS_DATABASE_CONNECTION_STRING
+    'secret_name': 'tests',
+    'driver': '',
+    'prefix': 'TESTS',
+    'replicas': [],
+    'tenant_map': ''
+}
+
+
+@pytest.fixture
+def create_tables():
+    """ Creates the tables of the models given to the fixture and drops them after the test """
+    created = []
+
+    def create(*models):
+        connection = DBConnection(**models[0].get_connection_params())
+        engine = connection.get_engine()
+        tables = [model.__table__ for model in models]
+        BaseModel.metadata.drop_all(engine, tables=tables)
+        BaseModel.metadata.create_all(engine, tables=tables)
+        created.append((engine, tables))
+        return connection
+
+    yield create
+
+    for engine, tables in created:
+        BaseModel.metadata.drop_all(engine, tables=tables)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
+
+__all__ = [
+    "get_s3_client",
+    "put_object",
+    "get_object",
+    "create_multipart_upload",
+    "upload_part",
+    "complete_multipart_upload",
+    "abort_multipart_upload",
+    "generate_presigned_url",
+]
+
+LOGGER = Logger('layers.core.core_aws.s3')
+
+_S3_CLIENT = None
+
+
+def get_s3_client():
+    """
+    Create the S3 client once per container, boto3 is imported on first use to keep the import of the module cheap.
+    """
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        import boto3
+
+        _S3_CLIENT = boto3.client("s3")
+    return _S3_CLIENT
+
+
+def put_object(bucket: str, key: str, body: bytes, content_type: str = "application/octet-stream") -> dict:
+    """
+    Write a whole object.
+
+    Args:
+        bucket: (str) Bucket name
+        key: (str) Object key
+        body: (bytes) Content of the object
+        content_type: (str) Content type of the object
+
+    Returns: (dict)
+        Response of PutObject
+    """
+    return get_s3_client().put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type)
+
+
+def get_object(bucket: str, key: str) -> bytes | None:
+    """
+    Read a whole object.
+
+    Args:
+        bucket: (str) Bucket name
+        key: (str) Object key
+
+    Returns: (bytes | None)
+        Content of the object or None if it doesn't exist
+
+    Raises:
+        ClientError: When an AWS exception other than a missing key is found
+    """
+    try:
+        return get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise error
+
+
+def create_multipart_upload(bucket: str, key: str, content_type: str = "application/octet-stream") -> str:
+    """
+    Start an upload in parts, used to write objects while they are generated.
+
+    Returns: (str)
+        Upload id
+    """
+    return get_s3_client().create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+
+
+def upload_part(bucket: str, key: str, upload_id: str, part_number: int, body: bytes) -> dict:
+    """
+    Upload a part of a multipart upload. Every part but the last one must have at least 5 MB.
+
+    Returns: (dict)
+        Part to send to complete_multipart_upload (PartNumber and ETag)
+    """
+    response = get_s3_client().upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body)
+    return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+
+def complete_multipart_upload(bucket: str, key: str, upload_id: str, parts: list) -> dict:
+    """
+    Join the uploaded parts in the object.
+
+    Args:
+        parts: (list) Parts returned by upload_part, in order
+    """
+    return get_s3_client().complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+
+
+def abort_multipart_upload(bucket: str, key: str, upload_id: str) -> None:
+    """
+    Discard the parts of an unfinished upload, the errors are only logged.
+    """
+    try:
+        get_s3_client().abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+    except ClientError:
+        LOGGER.exception(f"Cannot abort the upload of s3://{bucket}/{key}")
+
+
+def generate_presigned_url(bucket: str, key: str, expires_in: int = 3600, filename: str | None = None) -> str:
+    """
+    Temporary download link of an object.
+
+    Args:
+        bucket: (str) Bucket name
+        key: (str) Object key
+        expires_in: (int) Seconds that the link is valid
+        filename: (str | None) Name of the downloaded file
+
+    Returns: (str)
+        Presigned GET url
+    """
+    params = {"Bucket": bucket, "Key": key}
+    if filename:
+        params["ResponseContentDisposition"] = f"attachment; filename={filename}"
+    return get_s3_client().generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
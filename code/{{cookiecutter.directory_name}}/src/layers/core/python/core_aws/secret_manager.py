@@ -1,19 +1,45 @@
-import boto3
 import json
+import time
 from aws_lambda_powertools import Logger
-from botocore.exceptions import ClientError
-from core_utils.environment import ENVIRONMENT, APP_NAME
+from core_utils.environment import ENVIRONMENT, APP_NAME, env
 
 LOGGER = Logger('layers.core.core_aws.secret_manager')
-SECRET_CLIENT = boto3.client("secretsmanager")
 
-def get_secret(secret_name:str, is_dict=False, use_prefix = False) -> str | dict:
+## Seconds that a secret is reused by the container (0 disables the cache)
+SECRETS_CACHE_TTL = env("SECRETS_CACHE_TTL", 300)
+SECRETS_CACHE: dict[str, tuple[float, str]] = {}
+
+## boto3 and the client are created on first use, importing the module doesn't pay for them
+_SECRET_CLIENT = None
+
+def get_secret_client():
+    global _SECRET_CLIENT
+    if _SECRET_CLIENT is None:
+        import boto3
+        _SECRET_CLIENT = boto3.client("secretsmanager")
+    return _SECRET_CLIENT
+
+def __getattr__(name: str):
+    # SECRET_CLIENT is kept as a lazy module attribute (PEP 562)
+    if name == "SECRET_CLIENT":
+        return get_secret_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_secret(secret_name:str, is_dict=False, use_prefix = False, use_cache = True) -> str | dict:
     if use_prefix:
         secret_name = f"{ENVIRONMENT}-{APP_NAME}-{secret_name}"
+
+    cached = SECRETS_CACHE.get(secret_name)
+    if use_cache and cached is not None and cached[0] > time.monotonic():
+        return cached[1] if not is_dict else json.loads(str(cached[1]))
+
+    from botocore.exceptions import ClientError
     try:
         LOGGER.info(f"Getting secret: {secret_name}")
-        get_secret_value_response = SECRET_CLIENT.get_secret_value(SecretId=secret_name)
+        get_secret_value_response = get_secret_client().get_secret_value(SecretId=secret_name)
         secret = get_secret_value_response["SecretString"]
+        if SECRETS_CACHE_TTL:
+            SECRETS_CACHE[secret_name] = (time.monotonic() + SECRETS_CACHE_TTL, secret)
     except (KeyError, ClientError) as e:
         LOGGER.error("Error create client secretmanager")
         LOGGER.error(f"Details: {str(e)}")
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 import uuid
 import os
-import boto3
 from botocore.exceptions import (
     ClientError,
 )
@@ -31,6 +30,8 @@ def get_sqs_client(session=None, region="us-east-1"):
         A low-level client representing Amazon Simple Queue Service (SQS)
 
     """
+    import boto3
+
     if not session:
         return boto3.client("sqs", endpoint_url="https://sqs.{}.amazonaws.com".format(
             os.environ.get("AWS_DEFAULT_REGION", "us-east-1")))
@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 import json
+import time
 
-import boto3
 from aws_lambda_powertools import Logger
 from botocore import exceptions
 from core_utils.environment import (
     ENVIRONMENT,
-    APP_NAME
+    APP_NAME,
+    env
 )
 
 __all__ = ["get_parameter",
@@ -14,8 +15,26 @@ __all__ = ["get_parameter",
 
 LOGGER = Logger('layers.core.core_aws.ssm')
 
+## Seconds that a parameter is reused by the container (0 disables the cache)
+PARAMETERS_CACHE_TTL = env("PARAMETERS_CACHE_TTL", 300)
+PARAMETERS_CACHE = {}
 
-def get_parameter(ssm_name, use_environ=False, default=None, is_dict=True, use_prefix=False):
+_SSM_CLIENT = None
+
+
+def get_ssm_client():
+    """
+    Create the SSM client once per container, boto3 is imported on first use to keep the import of the module cheap.
+    """
+    global _SSM_CLIENT
+    if _SSM_CLIENT is None:
+        import boto3
+
+        _SSM_CLIENT = boto3.client("ssm")
+    return _SSM_CLIENT
+
+
+def get_parameter(ssm_name, use_environ=False, default=None, is_dict=True, use_prefix=False, use_cache=True):
     """
     Get a parameter from SSM service on aws.
 
@@ -28,6 +47,8 @@ def get_parameter(ssm_name, use_environ=False, default=None, is_dict=True, use_p
         If True, the environment variable will be used to get the parameter.
     default : str
         The default value to return if the parameter is not found.
+    use_cache : bool
+        Reuse the value read in the last PARAMETERS_CACHE_TTL seconds.
 
     Returns
     -------
@@ -46,7 +67,7 @@ def get_parameter(ssm_name, use_environ=False, default=None, is_dict=True, use_p
 
     """
     try:
-        ssm = boto3.client("ssm")
+        ssm = get_ssm_client()
     except Exception as details:
         LOGGER.error("Error create client ssm")
         LOGGER.error("Details: {}".format(details))
@@ -56,9 +77,15 @@ def get_parameter(ssm_name, use_environ=False, default=None, is_dict=True, use_p
             ssm_name = f"{ssm_name}-{ENVIRONMENT}"
         if use_prefix:
             ssm_name = f"/{ENVIRONMENT.lower()}/{APP_NAME.lower()}/{ssm_name}"
-        LOGGER.info(f"Getting parameter: {ssm_name}")
-        parameters = ssm.get_parameter(Name=ssm_name)["Parameter"]["Value"]
-        LOGGER.info(parameters)
+        cached = PARAMETERS_CACHE.get(ssm_name)
+        if use_cache and cached is not None and cached[0] > time.monotonic():
+            parameters = cached[1]
+        else:
+            LOGGER.info(f"Getting parameter: {ssm_name}")
+            parameters = ssm.get_parameter(Name=ssm_name)["Parameter"]["Value"]
+            LOGGER.info(parameters)
+            if PARAMETERS_CACHE_TTL:
+                PARAMETERS_CACHE[ssm_name] = (time.monotonic() + PARAMETERS_CACHE_TTL, parameters)
     except Exception as details:
         LOGGER.exception("Name parameter ref : " + ssm_name)
         LOGGER.exception(details)
@@ -100,7 +127,7 @@ def get_parameters_by_path(ssm_path, recursive=True, parameters_filters=[], with
 
     """
     try:
-        ssm = boto3.client("ssm")
+        ssm = get_ssm_client()
     except Exception as details:
         LOGGER.error("Error create client ssm")
         LOGGER.error("Details: {}".format(details))
@@ -152,7 +179,7 @@ def update_parameter(ssm_name, ssm_value, use_environ=False, use_prefix=False, v
             ssm_name = f"{ssm_name}-{ENVIRONMENT}"
         if use_prefix:
             ssm_name = f"/{ENVIRONMENT.lower()}/{APP_NAME.lower()}/{ssm_name}"
-        ssm = boto3.client("ssm")
+        ssm = get_ssm_client()
         LOGGER.info(f"Updating parameter: {ssm_name} with value: {ssm_value}")
         ssm.put_parameter(Name=ssm_name, Value=ssm_value, Type=value_type, Overwrite=True)
     except Exception as details:
@@ -0,0 +1,392 @@
+import json
+import asyncio
+from typing import cast
+
+from .enums.http_status_code import HTTPStatusCode
+from .exceptions.api_exception import APIException
+from .validators.request_validator import RequestValidator
+from .interfaces.pagination_result import PaginationResult
+from .utils import build_response, get_paginate_params, get_relationship_params, get_body, get_path_parameters, get_accept_encoding, get_header, build_etag, etag_matches
+from .tenancy import tenant_handler
+from .admission import admission_handler, page_priority, Priority
+from .BaseController import get_request_filters, get_aggregate_params, get_sync_params, is_sync_request, deadline_exceeded
+
+from core_db.BaseModel import BaseModel
+from core_db.aggregates import AGGREGATE_MAX_GROUPS
+from core_db.sync import encode_watermark
+from core_db.AsyncBaseService import AsyncBaseService
+from core_db.AsyncDBConnection import AsyncDBConnection
+from core_db.DBConnection import AlchemyEncoder, AlchemyRelationEncoder
+from core_db.instrumentation import log_db_stats
+from core_utils.profiling import timed_handler, phase
+from core_utils.deadline import DeadlineExceeded, deadline_handler, has_time_for, DEADLINE_OPTIONAL_WORK_MS
+from aws_lambda_powertools import Logger
+
+LOGGER = Logger('layers.core.core_http.async_base_controller')
+
+## Async handlers, run them from the lambda handler with core_db.AsyncDBConnection.run:
+##     return run(AsyncBaseController.index(service, event, context))
+
+def get_session(service: AsyncBaseService):
+    return AsyncDBConnection(**service.get_connection_params()).get_session()
+
+async def delta_sync(service: AsyncBaseService, request: dict):
+    """ Async counterpart of BaseController.delta_sync """
+    session = get_session(service)
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = service.get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    try:
+        with phase('params'):
+            since, limit = get_sync_params(request)
+            filters, filters_search, search_method = get_request_filters(service, request, include_deleted=True)
+        with phase('query'):
+            changes, watermark, has_more = await service.get_changes(session, since, filters, search_filters=filters_search, search_method=search_method, limit=limit)
+        with phase('serialize'):
+            body = dict(data=changes, next_watermark=encode_watermark(*watermark), has_more=has_more)
+            response = json.dumps(body, cls=AlchemyEncoder)
+
+        etag = build_etag(response)
+        if etag_matches(etag, if_none_match):
+            return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        headers['ETag'] = etag
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
+    except APIException as e:
+        LOGGER.warning("Invalid sync request", extra={'reason': e.message})
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        response = json.dumps(dict(message="Cannot make the request"))
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await session.close()
+
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler(priority=page_priority)
+async def index(service: AsyncBaseService, request: dict, context = None):
+    if is_sync_request(service, request):
+        return await delta_sync(service, request)
+
+    (page, per_page) = get_paginate_params(request)
+    relationship_retrieve = get_relationship_params(request)
+    prefix_host = request.get('headers', {}).get('er-company-request', None)
+    params = request.get("queryStringParameters") or {}
+    order_by = params.get("order_by")
+    order_dir = params.get("order_dir", "asc")
+
+    encoder = AlchemyEncoder if 'relationships' not in relationship_retrieve else AlchemyRelationEncoder
+
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = service.get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    # The page and its count are independent queries, each one runs in its own session
+    session = get_session(service)
+    count_session = get_session(service)
+    try:
+        filters, filters_search, search_method = get_request_filters(service, request)
+
+        etag = None
+        if service.has_updated_at():
+            with phase('version'):
+                version = await service.get_version(session, filters, search_filters=filters_search, search_method=search_method)
+                etag = build_etag(version, params, prefix_host)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+
+        # The page and the count run concurrently, both are measured in the same phase
+        with phase('query'):
+            statement = service.filters_statement(filters, filters_search, search_method, order_by, order_dir)
+            page_query = service.multiple_filters(session, filters, True, page, per_page, search_filters=filters_search, search_method=search_method, order_by=order_by, order_dir=order_dir, relationships=relationship_retrieve.get('relationships'))
+            if has_time_for(DEADLINE_OPTIONAL_WORK_MS):
+                (_, elements), total_elements = await asyncio.gather(page_query, service.count_with_query(statement, count_session))
+            else:
+                # Without time for the count the page is returned without its total (partial result)
+                (_, elements), total_elements = await page_query, None
+                headers['X-Partial-Result'] = 'total'
+
+        def serialize(_):
+            body = PaginationResult(elements, page, per_page, total_elements, refType=service.model, prefix_host=prefix_host).to_dict()
+            body['data'] = list(map(lambda d: dict(
+                    **cast(BaseModel, d).to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve)
+                ), body['data'])
+            )
+            return json.dumps(body, cls=encoder, **relationship_retrieve)
+
+        # Nested relationships may lazy load, that is only allowed in the sync context of the session
+        with phase('serialize'):
+            response = await session.run_sync(serialize)
+
+        if etag is None:
+            etag = build_etag(response)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        # A partial page isn't cached by the clients
+        if 'X-Partial-Result' not in headers:
+            headers['ETag'] = etag
+
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
+    except APIException as e:
+        LOGGER.exception("APIException occurred")
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception as e:
+        LOGGER.exception("Cannot make the request")
+        response = json.dumps(dict(message=str(e)))
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await asyncio.gather(session.close(), count_session.close())
+
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
+async def find(service: AsyncBaseService, request: dict, context = None):
+    path_params = get_path_parameters(request)
+    id = path_params.get('id', None)
+    session = get_session(service)
+    relationship_retrieve = get_relationship_params(request)
+    encoder = AlchemyEncoder if 'relationships' not in relationship_retrieve else AlchemyRelationEncoder
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = service.get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    try:
+        etag = None
+        if service.has_updated_at():
+            with phase('version'):
+                version = await service.get_version_by_id(session, id)
+            if version is not None:
+                etag = build_etag(version, relationship_retrieve)
+                if etag_matches(etag, if_none_match):
+                    return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+
+        with phase('query'):
+            element = await service.get_one(session, id, relationships=relationship_retrieve.get('relationships'))
+        with phase('serialize'):
+            response = await session.run_sync(lambda _: json.dumps(element.to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve), cls=AlchemyEncoder))
+
+        if etag is None:
+            etag = build_etag(response)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        headers['ETag'] = etag
+
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
+    except APIException as e:
+        LOGGER.exception("APIException occurred")
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        response = json.dumps(dict(message="Cannot make the request"))
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await session.close()
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
+async def store(service: AsyncBaseService, request: dict, context = None):
+    session = get_session(service)
+
+    RequestValidator(service.get_rules_for_store()).validate(request)
+    input_params = get_body(request)
+
+    headers = {}
+    try:
+        with phase('query'):
+            body = await service.insert_register(session, input_params)
+        response = json.dumps(body, cls=AlchemyEncoder)
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, headers = deadline_exceeded(e)
+        response = json.dumps(error)
+    except APIException as e:
+        LOGGER.exception("APIException occurred")
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("No se pudo realizar la consulta")
+        body = dict(message="No se pudo realizar la consulta")
+        response = json.dumps(body)
+        status_code=HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await session.close()
+
+    return build_response(status_code, response, is_body_str=True, accept_encoding=get_accept_encoding(request), headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
+async def update(service: AsyncBaseService, request: dict, context = None):
+    path_params = get_path_parameters(request)
+    id = path_params.get('id', None)
+    session = get_session(service)
+
+    input_params = get_body(request)
+    headers = {}
+    try:
+        with phase('query'):
+            body = await service.update_register(session, id, input_params)
+        if body is None:
+            raise APIException("Element not found", HTTPStatusCode.NOT_FOUND.value)
+        response = json.dumps(body, cls=AlchemyEncoder)
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, headers = deadline_exceeded(e)
+        response = json.dumps(error)
+    except APIException as e:
+        LOGGER.exception("APIException occurred")
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        body = dict(message="Cannot make the request")
+        response = json.dumps(body)
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await session.close()
+    return build_response(status_code, response, is_body_str=True, accept_encoding=get_accept_encoding(request), headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
+async def delete(service: AsyncBaseService, request: dict, context = None):
+    path_params = get_path_parameters(request)
+    id = path_params.get('id', None)
+    session = get_session(service)
+    body = None
+
+    headers = {}
+    try:
+        with phase('query'):
+            if service.has_soft_delete():
+                element = await service.soft_delete_register(session, id)
+            else:
+                element = await service.delete_register(session, id)
+        if element is None:
+            raise APIException("Element not found", HTTPStatusCode.NOT_FOUND.value)
+        status_code = HTTPStatusCode.OK.value
+        body = {'id': id}
+    except DeadlineExceeded as e:
+        body, status_code, headers = deadline_exceeded(e)
+    except APIException as e:
+        LOGGER.exception("APIException occurred")
+        body = e.to_dict()
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        body = dict(message="Cannot make the request")
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await session.close()
+    return build_response(status_code, body, jsonEncoder=AlchemyEncoder, accept_encoding=get_accept_encoding(request), headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler(priority=Priority.LOW)
+async def aggregate(service: AsyncBaseService, request: dict, context = None):
+    session = get_session(service)
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = service.get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    try:
+        with phase('params'):
+            prefix_host = request.get('headers', {}).get('er-company-request', None)
+            params = request.get("queryStringParameters") or {}
+            group_by, aggregates, bucket = get_aggregate_params(service, request)
+            filters, filters_search, search_method = get_request_filters(service, request)
+
+        etag = None
+        if service.has_updated_at():
+            with phase('version'):
+                version = await service.get_version(session, filters, search_filters=filters_search, search_method=search_method)
+                etag = build_etag(version, params, prefix_host)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+
+        with phase('query'):
+            try:
+                groups = await service.aggregate(session, filters, group_by, aggregates, bucket, search_filters=filters_search, search_method=search_method, limit=AGGREGATE_MAX_GROUPS + 1)
+            except ValueError as e:
+                raise APIException(str(e), status_code=HTTPStatusCode.BAD_REQUEST.value)
+        if len(groups) > AGGREGATE_MAX_GROUPS:
+            groups = groups[:AGGREGATE_MAX_GROUPS]
+            headers['X-Partial-Result'] = 'groups'
+
+        with phase('serialize'):
+            response = json.dumps(dict(data=groups), cls=AlchemyEncoder)
+
+        if etag is None:
+            etag = build_etag(response)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        if 'X-Partial-Result' not in headers:
+            headers['ETag'] = etag
+
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
+    except APIException as e:
+        LOGGER.warning("Invalid aggregation", extra={'reason': e.message})
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        response = json.dumps(dict(message="Cannot make the request"))
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        await session.close()
+
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
@@ -1,8 +1,9 @@
-import csv
+import base64
 from datetime import datetime, timezone
 from http import HTTPStatus
 import io
 import json
+from collections.abc import Mapping
 from typing import cast
 from .enums.http_status_code import HTTPStatusCode
 
@@ -10,110 +11,377 @@ from .exceptions.api_exception import APIException
 from .validators.request_validator import RequestValidator
 
 from .interfaces.pagination_result import PaginationResult
-from .utils import build_response, get_paginate_params, get_filter_params, get_relationship_params, get_search_method_param, get_search_params, get_body, get_headers_request, get_path_parameters
+from .utils import build_response, get_paginate_params, get_filter_params, get_relationship_params, get_search_method_param, get_search_params, get_filter_expressions, get_body, get_headers_request, get_path_parameters, get_accept_encoding, get_header, build_etag, etag_matches
+from .tenancy import tenant_handler, get_request_tenant
+from .export_jobs import ExportJobsUnavailable, create_export_job, get_export_job_status
+from .admission import admission_handler, page_priority, Priority
 
 from core_db.BaseModel import BaseModel
+from core_db.aggregates import AGGREGATE_MAX_GROUPS
+from core_db.filters import compile_filter
+from core_db.sync import SYNC_PAGE_SIZE, decode_watermark, encode_watermark
+from core_db.export import ExportFormatUnavailable, get_export_columns, get_export_writer
 from core_db.BaseService import BaseService
 from core_db.DBConnection import AlchemyEncoder, AlchemyRelationEncoder, DBConnection
+from core_db.instrumentation import log_db_stats
+from core_utils.profiling import timed_handler, phase
+from core_utils.aggregates import AggregateExpression, DateBucket, parse_aggregate, parse_bucket
+from core_utils.deadline import DeadlineExceeded, deadline_handler, has_time_for, DEADLINE_OPTIONAL_WORK_MS, DEADLINE_RETRY_AFTER
 from aws_lambda_powertools import Logger
 
 LOGGER = Logger('layers.core.core_http.base_controller')
 
-def index(service: BaseService, request: dict):
-    session = DBConnection(**service.get_connection_params()).get_session()
-    (page, per_page) = get_paginate_params(request)
-    relationship_retrieve = get_relationship_params(request)
+def get_request_filters(service: BaseService, request: dict, include_deleted: bool = False) -> tuple[list, list, str]:
+    """ Build the filters of the model from the query string (only filter_columns and search_columns are allowed)
+
+    Args:
+        service (BaseService): Service of the model
+        request (dict): Http request
+        include_deleted (bool, optional): Don't filter out the soft deleted rows (delta sync). Defaults to False.
+
+    Raises:
+        APIException: Filter values that don't match the type of their column (400)
+
+    Returns:
+        tuple[list, list, str]: Filters, search filters and search method
+    """
     filter_query = get_filter_params(request)
     filter_keys = filter_query.keys()
-    prefix_host = request.get('headers', {}).get('er-company-request', None)
-    params = request.get("queryStringParameters") or {}
-    order_by = params.get("order_by")
-    order_dir = params.get("order_dir", "asc")
 
-    
-    encoder = AlchemyEncoder if 'relationships' not in relationship_retrieve else AlchemyRelationEncoder
-    search_query = get_search_params(request)
+    search_query = get_search_params(request, wrap_like=False)
     search_keys = service.get_search_columns()
     search_columns = list(set(search_keys).intersection(search_query.keys()))
     filters_search = []
     for skey in search_columns:
         filters_search.append({
             'column': getattr(cast(BaseService, service).model, skey),
-            'value': search_query[skey]
+            'value': search_query[skey],
+            'mode': cast(BaseService, service).get_search_mode(skey)
         })
-    
+
     search_method = 'AND'
     if len(filters_search) > 0:
         search_method = get_search_method_param(request)
-    
+
     model_filter_keys = cast(BaseService, service).get_filter_columns()
     filters_model = set(model_filter_keys).intersection(filter_keys)
-    
+
     filters = []
     for f in filters_model:
         filters.append({f: filter_query[f]})
-    
-    if cast(BaseService, service).has_soft_delete():
+
+    # Filters with operator (amount__gte=10) are also limited to the filter columns of the model
+    for expression in get_filter_expressions(request):
+        if expression.column in model_filter_keys:
+            try:
+                # The filters are compiled again with the query, here the bad values are rejected as a bad request
+                compile_filter(cast(BaseService, service).model, expression)
+            except ValueError as e:
+                raise APIException(str(e), status_code=HTTPStatusCode.BAD_REQUEST.value)
+            filters.append(expression)
+
+    if cast(BaseService, service).has_soft_delete() and not include_deleted:
         filters.append({
             cast(BaseModel, cast(BaseService, service).model).SOFT_DELETE_COLUMN: None
         })
-    
+
+    return filters, filters_search, search_method
+
+def get_aggregate_params(service: BaseService, request: dict) -> tuple[list[str], list[AggregateExpression], DateBucket | None]:
+    """ Parse the aggregation of the query string: group_by=status,country (filter_columns), aggregates=count,amount__sum
+    (filter_columns or display members) and bucket=created_at__month (filter_columns)
+
+    Args:
+        service (BaseService): Service of the model
+        request (dict): Http request
+
+    Raises:
+        APIException: Columns that are not allowed or functions and intervals that are not supported
+
+    Returns:
+        tuple[list[str], list[AggregateExpression], DateBucket | None]: Group columns, aggregates and date bucket
+    """
+    params = request.get("queryStringParameters") or {}
+    filter_columns = cast(BaseService, service).get_filter_columns()
+    allowed_columns = set(filter_columns) | set(cast(BaseService, service).get_display_members())
+
+    group_by = [column.strip() for column in str(params.get("group_by", "")).split(",") if column.strip()]
+    invalid = [column for column in group_by if column not in filter_columns]
+    if invalid:
+        raise APIException(f"Cannot group by {', '.join(invalid)}", status_code=HTTPStatusCode.BAD_REQUEST.value)
+
+    aggregates = []
+    for value in str(params.get("aggregates", "count")).split(","):
+        aggregate = parse_aggregate(value)
+        if aggregate is None or (aggregate.column is not None and aggregate.column not in allowed_columns):
+            raise APIException(f"Invalid aggregate {value.strip()}", status_code=HTTPStatusCode.BAD_REQUEST.value)
+        if aggregate not in aggregates:
+            aggregates.append(aggregate)
+
+    bucket = None
+    if params.get("bucket"):
+        bucket = parse_bucket(params["bucket"])
+        if bucket is None or bucket.column not in filter_columns or bucket.column in group_by:
+            raise APIException(f"Invalid bucket {params['bucket']}", status_code=HTTPStatusCode.BAD_REQUEST.value)
+
+    return group_by, aggregates, bucket
+
+def get_sync_params(request: dict) -> tuple[tuple, int]:
+    """ Parse the delta sync of the query string: updated_since (watermark or ISO date) and per_page (capped to
+    SYNC_PAGE_SIZE)
+
+    Raises:
+        APIException: Invalid watermark or page size
+
+    Returns:
+        tuple[tuple, int]: Decoded watermark and max changes
+    """
+    params = request.get("queryStringParameters") or {}
     try:
-        query, elements = cast(BaseService, service).multiple_filters(session, filters, True, page, per_page, search_filters=filters_search, search_method=search_method,order_by=order_by,order_dir=order_dir)
-        total_elements = cast(BaseService, service).count_with_query(query)
-        
-        body = PaginationResult(elements, page, per_page, total_elements, refType=cast(BaseService, service).model, prefix_host=prefix_host).to_dict()
-        body['data'] = list(map(lambda d: dict(
-                **cast(BaseModel, d).to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve)
-            ), body['data'])
-        )
+        since = decode_watermark(params["updated_since"])
+        limit = min(int(params.get("per_page", SYNC_PAGE_SIZE)), SYNC_PAGE_SIZE)
+    except ValueError as e:
+        raise APIException(str(e), status_code=HTTPStatusCode.BAD_REQUEST.value)
+    if limit < 1:
+        raise APIException("per_page must be positive", status_code=HTTPStatusCode.BAD_REQUEST.value)
+    return since, limit
+
+def is_sync_request(service: BaseService, request: dict) -> bool:
+    """ index runs the delta sync for the models with updated at when the request sends updated_since """
+    params = request.get("queryStringParameters") or {}
+    return params.get("updated_since") is not None and cast(BaseService, service).has_updated_at()
+
+def delta_sync(service: BaseService, request: dict):
+    """ Changes after the updated_since watermark, soft deleted rows as tombstones (see core_db.sync):
+
+        GET /items?updated_since=2024-01-01T00:00:00
+        {"data": [{"IdItem": 3, "name": "...", "deleted": false}, {"IdItem": 7, "deleted": true}],
+         "next_watermark": "WyIyMDI0LTAx...", "has_more": false}
 
+    Clients repeat the request with next_watermark while has_more is true, a sync without changes returns the same
+    watermark (and 304 with its ETag)
+    """
+    session = DBConnection(**service.get_connection_params()).get_session()
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = cast(BaseService, service).get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    try:
+        with phase('params'):
+            since, limit = get_sync_params(request)
+            filters, filters_search, search_method = get_request_filters(service, request, include_deleted=True)
+        with phase('query'):
+            changes, watermark, has_more = cast(BaseService, service).get_changes(session, since, filters, search_filters=filters_search, search_method=search_method, limit=limit)
+        with phase('serialize'):
+            body = dict(data=changes, next_watermark=encode_watermark(*watermark), has_more=has_more)
+            response = json.dumps(body, cls=AlchemyEncoder)
+
+        etag = build_etag(response)
+        if etag_matches(etag, if_none_match):
+            return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        headers['ETag'] = etag
         status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
+    except APIException as e:
+        LOGGER.warning("Invalid sync request", extra={'reason': e.message})
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        response = json.dumps(dict(message="Cannot make the request"))
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        session.close()
+
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+
+def deadline_exceeded(error: DeadlineExceeded) -> tuple[dict, int, dict]:
+    """ Response of a request that ran out of time: 503 that the client can retry, the container and its
+    connections are kept instead of being killed by the Lambda timeout
+
+    Returns:
+        tuple[dict, int, dict]: Body, status code and headers
+    """
+    LOGGER.warning("Deadline exceeded", extra={'reason': str(error)})
+    return dict(message="The request could not be completed in time"), HTTPStatusCode.SERVICE_UNAVAILABLE.value, {'Retry-After': str(DEADLINE_RETRY_AFTER)}
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler(priority=page_priority)
+def index(service: BaseService, request: dict, context = None):
+    if is_sync_request(service, request):
+        return delta_sync(service, request)
+
+    session = DBConnection(**service.get_connection_params()).get_session()
+    with phase('params'):
+        (page, per_page) = get_paginate_params(request)
+        relationship_retrieve = get_relationship_params(request)
+        prefix_host = request.get('headers', {}).get('er-company-request', None)
+        params = request.get("queryStringParameters") or {}
+        order_by = params.get("order_by")
+        order_dir = params.get("order_dir", "asc")
+
+        encoder = AlchemyEncoder if 'relationships' not in relationship_retrieve else AlchemyRelationEncoder
+        # The relationships are only loaded by the ORM objects
+        row_mode = cast(BaseService, service).use_row_mode() and 'relationships' not in relationship_retrieve
+
+        accept_encoding = get_accept_encoding(request)
+        if_none_match = get_header(request, 'If-None-Match')
+        headers = {}
+        cache_control = cast(BaseService, service).get_cache_control()
+        if cache_control:
+            headers['Cache-Control'] = cache_control
+
+    try:
+        with phase('params'):
+            filters, filters_search, search_method = get_request_filters(service, request)
+
+        etag = None
+        if cast(BaseService, service).has_updated_at():
+            # Cheap version of the data: clients with a valid copy get a 304 without fetching the page
+            with phase('version'):
+                version = cast(BaseService, service).get_version(session, filters, search_filters=filters_search, search_method=search_method)
+                etag = build_etag(version, params, prefix_host)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+
+        with phase('query'):
+            if row_mode:
+                query, elements = cast(BaseService, service).multiple_filters_rows(session, filters, True, page, per_page, search_filters=filters_search, search_method=search_method, order_by=order_by, order_dir=order_dir)
+            else:
+                query, elements = cast(BaseService, service).multiple_filters(session, filters, True, page, per_page, search_filters=filters_search, search_method=search_method,order_by=order_by,order_dir=order_dir)
+        with phase('count'):
+            # Without time for the count the page is returned without its total (partial result)
+            total_elements = None
+            if has_time_for(DEADLINE_OPTIONAL_WORK_MS):
+                total_elements = cast(BaseService, service).count_with_query(query, session)
+            else:
+                headers['X-Partial-Result'] = 'total'
+
+        with phase('pagination'):
+            body = PaginationResult(elements, page, per_page, total_elements, refType=cast(BaseService, service).model, prefix_host=prefix_host).to_dict()
+        with phase('serialize'):
+            if not row_mode:
+                body['data'] = list(map(lambda d: dict(
+                        **cast(BaseModel, d).to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve)
+                    ), body['data'])
+                )
+            response = json.dumps(body, cls=encoder, **relationship_retrieve)
+
+        if etag is None:
+            etag = build_etag(response)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        # A partial page isn't cached by the clients
+        if 'X-Partial-Result' not in headers:
+            headers['ETag'] = etag
+
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
     except APIException as e:
         LOGGER.exception("APIException occurred")
-        body = e.to_dict()
+        response = json.dumps(e.to_dict())
         status_code = e.status_code
     except Exception as e:
         LOGGER.exception("Cannot make the request")
-        body = dict(message=str(e))
+        response = json.dumps(dict(message=str(e)))
         status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
     finally:
         session.close()
-    
-    return build_response(status_code, body, jsonEncoder=encoder, encoder_extras=relationship_retrieve)
 
-def find(service: BaseService, request: dict):
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
+def find(service: BaseService, request: dict, context = None):
     path_params = get_path_parameters(request)
     id = path_params.get('id', None)
     session = DBConnection(**service.get_connection_params()).get_session()
     relationship_retrieve = get_relationship_params(request)
     encoder = AlchemyEncoder if 'relationships' not in relationship_retrieve else AlchemyRelationEncoder
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = cast(BaseService, service).get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
     try:
-        element = cast(BaseService, service).get_one(session, id)
-        body = element.to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve)
+        etag = None
+        if cast(BaseService, service).has_updated_at():
+            with phase('version'):
+                version = cast(BaseService, service).get_version_by_id(session, id)
+            if version is not None:
+                etag = build_etag(version, relationship_retrieve)
+                if etag_matches(etag, if_none_match):
+                    return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+
+        with phase('query'):
+            element = cast(BaseService, service).get_one(session, id)
+        with phase('serialize'):
+            body = element.to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve)
+            response = json.dumps(body, cls=AlchemyEncoder)
+
+        if etag is None:
+            etag = build_etag(response)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        headers['ETag'] = etag
+
         status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
     except APIException as e:
         LOGGER.exception("APIException occurred")
-        body = e.to_dict()
+        response = json.dumps(e.to_dict())
         status_code = e.status_code
     except Exception as e:
         LOGGER.exception("Cannot make the request")
-        body = dict(message="Cannot make the request")
+        response = json.dumps(dict(message="Cannot make the request"))
         status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
     finally:
         session.close()
-    return build_response(status_code, body, jsonEncoder=AlchemyEncoder)
-
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
 def store(service: BaseService, request: dict, context = None):
     session = DBConnection(**service.get_connection_params()).get_session()
     
     RequestValidator(cast(BaseService, service).get_rules_for_store()).validate(request)
     input_params = get_body(request)
     
+    headers = {}
     try:
-        body = cast(BaseService, service).insert_register(session, input_params)
+        with phase('query'):
+            body = cast(BaseService, service).insert_register(session, input_params)
         response = json.dumps(body, cls=AlchemyEncoder)
         status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, headers = deadline_exceeded(e)
+        response = json.dumps(error)
     except APIException as e:
         LOGGER.exception("APIException occurred")
         response = json.dumps(e.to_dict())
@@ -126,18 +394,28 @@ def store(service: BaseService, request: dict, context = None):
     finally:
         session.close()
     
-    return build_response(status_code, response, is_body_str=True)
+    return build_response(status_code, response, is_body_str=True, accept_encoding=get_accept_encoding(request), headers=headers)
 
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
 def update(service: BaseService, request: dict, context = None):
     path_params = get_path_parameters(request)
     id = path_params.get('id', None)
     session = DBConnection(**service.get_connection_params()).get_session()
 
     input_params = get_body(request)
+    headers = {}
     try:
-        body = cast(BaseService, service).update_register(session, id, input_params)
+        with phase('query'):
+            body = cast(BaseService, service).update_register(session, id, input_params)
         response = json.dumps(body, cls=AlchemyEncoder)
         status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, headers = deadline_exceeded(e)
+        response = json.dumps(error)
     except APIException as e:
         LOGGER.exception("APIException occurred")
         response = json.dumps(e.to_dict())
@@ -149,18 +427,27 @@ def update(service: BaseService, request: dict, context = None):
         status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
     finally:
         session.close()
-    return build_response(status_code, response, is_body_str=True)
+    return build_response(status_code, response, is_body_str=True, accept_encoding=get_accept_encoding(request), headers=headers)
 
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler
 def delete(service: BaseService, request: dict, context = None):
     path_params = get_path_parameters(request)
     id = path_params.get('id', None)
     session = DBConnection(**service.get_connection_params()).get_session()
     body = None  
 
+    headers = {}
     try:
-        element = cast(BaseService, service).soft_delete_register(session, id) if cast(BaseService, service).has_soft_delete() else cast(BaseService, service).delete_register(session, id)
+        with phase('query'):
+            element = cast(BaseService, service).soft_delete_register(session, id) if cast(BaseService, service).has_soft_delete() else cast(BaseService, service).delete_register(session, id)
         status_code = HTTPStatusCode.OK.value
         body = {'id': id}
+    except DeadlineExceeded as e:
+        body, status_code, headers = deadline_exceeded(e)
     except APIException as e:
         LOGGER.exception("APIException occurred")
         body = e.to_dict()
@@ -171,42 +458,29 @@ def delete(service: BaseService, request: dict, context = None):
         status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
     finally:
         session.close()
-    return build_response(status_code, body, jsonEncoder=AlchemyEncoder)
+    return build_response(status_code, body, jsonEncoder=AlchemyEncoder, accept_encoding=get_accept_encoding(request), headers=headers)
 
-def get_filtered_elements(service: BaseService, request: dict):
+def get_filtered_elements(service: BaseService, request: dict, columns: list[str] | None = None):
     session = DBConnection(**service.get_connection_params()).get_session()
     (page, per_page) = get_paginate_params(request)
     relationship_retrieve = get_relationship_params(request)
-    filter_query = get_filter_params(request)
-    filter_keys = filter_query.keys()
 
     encoder = AlchemyEncoder if 'relationships' not in relationship_retrieve else AlchemyRelationEncoder
-    search_query = get_search_params(request)
-    search_keys = service.get_search_columns()
-    search_columns = list(set(search_keys).intersection(search_query.keys()))
-
-    filters_search = []
-    for skey in search_columns:
-        filters_search.append({
-            'column': getattr(cast(BaseService, service).model, skey),
-            'value': search_query[skey]
-        })
-
-    search_method = 'AND'
-    if len(filters_search) > 0:
-        search_method = get_search_method_param(request)
-
-    model_filter_keys = cast(BaseService, service).get_filter_columns()
-    filters_model = set(model_filter_keys).intersection(filter_keys)
-
-    filters = []
-    for f in filters_model:
-        filters.append({f: filter_query[f]})
-
-    if cast(BaseService, service).has_soft_delete():
-        filters.append({
-            cast(BaseModel, cast(BaseService, service).model).SOFT_DELETE_COLUMN: None
-        })
+    filters, filters_search, search_method = get_request_filters(service, request)
+
+    if columns is not None:
+        # Row mode: mappings of the columns instead of ORM objects
+        query, elements = cast(BaseService, service).multiple_filters_rows(
+            session,
+            filters,
+            True,
+            page,
+            per_page,
+            search_filters=filters_search,
+            search_method=search_method,
+            columns=columns
+        )
+        return elements, encoder, relationship_retrieve
 
     query, elements = cast(BaseService, service).multiple_filters(
         session,
@@ -221,60 +495,219 @@ def get_filtered_elements(service: BaseService, request: dict):
     return  elements, encoder, relationship_retrieve
 
 def get_field_value(obj, field_info):
+    if isinstance(obj, Mapping):
+        return obj.get(field_info.get("field", None), None)
     if "relation" in field_info and getattr(obj, field_info["relation"], None):
         related_obj = getattr(obj, field_info["relation"])
         return getattr(related_obj, field_info["attr"], None)
     else:
         return getattr(obj, field_info.get("field", None), None)
 
-def exportToCSV(service: BaseService, request: dict, column_aliases):
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler(priority=Priority.LOW)
+def exportToCSV(service: BaseService, request: dict, column_aliases, context = None):
+    """ Export the page of the filtered rows (same filters, search and soft delete as index) with the columns of
+    column_aliases. The format comes from the format parameter: csv (default), ndjson, arrow or parquet (see
+    core_db.export), the rows are written in batches while they are read from the cursor
+    """
+    accept_encoding = get_accept_encoding(request)
+    session = None
     try:
-
-        elements, encoder, relationship_retrieve = get_filtered_elements(service,request)
-
-        data = list(map(lambda d: dict(
-                **cast(BaseModel, d).to_dict(jsonEncoder=encoder, encoder_extras=relationship_retrieve)
-            ), elements)
-        )
-
-        if not data:
-            return {
-                "statusCode": HTTPStatus.BAD_REQUEST,
-                "body": json.dumps({"message": "No data provided"})
-            }
-
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=[info["alias"] for info in column_aliases.values()])
-        writer.writeheader()
-
-        for item in elements:
-            row = {}
-            for field, info in column_aliases.items():
-                if "field" not in info:
-                    info["field"] = field
-                row[info["alias"]] = get_field_value(item, info)
-            writer.writerow(row)
-        csv_content=output.getvalue()
-        output.close()
-
-        print(csv_content)
+        for field, info in column_aliases.items():
+            if "field" not in info:
+                info["field"] = field
+
+        with phase('params'):
+            params = request.get("queryStringParameters") or {}
+            writer_class = get_export_writer(params.get("format", "csv"))
+            columns = get_export_columns(column_aliases)
+            (page, per_page) = get_paginate_params(request)
+            filters, filters_search, search_method = get_request_filters(service, request)
+
+        session = DBConnection(**service.get_connection_params()).get_session()
+        output = io.BytesIO()
+        # Query and serialization are interleaved by batches
+        with phase('export'):
+            writer = writer_class(cast(BaseService, service).model, columns, output)
+            rows = cast(BaseService, service).export(session, writer, filters, columns, filters_search, search_method, True, page, per_page)
+            writer.close()
+
+        if not rows:
+            return build_response(HTTPStatus.BAD_REQUEST, {"message": "No data provided"}, accept_encoding=accept_encoding)
 
         file_date = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-        filename = f"export_{file_date}.csv"
-
-        response= {
-            "statusCode": HTTPStatus.OK,
-            "headers": {
-                "Content-Type": "text/csv",
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Access-Control-Allow-Origin": "*"
-            },
-            "body": csv_content
-        }
-        print("Response headers:", response["headers"])
+        filename = f"export_{file_date}.{writer.extension}"
+        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+        if writer.binary:
+            # Binary files go base64 encoded, they are already compressed
+            body = base64.b64encode(output.getvalue()).decode("ascii")
+            response = build_response(HTTPStatus.OK, body, application_type=writer.content_type, is_base_64=True, is_body_str=True, headers=headers)
+        else:
+            response = build_response(HTTPStatus.OK, output.getvalue().decode("utf-8"), application_type=writer.content_type, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
+        LOGGER.info("Response headers", extra={"headers": response["headers"], "rows": rows})
         return response
+    except ExportFormatUnavailable as e:
+        return build_response(HTTPStatusCode.NOT_ACCEPTABLE.value, {"message": str(e)}, accept_encoding=accept_encoding)
+    except APIException as e:
+        return build_response(e.status_code, e.to_dict(), accept_encoding=accept_encoding)
+    except DeadlineExceeded as e:
+        error, status_code, headers = deadline_exceeded(e)
+        return build_response(status_code, error, accept_encoding=accept_encoding, headers=headers)
     except Exception as e:
-        return {
-            "statusCode": HTTPStatus.INTERNAL_SERVER_ERROR,
-            "body": json.dumps({"error": str(e)})
-        }
\ No newline at end of file
+        return build_response(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}, accept_encoding=accept_encoding)
+    finally:
+        if session is not None:
+            session.close()
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler(priority=Priority.LOW)
+def exportAsync(service: BaseService, request: dict, column_aliases, context = None):
+    """ Export all the filtered rows (same filters, search and soft delete as index) in an export job
+    (core_http.export_jobs): the job is planned and enqueued, the export worker writes the files and exportStatus
+    returns its progress and download links
+
+        POST /items/export-jobs?format=parquet&status=paid -> 202 {"job_id": "...", "status": "queued", ...}
+    """
+    accept_encoding = get_accept_encoding(request)
+    session = None
+    try:
+        for field, info in column_aliases.items():
+            if "field" not in info:
+                info["field"] = field
+
+        with phase('params'):
+            params = request.get("queryStringParameters") or {}
+            export_format = get_export_writer(params.get("format", "csv")).format
+            columns = get_export_columns(column_aliases)
+            filters, filters_search, search_method = get_request_filters(service, request)
+
+        session = DBConnection(**service.get_connection_params()).get_session()
+        with phase('plan'):
+            id_range = cast(BaseService, service).get_id_range(session, filters, filters_search, search_method)
+        if not id_range[2]:
+            return build_response(HTTPStatus.BAD_REQUEST, {"message": "No data provided"}, accept_encoding=accept_encoding)
+
+        with phase('enqueue'):
+            job = create_export_job(service, columns, export_format, params, id_range, get_request_tenant(request))
+        body = {"job_id": job["job_id"], "status": "queued", "format": job["format"], "rows": job["rows"], "partitions": len(job["partitions"])}
+        return build_response(HTTPStatusCode.ACCEPTED.value, body, accept_encoding=accept_encoding)
+    except ExportFormatUnavailable as e:
+        return build_response(HTTPStatusCode.NOT_ACCEPTABLE.value, {"message": str(e)}, accept_encoding=accept_encoding)
+    except APIException as e:
+        return build_response(e.status_code, e.to_dict(), accept_encoding=accept_encoding)
+    except ExportJobsUnavailable as e:
+        LOGGER.error(str(e))
+        return build_response(HTTPStatusCode.SERVICE_UNAVAILABLE.value, {"message": "Export jobs are not available"}, accept_encoding=accept_encoding)
+    except DeadlineExceeded as e:
+        error, status_code, headers = deadline_exceeded(e)
+        return build_response(status_code, error, accept_encoding=accept_encoding, headers=headers)
+    except Exception as e:
+        LOGGER.exception("Cannot create the export job")
+        return build_response(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}, accept_encoding=accept_encoding)
+    finally:
+        if session is not None:
+            session.close()
+
+@timed_handler
+@tenant_handler
+def exportStatus(service: BaseService, request: dict, context = None):
+    """ Status of an export job of the tenant (job_id path parameter): progress while it runs, download links of the
+    files (download_url when the job wrote a single file) once it is done
+    """
+    accept_encoding = get_accept_encoding(request)
+    job_id = get_path_parameters(request).get('job_id', None)
+    try:
+        status = get_export_job_status(str(job_id), get_request_tenant(request))
+        if status is None:
+            return build_response(HTTPStatusCode.NOT_FOUND.value, {"message": "Export job not found"}, accept_encoding=accept_encoding)
+        # The progress changes while the job runs and the links expire
+        return build_response(HTTPStatusCode.OK.value, status, accept_encoding=accept_encoding, headers={'Cache-Control': 'no-store'})
+    except ExportJobsUnavailable as e:
+        LOGGER.error(str(e))
+        return build_response(HTTPStatusCode.SERVICE_UNAVAILABLE.value, {"message": "Export jobs are not available"}, accept_encoding=accept_encoding)
+    except Exception:
+        LOGGER.exception("Cannot read the export job")
+        return build_response(HTTPStatusCode.UNPROCESABLE_ENTITY.value, {"message": "Cannot make the request"}, accept_encoding=accept_encoding)
+
+@log_db_stats(logger=LOGGER)
+@timed_handler
+@deadline_handler
+@tenant_handler
+@admission_handler(priority=Priority.LOW)
+def aggregate(service: BaseService, request: dict, context = None):
+    """ Groups of the rows that match the filters of the request (same filters, search and soft delete as index)
+    with their aggregates, computed by a single GROUP BY:
+
+        GET /items/aggregate?group_by=status&bucket=created_at__month&aggregates=count,amount__sum&amount__gte=10
+        {"data": [{"created_at": "2024-05-01", "status": "paid", "count": 12, "amount__sum": 340.5}, ...]}
+
+    At most AGGREGATE_MAX_GROUPS groups are returned, with X-Partial-Result: groups when there are more
+    """
+    session = DBConnection(**service.get_connection_params()).get_session()
+    accept_encoding = get_accept_encoding(request)
+    if_none_match = get_header(request, 'If-None-Match')
+    headers = {}
+    cache_control = cast(BaseService, service).get_cache_control()
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    try:
+        with phase('params'):
+            prefix_host = request.get('headers', {}).get('er-company-request', None)
+            params = request.get("queryStringParameters") or {}
+            group_by, aggregates, bucket = get_aggregate_params(service, request)
+            filters, filters_search, search_method = get_request_filters(service, request)
+
+        etag = None
+        if cast(BaseService, service).has_updated_at():
+            # The groups only change with the rows, the version of the filtered rows validates them
+            with phase('version'):
+                version = cast(BaseService, service).get_version(session, filters, search_filters=filters_search, search_method=search_method)
+                etag = build_etag(version, params, prefix_host)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+
+        with phase('query'):
+            try:
+                # One group over the limit tells that the result was cut
+                groups = cast(BaseService, service).aggregate(session, filters, group_by, aggregates, bucket, search_filters=filters_search, search_method=search_method, limit=AGGREGATE_MAX_GROUPS + 1)
+            except ValueError as e:
+                raise APIException(str(e), status_code=HTTPStatusCode.BAD_REQUEST.value)
+        if len(groups) > AGGREGATE_MAX_GROUPS:
+            groups = groups[:AGGREGATE_MAX_GROUPS]
+            headers['X-Partial-Result'] = 'groups'
+
+        with phase('serialize'):
+            response = json.dumps(dict(data=groups), cls=AlchemyEncoder)
+
+        if etag is None:
+            etag = build_etag(response)
+            if etag_matches(etag, if_none_match):
+                return build_response(HTTPStatusCode.NOT_MODIFIED.value, "", is_body_str=True, accept_encoding=accept_encoding, headers={**headers, 'ETag': etag})
+        if 'X-Partial-Result' not in headers:
+            headers['ETag'] = etag
+
+        status_code = HTTPStatusCode.OK.value
+    except DeadlineExceeded as e:
+        error, status_code, error_headers = deadline_exceeded(e)
+        response = json.dumps(error)
+        headers.update(error_headers)
+    except APIException as e:
+        LOGGER.warning("Invalid aggregation", extra={'reason': e.message})
+        response = json.dumps(e.to_dict())
+        status_code = e.status_code
+    except Exception:
+        LOGGER.exception("Cannot make the request")
+        response = json.dumps(dict(message="Cannot make the request"))
+        status_code = HTTPStatusCode.UNPROCESABLE_ENTITY.value
+    finally:
+        session.close()
+
+    with phase('response'):
+        return build_response(status_code, response, is_body_str=True, accept_encoding=accept_encoding, headers=headers)
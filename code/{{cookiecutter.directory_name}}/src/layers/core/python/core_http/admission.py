@@ -0,0 +1,93 @@
+"""
+Admission of the controller requests by the load of their database connection (core_db.admission). The low priority
+requests are answered with 429 while the connection is overloaded and every request with 503 while its circuit is
+open, in both cases with Retry-After and before opening a session.
+
+    @admission_handler(priority=Priority.LOW)
+    def exportToCSV(service, request, column_aliases, context=None): ...
+"""
+import inspect
+import functools
+from typing import Any, Callable
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+
+from core_db.admission import AdmissionRejected, CircuitOpen, Priority, get_admission_controller
+from core_db.instrumentation import METRICS_NAMESPACE
+from core_utils.environment import env
+from .enums.http_status_code import HTTPStatusCode
+from .utils import build_response, get_accept_encoding, get_paginate_params
+
+LOGGER = Logger('layers.core.core_http.admission')
+
+## Listings that read past this row offset (page * per_page) are low priority
+ADMISSION_DEEP_PAGE_ROWS = env("ADMISSION_DEEP_PAGE_ROWS", 10000)
+
+
+def page_priority(service: Any, request: dict) -> Priority:
+    """ Priority of a listing: the deep pages are low priority (the database reads and discards the offset) """
+    page, per_page = get_paginate_params(request)
+    return Priority.LOW if page * per_page > ADMISSION_DEEP_PAGE_ROWS else Priority.NORMAL
+
+
+def rejected_response(error: AdmissionRejected, request: dict) -> dict:
+    """ Response of a request that wasn't admitted: 503 with the circuit open, 429 when it was shed
+
+    Args:
+        error (AdmissionRejected): Reason of the rejection
+        request (dict): Request of the handler
+
+    Returns:
+        dict: API Gateway response
+    """
+    circuit_open = isinstance(error, CircuitOpen)
+    LOGGER.warning("Request not admitted", extra={'reason': str(error), 'retry_after': error.retry_after})
+
+    emf = EphemeralMetrics(namespace=METRICS_NAMESPACE)
+    emf.add_metric(name="DBCircuitOpenRejections" if circuit_open else "DBLoadShedRejections", unit=MetricUnit.Count, value=1)
+    emf.flush_metrics()
+
+    status_code = HTTPStatusCode.SERVICE_UNAVAILABLE.value if circuit_open else HTTPStatusCode.TOO_MANY_REQUESTS.value
+    return build_response(status_code, dict(message=str(error)), accept_encoding=get_accept_encoding(request), headers={'Retry-After': str(error.retry_after)})
+
+
+def _admit(priority: Priority | Callable[[Any, dict], Priority], args: tuple, kwargs: dict) -> None:
+    service = kwargs.get('service', args[0] if len(args) > 0 else None)
+    request = kwargs.get('request', args[1] if len(args) > 1 else None) or {}
+    config_name = service.get_connection_params().get('config_name') if service is not None else None
+    # Without controller the connection wasn't used yet in the container, there is nothing to protect
+    controller = get_admission_controller(config_name) if config_name else None
+    if controller is not None:
+        controller.admit(priority(service, request) if callable(priority) else priority)
+
+
+def admission_handler(handler: Callable | None = None, *, priority: Priority | Callable[[Any, dict], Priority] = Priority.NORMAL):
+    """ Decorator of the controllers (service, request, ...) that rejects the request when its database connection
+    doesn't admit it. Works with sync and async functions.
+
+    Args:
+        handler (Callable | None, optional): Decorated function. Defaults to None.
+        priority (Priority | Callable, optional): Priority or function (service, request) -> Priority. Defaults to Priority.NORMAL.
+    """
+    if handler is None:
+        return functools.partial(admission_handler, priority=priority)
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            try:
+                _admit(priority, args, kwargs)
+            except AdmissionRejected as e:
+                return rejected_response(e, kwargs.get('request', args[1] if len(args) > 1 else {}))
+            return await handler(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs) -> Any:
+        try:
+            _admit(priority, args, kwargs)
+        except AdmissionRejected as e:
+            return rejected_response(e, kwargs.get('request', args[1] if len(args) > 1 else {}))
+        return handler(*args, **kwargs)
+    return wrapper
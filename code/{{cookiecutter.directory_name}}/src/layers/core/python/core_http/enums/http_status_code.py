@@ -6,8 +6,11 @@ class HTTPStatusCode(Enum):
 
     OK  = 200
     CREATED = 201
+    ACCEPTED = 202
     NO_CONTENT = 204
 
+    NOT_MODIFIED = 304
+
     BAD_REQUEST = 400
     UNAUTHORIZED = 401
     FORBIDDEN = 403
@@ -18,5 +21,7 @@ class HTTPStatusCode(Enum):
     CONFLICT = 409
     UNSUPPORTED_TYPE = 415
     UNPROCESABLE_ENTITY = 422
+    TOO_MANY_REQUESTS = 429
 
-    INTERNAL_SERVER_ERROR = 500
\ No newline at end of file
+    INTERNAL_SERVER_ERROR = 500
+    SERVICE_UNAVAILABLE = 503
\ No newline at end of file
@@ -0,0 +1,695 @@
+"""
+Asynchronous export jobs, for the exports that don't fit in a synchronous response (API Gateway waits 29 seconds and
+answers at most 6 MB):
+
+1. exportAsync (BaseController) validates the filters, plans the job and answers 202 with its id. The filtered rows
+   are split in ranges of the identifier (EXPORT_JOB_PARTITION_ROWS rows each on average, at most
+   EXPORT_JOB_MAX_PARTITIONS) and every range is a message of the EXPORT_JOB_QUEUE queue.
+2. The export worker (src/lambdas/export_worker) exports the ranges in parallel with the writers of core_db.export,
+   uploading each file in parts of EXPORT_JOB_CHUNK_BYTES while the rows are read, and reports its progress.
+3. exportStatus returns the progress of the job and the download links once it is done.
+
+The job (manifest and progress of each range) is kept in the storage next to its files:
+
+    <tenant>/<job id>/job.json
+    <tenant>/<job id>/partitions/00000.json
+    <tenant>/<job id>/export-00000.csv
+
+The ranges are fixed when the job is planned: rows inserted later are not exported. Each range is a complete file of
+the format (with its header), models without an integer identifier are exported in a single range.
+
+Storage: s3://bucket/prefix, file:///tmp/exports or memory://. Queue: name or url of an SQS queue, or memory://
+(the messages stay in the process, MemoryExportQueue.to_event builds the event of the worker).
+"""
+import io
+import re
+import json
+import time
+import uuid
+import importlib
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, List
+from urllib.parse import urlparse
+
+from aws_lambda_powertools import Logger
+
+from core_db.BaseService import BaseService
+from core_db.DBConnection import DBConnection
+from core_db.export import ExportColumn, get_export_writer
+from core_db.tenancy import tenant_scope
+from core_utils.environment import env
+from core_utils.filters import FilterExpression
+
+LOGGER = Logger('layers.core.core_http.export_jobs')
+
+## Queue of the export jobs: name or url of an SQS queue, or memory:// (tests and local development)
+EXPORT_JOB_QUEUE = env("EXPORT_JOB_QUEUE", "")
+## Storage of the files and progress of the jobs: s3://bucket/prefix, file:///tmp/exports or memory://
+EXPORT_JOB_STORAGE_URL = env("EXPORT_JOB_STORAGE_URL", "")
+## Average rows of each range exported by a worker and max ranges of a job
+EXPORT_JOB_PARTITION_ROWS = env("EXPORT_JOB_PARTITION_ROWS", 250000)
+EXPORT_JOB_MAX_PARTITIONS = env("EXPORT_JOB_MAX_PARTITIONS", 32)
+## Bytes uploaded per part (S3 needs at least 5 MB in every part but the last one)
+EXPORT_JOB_CHUNK_BYTES = env("EXPORT_JOB_CHUNK_BYTES", 8 * 1024 * 1024)
+## Seconds between the progress reports of a worker
+EXPORT_JOB_PROGRESS_SECONDS = env("EXPORT_JOB_PROGRESS_SECONDS", 5)
+## Seconds that the download links are valid
+EXPORT_JOB_LINK_SECONDS = env("EXPORT_JOB_LINK_SECONDS", 3600)
+
+EXPORT_JOB_STORAGE: 'ExportStorage | None' = None
+EXPORT_JOB_QUEUE_BACKEND: 'ExportQueue | None' = None
+
+## Status of the jobs and of each range
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ExportJobsUnavailable(Exception):
+    """ The queue or the storage of the export jobs are not configured """
+
+
+class ExportStorage:
+    """ Minimal protocol of the object storage of the jobs (S3 semantics)
+    """
+
+    def put(self, key: str, data: bytes, content_type: str = 'application/json') -> None:
+        raise NotImplementedError()
+
+    def get(self, key: str) -> bytes | None:
+        raise NotImplementedError()
+
+    def start_upload(self, key: str, content_type: str) -> str:
+        """ Start an upload in parts
+
+        Returns:
+            str: Upload id
+        """
+        raise NotImplementedError()
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> Any:
+        """ Upload a part (numbered from 1), returns what complete_upload needs of it """
+        raise NotImplementedError()
+
+    def complete_upload(self, key: str, upload_id: str, parts: list) -> None:
+        raise NotImplementedError()
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        raise NotImplementedError()
+
+    def link(self, key: str, filename: str, expires_in: int) -> str:
+        """ Download link of an object """
+        raise NotImplementedError()
+
+
+class MemoryExportStorage(ExportStorage):
+    """ In-process stand-in of the storage, useful for tests and local development
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self._lock = threading.RLock()
+
+    def put(self, key: str, data: bytes, content_type: str = 'application/json') -> None:
+        with self._lock:
+            self.objects[key] = data
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self.objects.get(key)
+
+    def start_upload(self, key: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {}
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> Any:
+        with self._lock:
+            self.uploads[upload_id][number] = data
+        return number
+
+    def complete_upload(self, key: str, upload_id: str, parts: list) -> None:
+        with self._lock:
+            uploaded = self.uploads.pop(upload_id)
+            self.objects[key] = b"".join(uploaded[number] for number in parts)
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        with self._lock:
+            self.uploads.pop(upload_id, None)
+
+    def link(self, key: str, filename: str, expires_in: int) -> str:
+        return f"memory://{key}"
+
+
+class FileExportStorage(ExportStorage):
+    """ Local-file stand-in of the storage: processes in the same host (e.g. the local api and worker) share it
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key
+
+    def _part_path(self, key: str, upload_id: str, number: int) -> Path:
+        path = self._path(key)
+        return path.with_name(f"{path.name}.{upload_id}.{number:05d}.part")
+
+    def put(self, key: str, data: bytes, content_type: str = 'application/json') -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def start_upload(self, key: str, content_type: str) -> str:
+        self._path(key).parent.mkdir(parents=True, exist_ok=True)
+        return uuid.uuid4().hex
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> Any:
+        self._part_path(key, upload_id, number).write_bytes(data)
+        return number
+
+    def complete_upload(self, key: str, upload_id: str, parts: list) -> None:
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{upload_id}.tmp")
+        with open(tmp_path, "wb") as file:
+            for number in parts:
+                part_path = self._part_path(key, upload_id, number)
+                file.write(part_path.read_bytes())
+                part_path.unlink()
+        tmp_path.replace(path)
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        path = self._path(key)
+        for part_path in path.parent.glob(f"{path.name}.{upload_id}.*.part"):
+            part_path.unlink(missing_ok=True)
+
+    def link(self, key: str, filename: str, expires_in: int) -> str:
+        return self._path(key).resolve().as_uri()
+
+
+class S3ExportStorage(ExportStorage):
+    """ S3 storage (core_aws.s3), the links are presigned urls
+    """
+
+    def __init__(self, bucket: str, prefix: str = "") -> None:
+        self.bucket = bucket
+        self.prefix = f"{prefix.strip('/')}/" if prefix.strip('/') else ""
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put(self, key: str, data: bytes, content_type: str = 'application/json') -> None:
+        from core_aws.s3 import put_object
+
+        put_object(self.bucket, self._key(key), data, content_type)
+
+    def get(self, key: str) -> bytes | None:
+        from core_aws.s3 import get_object
+
+        return get_object(self.bucket, self._key(key))
+
+    def start_upload(self, key: str, content_type: str) -> str:
+        from core_aws.s3 import create_multipart_upload
+
+        return create_multipart_upload(self.bucket, self._key(key), content_type)
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> Any:
+        from core_aws.s3 import upload_part
+
+        return upload_part(self.bucket, self._key(key), upload_id, number, data)
+
+    def complete_upload(self, key: str, upload_id: str, parts: list) -> None:
+        from core_aws.s3 import complete_multipart_upload
+
+        complete_multipart_upload(self.bucket, self._key(key), upload_id, parts)
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        from core_aws.s3 import abort_multipart_upload
+
+        abort_multipart_upload(self.bucket, self._key(key), upload_id)
+
+    def link(self, key: str, filename: str, expires_in: int) -> str:
+        from core_aws.s3 import generate_presigned_url
+
+        return generate_presigned_url(self.bucket, self._key(key), expires_in, filename)
+
+
+class ExportQueue:
+    """ Queue of the ranges of the jobs (SQS semantics)
+    """
+
+    def send(self, messages: List[dict]) -> None:
+        raise NotImplementedError()
+
+
+class MemoryExportQueue(ExportQueue):
+    """ In-process stand-in of the queue, the worker runs with the event of to_event
+    """
+
+    def __init__(self) -> None:
+        self.messages: List[dict] = []
+        self._lock = threading.RLock()
+
+    def send(self, messages: List[dict]) -> None:
+        with self._lock:
+            self.messages.extend(messages)
+
+    def to_event(self) -> dict:
+        """ SQS event of the worker with the pending messages (they are removed from the queue) """
+        with self._lock:
+            messages, self.messages = self.messages, []
+        return {"Records": [{"messageId": uuid.uuid4().hex, "body": json.dumps(message)} for message in messages]}
+
+
+class SqsExportQueue(ExportQueue):
+    """ SQS queue (core_aws.sqs), the messages are sent in batches of 10
+    """
+
+    def __init__(self, queue: str) -> None:
+        self.queue = queue
+        self._url = queue if queue.startswith("https://") else None
+
+    def get_url(self) -> str:
+        if self._url is None:
+            from core_aws.sqs import get_sqs_queue_url
+
+            self._url = get_sqs_queue_url(self.queue)
+        return self._url
+
+    def send(self, messages: List[dict]) -> None:
+        from core_aws.sqs import UnprocessedMessagesError, send_message_batch_by_url
+
+        for start in range(0, len(messages), 10):
+            entries = [
+                {"Id": str(i), "MessageBody": json.dumps(message)}
+                for i, message in enumerate(messages[start:start + 10], start)
+            ]
+            response = send_message_batch_by_url(self.get_url(), entries)
+            if response.get("Failed"):
+                raise UnprocessedMessagesError(f"Cannot enqueue the export ranges: {response['Failed']}")
+
+
+def create_export_storage(url: str) -> ExportStorage | None:
+    """ Build a storage from its url
+
+    Args:
+        url (str): s3://, file:// or memory:// url
+
+    Returns:
+        ExportStorage | None: Storage or None if the url is empty
+    """
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    if parsed.scheme == 's3':
+        return S3ExportStorage(parsed.netloc, parsed.path)
+    if parsed.scheme == 'file':
+        return FileExportStorage(parsed.path)
+    if parsed.scheme == 'memory':
+        return MemoryExportStorage()
+    raise ValueError(f"Unsupported export storage url: {url}")
+
+
+def create_export_queue(queue: str) -> ExportQueue | None:
+    """ Build a queue from its name or url
+
+    Args:
+        queue (str): SQS queue name or url, or memory://
+
+    Returns:
+        ExportQueue | None: Queue or None if it is empty
+    """
+    if not queue:
+        return None
+    if queue.startswith('memory://'):
+        return MemoryExportQueue()
+    return SqsExportQueue(queue)
+
+
+def get_export_storage() -> ExportStorage:
+    """ Get the storage configured with EXPORT_JOB_STORAGE_URL (created once per container)
+
+    Raises:
+        ExportJobsUnavailable: The storage is not configured
+    """
+    global EXPORT_JOB_STORAGE
+    if EXPORT_JOB_STORAGE is None:
+        EXPORT_JOB_STORAGE = create_export_storage(EXPORT_JOB_STORAGE_URL)
+    if EXPORT_JOB_STORAGE is None:
+        raise ExportJobsUnavailable("The export jobs need EXPORT_JOB_STORAGE_URL")
+    return EXPORT_JOB_STORAGE
+
+
+def set_export_storage(storage: ExportStorage | None) -> None:
+    """ Replace the storage (e.g. a MemoryExportStorage in tests) """
+    global EXPORT_JOB_STORAGE
+    EXPORT_JOB_STORAGE = storage
+
+
+def get_export_queue() -> ExportQueue:
+    """ Get the queue configured with EXPORT_JOB_QUEUE (created once per container)
+
+    Raises:
+        ExportJobsUnavailable: The queue is not configured
+    """
+    global EXPORT_JOB_QUEUE_BACKEND
+    if EXPORT_JOB_QUEUE_BACKEND is None:
+        EXPORT_JOB_QUEUE_BACKEND = create_export_queue(EXPORT_JOB_QUEUE)
+    if EXPORT_JOB_QUEUE_BACKEND is None:
+        raise ExportJobsUnavailable("The export jobs need EXPORT_JOB_QUEUE")
+    return EXPORT_JOB_QUEUE_BACKEND
+
+
+def set_export_queue(queue: ExportQueue | None) -> None:
+    """ Replace the queue (e.g. a MemoryExportQueue in tests) """
+    global EXPORT_JOB_QUEUE_BACKEND
+    EXPORT_JOB_QUEUE_BACKEND = queue
+
+
+def plan_partitions(min_id: Any, max_id: Any, rows: int, partition_rows: int = EXPORT_JOB_PARTITION_ROWS, max_partitions: int = EXPORT_JOB_MAX_PARTITIONS) -> List[list | None]:
+    """ Split the identifiers of the filtered rows in ranges of the same width (inclusive bounds)
+
+    Args:
+        min_id (Any): Min identifier of the rows
+        max_id (Any): Max identifier of the rows
+        rows (int): Filtered rows
+        partition_rows (int, optional): Average rows of each range. Defaults to EXPORT_JOB_PARTITION_ROWS.
+        max_partitions (int, optional): Max ranges. Defaults to EXPORT_JOB_MAX_PARTITIONS.
+
+    Returns:
+        List[list | None]: Ranges [first id, last id], a single None range if the identifiers are not integers
+    """
+    if not rows:
+        return []
+    if not isinstance(min_id, int) or not isinstance(max_id, int):
+        return [None]
+
+    count = max(1, min(max_partitions, -(-rows // max(1, partition_rows)), max_id - min_id + 1))
+    width = -(-(max_id - min_id + 1) // count)
+    return [
+        [start, min(start + width - 1, max_id)]
+        for start in range(min_id, max_id + 1, width)
+    ]
+
+
+def _job_key(tenant: str | None, job_id: str, name: str) -> str:
+    return f"{tenant or '_'}/{job_id}/{name}"
+
+
+def _partition_key(tenant: str | None, job_id: str, index: int) -> str:
+    return _job_key(tenant, job_id, f"partitions/{index:05d}.json")
+
+
+def _read_json(storage: ExportStorage, key: str) -> dict | None:
+    data = storage.get(key)
+    return json.loads(data) if data is not None else None
+
+
+def _class_path(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _import_class(path: str) -> Any:
+    module, _, name = path.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+def create_export_job(service: BaseService, columns: List[ExportColumn], export_format: str, query: dict, id_range: tuple, tenant: str | None = None) -> dict:
+    """ Write the manifest of a job and enqueue its ranges
+
+    Args:
+        service (BaseService): Service of the model
+        columns (List[ExportColumn]): Exported columns
+        export_format (str): Format of the files
+        query (dict): Query string of the request, the worker builds the filters with it
+        id_range (tuple): (min id, max id, count) of the filtered rows (BaseService.get_id_range)
+        tenant (str | None, optional): Tenant of the request. Defaults to None.
+
+    Raises:
+        ExportJobsUnavailable: The queue or the storage are not configured
+
+    Returns:
+        dict: Manifest of the job
+    """
+    storage = get_export_storage()
+    queue = get_export_queue()
+    min_id, max_id, rows = id_range
+    writer_class = get_export_writer(export_format)
+
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "tenant": tenant,
+        "format": writer_class.format,
+        "rows": rows,
+        "partitions": plan_partitions(min_id, max_id, rows),
+        "service": _class_path(type(service)),
+        "model": _class_path(service.model),
+        "columns": [list(column) for column in columns],
+        "query": query,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    storage.put(_job_key(tenant, job["job_id"], "job.json"), json.dumps(job).encode("utf-8"))
+    queue.send([
+        {"job_id": job["job_id"], "tenant": tenant, "partition": index}
+        for index in range(len(job["partitions"]))
+    ])
+    LOGGER.info("Export job queued", extra={"job_id": job["job_id"], "rows": rows, "partitions": len(job["partitions"])})
+    return job
+
+
+def load_job_service(job: dict) -> BaseService:
+    """ Service of the model of a job (generated services are built without arguments)
+
+    Raises:
+        ValueError: The service of the job is not a BaseService
+    """
+    service_class = _import_class(job["service"])
+    if not isinstance(service_class, type) or not issubclass(service_class, BaseService):
+        raise ValueError(f"Invalid export service {job['service']}")
+    if service_class is BaseService:
+        return BaseService(_import_class(job["model"]))
+    return service_class()
+
+
+class ChunkedUpload(io.RawIOBase):
+    """ Writable file that uploads its content in parts of chunk_bytes while it is written, the object only exists
+    after complete
+
+    Args:
+        storage (ExportStorage): Storage of the object
+        key (str): Key of the object
+        content_type (str): Content type of the object
+        chunk_bytes (int, optional): Bytes of each part. Defaults to EXPORT_JOB_CHUNK_BYTES.
+    """
+
+    def __init__(self, storage: ExportStorage, key: str, content_type: str, chunk_bytes: int = EXPORT_JOB_CHUNK_BYTES) -> None:
+        super().__init__()
+        self.storage = storage
+        self.key = key
+        self.chunk_bytes = chunk_bytes
+        self.upload_id = storage.start_upload(key, content_type)
+        self.buffer = bytearray()
+        self.parts = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        size = memoryview(data).nbytes
+        self.buffer += data
+        self.position += size
+        while len(self.buffer) >= self.chunk_bytes:
+            self._upload(bytes(self.buffer[:self.chunk_bytes]))
+            del self.buffer[:self.chunk_bytes]
+        return size
+
+    def tell(self) -> int:
+        return self.position
+
+    def _upload(self, data: bytes) -> None:
+        self.parts.append(self.storage.upload_part(self.key, self.upload_id, len(self.parts) + 1, data))
+
+    def complete(self) -> None:
+        if self.buffer or not self.parts:
+            self._upload(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.storage.complete_upload(self.key, self.upload_id, self.parts)
+
+    def abort(self) -> None:
+        self.storage.abort_upload(self.key, self.upload_id)
+
+
+def run_export_partition(message: dict) -> int:
+    """ Export a range of a job to its file, reporting the rows written every EXPORT_JOB_PROGRESS_SECONDS. Ranges
+    already exported (repeated messages) are skipped
+
+    Args:
+        message (dict): Message of the range (job_id, tenant and partition)
+
+    Raises:
+        Exception: The errors of the export, the range is marked as failed and the queue retries it
+
+    Returns:
+        int: Exported rows
+    """
+    # Imported here, BaseController imports this module
+    from .BaseController import get_request_filters
+
+    storage = get_export_storage()
+    tenant, job_id, index = message.get("tenant"), message["job_id"], int(message["partition"])
+    job = _read_json(storage, _job_key(tenant, job_id, "job.json"))
+    if job is None:
+        LOGGER.warning("Export job not found, the range is dropped", extra={"job_id": job_id, "partition": index})
+        return 0
+
+    progress_key = _partition_key(tenant, job_id, index)
+    progress = _read_json(storage, progress_key) or {}
+    if progress.get("status") == DONE:
+        return progress["rows"]
+
+    writer_class = get_export_writer(job["format"])
+    key = _job_key(tenant, job_id, f"export-{index:05d}.{writer_class.extension}")
+    attempts = progress.get("attempts", 0) + 1
+
+    def report(status: str, rows: int, **extra) -> None:
+        state = {"status": status, "rows": rows, "attempts": attempts, "updated_at": datetime.now(timezone.utc).isoformat(), **extra}
+        storage.put(progress_key, json.dumps(state).encode("utf-8"))
+
+    last_report = time.monotonic()
+
+    def on_batch(rows: int) -> None:
+        nonlocal last_report
+        if time.monotonic() - last_report >= EXPORT_JOB_PROGRESS_SECONDS:
+            report(RUNNING, rows)
+            last_report = time.monotonic()
+
+    report(RUNNING, 0)
+    upload = ChunkedUpload(storage, key, writer_class.content_type)
+    try:
+        service = load_job_service(job)
+        columns = [ExportColumn(*column) for column in job["columns"]]
+        with tenant_scope(tenant):
+            filters, filters_search, search_method = get_request_filters(service, {"queryStringParameters": job["query"]})
+            id_range = job["partitions"][index]
+            if id_range is not None:
+                filters.append(FilterExpression('id', 'between', (str(id_range[0]), str(id_range[1]))))
+
+            session = DBConnection(**service.get_connection_params()).get_session()
+            try:
+                writer = writer_class(service.model, columns, upload)
+                rows = service.export(session, writer, filters, columns, filters_search, search_method, order_by='id', order_dir='asc', on_batch=on_batch)
+                writer.close()
+            finally:
+                session.close()
+        upload.complete()
+    except Exception as e:
+        LOGGER.exception("Export range failed", extra={"job_id": job_id, "partition": index})
+        upload.abort()
+        # The status only shows the type of the error, the details stay in the log
+        report(FAILED, 0, error=type(e).__name__)
+        raise
+
+    report(DONE, rows, key=key, bytes=upload.position)
+    LOGGER.info("Export range done", extra={"job_id": job_id, "partition": index, "rows": rows, "bytes": upload.position})
+    return rows
+
+
+def process_export_records(event: dict) -> dict:
+    """ Run the ranges of an SQS event of the worker
+
+    Args:
+        event (dict): SQS event
+
+    Returns:
+        dict: Partial batch response, only the failed messages return to the queue
+    """
+    failures = []
+    for record in event.get("Records", []):
+        try:
+            run_export_partition(json.loads(record["body"]))
+        except Exception:
+            failures.append({"itemIdentifier": record["messageId"]})
+    return {"batchItemFailures": failures}
+
+
+def get_export_job_status(job_id: str, tenant: str | None = None) -> dict | None:
+    """ Progress of a job and, once all its ranges are done, the download links of its files
+
+    Args:
+        job_id (str): Job id
+        tenant (str | None, optional): Tenant of the request, jobs of other tenants are not found. Defaults to None.
+
+    Returns:
+        dict | None: Status of the job or None if it doesn't exist
+    """
+    if not JOB_ID_PATTERN.match(str(job_id)):
+        return None
+
+    storage = get_export_storage()
+    job = _read_json(storage, _job_key(tenant, job_id, "job.json"))
+    if job is None:
+        return None
+
+    partitions = [
+        _read_json(storage, _partition_key(tenant, job_id, index)) or {"status": QUEUED, "rows": 0}
+        for index in range(len(job["partitions"]))
+    ]
+    statuses = [partition["status"] for partition in partitions]
+    if FAILED in statuses:
+        status = FAILED
+    elif all(partition_status == DONE for partition_status in statuses):
+        status = DONE
+    elif all(partition_status == QUEUED for partition_status in statuses):
+        status = QUEUED
+    else:
+        status = RUNNING
+
+    rows_written = sum(partition["rows"] for partition in partitions)
+    body = {
+        "job_id": job_id,
+        "status": status,
+        "format": job["format"],
+        "created_at": job["created_at"],
+        "rows": job["rows"],
+        "rows_written": rows_written,
+        "progress": 1.0 if status == DONE else round(min(rows_written / max(job["rows"], 1), 0.99), 4),
+        "partitions": {
+            "total": len(partitions),
+            "done": statuses.count(DONE),
+            "failed": statuses.count(FAILED),
+        },
+    }
+    if status == FAILED:
+        # The failed ranges return to the queue until its redrive policy moves them to the dead letter queue
+        body["errors"] = [partition["error"] for partition in partitions if partition["status"] == FAILED]
+    if status == DONE:
+        extension = get_export_writer(job["format"]).extension
+        body["files"] = [
+            {
+                "url": storage.link(partition["key"], f"export_{job_id}_{index:05d}.{extension}", EXPORT_JOB_LINK_SECONDS),
+                "rows": partition["rows"],
+                "bytes": partition["bytes"],
+            }
+            for index, partition in enumerate(partitions)
+        ]
+        if len(body["files"]) == 1:
+            body["download_url"] = body["files"][0]["url"]
+    return body
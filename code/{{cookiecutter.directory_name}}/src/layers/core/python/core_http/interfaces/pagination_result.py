@@ -6,12 +6,12 @@ from .resource_reference import ResourceReference
 
 class PaginationResult:
 
-    def __init__(self, data: List[BaseModel], offset: int = 1, limit: int = 50, total: int = 1, prefix_model: str = "", sufix_model: str = "", refType: Type = BaseModel, request_method='GET', prefix_host: str | None = None) -> None:
+    def __init__(self, data: List[BaseModel], offset: int = 1, limit: int = 50, total: int | None = 1, prefix_model: str = "", sufix_model: str = "", refType: Type = BaseModel, request_method='GET', prefix_host: str | None = None) -> None:
         if len(data) > 0:
             self.Data = data
             self.Links = {
                 "current": ResourceReference(
-                    type(data[0]),
+                    type(data[0]) if isinstance(data[0], BaseModel) else refType,
                     prefix_model=prefix_model,
                     sufix_model=f"{'/' if sufix_model != '' else ''}{sufix_model}?page={offset}&per_page={limit}",
                     action=request_method,
@@ -29,14 +29,17 @@ class PaginationResult:
                 action=request_method,
                 prefix_host=prefix_host).to_dict()
             
-            self.Links["last"] = ResourceReference(
-                refType,
-                prefix_model=prefix_model,
-                sufix_model=f"{'/' if sufix_model != '' else ''}{sufix_model}?page={(math.ceil(total / limit))}&per_page={limit}",
-                action=request_method,
-                prefix_host=prefix_host).to_dict()
+            # The total is None when the count was skipped (deadline), the last page is unknown
+            if total is not None:
+                self.Links["last"] = ResourceReference(
+                    refType,
+                    prefix_model=prefix_model,
+                    sufix_model=f"{'/' if sufix_model != '' else ''}{sufix_model}?page={(math.ceil(total / limit))}&per_page={limit}",
+                    action=request_method,
+                    prefix_host=prefix_host).to_dict()
 
-            if (self.Offset * self.Limit) < self.Total:
+            has_next = (self.Offset * self.Limit) < self.Total if total is not None else len(data) >= limit
+            if has_next:
                 self.Links["next"] = ResourceReference(
                     refType,
                     prefix_model=prefix_model,
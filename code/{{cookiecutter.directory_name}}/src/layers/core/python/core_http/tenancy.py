@@ -0,0 +1,100 @@
+"""
+Tenant of the requests. The controllers run inside the tenant scope of core_db.tenancy, so the services use the
+database of the tenant without changes. Handlers that use the services directly open the scope themselves:
+
+    with tenant_scope(get_request_tenant(event)):
+        ...
+"""
+import inspect
+import functools
+from typing import Any, Callable
+
+from aws_lambda_powertools import Logger
+
+from core_db.tenancy import TENANT_PATTERN, TenantRoutingError, tenant_scope
+from core_utils.environment import env
+from .enums.http_status_code import HTTPStatusCode
+from .utils import build_response, get_accept_encoding, get_header
+
+LOGGER = Logger('layers.core.core_http.tenancy')
+
+## Header with the tenant of the request (it is also the host prefix of the links)
+TENANT_HEADER = env("TENANT_HEADER", "er-company-request")
+
+
+def get_request_tenant(request: dict) -> str | None:
+    """ Tenant of a request
+
+    Args:
+        request (dict): API Gateway event
+
+    Raises:
+        ValueError: The header has an invalid identifier
+
+    Returns:
+        str | None: Tenant or None if the request doesn't send it
+    """
+    tenant = get_header(request, TENANT_HEADER)
+    if not tenant:
+        return None
+    if not TENANT_PATTERN.match(tenant):
+        raise ValueError(f"Invalid {TENANT_HEADER} header")
+    return tenant
+
+
+def _resolve(args: tuple, kwargs: dict) -> tuple[Any, dict]:
+    service = kwargs.get('service', args[0] if len(args) > 0 else None)
+    request = kwargs.get('request', args[1] if len(args) > 1 else None) or {}
+    return service, request
+
+
+def _route(service: Any, request: dict) -> dict | None:
+    """ Route the connection of the service once in the scope, the errors are answered before the handler runs """
+    try:
+        if service is not None:
+            service.get_connection_params()
+    except TenantRoutingError:
+        LOGGER.exception("Cannot route the tenant connection")
+        return build_response(HTTPStatusCode.SERVICE_UNAVAILABLE.value, dict(message="The database of the tenant is not available"), accept_encoding=get_accept_encoding(request))
+    return None
+
+
+def _invalid(error: ValueError, request: dict) -> dict:
+    return build_response(HTTPStatusCode.BAD_REQUEST.value, dict(message=str(error)), accept_encoding=get_accept_encoding(request))
+
+
+def tenant_handler(handler: Callable):
+    """ Decorator of the controllers (service, request, ...) that runs them in the tenant scope of the request.
+    Works with sync and async functions.
+
+    Args:
+        handler (Callable): Decorated function
+    """
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            service, request = _resolve(args, kwargs)
+            try:
+                tenant = get_request_tenant(request)
+            except ValueError as e:
+                return _invalid(e, request)
+            with tenant_scope(tenant):
+                error = _route(service, request) if tenant is not None else None
+                if error is not None:
+                    return error
+                return await handler(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs) -> Any:
+        service, request = _resolve(args, kwargs)
+        try:
+            tenant = get_request_tenant(request)
+        except ValueError as e:
+            return _invalid(e, request)
+        with tenant_scope(tenant):
+            error = _route(service, request) if tenant is not None else None
+            if error is not None:
+                return error
+            return handler(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+from sqlalchemy import Column, Integer, String
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.admission import ADMISSION_RETRY_AFTER, Priority, get_admission_controller
+from core_db.config import DBConfig
+from core_http.admission import ADMISSION_DEEP_PAGE_ROWS, page_priority
+from core_http.BaseController import exportToCSV, index
+
+
+class AdmissionNote(BaseModel):
+    __tablename__ = 'admission_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+
+    model_path_name = "note"
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title"]
+
+
+class AdmissionNoteService(BaseService):
+    def __init__(self):
+        super().__init__(AdmissionNote)
+
+
+def request(query: dict | None = None):
+    return {"queryStringParameters": query, "pathParameters": {}, "headers": {}, "body": None}
+
+
+@pytest.fixture
+def overloaded(create_tables, monkeypatch):
+    """ The recent checkouts of the tests connection waited over max_wait_ms """
+    connection = create_tables(AdmissionNote)
+    session = connection.get_session()
+    session.add(AdmissionNote(id=1, title="note"))
+    session.commit()
+    session.close()
+
+    controller = get_admission_controller('tests', DBConfig.get_config(conn_name='tests', secret_name='tests', prefix='TESTS'))
+    monkeypatch.setattr(controller, 'checkout_wait_ms', controller.max_wait_ms * 5)
+    monkeypatch.setattr(controller, 'last_checkout_at', time.monotonic())
+    return controller
+
+
+def test_deep_pages_are_low_priority():
+    service = AdmissionNoteService()
+    per_page = 100
+    last_normal_page = ADMISSION_DEEP_PAGE_ROWS // per_page
+
+    assert page_priority(service, request({"page": str(last_normal_page), "per_page": str(per_page)})) == Priority.NORMAL
+    assert page_priority(service, request({"page": str(last_normal_page + 1), "per_page": str(per_page)})) == Priority.LOW
+
+
+def test_low_priority_requests_get_429(overloaded):
+    service = AdmissionNoteService()
+    deep_page = {"page": str(ADMISSION_DEEP_PAGE_ROWS // 10 + 1), "per_page": "10"}
+
+    for response in (
+        exportToCSV(service, request(), {"title": {"name": "Title"}}),
+        index(service, request(deep_page)),
+    ):
+        assert response["statusCode"] == 429
+        assert response["headers"]["Retry-After"] == str(ADMISSION_RETRY_AFTER)
+        assert "overloaded" in json.loads(response["body"])["message"]
+
+    response = index(service, request())
+    assert response["statusCode"] == 200
+    assert [note["title"] for note in json.loads(response["body"])["data"]] == ["note"]
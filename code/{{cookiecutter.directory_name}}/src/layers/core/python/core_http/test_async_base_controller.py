@@ -0,0 +1,133 @@
+import json
+import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String
+
+from core_db.AsyncBaseService import AsyncBaseService
+from core_db.AsyncDBConnection import ASYNC_CONNECTION_HANDLERS, run, shutdown
+from core_db.BaseModel import BaseModel
+from core_http import AsyncBaseController
+
+pytest.importorskip("aiosqlite")
+
+
+class AsyncNote(BaseModel):
+    __tablename__ = 'async_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+    priority = Column(Integer)
+
+    model_path_name = "note"
+    filter_columns = ["priority"]
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title", "priority"]
+
+
+class AsyncSyncNote(BaseModel):
+    """ Without onupdate, the soft delete has to move the updated at itself """
+    __tablename__ = 'async_sync_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title"]
+
+
+class AsyncSyncNoteService(AsyncBaseService):
+    def __init__(self):
+        super().__init__(AsyncSyncNote)
+
+
+class AsyncNoteService(AsyncBaseService):
+    """ Records the session and the start/end of the page and count queries """
+
+    def __init__(self):
+        super().__init__(AsyncNote)
+        self.events = []
+        self.sessions = {}
+
+    async def multiple_filters(self, session, *args, **kwargs):
+        self.sessions['page'] = session
+        self.events.append('page started')
+        result = await super().multiple_filters(session, *args, **kwargs)
+        self.events.append('page finished')
+        return result
+
+    async def count_with_query(self, statement, session=None):
+        self.sessions['count'] = session
+        self.events.append('count started')
+        result = await super().count_with_query(statement, session)
+        self.events.append('count finished')
+        return result
+
+
+@pytest.fixture
+def notes(create_tables):
+    connection = create_tables(AsyncNote, AsyncSyncNote)
+    session = connection.get_session()
+    session.add_all([AsyncNote(id=index, title=f"note {index}", priority=index % 2) for index in range(1, 6)])
+    session.add_all([AsyncSyncNote(id=index, title=f"note {index}", updated_at=datetime.datetime(2024, 1, 1)) for index in (1, 2)])
+    session.commit()
+    session.close()
+    yield
+    shutdown()
+    ASYNC_CONNECTION_HANDLERS.pop('tests', None)
+
+
+def test_index_runs_page_and_count_concurrently(notes):
+    service = AsyncNoteService()
+    request = {"queryStringParameters": {"priority": "1", "per_page": "2", "order_by": "id"}, "pathParameters": {}, "headers": {}}
+
+    response = run(AsyncBaseController.index(service, request))
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert [note["title"] for note in body["data"]] == ["note 1", "note 3"]
+    assert body["total"] == 3
+    assert ASYNC_CONNECTION_HANDLERS['tests'].engine.url.drivername == "sqlite+aiosqlite"
+
+    # Each query has its own session, the count starts before the page finishes
+    assert service.sessions['page'] is not service.sessions['count']
+    assert service.events.index('count started') < service.events.index('page finished')
+    assert sorted(service.events) == ['count finished', 'count started', 'page finished', 'page started']
+
+
+def sync_request(updated_since: str, path: dict | None = None) -> dict:
+    return {"queryStringParameters": {"updated_since": updated_since}, "pathParameters": path or {}, "headers": {}}
+
+
+def test_soft_deleted_rows_are_returned_by_the_delta_sync(notes):
+    service = AsyncSyncNoteService()
+    body = json.loads(run(AsyncBaseController.index(service, sync_request("1970-01-01T00:00:00Z")))["body"])
+    assert [change["id"] for change in body["data"]] == [1, 2]
+
+    response = run(AsyncBaseController.delete(service, sync_request("", {"id": "2"})))
+    assert response["statusCode"] == 200
+
+    changes = json.loads(run(AsyncBaseController.index(service, sync_request(body["next_watermark"])))["body"])
+    assert changes["data"] == [{"id": 2, "deleted": True}]
+
+
+def test_missing_rows_are_not_found(notes):
+    for handler, path in ((AsyncBaseController.delete, {"id": "99"}), (AsyncBaseController.update, {"id": "99"})):
+        response = run(handler(AsyncSyncNoteService(), {"queryStringParameters": {}, "pathParameters": path, "headers": {}, "body": "{}"}))
+        assert response["statusCode"] == 404
+
+
+def test_sync_only_methods_are_not_implemented(notes):
+    service = AsyncNoteService()
+    for method in (service.filter_by_column, service.multiple_filters_rows, service.export, service.get_id_range):
+        with pytest.raises(NotImplementedError, match=method.__name__):
+            method(None, [])
+    with pytest.raises(TypeError):
+        run(service.count_with_query(service.filters_statement([])))
@@ -0,0 +1,299 @@
+import csv
+import gzip
+import io
+import json
+import base64
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_http.BaseController import LOGGER, aggregate, exportToCSV, find, get_request_filters, index, store
+from core_http.exceptions.api_exception import APIException
+from core_http.utils import get_body
+
+
+class ControllerNote(BaseModel):
+    __tablename__ = 'controller_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+    priority = Column(Integer)
+
+    model_path_name = "note"
+    filter_columns = ["priority"]
+
+    @classmethod
+    def rules_for_store(cls_):
+        return {"title": ["required", "string"]}
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title"]
+
+
+class ControllerNoteService(BaseService):
+    def __init__(self):
+        super().__init__(ControllerNote)
+
+
+class VersionedNote(BaseModel):
+    __tablename__ = 'versioned_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+    # Microseconds in Python, CURRENT_TIMESTAMP of SQLite only has seconds
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    model_path_name = "note"
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title"]
+
+
+class AggregateSale(BaseModel):
+    __tablename__ = 'aggregate_sales'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdSale", Integer, primary_key=True)
+    status = Column(String(20))
+    customer = Column(String(50))
+    amount = Column(Integer)
+    sold_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+
+    model_path_name = "sale"
+    filter_columns = ["status", "sold_at"]
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "status", "customer", "amount", "sold_at"]
+
+
+class AggregateSaleService(BaseService):
+    def __init__(self):
+        super().__init__(AggregateSale)
+
+
+class VersionedNoteService(BaseService):
+    cache_control = "private, max-age=5"
+
+    def __init__(self):
+        super().__init__(VersionedNote)
+
+
+def request(body=None, is_base_64: bool = False, query: dict | None = None, headers: dict | None = None):
+    return {
+        "queryStringParameters": query,
+        "pathParameters": {},
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": body,
+        "isBase64Encoded": is_base_64,
+    }
+
+
+def test_get_body_decodes_base64():
+    body = json.dumps({"title": "ñandú"})
+    encoded = base64.b64encode(body.encode("utf-8")).decode("ascii")
+
+    assert get_body(request(encoded, is_base_64=True)) == {"title": "ñandú"}
+    assert get_body(request(body)) == {"title": "ñandú"}
+
+
+def test_store_base64_payload(create_tables):
+    # API Gateway sends every body as base64 with the binary media types "*/*" of api.yaml
+    connection = create_tables(ControllerNote)
+    body = base64.b64encode(json.dumps({"title": "from base64"}).encode("utf-8")).decode("ascii")
+
+    response = store(ControllerNoteService(), request(body, is_base_64=True))
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["title"] == "from base64"
+    session = connection.get_session()
+    try:
+        assert [note.title for note in session.query(ControllerNote).all()] == ["from base64"]
+    finally:
+        session.close()
+
+
+def test_bad_filter_value_is_a_bad_request(create_tables):
+    create_tables(ControllerNote)
+    service = ControllerNoteService()
+
+    filters, _, _ = get_request_filters(service, request(query={"priority__gte": "2"}))
+    assert [(f.column, f.operator, f.value) for f in filters] == [("priority", "gte", ("2",))]
+
+    with pytest.raises(APIException) as error:
+        get_request_filters(service, request(query={"priority__gte": "high"}))
+    assert error.value.status_code == 400
+
+    response = index(service, request(query={"priority__between": "1"}))
+    assert response["statusCode"] == 400
+    assert "needs two values" in json.loads(response["body"])["message"]
+
+
+def test_filters_outside_filter_columns_are_ignored(create_tables):
+    connection = create_tables(ControllerNote)
+    session = connection.get_session()
+    session.add_all([ControllerNote(id=1, title="low", priority=1), ControllerNote(id=2, title="high", priority=3)])
+    session.commit()
+    session.close()
+    query = {"priority__lt": "3", "title": "high", "title__in": "high,low", "id__gte": "2"}
+
+    filters, _, _ = get_request_filters(ControllerNoteService(), request(query=query))
+    assert [(f.column, f.operator, f.value) for f in filters] == [("priority", "lt", ("3",))]
+
+    response = index(ControllerNoteService(), request(query=query))
+    assert [note["title"] for note in json.loads(response["body"])["data"]] == ["low"]
+    # Database usage of the request in the keys of the controller logger
+    assert LOGGER.get_current_keys()["db_queries"] >= 2
+
+
+def test_export_is_compressed(create_tables):
+    connection = create_tables(ControllerNote)
+    session = connection.get_session()
+    session.add_all([ControllerNote(id=index, title=f"note number {index}", priority=index % 3) for index in range(1, 201)])
+    session.commit()
+    session.close()
+
+    response = exportToCSV(
+        ControllerNoteService(),
+        request(query={"per_page": "200"}, headers={"Accept-Encoding": "gzip;q=1, br;q=0"}),
+        {"id": {"alias": "Id"}, "title": {"alias": "Title"}}
+    )
+
+    assert response["statusCode"] == 200
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert response["headers"]["Vary"] == "Accept-Encoding"
+    assert response["headers"]["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(base64.b64decode(response["body"])).decode("utf-8"))))
+    assert sorted(int(row["Id"]) for row in rows) == list(range(1, 201))
+    assert {"Id": "1", "Title": "note number 1"} in rows
+
+
+def test_export_unknown_format_is_not_acceptable(create_tables):
+    create_tables(ControllerNote)
+
+    response = exportToCSV(ControllerNoteService(), request(query={"format": "xml"}), {"id": {"alias": "Id"}})
+
+    assert response["statusCode"] == 406
+    assert "xml" in json.loads(response["body"])["message"]
+
+
+@pytest.mark.parametrize('handler, path', [(find, {"id": "1"}), (index, {})], ids=["find", "index"])
+def test_conditional_get(create_tables, handler, path):
+    connection = create_tables(VersionedNote)
+    session = connection.get_session()
+    session.add_all([VersionedNote(id=1, title="first"), VersionedNote(id=2, title="second")])
+    session.commit()
+    session.close()
+    service = VersionedNoteService()
+
+    def get(if_none_match: str | None = None):
+        event = request(headers={"If-None-Match": if_none_match} if if_none_match else None)
+        event["pathParameters"] = path
+        return handler(service, event)
+
+    response = get()
+    etag = response["headers"]["ETag"]
+    assert response["statusCode"] == 200
+    assert response["headers"]["Cache-Control"] == "private, max-age=5"
+
+    not_modified = get(etag)
+    assert not_modified["statusCode"] == 304
+    assert not_modified["body"] == ""
+    assert not_modified["headers"]["ETag"] == etag
+    assert not_modified["headers"]["Cache-Control"] == "private, max-age=5"
+
+    session = connection.get_session()
+    try:
+        service.update_register(session, 1, {"title": "changed"})
+    finally:
+        session.close()
+
+    modified = get(etag)
+    assert modified["statusCode"] == 200
+    assert modified["headers"]["ETag"] != etag
+    assert "changed" in modified["body"]
+    assert get(modified["headers"]["ETag"])["statusCode"] == 304
+
+
+def test_delta_sync_through_index(create_tables):
+    connection = create_tables(VersionedNote)
+    session = connection.get_session()
+    session.add(VersionedNote(id=1, title="first"))
+    session.commit()
+    session.close()
+    service = VersionedNoteService()
+
+    response = index(service, request(query={"updated_since": "1970-01-01T00:00:00Z"}))
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["data"] == [{"id": 1, "title": "first", "deleted": False}] and body["has_more"] is False
+
+    unchanged = index(service, request(query={"updated_since": body["next_watermark"]}))
+    assert json.loads(unchanged["body"])["data"] == []
+
+    for updated_since in ("yesterday", "not-a-watermark"):
+        response = index(service, request(query={"updated_since": updated_since}))
+        assert response["statusCode"] == 400
+        assert "Invalid updated_since" in json.loads(response["body"])["message"]
+
+
+@pytest.fixture
+def sales(create_tables):
+    connection = create_tables(AggregateSale)
+    session = connection.get_session()
+    session.add_all([
+        # Wednesday and Sunday of the week of Monday 2024-04-29, then Monday 2024-05-06
+        AggregateSale(id=1, status="paid", customer="acme", amount=10, sold_at=datetime(2024, 5, 1, 9, 30)),
+        AggregateSale(id=2, status="paid", customer="acme", amount=15, sold_at=datetime(2024, 5, 5, 23, 59)),
+        AggregateSale(id=3, status="open", customer="globex", amount=7, sold_at=datetime(2024, 5, 6, 0, 0)),
+        AggregateSale(id=4, status="paid", customer="globex", amount=20, sold_at=datetime(2024, 5, 8, 12, 0)),
+        AggregateSale(id=5, status="paid", customer="globex", amount=1000, sold_at=datetime(2024, 5, 2), deleted_at=datetime(2024, 5, 3)),
+    ])
+    session.commit()
+    session.close()
+
+
+def aggregate_request(**query):
+    return request(query=query)
+
+
+def test_aggregate_per_group(sales):
+    response = aggregate(AggregateSaleService(), aggregate_request(group_by="status", aggregates="count,amount__sum,amount__max"))
+
+    assert response["statusCode"] == 200
+    # The soft deleted sale is not counted
+    assert json.loads(response["body"])["data"] == [
+        {"status": "open", "count": 1, "amount__sum": 7, "amount__max": 7},
+        {"status": "paid", "count": 3, "amount__sum": 45, "amount__max": 20},
+    ]
+
+
+def test_aggregate_weekly_buckets_start_on_monday(sales):
+    response = aggregate(AggregateSaleService(), aggregate_request(bucket="sold_at__week", aggregates="count,amount__sum", status="paid"))
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["data"] == [
+        {"sold_at": "2024-04-29", "count": 2, "amount__sum": 25},
+        {"sold_at": "2024-05-06", "count": 1, "amount__sum": 20},
+    ]
+
+
+@pytest.mark.parametrize('query, message', [
+    ({"group_by": "customer"}, "Cannot group by customer"),
+    ({"group_by": "status", "aggregates": "customer__sum"}, "needs a numeric column"),
+    ({"bucket": "status__week"}, "needs a date column"),
+], ids=["group-column", "sum-text", "bucket-text"])
+def test_aggregate_rejects_columns(sales, query, message):
+    response = aggregate(AggregateSaleService(), aggregate_request(**query))
+
+    assert response["statusCode"] == 400
+    assert message in json.loads(response["body"])["message"]
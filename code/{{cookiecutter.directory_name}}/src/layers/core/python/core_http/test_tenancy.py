@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+
+from core_db.BaseModel import DIALECT_NAMES, BaseModel
+from core_db.BaseService import BaseService
+from core_db.config import DBConfig
+from core_db.tenancy import TENANT_CONNECTIONS, dispose_connection
+from core_http.BaseController import index
+from core_http.tenancy import TENANT_HEADER
+
+
+class HandlerTenantNote(BaseModel):
+    __tablename__ = 'handler_tenant_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+
+    model_path_name = "note"
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title"]
+
+
+class HandlerTenantNoteService(BaseService):
+    def __init__(self):
+        super().__init__(HandlerTenantNote)
+
+
+@pytest.fixture
+def tenant_map(tmp_path, monkeypatch):
+    """ acme has its own shard, the shard of initech is not declared in the map """
+    url = f"sqlite:///{tmp_path / 'cluster-a.db'}"
+    engine = create_engine(url)
+    BaseModel.metadata.create_all(engine, tables=[HandlerTenantNote.__table__])
+    with engine.begin() as connection:
+        connection.execute(HandlerTenantNote.__table__.insert(), {"IdNote": 1, "title": "acme"})
+    engine.dispose()
+
+    config = DBConfig.get_config(conn_name='tests', secret_name='tests', prefix='TESTS')
+    monkeypatch.setattr(config, 'DATABASE_TENANT_MAP', json.dumps({
+        "tenants": {"acme": "cluster-a", "initech": "cluster-z"},
+        "shards": {"cluster-a": {"connection_string": url}}
+    }))
+    yield config
+    for routed_name in list(TENANT_CONNECTIONS):
+        dispose_connection(routed_name)
+        DIALECT_NAMES.pop(routed_name, None)
+    TENANT_CONNECTIONS.clear()
+
+
+def request(tenant: str):
+    return {
+        "queryStringParameters": None,
+        "pathParameters": {},
+        "headers": {TENANT_HEADER: tenant},
+        "body": None,
+    }
+
+
+def test_tenant_request_reads_its_shard(tenant_map):
+    response = index(HandlerTenantNoteService(), request("acme"))
+
+    assert response["statusCode"] == 200
+    assert [note["title"] for note in json.loads(response["body"])["data"]] == ["acme"]
+
+
+def test_tenant_without_shard_is_unavailable(tenant_map):
+    response = index(HandlerTenantNoteService(), request("initech"))
+
+    assert response["statusCode"] == 503
+    assert json.loads(response["body"])["message"] == "The database of the tenant is not available"
+
+
+def test_malformed_tenant_is_a_bad_request(tenant_map):
+    response = index(HandlerTenantNoteService(), request("acme/../globex"))
+
+    assert response["statusCode"] == 400
+    assert TENANT_HEADER in json.loads(response["body"])["message"]
+    assert list(TENANT_CONNECTIONS) == []
@@ -0,0 +1,85 @@
+import gzip
+import json
+import base64
+
+import pytest
+
+from core_http import utils
+from core_http.utils import COMPRESSION_MIN_SIZE, build_etag, build_response, etag_matches, negotiate_encoding
+
+
+@pytest.fixture(params=[True, False], ids=["brotli", "without-brotli"])
+def brotli(request, monkeypatch):
+    """ Negotiation with and without the optional brotli package in the layer """
+    if not request.param:
+        monkeypatch.setattr(utils, '_get_brotli', lambda: None)
+    elif utils._get_brotli() is None:
+        pytest.skip("brotli is not installed")
+    return request.param
+
+
+def large_body() -> dict:
+    return {"data": [{"id": index, "title": f"note {index}"} for index in range(COMPRESSION_MIN_SIZE // 10)]}
+
+
+def test_zero_weight_rejects_the_coding(brotli):
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip;q=0, br;q=0") is None
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+    assert negotiate_encoding("*;q=0") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None and negotiate_encoding(None) is None
+
+
+def test_wildcard_and_case_insensitive_codings(brotli):
+    assert negotiate_encoding("*") == ("br" if brotli else "gzip")
+    assert negotiate_encoding("GZip") == "gzip"
+    assert negotiate_encoding("BR, GZIP;Q=0.5") == ("br" if brotli else "gzip")
+    assert negotiate_encoding("*;q=0.5, gzip;q=1") == "gzip"
+    assert negotiate_encoding("*, gzip;q=0") == ("br" if brotli else None)
+
+
+def test_small_body_is_not_compressed():
+    response = build_response(200, {"id": 1}, accept_encoding="gzip")
+
+    assert response["isBase64Encoded"] is False
+    assert json.loads(response["body"]) == {"id": 1}
+    assert "Content-Encoding" not in response["headers"]
+    assert response["headers"]["Vary"] == "Accept-Encoding"
+
+
+def test_large_body_is_compressed(monkeypatch):
+    monkeypatch.setattr(utils, '_get_brotli', lambda: None)
+    body = large_body()
+
+    response = build_response(200, body, accept_encoding="gzip, deflate", headers={"Vary": "Origin"})
+
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert response["headers"]["Vary"] == "Origin, Accept-Encoding"
+    assert json.loads(gzip.decompress(base64.b64decode(response["body"]))) == body
+
+
+def test_response_without_negotiation_is_left_as_is():
+    body = large_body()
+
+    response = build_response(200, body)
+
+    assert response["isBase64Encoded"] is False
+    assert json.loads(response["body"]) == body
+    assert "Content-Encoding" not in response["headers"] and "Vary" not in response["headers"]
+
+
+def test_etags_match_weakly():
+    etag = build_etag('{"id": 1}')
+    opaque = etag[2:]
+
+    assert etag.startswith('W/"') and etag == build_etag('{"id": 1}')
+    assert build_etag((3, "2024-01-01", 7), {"page": "1"}) != build_etag((3, "2024-01-01", 8), {"page": "1"})
+    # Weak comparison: the strong form of the same tag and lists of tags also match
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag, opaque)
+    assert etag_matches(etag, f'"other", {opaque}')
+    assert etag_matches(etag, ' * ')
+    assert not etag_matches(etag, '"other", W/"another"')
+    assert not etag_matches(etag, None) and not etag_matches(None, '*')
@@ -1,9 +1,20 @@
 import json
+import gzip
+import base64
+import hashlib
 import decimal
 import datetime
 from json.encoder import JSONEncoder
 from typing import Tuple
 
+from core_utils.environment import env
+from core_utils.constants import FILTER_OPERATOR_SEPARATOR
+from core_utils.filters import FilterExpression, parse_filter
+
+COMPRESSION_MIN_SIZE = env("HTTP_COMPRESSION_MIN_SIZE", 1024)
+COMPRESSION_GZIP_LEVEL = env("HTTP_COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = env("HTTP_COMPRESSION_BROTLI_QUALITY", 5)
+
 class CustomJSONDecoder(json.JSONEncoder):
     """ Clase que ayuda con el manejo de JSON de un blob Storage de Azure
     """
@@ -40,6 +51,8 @@ def get_body(event: str | dict) -> dict:
     if isinstance(event, str):
         event = json.loads(event)
     body = event.get("body")
+    if isinstance(body, str) and event.get("isBase64Encoded", False):
+        body = base64.b64decode(body).decode("utf-8")
     if isinstance(body, str):
         return json.loads(body)
     return body
@@ -140,7 +153,161 @@ def get_headers_request(event: str | dict):
     return event.get("headers") or {}
 
 
-def build_response(status: int, body: dict, application_type: str = 'application/json', is_base_64: bool = False, jsonEncoder: JSONEncoder = CustomJSONDecoder, circular: bool = True, is_body_str: bool = False, encoder_extras: dict = {}) -> dict:
+def get_header(event: str | dict, header_name: str, default: str | None = None) -> str | None:
+    """
+    Get a single header from the event ignoring the case of its name (API Gateway keeps the casing sent by the client).
+    Parameters
+    ----------
+    event : dict
+    header_name : str
+        Name of the header to look for.
+    default : str
+        Value returned when the header is not present.
+
+    Returns
+    -------
+    str
+        Header value or the default value.
+
+    Examples
+    --------
+    >>> from core_http.utils import get_header
+    >>> get_header({"headers": {"accept-encoding": "gzip"}}, "Accept-Encoding")
+
+    """
+    header_name = header_name.lower()
+    for key, value in get_headers_request(event).items():
+        if str(key).lower() == header_name:
+            return value
+    return default
+
+
+def get_accept_encoding(event: str | dict) -> str:
+    """
+    Get the Accept-Encoding header of the request, empty string if the client did not send it.
+    Parameters
+    ----------
+    event : dict
+
+    Returns
+    -------
+    str
+        Content codings accepted by the client.
+
+    Examples
+    --------
+    >>> from core_http.utils import get_accept_encoding
+    >>> get_accept_encoding({"headers": {"Accept-Encoding": "gzip, br"}})
+
+    """
+    return get_header(event, "Accept-Encoding", "") or ""
+
+
+def build_etag(*parts) -> str:
+    """ Build a weak entity tag from the parts that identify a representation (serialized body or data version)
+
+    Args:
+        parts (Any): Values to hash, they are serialized as JSON
+
+    Returns:
+        str: Weak ETag, e.g. W/"5d41402abc4b2a76b9719d911017c592"
+    """
+    if len(parts) == 1 and isinstance(parts[0], (str, bytes)):
+        raw = parts[0]
+    else:
+        raw = json.dumps(parts, sort_keys=True, default=str)
+    raw = raw.encode("utf-8") if isinstance(raw, str) else raw
+    return f'W/"{hashlib.md5(raw, usedforsecurity=False).hexdigest()}"'
+
+
+def etag_matches(etag: str | None, if_none_match: str | None) -> bool:
+    """ Weak comparison of an ETag against the If-None-Match header of the request
+
+    Args:
+        etag (str | None): Current ETag of the resource
+        if_none_match (str | None): Value of the If-None-Match header
+
+    Returns:
+        bool: True if the client representation is still valid (the response can be a 304)
+    """
+    if not etag or not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    current = opaque(etag)
+    return any(opaque(tag) == current for tag in if_none_match.split(','))
+
+
+def _get_brotli():
+    """ Brotli is optional, it is used only when the package is installed in the layer """
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """ Choose the content coding for the response according with the Accept-Encoding header (RFC 9110)
+
+    Args:
+        accept_encoding (str | None): Value of the Accept-Encoding header
+
+    Returns:
+        str | None: 'br', 'gzip' or None when the response should not be compressed
+    """
+    if not accept_encoding:
+        return None
+
+    supported = ['br', 'gzip'] if _get_brotli() is not None else ['gzip']
+    weights = {}
+    for item in accept_encoding.split(','):
+        parts = [part.strip() for part in item.split(';')]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in parts[1:]:
+            if param.lower().startswith('q='):
+                try:
+                    weight = float(param[2:])
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    candidates = []
+    for coding in supported:
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > 0:
+            candidates.append((weight, -supported.index(coding), coding))
+
+    if not candidates:
+        return None
+    return max(candidates)[2]
+
+
+def compress_body(body: str | bytes, encoding: str) -> bytes:
+    """ Compress the body of a response with the specified content coding
+
+    Args:
+        body (str | bytes): Response body
+        encoding (str): Content coding ('br' or 'gzip')
+
+    Returns:
+        bytes: Compressed body
+    """
+    raw = body.encode("utf-8") if isinstance(body, str) else body
+    if encoding == 'br':
+        return _get_brotli().compress(raw, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(raw, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+def build_response(status: int, body: dict, application_type: str = 'application/json', is_base_64: bool = False, jsonEncoder: JSONEncoder = CustomJSONDecoder, circular: bool = True, is_body_str: bool = False, encoder_extras: dict = {}, accept_encoding: str | None = None, headers: dict | None = None) -> dict:
     """ Devuelve el formato que acepta azure para una respuesta de HTTP
 
     Args:
@@ -149,18 +316,39 @@ def build_response(status: int, body: dict, application_type: str = 'application
         application_type (str, optional): Tipo de respuesta. Defaults to 'application/json'.
         jsonEncoder (JSONEncoder, optional): Codificacion el JSON de salida. Defaults to CustomJSONDecoder.
         circular (bool, optional): Inidica si la codificacion la hara por cada parametro del JSON. Defaults to True.
+        accept_encoding (str, optional): Header Accept-Encoding de la peticion. Si se indica, el body se comprime
+            (gzip/br) cuando supera HTTP_COMPRESSION_MIN_SIZE bytes. Defaults to None (sin negociacion).
+        headers (dict, optional): Headers adicionales de la respuesta. Defaults to None.
 
     Returns:
         func.HttpResponse: Respuesta HTTP aceptada por Azure
     """
+    response_body = body if is_body_str else json.dumps(body, cls=jsonEncoder, check_circular=circular, **encoder_extras)
+    response_headers = {
+        "content-type": application_type,
+        "Access-Control-Allow-Origin": "*"
+    }
+    if headers:
+        response_headers.update(headers)
+
+    if accept_encoding is not None and not is_base_64 and response_body is not None:
+        vary = response_headers.get("Vary")
+        response_headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+        encoding = negotiate_encoding(accept_encoding)
+        raw_body = response_body.encode("utf-8") if isinstance(response_body, str) else response_body
+        if encoding is not None and len(raw_body) >= COMPRESSION_MIN_SIZE:
+            compressed = compress_body(raw_body, encoding)
+            if len(compressed) < len(raw_body):
+                response_body = base64.b64encode(compressed).decode("ascii")
+                response_headers["Content-Encoding"] = encoding
+                is_base_64 = True
+
     return {
         "isBase64Encoded": is_base_64,
         "statusCode": status,
-        "body": body if is_body_str else json.dumps(body, cls=jsonEncoder, check_circular=circular, **encoder_extras),
-        "headers": {
-            "content-type": application_type,
-            "Access-Control-Allow-Origin": "*"
-        }
+        "body": response_body,
+        "headers": response_headers
     }
 
 def serialize_json(data: dict, jsonEncoder: JSONEncoder = CustomJSONDecoder, circular: bool = True) -> str:
@@ -220,6 +408,27 @@ def get_filter_params(req: str | dict) -> dict:
     
     return ret_dict
 
+def get_filter_expressions(req: str | dict) -> list[FilterExpression]:
+    """ Obtiene los filtros con operador de query (columna__operador=valor)
+
+    Args:
+        req (dict): Peticion http
+
+    Returns:
+        list[FilterExpression]: Filtros con operador, los valores aun no tienen el tipo de la columna
+    """
+    query_params = get_query_parameters(req)
+
+    expressions = []
+    for key, value in query_params.items():
+        if FILTER_OPERATOR_SEPARATOR not in str(key):
+            continue
+        expression = parse_filter(key, value)
+        if expression is not None:
+            expressions.append(expression)
+
+    return expressions
+
 def get_relationship_params(req: str | dict) -> dict:
     """ Obtiene filtros de query
 
@@ -241,11 +450,13 @@ def get_relationship_params(req: str | dict) -> dict:
     
     return ret_dict
  
-def get_search_params(req: str | dict) -> dict:
+def get_search_params(req: str | dict, wrap_like: bool = True) -> dict:
     """ Obtiene filtros de query
 
     Args:
         req (dict): Peticion http
+        wrap_like (bool, optional): Envuelve los valores no numericos en '%...%'. Sin envolver el modo
+            de busqueda de cada columna decide la condicion (core_db.search). Defaults to True.
 
     Returns:
         dict: Filtros formados como par valor
@@ -257,7 +468,7 @@ def get_search_params(req: str | dict) -> dict:
         if str(k).startswith('search_') and str(k):
             v = query_params[k]
             key = k.replace("search_", "", 1)
-            if str(v).isdigit():
+            if str(v).isdigit() or not wrap_like:
                 ret_dict[key] = v  # sin '%'
             else:
                 ret_dict[key] = f"%{v}%"
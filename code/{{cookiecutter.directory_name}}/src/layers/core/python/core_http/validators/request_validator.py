@@ -7,6 +7,9 @@ from sqlalchemy.sql.schema import Column
 from ..exceptions.api_exception import APIException
 from ..enums.request_parts import RequestPart
 
+## Compiled once per container
+EMAIL_REGEX = re.compile(r'^(\w|\.|\_|\-)+[@](\w|\_|\-|\.)+[.]\w{2,3}$')
+
 class DBValidator:
     def __init__(self, type: str, table: Type, column: Column[int]) -> None:
         self.type = type
@@ -121,7 +124,6 @@ class RequestValidator():
         Returns:
             Match or None: Indicates if there is a match according with email regex
         """
-        email_regex = '^(\w|\.|\_|\-)+[@](\w|\_|\-|\.)+[.]\w{2,3}$'
-        return re.search(email_regex, text)
+        return EMAIL_REGEX.search(text)
 
     
\ No newline at end of file
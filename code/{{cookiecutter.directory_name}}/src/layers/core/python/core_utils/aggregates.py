@@ -0,0 +1,52 @@
+from typing import NamedTuple
+
+from .constants import FILTER_OPERATOR_SEPARATOR, AGGREGATE_FUNCTIONS, DATE_BUCKET_INTERVALS
+
+
+class AggregateExpression(NamedTuple):
+    """ Aggregate function over a column parsed from the query string (amount__sum -> ('sum', 'amount')).
+    The column is None for the count of rows. The label is the key of the value in the response
+    """
+    function: str
+    column: str | None
+
+    @property
+    def label(self) -> str:
+        return self.function if self.column is None else f"{self.column}{FILTER_OPERATOR_SEPARATOR}{self.function}"
+
+
+class DateBucket(NamedTuple):
+    """ Date column truncated to the start of an interval (created_at__month -> ('created_at', 'month')) """
+    column: str
+    interval: str
+
+
+def parse_aggregate(value: str) -> AggregateExpression | None:
+    """ Parse an element of the aggregates parameter (count, amount__count, amount__sum...)
+
+    Args:
+        value (str): Element of the parameter
+
+    Returns:
+        AggregateExpression | None: Aggregate expression or None if the function is not supported
+    """
+    column, separator, function = str(value).strip().rpartition(FILTER_OPERATOR_SEPARATOR)
+    column = column or None
+    if function not in AGGREGATE_FUNCTIONS or (column is None and function != "count"):
+        return None
+    return AggregateExpression(function, column)
+
+
+def parse_bucket(value: str) -> DateBucket | None:
+    """ Parse the bucket parameter (column__interval)
+
+    Args:
+        value (str): Parameter value
+
+    Returns:
+        DateBucket | None: Date bucket or None if the interval is not supported
+    """
+    column, separator, interval = str(value).strip().rpartition(FILTER_OPERATOR_SEPARATOR)
+    if not separator or not column or interval not in DATE_BUCKET_INTERVALS:
+        return None
+    return DateBucket(column, interval)
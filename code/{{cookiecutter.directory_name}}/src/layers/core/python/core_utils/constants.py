@@ -1 +1,15 @@
 HTTP_SCHEMA = "https"
+
+## Separator between the column and the operator of a filter in the query string (amount__gte=10)
+FILTER_OPERATOR_SEPARATOR = "__"
+## Operators of the filters, eq is the one used when the key doesn't have operator
+FILTER_OPERATORS = ["eq", "ne", "gt", "gte", "lt", "lte", "in", "between", "isnull"]
+## Operators that receive a comma separated list of values
+FILTER_LIST_OPERATORS = ["in", "between"]
+
+## Functions of the aggregate handler (aggregates=count,amount__sum), count without column counts the rows
+AGGREGATE_FUNCTIONS = ["count", "sum", "avg", "min", "max"]
+## Functions that only accept numeric columns
+AGGREGATE_NUMERIC_FUNCTIONS = ["sum", "avg", "min", "max"]
+## Intervals of the date buckets of the aggregate handler (bucket=created_at__month)
+DATE_BUCKET_INTERVALS = ["hour", "day", "week", "month", "year"]
@@ -0,0 +1,144 @@
+"""
+Deadline of the current invocation, taken from the remaining time of the Lambda context. The database layer turns it
+into statement timeouts and the controllers skip optional work or answer 503 before Lambda kills the container.
+
+    @deadline_handler
+    def lambda_handler(event, context):
+        ...
+        if has_time_for(DEADLINE_OPTIONAL_WORK_MS):
+            ...
+"""
+import time
+import inspect
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from typing import Any, Callable
+
+from .environment import env
+
+## Milliseconds kept for the response after the database work (serialization, compression, logs)
+DEADLINE_RESPONSE_MARGIN_MS = env("DEADLINE_RESPONSE_MARGIN_MS", 500)
+## Optional work (the total of a listing) is skipped when less than this remains
+DEADLINE_OPTIONAL_WORK_MS = env("DEADLINE_OPTIONAL_WORK_MS", 1500)
+## Retry-After (seconds) of the 503 responses when the deadline is exceeded
+DEADLINE_RETRY_AFTER = env("DEADLINE_RETRY_AFTER", 1)
+
+_DEADLINE_IDS = count(1)
+
+
+class DeadlineExceeded(Exception):
+    """ The invocation has no time left for the operation (raised before running it or when the database cancels it)
+    """
+
+
+class Deadline:
+    """ Point in time where the work of the invocation must be done (monotonic clock)
+
+    Args:
+        remaining_ms (float): Milliseconds until the function times out
+        margin_ms (float, optional): Milliseconds reserved to build the response. Defaults to DEADLINE_RESPONSE_MARGIN_MS.
+    """
+
+    def __init__(self, remaining_ms: float, margin_ms: float = DEADLINE_RESPONSE_MARGIN_MS) -> None:
+        self.id = next(_DEADLINE_IDS)
+        self.expires_at = time.monotonic() + (float(remaining_ms) - float(margin_ms)) / 1000
+
+    def remaining_ms(self) -> int:
+        return int((self.expires_at - time.monotonic()) * 1000)
+
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    def check(self, operation: str = "operation") -> None:
+        """ Raise DeadlineExceeded if the deadline has passed
+
+        Args:
+            operation (str, optional): Name of the operation for the message. Defaults to "operation".
+        """
+        if self.expired():
+            raise DeadlineExceeded(f"No time left for the {operation}")
+
+
+_CURRENT_DEADLINE: ContextVar[Deadline | None] = ContextVar('core_utils_deadline', default=None)
+
+
+def get_deadline() -> Deadline | None:
+    return _CURRENT_DEADLINE.get()
+
+
+def remaining_ms() -> int | None:
+    """ Milliseconds left in the current deadline, None outside a deadline """
+    deadline = _CURRENT_DEADLINE.get()
+    return deadline.remaining_ms() if deadline is not None else None
+
+
+def has_time_for(milliseconds: float) -> bool:
+    """ Check if the current invocation has time for an operation (always True outside a deadline)
+
+    Args:
+        milliseconds (float): Expected duration of the operation
+    """
+    deadline = _CURRENT_DEADLINE.get()
+    return deadline is None or deadline.remaining_ms() >= milliseconds
+
+
+@contextmanager
+def deadline_scope(context: Any = None, remaining: float | None = None, margin_ms: float = DEADLINE_RESPONSE_MARGIN_MS):
+    """ Set the deadline of the block from a Lambda context (or a number of milliseconds). Nested scopes keep
+    the outermost deadline, without context the block runs without deadline
+
+    Args:
+        context (Any, optional): Lambda context. Defaults to None.
+        remaining (float | None, optional): Remaining milliseconds when there is no context. Defaults to None.
+        margin_ms (float, optional): Milliseconds reserved to build the response. Defaults to DEADLINE_RESPONSE_MARGIN_MS.
+    """
+    if remaining is None and context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        remaining = context.get_remaining_time_in_millis()
+
+    if _CURRENT_DEADLINE.get() is not None or remaining is None:
+        yield _CURRENT_DEADLINE.get()
+        return
+
+    deadline = Deadline(remaining, margin_ms)
+    token = _CURRENT_DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _CURRENT_DEADLINE.reset(token)
+
+
+def _find_context(args: tuple, kwargs: dict) -> Any:
+    for value in list(args) + list(kwargs.values()):
+        if hasattr(value, 'get_remaining_time_in_millis'):
+            return value
+    return None
+
+
+def deadline_handler(handler: Callable | None = None, *, margin_ms: float = DEADLINE_RESPONSE_MARGIN_MS):
+    """ Decorator that sets the deadline of the invocation from the Lambda context found in the arguments.
+    Works with sync and async functions.
+
+        @deadline_handler
+        def lambda_handler(event, context): ...
+
+    Args:
+        handler (Callable | None, optional): Decorated function. Defaults to None.
+        margin_ms (float, optional): Milliseconds reserved to build the response. Defaults to DEADLINE_RESPONSE_MARGIN_MS.
+    """
+    if handler is None:
+        return functools.partial(deadline_handler, margin_ms=margin_ms)
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            with deadline_scope(_find_context(args, kwargs), margin_ms=margin_ms):
+                return await handler(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs) -> Any:
+        with deadline_scope(_find_context(args, kwargs), margin_ms=margin_ms):
+            return handler(*args, **kwargs)
+    return wrapper
@@ -1,10 +1,13 @@
 import os
 from typing import Any
-from dotenv import load_dotenv
 from aws_lambda_powertools import Logger
 
 LOGGER = Logger('layers.core.core_utils.environment')
-load_dotenv()
+
+# Lambda gets its variables from the function configuration, the .env file is only read locally
+if "AWS_LAMBDA_FUNCTION_NAME" not in os.environ:
+    from dotenv import load_dotenv
+    load_dotenv()
 
 def env(env_key: str, default_value: Any) -> Any:
     """ Parsea el valor de una variable de entorno a una variable utilizable para python
@@ -19,7 +22,7 @@ def env(env_key: str, default_value: Any) -> Any:
     if env_key in os.environ:
         if os.environ[env_key].isdecimal():
             return int(os.environ[env_key])
-        elif str(os.environ[env_key]).lower() == "true" or str(os.environ[env_key]).lower() == "true":
+        elif str(os.environ[env_key]).lower() == "true" or str(os.environ[env_key]).lower() == "false":
             return str(os.environ[env_key]).lower() == "true"
         else:
             return os.environ[env_key]
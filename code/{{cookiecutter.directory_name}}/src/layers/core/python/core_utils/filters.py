@@ -0,0 +1,35 @@
+from typing import NamedTuple
+
+from .constants import FILTER_OPERATOR_SEPARATOR, FILTER_OPERATORS, FILTER_LIST_OPERATORS
+
+
+class FilterExpression(NamedTuple):
+    """ Filter over a column parsed from the query string (amount__gte=10 -> ('amount', 'gte', ('10',))).
+    Values keep the raw strings of the request, they are coerced to the column type when the filter is compiled
+    """
+    column: str
+    operator: str
+    value: tuple
+
+
+def parse_filter(key: str, value: str) -> FilterExpression | None:
+    """ Parse a query string parameter as a filter expression
+
+    Args:
+        key (str): Parameter name (column or column__operator)
+        value (str): Parameter value
+
+    Returns:
+        FilterExpression | None: Filter expression or None if the operator is not supported
+    """
+    column, separator, operator = str(key).rpartition(FILTER_OPERATOR_SEPARATOR)
+    if not separator:
+        column, operator = key, "eq"
+    if operator not in FILTER_OPERATORS:
+        return None
+
+    if operator in FILTER_LIST_OPERATORS:
+        values = tuple(v.strip() for v in str(value).split(",") if v.strip() != "")
+    else:
+        values = (value,)
+    return FilterExpression(column, operator, values)
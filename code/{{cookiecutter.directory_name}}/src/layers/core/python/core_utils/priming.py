@@ -0,0 +1,168 @@
+"""
+Priming of the execution environment in the init phase: engines, connections, secrets and mappers are built before
+the first request when the function runs with provisioned concurrency or SnapStart.
+
+    from core_utils.priming import prime_on_init
+
+    prime_on_init()
+
+    def lambda_handler(event, context): ...
+
+The layers register their warmers (core_db.DBConnection registers the database connections) and the handlers can
+add their own with @register_warmer. After a SnapStart restore the registered after-restore hooks re-establish what
+the snapshot can't keep (open connections).
+"""
+import os
+import time
+from typing import Callable
+
+from aws_lambda_powertools import Logger
+
+from .environment import env
+
+LOGGER = Logger('layers.core.core_utils.priming')
+
+## Prime in every init, not only with provisioned concurrency / SnapStart
+PRIMING_ENABLED = env("PRIMING_ENABLED", False)
+## Comma separated warmers to run (all by default)
+PRIMING_WARMERS = env("PRIMING_WARMERS", "")
+## Comma separated secrets and SSM parameters loaded in the caches of core_aws
+PRIMING_SECRETS = env("PRIMING_SECRETS", "")
+PRIMING_PARAMETERS = env("PRIMING_PARAMETERS", "")
+## Init types of Lambda that are primed (AWS_LAMBDA_INITIALIZATION_TYPE)
+PRIMED_INITIALIZATION_TYPES = ("provisioned-concurrency", "snap-start")
+
+WARMERS: dict[str, Callable[[], None]] = {}
+AFTER_RESTORE_HOOKS: dict[str, Callable[[], None]] = {}
+
+_PRIMED = False
+_SNAPSTART_REGISTERED = False
+
+
+def register_warmer(name: str | Callable | None = None):
+    """ Register a function that prepares a resource in the init phase (it receives no arguments)
+
+        @register_warmer('catalogs')
+        def load_catalogs(): ...
+
+    Args:
+        name (str | None, optional): Warmer name. Defaults to the function name.
+    """
+    def decorator(warmer: Callable[[], None]) -> Callable[[], None]:
+        WARMERS[name if isinstance(name, str) else warmer.__name__] = warmer
+        return warmer
+
+    if callable(name):
+        return decorator(name)
+    return decorator
+
+
+def register_after_restore(name: str | Callable | None = None):
+    """ Register a function that runs after a SnapStart restore (e.g. reopen the connections of the snapshot)
+
+    Args:
+        name (str | None, optional): Hook name. Defaults to the function name.
+    """
+    def decorator(hook: Callable[[], None]) -> Callable[[], None]:
+        AFTER_RESTORE_HOOKS[name if isinstance(name, str) else hook.__name__] = hook
+        return hook
+
+    if callable(name):
+        return decorator(name)
+    return decorator
+
+
+def _run(hooks: dict[str, Callable[[], None]], names: list[str] | None, message: str) -> dict[str, float | None]:
+    results = {}
+    for name, hook in hooks.items():
+        if names and name not in names:
+            continue
+        start = time.perf_counter()
+        try:
+            hook()
+            results[name] = round((time.perf_counter() - start) * 1000, 2)
+        except Exception:
+            # A failed warmer must not break the init, the resource is built on first use
+            LOGGER.exception(f"{message} {name} failed")
+            results[name] = None
+    LOGGER.info(message, extra={'priming_ms': results})
+    return results
+
+
+def prime(names: list[str] | None = None) -> dict[str, float | None]:
+    """ Run the registered warmers
+
+    Args:
+        names (list[str] | None, optional): Warmers to run. Defaults to PRIMING_WARMERS or all.
+
+    Returns:
+        dict[str, float | None]: Milliseconds of each warmer, None if it failed
+    """
+    global _PRIMED
+    selected = names or _split(PRIMING_WARMERS) or None
+    results = _run(WARMERS, selected, "Priming")
+    _PRIMED = True
+    return results
+
+
+def after_restore() -> dict[str, float | None]:
+    """ Run the after-restore hooks (called by the SnapStart runtime hooks) """
+    return _run(AFTER_RESTORE_HOOKS, None, "After restore")
+
+
+def should_prime() -> bool:
+    return PRIMING_ENABLED or os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") in PRIMED_INITIALIZATION_TYPES
+
+
+def _split(value: str) -> list[str]:
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+if PRIMING_SECRETS:
+    @register_warmer('secrets')
+    def warm_secrets() -> None:
+        from core_aws.secret_manager import get_secret
+
+        for secret_name in _split(PRIMING_SECRETS):
+            get_secret(secret_name)
+
+
+if PRIMING_PARAMETERS:
+    @register_warmer('parameters')
+    def warm_parameters() -> None:
+        from core_aws.ssm import get_parameter
+
+        for parameter_name in _split(PRIMING_PARAMETERS):
+            get_parameter(parameter_name, is_dict=False)
+
+
+def register_snapstart_hooks() -> bool:
+    """ Register after_restore in the SnapStart runtime hooks (snapshot_restore_py is provided by the runtime)
+
+    Returns:
+        bool: True if the hooks were registered
+    """
+    global _SNAPSTART_REGISTERED
+    if _SNAPSTART_REGISTERED:
+        return True
+    try:
+        from snapshot_restore_py import register_after_restore as runtime_after_restore
+    except ImportError:
+        return False
+    runtime_after_restore(after_restore)
+    _SNAPSTART_REGISTERED = True
+    return True
+
+
+def prime_on_init(names: list[str] | None = None) -> dict[str, float | None] | None:
+    """ Prime the environment when it is initialized for provisioned concurrency or SnapStart (or PRIMING_ENABLED).
+    Call it at module level of the handler, once per execution environment
+
+    Returns:
+        dict[str, float | None] | None: Result of prime, None if the environment isn't primed
+    """
+    if os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") == "snap-start":
+        register_snapstart_hooks()
+    if _PRIMED or not should_prime():
+        return None
+    return prime(names)
@@ -0,0 +1,263 @@
+import io
+import os
+import time
+import random
+import inspect
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from aws_lambda_powertools import Logger
+
+from .environment import env, APP_NAME
+
+LOGGER = Logger('layers.core.core_utils.profiling')
+
+## Emit the phases of the handlers as EMF metrics
+PHASE_METRICS = env("PHASE_METRICS", True)
+## Fraction (0-1) of the invocations that are profiled
+PROFILING_SAMPLE_RATE = float(env("PROFILING_SAMPLE_RATE", 0))
+## Allow to profile a request sending the X-Profile: 1 header (only for non production environments)
+PROFILING_HEADER_ENABLED = env("PROFILING_HEADER_ENABLED", False)
+PROFILING_HEADER = "x-profile"
+## cprofile or pyinstrument (requires the pyinstrument package)
+PROFILER = env("PROFILER", "cprofile")
+## Directory or s3://bucket/prefix where the profiles are written
+PROFILING_OUTPUT = env("PROFILING_OUTPUT", "/tmp/profiles")
+
+
+class PhaseTimer:
+    """ Durations of the phases of a handler (params, query, count, serialize...)
+
+        timer = PhaseTimer('index')
+        with timer.phase('query'):
+            ...
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.phases: dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def summary(self) -> dict:
+        return {
+            'handler': self.name,
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 2),
+            'phases_ms': {name: round(value, 2) for name, value in self.phases.items()}
+        }
+
+    def emit(self, metrics: bool = PHASE_METRICS) -> dict:
+        """ Log the phases in one structured line and emit them as EMF metrics (dimension handler)
+
+        Returns:
+            dict: Summary of the phases
+        """
+        summary = self.summary()
+        LOGGER.info("Handler phases", extra=summary)
+
+        if metrics and self.phases:
+            from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+
+            emf = EphemeralMetrics(namespace=env("POWERTOOLS_METRICS_NAMESPACE", APP_NAME))
+            emf.add_dimension(name="handler", value=self.name)
+            for name, value in summary['phases_ms'].items():
+                emf.add_metric(name=f"Phase_{name}", unit=MetricUnit.Milliseconds, value=value)
+            emf.add_metric(name="Phase_total", unit=MetricUnit.Milliseconds, value=summary['total_ms'])
+            emf.flush_metrics()
+        return summary
+
+
+_CURRENT_TIMER: ContextVar[PhaseTimer | None] = ContextVar('core_utils_phase_timer', default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """ Measure a phase in the timer of the current handler (does nothing outside a timed handler)
+
+    Args:
+        name (str): Phase name
+    """
+    timer = _CURRENT_TIMER.get()
+    if timer is None:
+        yield None
+        return
+    with timer.phase(name):
+        yield timer
+
+
+def get_current_timer() -> PhaseTimer | None:
+    return _CURRENT_TIMER.get()
+
+
+def _find_request(args: tuple, kwargs: dict) -> dict | None:
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, dict) and ('headers' in value or 'requestContext' in value):
+            return value
+    return None
+
+
+def should_profile(request: dict | None = None) -> bool:
+    """ Decide if the invocation is profiled: sampled by PROFILING_SAMPLE_RATE or requested with the X-Profile header
+
+    Args:
+        request (dict | None, optional): Http request. Defaults to None.
+
+    Returns:
+        bool: True if the invocation must be profiled
+    """
+    if PROFILING_HEADER_ENABLED and request is not None:
+        headers = {str(k).lower(): v for k, v in (request.get('headers') or {}).items()}
+        if str(headers.get(PROFILING_HEADER, '')).lower() in ('1', 'true'):
+            return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def write_profile(name: str, content: str | bytes, extension: str) -> str:
+    """ Write a profile to PROFILING_OUTPUT (local directory or s3://bucket/prefix)
+
+    Returns:
+        str: Location of the profile
+    """
+    file_name = f"{name}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}.{extension}"
+    body = content.encode() if isinstance(content, str) else content
+
+    if PROFILING_OUTPUT.startswith('s3://'):
+        import boto3
+
+        bucket, _, prefix = PROFILING_OUTPUT[5:].partition('/')
+        key = f"{prefix.rstrip('/')}/{file_name}" if prefix else file_name
+        boto3.client('s3').put_object(Bucket=bucket, Key=key, Body=body)
+        return f"s3://{bucket}/{key}"
+
+    os.makedirs(PROFILING_OUTPUT, exist_ok=True)
+    path = os.path.join(PROFILING_OUTPUT, file_name)
+    with open(path, 'wb') as file:
+        file.write(body)
+    return path
+
+
+class _Profiler:
+    """ Common interface of cProfile and pyinstrument. Falls back to cProfile when pyinstrument is not installed """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.kind = 'cprofile'
+        if PROFILER == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+
+                self.profiler = Profiler()
+                self.kind = 'pyinstrument'
+            except ImportError:
+                LOGGER.error("pyinstrument is not installed, profiling with cProfile")
+        if self.kind == 'cprofile':
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.kind == 'pyinstrument':
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self) -> None:
+        try:
+            if self.kind == 'pyinstrument':
+                self.profiler.stop()
+                location = write_profile(self.name, self.profiler.output_html(), 'html')
+            else:
+                import pstats
+
+                self.profiler.disable()
+                buffer = io.StringIO()
+                pstats.Stats(self.profiler, stream=buffer).sort_stats('cumulative').print_stats(50)
+                location = write_profile(self.name, buffer.getvalue(), 'txt')
+            LOGGER.info("Profile written", extra={'handler': self.name, 'profile': location})
+        except Exception:
+            LOGGER.exception("Cannot write the profile")
+
+
+def _start_profiler(name: str) -> _Profiler | None:
+    """ Start a profiler, the invocation runs without it if it can't start (e.g. another profiler is active)
+
+    Returns:
+        _Profiler | None: Started profiler
+    """
+    try:
+        profiler = _Profiler(name)
+        profiler.start()
+        return profiler
+    except Exception:
+        LOGGER.exception("Cannot start the profiler")
+        return None
+
+
+def timed_handler(handler: Callable | None = None, *, name: str | None = None, metrics: bool = PHASE_METRICS):
+    """ Decorator that times the phases of a handler (use phase() inside it) and profiles the sampled invocations.
+    Nested timed handlers share the timer of the outermost one. Works with sync and async functions.
+
+        @timed_handler
+        def lambda_handler(event, context):
+            with phase('query'):
+                ...
+
+    Args:
+        handler (Callable | None, optional): Decorated function. Defaults to None.
+        name (str | None, optional): Handler name in logs and metrics. Defaults to the function name.
+        metrics (bool, optional): Emit EMF metrics. Defaults to PHASE_METRICS.
+    """
+    if handler is None:
+        return functools.partial(timed_handler, name=name, metrics=metrics)
+
+    handler_name = name or handler.__name__
+
+    def begin(args, kwargs):
+        if _CURRENT_TIMER.get() is not None:
+            return None, None, None
+        profiler = None
+        if should_profile(_find_request(args, kwargs)):
+            profiler = _start_profiler(handler_name)
+        timer = PhaseTimer(handler_name)
+        token = _CURRENT_TIMER.set(timer)
+        return timer, token, profiler
+
+    def end(timer, token, profiler):
+        if timer is None:
+            return
+        if profiler is not None:
+            profiler.stop()
+        _CURRENT_TIMER.reset(token)
+        try:
+            timer.emit(metrics)
+        except Exception:
+            LOGGER.exception("Cannot emit the phases")
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            state = begin(args, kwargs)
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                end(*state)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs) -> Any:
+        state = begin(args, kwargs)
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            end(*state)
+    return wrapper
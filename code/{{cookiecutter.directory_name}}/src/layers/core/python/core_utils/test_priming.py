@@ -0,0 +1,67 @@
+import pytest
+
+from core_utils import priming
+from core_utils.priming import after_restore, prime, prime_on_init, register_after_restore, register_warmer
+
+
+@pytest.fixture
+def warmers(monkeypatch):
+    """ Registry of warmers and hooks of the test, the environment isn't primed yet """
+    calls = []
+    monkeypatch.setattr(priming, 'WARMERS', {})
+    monkeypatch.setattr(priming, 'AFTER_RESTORE_HOOKS', {})
+    monkeypatch.setattr(priming, '_PRIMED', False)
+    monkeypatch.setattr(priming, 'PRIMING_WARMERS', "")
+    monkeypatch.setattr(priming, 'PRIMING_ENABLED', False)
+    monkeypatch.delenv("AWS_LAMBDA_INITIALIZATION_TYPE", raising=False)
+
+    @register_warmer
+    def connections():
+        calls.append('connections')
+
+    @register_warmer('catalogs')
+    def load_catalogs():
+        calls.append('catalogs')
+
+    @register_warmer('broken')
+    def broken():
+        raise ConnectionError("Database not reachable")
+
+    @register_after_restore
+    def reconnect():
+        calls.append('reconnect')
+
+    return calls
+
+
+def test_failed_warmers_do_not_stop_the_others(warmers):
+    results = prime()
+
+    assert warmers == ['connections', 'catalogs']
+    assert list(results) == ['connections', 'catalogs', 'broken']
+    assert results['broken'] is None
+    assert results['connections'] >= 0 and results['catalogs'] >= 0
+
+
+def test_selected_warmers(warmers, monkeypatch):
+    assert list(prime(['catalogs'])) == ['catalogs']
+
+    monkeypatch.setattr(priming, 'PRIMING_WARMERS', " connections, missing ")
+    assert list(prime()) == ['connections']
+    assert warmers == ['catalogs', 'connections']
+
+
+def test_prime_on_init_runs_once(warmers, monkeypatch):
+    # On demand init without PRIMING_ENABLED
+    assert prime_on_init() is None
+    assert warmers == []
+
+    monkeypatch.setenv("AWS_LAMBDA_INITIALIZATION_TYPE", "provisioned-concurrency")
+    assert list(prime_on_init(['connections'])) == ['connections']
+    assert prime_on_init() is None
+    assert warmers == ['connections']
+
+
+def test_after_restore_hooks(warmers):
+    assert list(after_restore()) == ['reconnect']
+    assert warmers == ['reconnect']
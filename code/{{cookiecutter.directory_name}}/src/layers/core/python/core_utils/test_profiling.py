@@ -0,0 +1,128 @@
+import sys
+import asyncio
+
+import pytest
+
+from core_utils import profiling
+from core_utils.profiling import PhaseTimer, get_current_timer, phase, should_profile, timed_handler, write_profile
+
+
+@pytest.fixture
+def profiles(monkeypatch, tmp_path):
+    """ Every invocation is profiled into a temporary directory """
+    monkeypatch.setattr(profiling, 'PROFILING_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(profiling, 'PROFILING_OUTPUT', str(tmp_path))
+    return tmp_path
+
+
+def test_phase_timer_adds_up_the_phases():
+    timer = PhaseTimer('index')
+    with timer.phase('query'):
+        pass
+    with timer.phase('query'):
+        pass
+    with timer.phase('serialize'):
+        pass
+
+    summary = timer.emit(metrics=False)
+    assert summary['handler'] == 'index'
+    assert set(summary['phases_ms']) == {'query', 'serialize'}
+    assert summary['total_ms'] >= summary['phases_ms']['query'] >= 0
+
+
+def test_phase_outside_a_timed_handler_does_nothing():
+    with phase('query') as timer:
+        assert timer is None
+    assert get_current_timer() is None
+
+
+def test_should_profile(monkeypatch):
+    request = {"headers": {"X-Profile": "1"}}
+    monkeypatch.setattr(profiling, 'PROFILING_SAMPLE_RATE', 0.0)
+    assert should_profile(request) is False
+
+    monkeypatch.setattr(profiling, 'PROFILING_HEADER_ENABLED', True)
+    assert should_profile(request) is True
+    assert should_profile({"headers": {"x-profile": "0"}}) is False
+    assert should_profile(None) is False
+
+    monkeypatch.setattr(profiling, 'PROFILING_SAMPLE_RATE', 0.5)
+    monkeypatch.setattr(profiling.random, 'random', lambda: 0.49)
+    assert should_profile() is True
+    monkeypatch.setattr(profiling.random, 'random', lambda: 0.5)
+    assert should_profile() is False
+
+
+def test_write_profile_to_a_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PROFILING_OUTPUT', str(tmp_path / "profiles"))
+
+    location = write_profile('index', "profile", 'txt')
+
+    assert location.startswith(str(tmp_path / "profiles" / "index-")) and location.endswith(".txt")
+    with open(location) as file:
+        assert file.read() == "profile"
+
+
+def test_nested_timed_handlers_share_the_timer():
+    timers = []
+
+    @timed_handler(metrics=False)
+    def controller(request):
+        timers.append(get_current_timer())
+        with phase('query'):
+            pass
+
+    @timed_handler(name='lambda_handler', metrics=False)
+    def handler(request):
+        timers.append(get_current_timer())
+        controller(request)
+
+    handler({"headers": {}})
+
+    assert timers[0] is timers[1] and timers[0].name == 'lambda_handler'
+    assert list(timers[0].phases) == ['query']
+    assert get_current_timer() is None
+
+
+def test_async_handler_is_timed_and_profiled(profiles):
+    @timed_handler(metrics=False)
+    async def handler(request):
+        with phase('query') as timer:
+            return timer
+
+    timer = asyncio.run(handler({"headers": {}}))
+
+    assert timer is not None and 'query' in timer.phases
+    assert get_current_timer() is None
+    assert [path.suffix for path in profiles.iterdir()] == ['.txt']
+
+
+def test_missing_pyinstrument_falls_back_to_cprofile(monkeypatch, profiles):
+    monkeypatch.setattr(profiling, 'PROFILER', 'pyinstrument')
+    # Import of pyinstrument fails even where it is installed
+    monkeypatch.setitem(sys.modules, 'pyinstrument', None)
+
+    @timed_handler(metrics=False)
+    def handler(request):
+        return get_current_timer()
+
+    assert handler({"headers": {}}) is not None
+    assert get_current_timer() is None
+    assert [path.suffix for path in profiles.iterdir()] == ['.txt']
+
+
+def test_profiler_that_cannot_start_is_skipped(monkeypatch, profiles):
+    def fail(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling._Profiler, 'start', fail)
+
+    @timed_handler(metrics=False)
+    def handler(request):
+        with phase('query'):
+            return get_current_timer()
+
+    timer = handler({"headers": {}})
+    assert timer is not None and 'query' in timer.phases
+    assert get_current_timer() is None
+    assert list(profiles.iterdir()) == []
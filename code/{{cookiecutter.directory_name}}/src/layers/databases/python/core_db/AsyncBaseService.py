@@ -0,0 +1,276 @@
+from typing import Any, Awaitable, Callable, Hashable, List, cast
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .BaseModel import BaseModel
+from .BaseService import BaseService
+from .cache import make_cache_key, restore_instances, snapshot_instances
+from .replicas import use_primary
+from .retries import retry_transient
+from .sync import SYNC_PAGE_SIZE, split_changes
+from core_utils.aggregates import AggregateExpression, DateBucket
+
+_MISSING = object()
+
+
+def _sync_only(method: str, alternative: str) -> NotImplementedError:
+    return NotImplementedError(f"AsyncBaseService.{method} is not available with AsyncSession, use {alternative} (or a BaseService for the sync version)")
+
+
+class AsyncBaseService(BaseService):
+    """ Async counterpart of BaseService. Queries are built with select() (AsyncSession doesn't support Query)
+    and the data methods are coroutines, so independent queries can run together with asyncio.gather
+    (each one with its own session, an AsyncSession can't run concurrent statements).
+    """
+
+    async def _cached(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """ Read through the container cache of the model (the shared cache is only used by the sync service)
+
+        Args:
+            key (Hashable): Normalized key of the query
+            loader (Callable[[], Awaitable[Any]]): Coroutine function that executes the query
+
+        Returns:
+            Any: Query result
+        """
+        cache = self.get_query_cache()
+        if cache is None or cache.ttl <= 0:
+            return await loader()
+
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = await loader()
+            cache.set(key, value)
+        return value
+
+    async def _cached_instances(self, session: AsyncSession, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """ _cached for ORM results: the cache keeps plain copies of the instances (with the loaded relationships)
+        and they are merged without queries into the session of the request
+
+        Args:
+            session (AsyncSession): Database session of the request
+            key (Hashable): Normalized key of the query
+            loader (Callable[[], Awaitable[Any]]): Coroutine function that loads the instances
+
+        Returns:
+            Any: Instance, list of instances or None
+        """
+        cache = self.get_query_cache()
+        if cache is None or cache.ttl <= 0:
+            return await loader()
+
+        async def load_snapshot():
+            return snapshot_instances(await loader())
+        return restore_instances(session.sync_session, self.model, await self._cached(key, load_snapshot))
+
+    def get_load_options(self, relationships: List[str] | None = None) -> list:
+        """ Eager load options of the requested relationships (lazy loads are not allowed with AsyncSession)
+
+        Args:
+            relationships (List[str] | None, optional): Relationship names. Defaults to None.
+
+        Returns:
+            list: selectinload options
+        """
+        model = cast(BaseModel, self.model)
+        return [selectinload(getattr(model, name)) for name in (relationships or []) if name in model.__mapper__.relationships]
+
+    async def get_all(self, session: AsyncSession, paginate = False, page = 1, per_page = 10):
+        """ Get all the elements of the model
+
+        Args:
+            session (AsyncSession): Database session
+            paginate (bool, optional): Flag to paginate results. Defaults to False.
+            page (int, optional): Pagenumber to return. Defaults to 1.
+            per_page (int, optional): Number of elements per page. Defaults to 10.
+
+        Returns:
+            List: Elements of the page, or the statement and all the elements when it is not paginated
+        """
+        model = cast(BaseModel, self.model)
+        statement = select(model)
+        if paginate is True:
+            statement = statement.order_by(model.id.desc()).limit(per_page).offset((page - 1) * per_page)
+            return (await session.scalars(statement)).all()
+        return statement, (await session.scalars(statement)).all()
+
+    async def get_one(self, session: AsyncSession, id: int, relationships: List[str] | None = None):
+        """ Search an element by id
+
+        Args:
+            session (AsyncSession): Database session
+            id (int): Database identifier
+            relationships (List[str] | None, optional): Relationships to load with the element. Defaults to None.
+
+        Returns:
+            ORMClass: Element or None if it doesn't exist
+        """
+        if int(id) <= 0:
+            return None
+
+        async def load():
+            return await session.get(self.model, int(id), options=self.get_load_options(relationships))
+        return await self._cached_instances(session, make_cache_key('find', str(id), relationships or []), load)
+
+    async def get_by_column(self, session: AsyncSession, column_name: str, column_value):
+        statement = select(self.model).filter_by(**{column_name: column_value}).limit(1)
+        return (await session.scalars(statement)).first()
+
+    def filters_statement(self, filters: List[dict], search_filters: dict = {}, search_method='AND', order_by: str = None, order_dir: str = "asc") -> Select:
+        model = cast(BaseModel, self.model)
+        statement = model.apply_filters(select(model), filters, search_filters, search_method)
+        return model.apply_order(statement, order_by, order_dir)
+
+    async def multiple_filters(self, session: AsyncSession, filters: List[dict], paginate = False, page = 1, per_page = 10, first: bool = False, search_filters: dict = {}, search_method='AND', order_by: str=None, order_dir: str="asc", relationships: List[str] | None = None):
+        statement = self.filters_statement(filters, search_filters, search_method, order_by, order_dir)
+
+        async def load():
+            page_statement = statement.options(*self.get_load_options(relationships))
+            if first:
+                return (await session.scalars(page_statement.limit(1))).first()
+            if paginate:
+                page_statement = page_statement.limit(per_page).offset((page - 1) * per_page)
+            return (await session.scalars(page_statement)).all()
+
+        key = make_cache_key('filters', filters, search_filters, search_method, order_by, order_dir, paginate, page, per_page, first, relationships or [])
+        return statement, await self._cached_instances(session, key, load)
+
+    async def count_with_query(self, statement: Select, session: AsyncSession | None = None) -> int:
+        if session is None:
+            raise TypeError("count_with_query needs the session to count a Select: count_with_query(statement, session)")
+        count_statement = select(func.count()).select_from(statement.order_by(None).subquery())
+
+        async def load():
+            return (await session.execute(count_statement)).scalar_one()
+
+        compiled = count_statement.compile()
+        return await self._cached(make_cache_key('count', str(compiled), compiled.params), load)
+
+    def filter_by_column(self, *args, **kwargs):
+        raise _sync_only('filter_by_column', 'get_by_column or multiple_filters')
+
+    def multiple_filters_rows(self, *args, **kwargs):
+        raise _sync_only('multiple_filters_rows', 'multiple_filters')
+
+    def export(self, *args, **kwargs):
+        raise _sync_only('export', 'the export handlers of BaseController')
+
+    def get_id_range(self, *args, **kwargs):
+        raise _sync_only('get_id_range', 'the export jobs of BaseController')
+
+    async def count_elements(self, session: AsyncSession) -> int:
+        return (await session.execute(select(func.count(cast(BaseModel, self.model).id)))).scalar_one()
+
+    async def count_filtered(self, session: AsyncSession, filters: List[dict]) -> int:
+        return await self.count_with_query(self.filters_statement(filters), session)
+
+    async def get_version(self, session: AsyncSession, filters: List[dict], search_filters: dict = {}, search_method='AND') -> tuple:
+        model = cast(BaseModel, self.model)
+        statement = model.apply_filters(select(model), filters, search_filters, search_method).with_only_columns(
+            func.count(model.id),
+            func.max(getattr(model, model.UPDATED_AT_COLUMN)),
+            func.max(model.id),
+            maintain_column_froms=True
+        )
+
+        async def load():
+            return tuple((await session.execute(statement)).one())
+        return await self._cached(make_cache_key('version', filters, search_filters, search_method), load)
+
+    async def aggregate(self, session: AsyncSession, filters: List[dict], group_by: List[str], aggregates: List[AggregateExpression], bucket: DateBucket | None = None, search_filters: dict = {}, search_method='AND', limit: int | None = None) -> List[RowMapping]:
+        model = cast(BaseModel, self.model)
+        statement = model.aggregate_query(filters, group_by, aggregates, bucket, search_filters, search_method, limit)
+
+        async def load():
+            return (await session.execute(statement)).mappings().all()
+        key = make_cache_key('aggregate', filters, search_filters, search_method, tuple(group_by), tuple(aggregates), bucket, limit)
+        return await self._cached(key, load)
+
+    async def get_changes(self, session: AsyncSession, since: tuple, filters: List[dict], search_filters: dict = {}, search_method='AND', limit: int = SYNC_PAGE_SIZE) -> tuple[List[dict], tuple, bool]:
+        model = cast(BaseModel, self.model)
+        statement = model.sync_query(since, filters, search_filters, search_method, limit + 1)
+
+        async def load():
+            return (await session.execute(statement)).mappings().all()
+        rows = await self._cached(make_cache_key('sync', since, filters, search_filters, search_method, limit), load)
+        return split_changes(rows, model.property_map().get('id', 'id'), since, limit)
+
+    async def get_version_by_id(self, session: AsyncSession, id: int) -> tuple | None:
+        model = cast(BaseModel, self.model)
+        statement = select(model.id, getattr(model, model.UPDATED_AT_COLUMN)).where(model.id == id)
+
+        async def load():
+            row = (await session.execute(statement)).first()
+            return tuple(row) if row is not None else None
+        return await self._cached(make_cache_key('version_of', str(id)), load)
+
+    @retry_transient
+    async def insert_register(self, session: AsyncSession, input_data: dict):
+        input_params = {}
+        for ipKey in input_data.keys():
+            if ipKey in self.get_display_members():
+                input_params[ipKey] = input_data[ipKey]
+        obj = cast(BaseModel, self.model(**input_params))
+        use_primary(session.sync_session)
+
+        obj.before_save(session, **input_data)
+        session.add(obj)
+        try:
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            raise e
+        # Server generated columns are expired on commit and can't be lazy loaded later
+        await session.refresh(obj)
+        obj.after_save(session, **input_data)
+        self.model.invalidate_cache()
+        return obj
+
+    @retry_transient
+    async def update_register(self, session: AsyncSession, id: int, update_data: dict):
+        use_primary(session.sync_session)
+        obj = cast(BaseModel, await session.get(self.model, int(id)))
+        if obj is None:
+            return None
+
+        obj.before_update(session, update_data)
+        obj.fill(update_data)
+        obj.after_update(session, update_data)
+        await session.commit()
+        await session.refresh(obj)
+        self.model.invalidate_cache()
+        return obj
+
+    @retry_transient
+    async def delete_register(self, session: AsyncSession, id: int):
+        use_primary(session.sync_session)
+        obj = cast(BaseModel, await session.get(self.model, int(id)))
+        if obj is None:
+            return None
+
+        obj.before_delete(session)
+        await session.delete(obj)
+        await session.commit()
+        obj.after_delete(session)
+        self.model.invalidate_cache()
+        return obj
+
+    @retry_transient
+    async def soft_delete_register(self, session: AsyncSession, id: int):
+        use_primary(session.sync_session)
+        obj = cast(BaseModel, await session.get(self.model, int(id)))
+        if obj is None:
+            return None
+
+        obj.before_soft_delete(session)
+        for key, value in obj.soft_delete_values().items():
+            setattr(obj, key, value)
+        await session.commit()
+        await session.refresh(obj)
+        obj.after_soft_delete(session)
+        self.model.invalidate_cache()
+        return obj
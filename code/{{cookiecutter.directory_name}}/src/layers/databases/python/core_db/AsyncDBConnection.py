@@ -0,0 +1,181 @@
+import asyncio
+from typing import Any, Coroutine
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from core_db.config import DBConfig, CONNECTIONS
+from core_db.replicas import ReplicaPool, RoutingSession
+from core_db.instrumentation import instrument_engine
+from core_db.deadlines import apply_deadlines
+from core_db.admission import get_admission_controller
+from core_utils.priming import register_after_restore
+
+ASYNC_CONNECTION_HANDLERS: dict[str, 'AsyncDBConnection'] = {}
+
+## Async driver used for each sync driver when the connection doesn't declare 'async_driver'
+ASYNC_DRIVERS: dict[str, str] = {
+    'pymysql': 'aiomysql',
+    'mysqldb': 'aiomysql',
+    'mysqlconnector': 'aiomysql',
+    'psycopg2': 'asyncpg',
+    'psycopg': 'asyncpg',
+    'pysqlite': 'aiosqlite',
+}
+
+## Default async driver by dialect, used when the url doesn't include the driver
+DIALECT_ASYNC_DRIVERS: dict[str, str] = {
+    'mysql': 'aiomysql',
+    'mariadb': 'aiomysql',
+    'postgresql': 'asyncpg',
+    'sqlite': 'aiosqlite',
+}
+
+## Event loop of the container. Pooled async connections are bound to the loop that opened them,
+## so every invocation must run in the same loop (asyncio.run would create a new one each time)
+EVENT_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+def get_async_url(url: str, async_driver: str | None = None) -> str:
+    """ Translate a sync connection string to its async driver (mysql+pymysql -> mysql+aiomysql)
+
+    Args:
+        url (str): Sync connection string
+        async_driver (str | None, optional): Driver to use instead of the default mapping. Defaults to None.
+
+    Returns:
+        str: Async connection string
+    """
+    parsed = make_url(url)
+    dialect = parsed.get_backend_name()
+    driver = parsed.get_driver_name()
+    if async_driver is None:
+        async_driver = ASYNC_DRIVERS.get(driver) or DIALECT_ASYNC_DRIVERS.get(dialect, driver)
+    return parsed.set(drivername=f"{dialect}+{async_driver}").render_as_string(hide_password=False)
+
+
+def run(coroutine: Coroutine) -> Any:
+    """ Run a coroutine in the event loop of the container, use it from the sync lambda handler
+
+    Args:
+        coroutine (Coroutine): Coroutine to run (e.g. an AsyncBaseController handler)
+
+    Returns:
+        Any: Result of the coroutine
+    """
+    global EVENT_LOOP
+    if EVENT_LOOP is None or EVENT_LOOP.is_closed():
+        EVENT_LOOP = asyncio.new_event_loop()
+        asyncio.set_event_loop(EVENT_LOOP)
+    return EVENT_LOOP.run_until_complete(coroutine)
+
+
+def shutdown() -> None:
+    """ Dispose the async engines and close the event loop of the container (local scripts and tests, lambdas keep them)
+    """
+    global EVENT_LOOP
+    if EVENT_LOOP is None or EVENT_LOOP.is_closed():
+        return
+
+    for handler in ASYNC_CONNECTION_HANDLERS.values():
+        if handler.engine is not None:
+            EVENT_LOOP.run_until_complete(handler.engine.dispose())
+            handler.engine = None
+            handler.session = None
+        if handler.replicas is not None:
+            for engine in handler.replicas.engines:
+                EVENT_LOOP.run_until_complete(AsyncEngine(engine).dispose())
+            handler.replicas = None
+    EVENT_LOOP.close()
+    EVENT_LOOP = None
+
+
+@register_after_restore('async_database')
+def reset_connections() -> None:
+    """ Discard the pools of the async engines restored from a SnapStart snapshot, the next session reconnects
+    """
+    for handler in ASYNC_CONNECTION_HANDLERS.values():
+        engines = [handler.engine.sync_engine] if handler.engine is not None else []
+        engines += list(handler.replicas.engines) if handler.replicas is not None else []
+        for engine in engines:
+            engine.dispose(close=False)
+
+
+class AsyncDBConnection:
+    """ Async counterpart of DBConnection (create_async_engine). It shares the configuration of the sync connection,
+    the driver is taken from CONNECTIONS[...]['async_driver'] or translated from CONNECTIONS[...]['driver']
+    """
+
+    def __init__(self, config_name: str, secret_name: str = None, prefix: str = 'default', *_, **__) -> None:
+        self.config_name = config_name
+        self.secret_name = secret_name
+        self.prefix = prefix
+
+        self.config: DBConfig | None = None
+        self.engine: AsyncEngine | None = None
+        self.replicas: ReplicaPool | None = None
+        self.session: async_sessionmaker | None = None
+
+        if self.config_name not in ASYNC_CONNECTION_HANDLERS:
+            ASYNC_CONNECTION_HANDLERS[self.config_name] = self
+
+        handler = ASYNC_CONNECTION_HANDLERS[self.config_name]
+        if not handler.config:
+            handler.config = DBConfig.get_config(conn_name=config_name, secret_name=secret_name, prefix=prefix)
+
+    def get_async_driver(self) -> str | None:
+        # The shards of the tenant routing use the driver of the connection they come from
+        config = ASYNC_CONNECTION_HANDLERS[self.config_name].config
+        return CONNECTIONS.get(config.base_conn_name if config is not None else self.config_name, {}).get('async_driver')
+
+    def get_engine_config(self, url: str) -> dict:
+        engine_config = ASYNC_CONNECTION_HANDLERS[self.config_name].config.get_engine_config()
+        engine_config['url'] = get_async_url(url, self.get_async_driver())
+        return engine_config
+
+    def create_engine(self, url: str) -> AsyncEngine:
+        engine = create_async_engine(**self.get_engine_config(url))
+        if ASYNC_CONNECTION_HANDLERS[self.config_name].config.DATABASE_INSTRUMENTATION:
+            instrument_engine(engine.sync_engine)
+        if ASYNC_CONNECTION_HANDLERS[self.config_name].config.DATABASE_STATEMENT_TIMEOUTS:
+            apply_deadlines(engine.sync_engine)
+        if ASYNC_CONNECTION_HANDLERS[self.config_name].config.DATABASE_ADMISSION_CONTROL:
+            get_admission_controller(self.config_name, ASYNC_CONNECTION_HANDLERS[self.config_name].config).register(engine.sync_engine)
+        return engine
+
+    def get_engine(self) -> AsyncEngine:
+        handler = ASYNC_CONNECTION_HANDLERS[self.config_name]
+        if not handler.engine:
+            handler.engine = self.create_engine(handler.config.DATABASE_CONNECTION_STRING)
+        return handler.engine
+
+    def build_sessionmaker(self) -> async_sessionmaker:
+        """ Session factory of the connection, routing the reads to the replicas when they are configured
+
+        Returns:
+            async_sessionmaker: Async session factory
+        """
+        handler = ASYNC_CONNECTION_HANDLERS[self.config_name]
+        config = handler.config
+        if not config.has_replicas():
+            return async_sessionmaker(self.get_engine(), expire_on_commit=False)
+
+        if handler.replicas is None:
+            handler.replicas = ReplicaPool(
+                [self.create_engine(url).sync_engine for url in config.get_replica_connection_strings()],
+                eject_seconds=config.DATABASE_REPLICA_EJECT_SECONDS
+            )
+        return async_sessionmaker(
+            self.get_engine(),
+            expire_on_commit=False,
+            sync_session_class=RoutingSession,
+            replicas=handler.replicas,
+            config_name=self.config_name,
+            read_your_writes=config.DATABASE_READ_YOUR_WRITES
+        )
+
+    def get_session(self) -> AsyncSession:
+        handler = ASYNC_CONNECTION_HANDLERS[self.config_name]
+        if not handler.session:
+            handler.session = self.build_sessionmaker()
+        return handler.session()
@@ -1,18 +1,27 @@
 from __future__ import annotations
 import json
 from json.encoder import JSONEncoder
-from typing import Any, Dict, List, Type, cast
-from operator import and_, or_
-from sqlalchemy import Column, Integer, orm, cast, String
+from typing import Any, ClassVar, Dict, List, Type
+from sqlalchemy import Column, Integer, orm, select, lambda_stmt
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.query import Query
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.sql import func
-from typing import List
-from typing import ClassVar
+from sqlalchemy.sql import func, Select
 
-from .DBConnection import AlchemyEncoder
+from .DBConnection import AlchemyEncoder, DBConnection
 from .config import CONNECTIONS
+from .cache import QueryCache, get_query_cache
+from .tenancy import route_connection
+from .filters import FilterExpression, compile_filter
+from .search import SEARCH_CONTAINS, search_condition, legacy_search_condition, combine_conditions
+from .aggregates import aggregate_column, bucket_column, get_column
+from .sync import SYNC_DELETED_KEY, SYNC_ID_KEY, SYNC_UPDATED_AT_KEY, changed_since
+from core_utils.aggregates import AggregateExpression, DateBucket
+from core_utils.priming import register_warmer
+
+## Dialect of each connection (shards included), resolved once per container
+DIALECT_NAMES: dict[str, str] = {}
 
 class BaseModel(DeclarativeBase):
     """ Base model for a child classes implementations
@@ -39,8 +48,21 @@ class BaseModel(DeclarativeBase):
     filter_columns = []
     relationship_names = []
     search_columns = []
+    ## Search mode by search column: contains (default), prefix, fulltext or trigram (see core_db.search)
+    search_modes = {}
+    ## Columns that clients usually send in order_by, used by the index advisor
+    order_columns = []
     
     SOFT_DELETE_COLUMN: ClassVar[str] = "deleted_at"
+    ## Column updated on every change of the row, used to build cheap versions (ETags) of the data
+    UPDATED_AT_COLUMN: ClassVar[str] = "updated_at"
+
+    ## Seconds that the read results are cached in the container (0 disables the cache). Use it for reference data
+    CACHE_TTL: ClassVar[int] = 0
+    ## Max number of different queries cached for the model
+    CACHE_MAX_SIZE: ClassVar[int] = 256
+    ## Seconds that the read results are kept in the cache shared by all the containers (DATABASE_SHARED_CACHE_URL)
+    SHARED_CACHE_TTL: ClassVar[int] = 0
 
     @staticmethod
     def get_soft_delete_value():
@@ -59,7 +81,34 @@ class BaseModel(DeclarativeBase):
     
     @classmethod
     def get_connection_params(cls):
-        return CONNECTIONS.get(cls.__connection_config_name__, {})
+        """ Parameters of the connection of the model, routed to the shard of the current tenant (core_db.tenancy)
+        """
+        return route_connection(CONNECTIONS.get(cls.__connection_config_name__, {}))
+
+    @classmethod
+    def get_dialect_name(cls) -> str:
+        """ Dialect of the database of the model (mysql, postgresql...)
+
+        Returns:
+            str: Dialect name
+        """
+        params = cls.get_connection_params()
+        conn_name = params.get('config_name', cls.__connection_config_name__)
+        if conn_name not in DIALECT_NAMES:
+            DIALECT_NAMES[conn_name] = DBConnection(**params).get_engine().dialect.name
+        return DIALECT_NAMES[conn_name]
+
+    @classmethod
+    def get_search_mode(cls, column_name: str) -> str:
+        """ Search mode of a search column
+
+        Args:
+            column_name (str): Column name
+
+        Returns:
+            str: Search mode, contains if the model doesn't declare it
+        """
+        return cls.search_modes.get(column_name, SEARCH_CONTAINS)
 
     @classmethod
     def has_soft_delete(cls) -> bool:
@@ -70,6 +119,35 @@ class BaseModel(DeclarativeBase):
         """
         return hasattr(cls, cls.SOFT_DELETE_COLUMN)
 
+    @classmethod
+    def has_updated_at(cls) -> bool:
+        """ Check if the model has a column with the last update of the row
+
+        Returns:
+            bool: True if the model has an updated at column, False otherwise
+        """
+        return hasattr(cls, cls.UPDATED_AT_COLUMN)
+
+    @classmethod
+    def get_query_cache(cls) -> QueryCache | None:
+        """ Get the read-through cache of the model
+
+        Returns:
+            QueryCache | None: Cache of the model, None if the model doesn't enable it (CACHE_TTL/SHARED_CACHE_TTL)
+        """
+        # Each shard has its own data, its results are cached apart
+        shard = cls.get_connection_params().get('shard')
+        name = cls.__name__ if shard is None else f"{cls.__name__}@{shard}"
+        return get_query_cache(name, cls.CACHE_TTL, cls.CACHE_MAX_SIZE, cls.SHARED_CACHE_TTL)
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """ Discard the cached results of the model (called after every write)
+        """
+        cache = cls.get_query_cache()
+        if cache is not None:
+            cache.invalidate()
+
     @classmethod
     def all(cls_, session: Session):
         """ Get all rows from a table
@@ -81,14 +159,16 @@ class BaseModel(DeclarativeBase):
         Returns:
             List[Type[BaseModel]]: List of elements mapped from database table
         """
-        query = session.query(cls_)
-        return query, session.query(cls_).all()
+        statement = select(cls_)
+        return statement, session.scalars(statement).all()
     
     @classmethod
     def get_paginated(cls_, session: Session, page: int = 1, per_page: int = 10):
-        page = page - 1
-        query = session.query(cls_).order_by(cls_.id.desc()).limit(per_page).offset(page*per_page)
-        return query.all()
+        # lambda_stmt: the statement is built and its cache key computed once, the pages only change the parameters
+        offset = (page - 1) * per_page
+        statement = lambda_stmt(lambda: select(cls_).order_by(cls_.id.desc()))
+        statement += lambda s: s.limit(per_page).offset(offset)
+        return session.scalars(statement).all()
     
     @classmethod
     def find(cls_, session: Session, id: int):
@@ -103,7 +183,7 @@ class BaseModel(DeclarativeBase):
             Type[BaseModel]: The row that have a coincidence with the identifier
         """
         if int(id) > 0:
-            return session.query(cls_).get(id)
+            return session.get(cls_, id)
     
     @classmethod
     def filter_by(cls_, session: Session, column_name: str, value, paginated: bool = False, page: int = 1, per_page: int = 10, first = False):
@@ -121,15 +201,8 @@ class BaseModel(DeclarativeBase):
         filter_dict = {
             column_name: value
         }
-        query = session.query(cls_).filter_by(**filter_dict).order_by(cls_.id.desc())
-
-        if first:
-            return query, query.first()
-
-        if paginated:
-            page = page - 1
-            return query, query.limit(per_page).offset(page*per_page).all()
-        return query, query.all()
+        statement = select(cls_).filter_by(**filter_dict).order_by(cls_.id.desc())
+        return statement, cls_.fetch(session, statement, paginated, page, per_page, first)
     
     @classmethod
     def get_one(cls_, session: Session, column_name: str, value):
@@ -147,47 +220,70 @@ class BaseModel(DeclarativeBase):
         filter_dict = {
             column_name: value
         }
-        return session.query(cls_).filter_by(**filter_dict).first()
+        return session.scalars(select(cls_).filter_by(**filter_dict).limit(1)).first()
     
     @classmethod
-    def filters(cls_, session: Session, filters: List[dict], paginated: bool = False, page: int = 1, per_page: int = 10, first: bool = False, search_filters: dict = {}, search_method = 'AND',  order_by: str=None, order_dir: str="asc"):
-        """ Gets all rows that match with the multiple filters specified in dict (and logic)
+    def apply_filters(cls_, query: Select, filters: List[dict], search_filters: dict = {}, search_method = 'AND') -> Select:
+        """ Apply the filters and search filters to a select (same semantics for data, counts and versions).
+        The values are bound parameters, the same filter columns with other values reuse the compiled statement
 
         Args:
             cls_ (class): Child class method
-            session (Session): Database session
+            query (Select): Select (or legacy Query) over the model
+            filters (List[dict]): Filters to apply with AND logic (column/value dicts or FilterExpression)
+            search_filters (dict, optional): Search conditions (column, value and optionally the search mode). Defaults to {}.
+            search_method (str, optional): Logic to join the search conditions (AND/OR). Defaults to 'AND'.
 
         Returns:
-            List[Type[BaseModel]]: List of elements that match with the multiple filters
+            Select: Filtered select
         """
-        query = session.query(cls_)
-        
-        search_query = None
-        first_run = True
+        conditions = []
+        dialect_name = cls_.get_dialect_name() if any('mode' in ksearch for ksearch in search_filters) else None
         for ksearch in search_filters:
-            column = ksearch['column']
-            value = ksearch['value']
-
-            if isinstance(value, str) and '%' in value:
-                condition = cast(column, String).ilike(value)
+            if 'mode' in ksearch:
+                conditions.append(search_condition(ksearch['column'], ksearch['value'], ksearch['mode'], dialect_name))
             else:
-                condition = column == value
+                conditions.append(legacy_search_condition(ksearch['column'], ksearch['value']))
 
-            if first_run:
-                search_query = condition
-                first_run = False
-            else:
-                if search_method == 'OR':
-                    search_query = or_(search_query, condition)
-                else:
-                    search_query = and_(search_query, condition)
-        
+        search_query = combine_conditions(conditions, search_method)
         if search_query is not None:
             query = query.filter(search_query)
 
         for filter_dict in filters:
-            query = query.filter_by(**filter_dict)
+            if isinstance(filter_dict, FilterExpression):
+                query = query.filter(compile_filter(cls_, filter_dict))
+            else:
+                query = query.filter_by(**filter_dict)
+
+        return query
+
+    @classmethod
+    def filters_query(cls_, session: Session, filters: List[dict], search_filters: dict = {}, search_method = 'AND', order_by: str=None, order_dir: str="asc") -> Select:
+        """ Build the select of the multiple filters with its order, without executing it
+
+        Args:
+            cls_ (class): Child class method
+            session (Session): Database session (the select is not bound to it, execute it with fetch)
+
+        Returns:
+            Select: Filtered and ordered select
+        """
+        statement = cls_.apply_filters(select(cls_), filters, search_filters, search_method)
+        return cls_.apply_order(statement, order_by, order_dir)
+
+    @classmethod
+    def apply_order(cls_, query: Select, order_by: str = None, order_dir: str = "asc") -> Select:
+        """ Order a select (or query) by a column of the model, by default the newest rows first
 
+        Args:
+            cls_ (class): Child class method
+            query (Select): Select over the model
+            order_by (str, optional): Column name. Defaults to None.
+            order_dir (str, optional): asc or desc. Defaults to "asc".
+
+        Returns:
+            Select: Ordered select
+        """
         if order_by:
             column = getattr(cls_, order_by, None)
             if column is not None:
@@ -198,14 +294,154 @@ class BaseModel(DeclarativeBase):
         else:
             query = query.order_by(cls_.id.desc())
 
+        return query
+
+    @classmethod
+    def fetch(cls_, session: Session, statement: Select, paginated: bool = False, page: int = 1, per_page: int = 10, first: bool = False):
+        """ Execute a select built by filters_query. LIMIT and OFFSET are bound parameters, every page of the same
+        filters uses the same compiled statement
+
+        Args:
+            cls_ (class): Child class method
+            session (Session): Database session
+            statement (Select): Select to execute
+
+        Returns:
+            List[Type[BaseModel]] | Type[BaseModel]: Elements of the page, all the elements or the first one
+        """
         if first:
-            return query, query.first()
+            return session.scalars(statement.limit(1)).first()
 
         if paginated:
-            page = page - 1
-            return query, query.limit(per_page).offset(page * per_page).all()
-        
-        return query, query.all()
+            statement = statement.limit(per_page).offset((page - 1) * per_page)
+
+        return session.scalars(statement).all()
+
+    @classmethod
+    def filters(cls_, session: Session, filters: List[dict], paginated: bool = False, page: int = 1, per_page: int = 10, first: bool = False, search_filters: dict = {}, search_method = 'AND',  order_by: str=None, order_dir: str="asc"):
+        """ Gets all rows that match with the multiple filters specified in dict (and logic)
+
+        Args:
+            cls_ (class): Child class method
+            session (Session): Database session
+
+        Returns:
+            List[Type[BaseModel]]: List of elements that match with the multiple filters
+        """
+        statement = cls_.filters_query(session, filters, search_filters, search_method, order_by, order_dir)
+        return statement, cls_.fetch(session, statement, paginated, page, per_page, first)
+
+    @classmethod
+    def row_columns(cls_, columns: List[str] | None = None) -> list:
+        """ Columns selected by the row mode: the display members labeled with their property_map name (the keys
+        that AlchemyEncoder gives them), or the given attributes with their own name
+
+        Args:
+            cls_ (class): Child class method
+            columns (List[str] | None, optional): Attributes to select. Defaults to the display members.
+
+        Returns:
+            list: Labeled columns
+        """
+        column_attrs = cls_.__mapper__.column_attrs
+        if columns is not None:
+            return [getattr(cls_, name).label(name) for name in columns if name in column_attrs]
+
+        prop_map = cls_.property_map()
+        names = [name for name in cls_.display_members() if name in column_attrs] or column_attrs.keys()
+        return [getattr(cls_, name).label(prop_map.get(name, name)) for name in names]
+
+    @classmethod
+    def rows_query(cls_, filters: List[dict], search_filters: dict = {}, search_method = 'AND', order_by: str=None, order_dir: str="asc", columns: List[str] | None = None) -> Select:
+        """ Core select of the multiple filters over the projected columns (same filters and order as filters_query)
+
+        Args:
+            cls_ (class): Child class method
+            filters (List[dict]): Filters to apply with AND logic
+            columns (List[str] | None, optional): Attributes to select. Defaults to the display members.
+
+        Returns:
+            Select: Filtered and ordered select
+        """
+        statement = select(*cls_.row_columns(columns)).select_from(cls_)
+        statement = cls_.apply_filters(statement, filters, search_filters, search_method)
+        return cls_.apply_order(statement, order_by, order_dir)
+
+    @classmethod
+    def aggregate_query(cls_, filters: List[dict], group_by: List[str], aggregates: List[AggregateExpression], bucket: DateBucket | None = None, search_filters: dict = {}, search_method = 'AND', limit: int | None = None) -> Select:
+        """ Single GROUP BY select of the multiple filters (same filters as rows_query). The groups are labeled with
+        their property_map name, the aggregates with their expression (count, amount__sum...) and the rows are
+        ordered by the bucket and the groups
+
+        Args:
+            cls_ (class): Child class method
+            filters (List[dict]): Filters to apply with AND logic
+            group_by (List[str]): Columns of the groups
+            aggregates (List[AggregateExpression]): Aggregates of each group
+            bucket (DateBucket | None, optional): Date column grouped by interval. Defaults to None.
+            limit (int | None, optional): Max groups. Defaults to None.
+
+        Raises:
+            ValueError: Unknown columns, numeric aggregates over other types or buckets that aren't dates
+
+        Returns:
+            Select: Aggregate select
+        """
+        prop_map = cls_.property_map()
+        groups = [get_column(cls_, name).label(prop_map.get(name, name)) for name in group_by]
+        if bucket is not None:
+            groups.insert(0, bucket_column(cls_, bucket, cls_.get_dialect_name(), prop_map.get(bucket.column, bucket.column)))
+
+        statement = select(*groups, *[aggregate_column(cls_, aggregate) for aggregate in aggregates]).select_from(cls_)
+        statement = cls_.apply_filters(statement, filters, search_filters, search_method)
+        if groups:
+            statement = statement.group_by(*groups).order_by(*groups)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return statement
+
+    @classmethod
+    def sync_query(cls_, since: tuple, filters: List[dict], search_filters: dict = {}, search_method = 'AND', limit: int | None = None) -> Select:
+        """ Core select of the changes after a watermark (core_db.sync), soft deleted rows included, ordered by
+        (updated at, id). The rows have the display members plus the internal keys of the watermark and the tombstone flag
+
+        Args:
+            cls_ (class): Child class method
+            since (tuple): Decoded watermark (updated at, id)
+            filters (List[dict]): Filters to apply with AND logic (without the soft delete filter)
+            limit (int | None, optional): Max changes. Defaults to None.
+
+        Returns:
+            Select: Select of the changes
+        """
+        updated_at = getattr(cls_, cls_.UPDATED_AT_COLUMN)
+        columns = [updated_at.label(SYNC_UPDATED_AT_KEY), cls_.id.label(SYNC_ID_KEY)]
+        if cls_.has_soft_delete():
+            columns.append(getattr(cls_, cls_.SOFT_DELETE_COLUMN).is_not(None).label(SYNC_DELETED_KEY))
+
+        statement = select(*cls_.row_columns(), *columns).select_from(cls_).where(changed_since(updated_at, cls_.id, since))
+        statement = cls_.apply_filters(statement, filters, search_filters, search_method)
+        statement = statement.order_by(updated_at.asc(), cls_.id.asc())
+        if limit is not None:
+            statement = statement.limit(limit)
+        return statement
+
+    @classmethod
+    def fetch_rows(cls_, session: Session, statement: Select, paginated: bool = False, page: int = 1, per_page: int = 10) -> List[RowMapping]:
+        """ Execute a select built by rows_query. The rows skip the identity map and the attribute instrumentation
+        of the ORM objects, use them for read-only responses
+
+        Args:
+            cls_ (class): Child class method
+            session (Session): Database session
+            statement (Select): Select to execute
+
+        Returns:
+            List[RowMapping]: Rows of the page or all the rows
+        """
+        if paginated:
+            statement = statement.limit(per_page).offset((page - 1) * per_page)
+        return session.execute(statement).mappings().all()
 
     def before_save(self, sesion: Session, *args, **kwargs):
         """ Method to execute before save a row in database (polimorfism)
@@ -237,6 +473,7 @@ class BaseModel(DeclarativeBase):
                 raise e
 
         self.after_save(session, *args, **kwargs)
+        self.__class__.invalidate_cache()
         return self
 
     def before_update(self, session: Session, obj: dict, *args, **kwargs):
@@ -257,16 +494,23 @@ class BaseModel(DeclarativeBase):
             object (dict): Dictionary with only the field to update
         """
         self.before_update(session, obj, *args, **kwargs)
-        keys = self.__class__.get_keys()
-        for key in keys:
-            if key in obj:
-                self.__setattr__(key, obj[key])
-                pass
-            
+        self.fill(obj)
         self.after_update(session, obj, *args, **kwargs)
         session.commit()
+        self.__class__.invalidate_cache()
         return self
     
+    def fill(self, obj: dict) -> None:
+        """ Set the attributes of the model present in the dictionary
+
+        Args:
+            obj (dict): Dictionary with only the field to update
+        """
+        keys = self.__class__.get_keys()
+        for key in keys:
+            if key in obj:
+                self.__setattr__(key, obj[key])
+
     def before_delete(self, sesion: Session, *args, **kwargs):
         """ Method to execute before update a row in database (polimorfism)
         """
@@ -289,6 +533,7 @@ class BaseModel(DeclarativeBase):
         if commit:
             session.commit()
         self.after_delete(session, *args, **kwargs)
+        self.__class__.invalidate_cache()
     
     def before_soft_delete(self, sesion: Session, *args, **kwargs):
         """ Method to execute before soft delete a row in database (polimorfism)
@@ -300,6 +545,18 @@ class BaseModel(DeclarativeBase):
         """
         pass
 
+    def soft_delete_values(self) -> Dict[str, Any]:
+        """ Values written by a soft delete (shared by the sync and async services)
+
+        Returns:
+            Dict[str, Any]: Soft delete column and, if the model has it, the updated at column
+        """
+        values = {self.SOFT_DELETE_COLUMN: self.get_soft_delete_value()}
+        if self.has_updated_at():
+            # The tombstone must move past the watermarks of the delta sync (core_db.sync)
+            values[self.UPDATED_AT_COLUMN] = func.now()
+        return values
+
     def soft_delete(self, session: Session, commit=True, *args, **kwargs):
         """ Soft delete a specified register in database
 
@@ -310,11 +567,12 @@ class BaseModel(DeclarativeBase):
         session.add(self)
         self.before_soft_delete(session, *args, **kwargs)
         
-        self.update(session, {self.SOFT_DELETE_COLUMN: self.get_soft_delete_value()})
+        self.update(session, self.soft_delete_values())
         
         if commit:
             session.commit()
         self.after_soft_delete(session, *args, **kwargs)
+        self.__class__.invalidate_cache()
 
     @classmethod
     def eager(cls_: Type[BaseModel], session: Session, *args) -> Query:
@@ -328,22 +586,90 @@ class BaseModel(DeclarativeBase):
     
     @classmethod
     def count(cls_: Type[BaseModel], session: Session) -> int:
-        """ Execute in one load all joins
+        """ Count all the rows of the table
 
         Returns:
-            Type[BaseModel]: Database query
+            int: Number of rows
         """
-        return session.query(cls_.id).count()
+        return session.execute(lambda_stmt(lambda: select(func.count(cls_.id)))).scalar_one()
+
+    @classmethod
+    def count_query(cls_: Type[BaseModel], session: Session, statement: Select) -> int:
+        """ Count the rows of a select built by filters_query (its order is dropped)
+
+        Args:
+            session (Session): Database session
+            statement (Select): Select over the model
+
+        Returns:
+            int: Number of rows
+        """
+        return session.execute(select(func.count()).select_from(statement.order_by(None).subquery())).scalar_one()
     
     @classmethod
     def count_with_filters(cls_: Type[BaseModel], session: Session, filters: List[dict]) -> int:
-        query = session.query(cls_)
+        return cls_.count_query(session, cls_.apply_filters(select(cls_), filters))
+
+    @classmethod
+    def version_with_filters(cls_: Type[BaseModel], session: Session, filters: List[dict], search_filters: dict = {}, search_method = 'AND') -> tuple:
+        """ Get a cheap version of the rows that match the filters: number of rows, last update and max identifier.
+        Any insert, update or delete over the matched rows changes the version.
+
+        Args:
+            cls_ (Type[BaseModel]): Child class method
+            session (Session): Database session
+            filters (List[dict]): Filters to apply with AND logic
+
+        Returns:
+            tuple: (count, max updated at, max id)
+        """
+        statement = cls_.apply_filters(select(cls_), filters, search_filters, search_method).with_only_columns(
+            func.count(cls_.id),
+            func.max(getattr(cls_, cls_.UPDATED_AT_COLUMN)),
+            func.max(cls_.id),
+            maintain_column_froms=True
+        )
+        return tuple(session.execute(statement).one())
+
+    @classmethod
+    def id_range_with_filters(cls_: Type[BaseModel], session: Session, filters: List[dict], search_filters: dict = {}, search_method = 'AND') -> tuple:
+        """ Get the identifiers range of the rows that match the filters, used to split an export in partitions
+
+        Args:
+            cls_ (Type[BaseModel]): Child class method
+            session (Session): Database session
+            filters (List[dict]): Filters to apply with AND logic
+
+        Returns:
+            tuple: (min id, max id, count)
+        """
+        statement = cls_.apply_filters(select(cls_), filters, search_filters, search_method).with_only_columns(
+            func.min(cls_.id),
+            func.max(cls_.id),
+            func.count(cls_.id),
+            maintain_column_froms=True
+        )
+        return tuple(session.execute(statement).one())
+
+    @classmethod
+    def version_of(cls_: Type[BaseModel], session: Session, id: int) -> tuple | None:
+        """ Get the version of a single row without loading it
+
+        Args:
+            cls_ (Type[BaseModel]): Child class method
+            session (Session): Database session
+            id (int): Row identifier
+
+        Returns:
+            tuple | None: (id, updated at) or None if the row doesn't exist
+        """
+        # Runs before every find of a model with updated at (ETag): lambda_stmt skips building the statement
+        updated_at = getattr(cls_, cls_.UPDATED_AT_COLUMN)
+        statement = lambda_stmt(lambda: select(cls_.id, updated_at))
+        statement += lambda s: s.where(cls_.id == id)
+        row = session.execute(statement).first()
+        return tuple(row) if row is not None else None
 
-        for filter in filters:
-            query = query.filter_by(**filter)
-        
-        return query.count()
-    
     @classmethod
     def get_keys(cls_: Type[BaseModel]) -> List[str]:
         """ Get all attributes of class
@@ -396,3 +722,12 @@ class BaseModel(DeclarativeBase):
         attr_array = [f"{attr}={self.__getattribute__(attr)}" for attr in self.attrs]
         args_format = ",".join(attr_array)
         return f"<{type(self).__name__}({args_format})>"
+
+
+@register_warmer('models')
+def warm_models() -> None:
+    """ Warmer of core_utils.priming: configures the mappers of the imported models and runs their serializer once
+    """
+    orm.configure_mappers()
+    for mapper in BaseModel.registry.mappers:
+        json.dumps(mapper.class_(), cls=AlchemyEncoder)
@@ -1,12 +1,25 @@
 
-from typing import List, Tuple, Type, cast
+from typing import Callable, List, Tuple, Type, cast
 
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.orm.query import Query
+from sqlalchemy.sql import Select
 from .BaseModel import BaseModel
+from .cache import QueryCache, make_cache_key, restore_instances, snapshot_instances
 from .config import CONNECTIONS
+from .replicas import use_primary
+from .retries import retry_transient
+from .sync import SYNC_PAGE_SIZE, split_changes
+from .export import EXPORT_BATCH_ROWS, ExportColumn, ExportWriter, export_query, iter_batches
 from sqlalchemy.orm.session import Session
+from core_utils.aggregates import AggregateExpression, DateBucket
 
 class BaseService:
+    ## Cache-Control header returned by the read handlers (None to not send it), e.g. "private, max-age=5"
+    cache_control: str | None = None
+    ## Read-only list handlers (index) fetch rows of the projected columns instead of ORM objects
+    row_mode: bool = False
+
     def __init__(self, model: Type) -> None:
         self.model = model
 
@@ -26,7 +39,15 @@ class BaseService:
         """
         return cast(BaseModel, self.model).get_connection_params()
 
-    def get_all(self, session: Session, paginate = False, page = 1, per_page = 10) -> Tuple[Query, BaseModel]:
+    def get_query_cache(self) -> QueryCache | None:
+        """ Get the read-through cache of the model (None if the model doesn't enable it)
+
+        Returns:
+            QueryCache | None: Cache of the model
+        """
+        return cast(BaseModel, self.model).get_query_cache()
+
+    def get_all(self, session: Session, paginate = False, page = 1, per_page = 10) -> Tuple[Select, BaseModel]:
         """ Obtiene todos los elementos del modelo de datos especificado
 
         Args:
@@ -54,7 +75,12 @@ class BaseService:
         Returns:
             ORMClass: Devuelve un objeto de la base de datos
         """
-        return cast(BaseModel, self.model).find(session, id)
+        cache = self.get_query_cache()
+        if cache is None:
+            return cast(BaseModel, self.model).find(session, id)
+        # The cache keeps a plain copy of the row, the instance is merged into the session of the request
+        cached = cache.get_or_load(make_cache_key('find', str(id)), lambda: snapshot_instances(cast(BaseModel, self.model).find(session, id)))
+        return restore_instances(session, self.model, cached)
     
     def filter_by_column(self, session: Session, column_name: str, column_value, paginate = False, page = 1, per_page = 10, first: bool = False):
         return cast(BaseModel, self.model).filter_by(session, column_name, column_value, paginate, page, per_page, first)
@@ -74,36 +100,195 @@ class BaseService:
         return cast(BaseModel, self.model).get_one(session, column_name, column_value)
     
     def multiple_filters(self, session: Session, filters: List[dict], paginate = False, page = 1, per_page = 10, first: bool = False, search_filters: dict = {}, search_method='AND', order_by: str=None, order_dir: str="asc"):
-        return cast(BaseModel, self.model).filters(session, filters, paginate, page, per_page, first, search_filters, search_method, order_by, order_dir)
+        cache = self.get_query_cache()
+        if cache is None:
+            return cast(BaseModel, self.model).filters(session, filters, paginate, page, per_page, first, search_filters, search_method, order_by, order_dir)
+
+        query = cast(BaseModel, self.model).filters_query(session, filters, search_filters, search_method, order_by, order_dir)
+        key = make_cache_key('filters', filters, search_filters, search_method, order_by, order_dir, paginate, page, per_page, first)
+        cached = cache.get_or_load(key, lambda: snapshot_instances(cast(BaseModel, self.model).fetch(session, query, paginate, page, per_page, first)))
+        return query, restore_instances(session, self.model, cached)
     
-    def count_with_query(self, query: Query) -> int:
-        return query.count()
+    def multiple_filters_rows(self, session: Session, filters: List[dict], paginate = False, page = 1, per_page = 10, search_filters: dict = {}, search_method='AND', order_by: str=None, order_dir: str="asc", columns: List[str] | None = None) -> Tuple[Select, List[RowMapping]]:
+        """ Read-only version of multiple_filters: the rows are mappings of the projected columns
+
+        Args:
+            session (Session): Database session
+            filters (List[dict]): Filters to apply with AND logic
+            columns (List[str] | None, optional): Attributes to select. Defaults to the display members.
+
+        Returns:
+            Tuple[Select, List[RowMapping]]: Select of the model with the filters (not executed, for the count) and the rows
+        """
+        model = cast(BaseModel, self.model)
+        query = model.filters_query(session, filters, search_filters, search_method, order_by, order_dir)
+        statement = model.rows_query(filters, search_filters, search_method, order_by, order_dir, columns)
+        cache = self.get_query_cache()
+        if cache is None:
+            return query, model.fetch_rows(session, statement, paginate, page, per_page)
+
+        key = make_cache_key('rows', filters, search_filters, search_method, order_by, order_dir, paginate, page, per_page, tuple(columns or ()))
+        return query, cache.get_or_load(key, lambda: model.fetch_rows(session, statement, paginate, page, per_page))
+
+    def aggregate(self, session: Session, filters: List[dict], group_by: List[str], aggregates: List[AggregateExpression], bucket: DateBucket | None = None, search_filters: dict = {}, search_method='AND', limit: int | None = None) -> List[RowMapping]:
+        """ Groups of the rows that match the filters with their aggregates, computed by the database in a single query
+
+        Args:
+            session (Session): Database session
+            filters (List[dict]): Filters to apply with AND logic
+            group_by (List[str]): Columns of the groups
+            aggregates (List[AggregateExpression]): Aggregates of each group
+            bucket (DateBucket | None, optional): Date column grouped by interval. Defaults to None.
+            limit (int | None, optional): Max groups. Defaults to None.
+
+        Raises:
+            ValueError: The columns can't be aggregated (see BaseModel.aggregate_query)
+
+        Returns:
+            List[RowMapping]: One row per group
+        """
+        model = cast(BaseModel, self.model)
+        statement = model.aggregate_query(filters, group_by, aggregates, bucket, search_filters, search_method, limit)
+        cache = self.get_query_cache()
+        if cache is None:
+            return model.fetch_rows(session, statement)
+
+        key = make_cache_key('aggregate', filters, search_filters, search_method, tuple(group_by), tuple(aggregates), bucket, limit)
+        return cache.get_or_load(key, lambda: model.fetch_rows(session, statement))
+
+    def get_changes(self, session: Session, since: tuple, filters: List[dict], search_filters: dict = {}, search_method='AND', limit: int = SYNC_PAGE_SIZE) -> Tuple[List[dict], tuple, bool]:
+        """ Page of the delta sync: rows changed after the watermark, soft deleted ones as tombstones (core_db.sync)
+
+        Args:
+            session (Session): Database session
+            since (tuple): Decoded watermark (updated at, id)
+            filters (List[dict]): Filters to apply with AND logic (without the soft delete filter)
+            limit (int, optional): Max changes. Defaults to SYNC_PAGE_SIZE.
+
+        Returns:
+            Tuple[List[dict], tuple, bool]: Changes, next watermark and whether there are more changes
+        """
+        model = cast(BaseModel, self.model)
+        statement = model.sync_query(since, filters, search_filters, search_method, limit + 1)
+        cache = self.get_query_cache()
+        if cache is None:
+            rows = model.fetch_rows(session, statement)
+        else:
+            key = make_cache_key('sync', since, filters, search_filters, search_method, limit)
+            rows = cache.get_or_load(key, lambda: model.fetch_rows(session, statement))
+        return split_changes(rows, model.property_map().get('id', 'id'), since, limit)
+
+    def export(self, session: Session, writer: ExportWriter, filters: List[dict], columns: List[ExportColumn], search_filters: dict = {}, search_method='AND', paginate = False, page = 1, per_page = 10, order_by: str=None, order_dir: str="asc", batch_rows: int = EXPORT_BATCH_ROWS, on_batch: Callable[[int], None] | None = None) -> int:
+        """ Write the rows that match the filters to an export writer, reading them from the cursor in batches
+        (the results are not cached)
+
+        Args:
+            session (Session): Database session
+            writer (ExportWriter): Writer of the format
+            filters (List[dict]): Filters to apply with AND logic
+            columns (List[ExportColumn]): Exported columns
+            batch_rows (int, optional): Rows per batch. Defaults to EXPORT_BATCH_ROWS.
+            on_batch (Callable[[int], None] | None, optional): Called with the rows written after each batch (progress). Defaults to None.
+
+        Returns:
+            int: Exported rows
+        """
+        statement, row_export = export_query(self.model, columns, filters, search_filters, search_method, order_by, order_dir)
+        if paginate:
+            statement = statement.limit(per_page).offset((page - 1) * per_page)
+
+        rows = 0
+        for batch in iter_batches(session, statement, columns, row_export, batch_rows):
+            writer.write_batch(batch)
+            rows += len(batch)
+            if on_batch is not None:
+                on_batch(rows)
+        return rows
+
+    def get_id_range(self, session: Session, filters: List[dict], search_filters: dict = {}, search_method='AND') -> tuple:
+        """ Identifiers range and count of the rows that match the filters (not cached, export jobs plan with it)
+
+        Returns:
+            tuple: (min id, max id, count)
+        """
+        return cast(BaseModel, self.model).id_range_with_filters(session, filters, search_filters, search_method)
+
+    def count_with_query(self, query: Select | Query, session: Session | None = None) -> int:
+        """ Count the rows of a select returned by the filter methods
+
+        Args:
+            query (Select | Query): Select of the model (a legacy Query counts with its own session)
+            session (Session | None, optional): Database session, required for a Select. Defaults to None.
+
+        Raises:
+            TypeError: A Select without session (the filter methods return a Select since the select() port)
+
+        Returns:
+            int: Number of rows
+        """
+        if isinstance(query, Query):
+            count = query.count
+        elif session is None:
+            raise TypeError("count_with_query needs the session to count a Select: count_with_query(query, session)")
+        else:
+            def count() -> int:
+                return cast(BaseModel, self.model).count_query(session, query)
+
+        cache = self.get_query_cache()
+        if cache is None:
+            return count()
+
+        statement = (query.statement if isinstance(query, Query) else query).compile()
+        key = make_cache_key('count', str(statement), statement.params)
+        return cache.get_or_load(key, count)
     
     def count_elements(self, session: Session) -> int:
         return cast(BaseModel, self.model).count(session)
     
     def count_filtered(self, session: Session, filters: List[dict]) -> int:
         return cast(BaseModel, self.model).count_with_filters(session, filters)
+
+    def get_version(self, session: Session, filters: List[dict], search_filters: dict = {}, search_method='AND') -> tuple:
+        cache = self.get_query_cache()
+        if cache is None:
+            return cast(BaseModel, self.model).version_with_filters(session, filters, search_filters, search_method)
+        key = make_cache_key('version', filters, search_filters, search_method)
+        return cache.get_or_load(key, lambda: cast(BaseModel, self.model).version_with_filters(session, filters, search_filters, search_method))
+
+    def get_version_by_id(self, session: Session, id: int) -> tuple | None:
+        cache = self.get_query_cache()
+        if cache is None:
+            return cast(BaseModel, self.model).version_of(session, id)
+        return cache.get_or_load(make_cache_key('version_of', str(id)), lambda: cast(BaseModel, self.model).version_of(session, id))
     
+    @retry_transient
     def insert_register(self, session: Session, input_data: dict):
         input_params = {}
         for ipKey in input_data.keys():
             if ipKey in self.get_display_members():
                 input_params[ipKey] = input_data[ipKey]
         obj = self.model(**input_params)
+        use_primary(session)
         return cast(BaseModel, obj).save(session, **input_data)
     
+    @retry_transient
     def update_register(self, session: Session, id: int, update_data: dict):
-        obj = self.get_one(session, id)
+        # The row that is going to be written is read from the primary, replicas may lag behind
+        use_primary(session)
+        obj = cast(BaseModel, self.model).find(session, id)
         return cast(BaseModel, obj).update(session, update_data)
     
+    @retry_transient
     def delete_register(self, session: Session, id: int):
-        obj = self.get_one(session, id)
+        use_primary(session)
+        obj = cast(BaseModel, self.model).find(session, id)
         cast(BaseModel, obj).delete(session)
         return obj
 
+    @retry_transient
     def soft_delete_register(self, session: Session, id: int):
-        obj = self.get_one(session, id)
+        use_primary(session)
+        obj = cast(BaseModel, self.model).find(session, id)
         cast(BaseModel, obj).soft_delete(session)
         return obj
     
@@ -119,8 +304,20 @@ class BaseService:
     def get_search_columns(self) -> List[str]:
         return cast(BaseModel, self.model).search_columns
 
+    def get_search_mode(self, column_name: str) -> str:
+        return cast(BaseModel, self.model).get_search_mode(column_name)
+
     def get_relationship_names(self) -> List[str]:
         return cast(BaseModel, self.model).relationship_names
     
     def has_soft_delete(self) -> bool:
         return cast(BaseModel, self.model).has_soft_delete()
+
+    def has_updated_at(self) -> bool:
+        return cast(BaseModel, self.model).has_updated_at()
+
+    def get_cache_control(self) -> str | None:
+        return self.cache_control
+
+    def use_row_mode(self) -> bool:
+        return self.row_mode
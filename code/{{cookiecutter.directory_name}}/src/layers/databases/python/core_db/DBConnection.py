@@ -1,13 +1,19 @@
 import json
 import decimal
 import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm.session import Session as ORMSession
 
 from core_db.config import DBConfig, CONNECTIONS
+from core_db.replicas import ReplicaPool, RoutingSession
+from core_db.instrumentation import instrument_engine
+from core_db.deadlines import apply_deadlines
+from core_db.admission import get_admission_controller
+from core_utils.priming import register_warmer, register_after_restore
 
 CONNECTION_HANDLERS: dict[str, 'DBConnection'] = {}
 
@@ -20,6 +26,7 @@ class DBConnection:
         
         self.config: DBConfig | None = None
         self.engine: Engine | None = None
+        self.replicas: ReplicaPool | None = None
         self.session: ORMSession | None = None
 
         if self.config_name not in CONNECTION_HANDLERS:
@@ -32,23 +39,93 @@ class DBConnection:
             CONNECTION_HANDLERS[self.config_name].config = DBConfig.get_config(conn_name=config_name, secret_name=secret_name, prefix=prefix)
 
         if not CONNECTION_HANDLERS[self.config_name].engine:
-            CONNECTION_HANDLERS[self.config_name].engine = create_engine(**CONNECTION_HANDLERS[self.config_name].config.get_engine_config())
+            CONNECTION_HANDLERS[self.config_name].engine = self.create_engine(CONNECTION_HANDLERS[self.config_name].config.get_engine_config())
 
         if not CONNECTION_HANDLERS[self.config_name].session:
-            CONNECTION_HANDLERS[self.config_name].session = sessionmaker(CONNECTION_HANDLERS[self.config_name].engine)
+            CONNECTION_HANDLERS[self.config_name].session = self.build_sessionmaker()
+
+    def build_sessionmaker(self) -> sessionmaker:
+        """ Session factory of the connection. When the configuration declares read replicas the sessions route
+        the reads to them and the writes to the primary
+
+        Returns:
+            sessionmaker: Session factory
+        """
+        handler = CONNECTION_HANDLERS[self.config_name]
+        config = handler.config
+        if config is None or not config.has_replicas():
+            return sessionmaker(self.get_engine())
+
+        if handler.replicas is None:
+            handler.replicas = ReplicaPool(
+                [self.create_engine(engine_config) for engine_config in config.get_replica_engine_configs()],
+                eject_seconds=config.DATABASE_REPLICA_EJECT_SECONDS
+            )
+        return sessionmaker(
+            self.get_engine(),
+            class_=RoutingSession,
+            replicas=handler.replicas,
+            config_name=self.config_name,
+            read_your_writes=config.DATABASE_READ_YOUR_WRITES
+        )
+
+    def create_engine(self, engine_config: dict) -> Engine:
+        engine = create_engine(**engine_config)
+        if CONNECTION_HANDLERS[self.config_name].config.DATABASE_INSTRUMENTATION:
+            instrument_engine(engine)
+        if CONNECTION_HANDLERS[self.config_name].config.DATABASE_STATEMENT_TIMEOUTS:
+            apply_deadlines(engine)
+        if CONNECTION_HANDLERS[self.config_name].config.DATABASE_ADMISSION_CONTROL:
+            get_admission_controller(self.config_name, CONNECTION_HANDLERS[self.config_name].config).register(engine)
+        return engine
 
     def get_engine(self) -> Engine:
         if not CONNECTION_HANDLERS[self.config_name].engine:
-            CONNECTION_HANDLERS[self.config_name].engine = create_engine(**CONNECTION_HANDLERS[self.config_name].config.get_engine_config())
+            CONNECTION_HANDLERS[self.config_name].engine = self.create_engine(CONNECTION_HANDLERS[self.config_name].config.get_engine_config())
         return CONNECTION_HANDLERS[self.config_name].engine
 
+    def get_engines(self) -> list[Engine]:
+        """ Engine of the primary and of the read replicas """
+        handler = CONNECTION_HANDLERS[self.config_name]
+        return [self.get_engine()] + (list(handler.replicas.engines) if handler.replicas is not None else [])
+
+    def ping(self) -> None:
+        """ Open a connection of each engine with a dummy query, the pool keeps it for the first requests """
+        self.get_session().close()
+        for engine in self.get_engines():
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
     def get_session(self) -> ORMSession:
         if not CONNECTION_HANDLERS[self.config_name].session:
-            CONNECTION_HANDLERS[self.config_name].session = sessionmaker(self.get_engine())
+            CONNECTION_HANDLERS[self.config_name].session = self.build_sessionmaker()
         return CONNECTION_HANDLERS[self.config_name].session(expire_on_commit=False)
 
-for conn_name in CONNECTIONS.keys():
-    DBConnection(**CONNECTIONS[conn_name])
+def init_connections() -> None:
+    """ Create the engine of every configured connection. The connections are otherwise created on first use,
+    call it in the init phase of the function to move that cost out of the first request
+    """
+    for conn_name in CONNECTIONS.keys():
+        DBConnection(**CONNECTIONS[conn_name])
+
+@register_warmer('database')
+def warm_connections() -> None:
+    """ Warmer of core_utils.priming: engines, secrets of the configuration and one open connection per engine """
+    init_connections()
+    for conn_name in list(CONNECTION_HANDLERS.keys()):
+        CONNECTION_HANDLERS[conn_name].ping()
+
+@register_after_restore('database')
+def reset_connections() -> None:
+    """ The connections of a SnapStart snapshot are dead after the restore: the pools are discarded (without closing
+    the sockets of the snapshot) and new connections are opened
+    """
+    for handler in CONNECTION_HANDLERS.values():
+        if handler.engine is None:
+            continue
+        for engine in handler.get_engines():
+            engine.dispose(close=False)
+        handler.ping()
 
 class AlchemyEncoder(json.JSONEncoder):
     """ Based on: https://stackoverflow.com/questions/5022066/how-to-serialize-sqlalchemy-result-to-json/41204271 """
@@ -61,18 +138,22 @@ class AlchemyEncoder(json.JSONEncoder):
                 try:
                     if isinstance(data, (datetime.datetime, datetime.date, datetime.time)):
                         data = data.isoformat()
+                    elif isinstance(data, decimal.Decimal):
+                        data = self.default(data)
                     else:
                         json.dumps(data)
                     fields[prop_map_obj[field] if field in prop_map_obj else field] = data
                 except TypeError:
                     fields[field] = None
             return fields
+        if isinstance(obj, RowMapping):
+            return dict(obj)
         if isinstance(obj, decimal.Decimal):
             if obj % 1 > 0:
                 return float(obj)
             else:
                 return int(obj)
-        if isinstance(obj, (datetime.date, datetime.datetime)):
+        if isinstance(obj, (datetime.date, datetime.datetime, datetime.time)):
             return obj.isoformat()
         return json.JSONEncoder.default(self, obj)
 
@@ -102,6 +183,8 @@ class AlchemyRelationEncoder(json.JSONEncoder):
                 try:
                     if isinstance(data, (datetime.datetime, datetime.date, datetime.time)):
                         data = data.isoformat()
+                    elif isinstance(data, decimal.Decimal):
+                        data = self.default(data)
                     elif isinstance(data, DeclarativeBase):
                         # Use a shallow clone with reduced depth
                         data = json.loads(json.dumps(
@@ -0,0 +1,285 @@
+"""
+Admission control of the database connections. Each connection keeps, in the container, the time its sessions wait
+for a connection (pool checkout plus connect when the pool opens a new one, e.g. queued by an RDS Proxy), the
+statements in flight and a circuit breaker of the connection errors:
+
+- Overloaded (recent checkout wait over the limit or too many statements in flight): the low priority requests
+  (exports, deep pages) are rejected with LoadShed so the capacity goes to the rest.
+- Circuit open (consecutive connection errors): every request fails fast with CircuitOpen until the reset time,
+  then one request probes the database and its result closes or reopens the circuit.
+
+The core_http controllers check it with @admission_handler before opening their session.
+"""
+import math
+import time
+import weakref
+import threading
+from enum import IntEnum
+
+from aws_lambda_powertools import Logger
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm.session import Session as ORMSession
+
+from core_utils.environment import env
+
+LOGGER = Logger('layers.core.core_db.admission')
+
+## Retry-After (seconds) of the shed requests
+ADMISSION_RETRY_AFTER = env("ADMISSION_RETRY_AFTER", 2)
+## Weight of the last checkout in the average wait
+CHECKOUT_WAIT_SMOOTHING = 0.3
+## Seconds that a checkout wait counts as recent, an idle connection is not kept as overloaded
+CHECKOUT_WAIT_WINDOW_SECONDS = 10
+
+CHECKOUT_START_KEY = 'core_db_checkout_start'
+IN_FLIGHT_KEY = 'core_db_in_flight'
+
+## Admission controller by connection name and by engine (primary and replicas, weak keys: disposed engines go away)
+ADMISSION_CONTROLLERS: dict[str, 'AdmissionController'] = {}
+_ENGINE_CONTROLLERS: 'weakref.WeakKeyDictionary[Engine, AdmissionController]' = weakref.WeakKeyDictionary()
+
+_SESSION_EVENTS = False
+
+
+class Priority(IntEnum):
+    """ Priority of a request, only LOW requests are shed when the database is overloaded """
+    LOW = 0
+    NORMAL = 1
+
+
+class AdmissionRejected(Exception):
+    """ The request is not admitted, the client can retry after retry_after seconds """
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LoadShed(AdmissionRejected):
+    """ Low priority request rejected while the database is overloaded """
+
+
+class CircuitOpen(AdmissionRejected):
+    """ Request rejected without trying the database after consecutive connection errors """
+
+
+class CircuitBreaker:
+    """ Circuit of the connection errors: closed -> open after failure_threshold consecutive errors -> half open
+    after reset_seconds, where one probe closes it on success or reopens it on failure
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 15) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """ Check if a request can use the database, moving to half open (one probe) once the reset time passed """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self.probe_started_at = now
+                LOGGER.info("Circuit half open, probing the database")
+                return True
+            # A probe that never reported (e.g. the invocation timed out) is replaced after the reset time
+            if self.state == self.HALF_OPEN and now - self.probe_started_at >= self.reset_seconds:
+                self.probe_started_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                LOGGER.info("Circuit closed, the database is reachable")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                LOGGER.warning(f"Circuit open for {self.reset_seconds}s after {self.failures} connection errors")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def retry_after(self) -> int:
+        """ Seconds until the next probe """
+        remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining))
+
+
+class AdmissionController:
+    """ Load of a database connection in the container and the decision to admit a request
+
+    Args:
+        name (str): Connection name
+        max_wait_ms (float, optional): Average checkout wait that marks the connection as overloaded. Defaults to 200.
+        max_in_flight (int, optional): Statements in flight that mark it as overloaded (0 disables it). Defaults to 0.
+        failure_threshold (int, optional): Consecutive connection errors that open the circuit. Defaults to 5.
+        reset_seconds (float, optional): Seconds of open circuit before the probe. Defaults to 15.
+    """
+
+    def __init__(self, name: str, max_wait_ms: float = 200, max_in_flight: int = 0, failure_threshold: int = 5, reset_seconds: float = 15) -> None:
+        self.name = name
+        self.max_wait_ms = max_wait_ms
+        self.max_in_flight = max_in_flight
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.checkout_wait_ms = 0.0
+        self.last_checkout_at = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def register(self, engine: Engine) -> Engine:
+        """ Track the checkouts, statements and connection errors of an engine (once per engine)
+
+        Args:
+            engine (Engine): Sync engine (use AsyncEngine.sync_engine for async engines)
+
+        Returns:
+            Engine: Same engine
+        """
+        _register_session_events()
+        if engine in _ENGINE_CONTROLLERS:
+            return engine
+        _ENGINE_CONTROLLERS[engine] = self
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+        return engine
+
+    def observe_checkout(self, wait_ms: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self.last_checkout_at > CHECKOUT_WAIT_WINDOW_SECONDS:
+                self.checkout_wait_ms = wait_ms
+            else:
+                self.checkout_wait_ms += CHECKOUT_WAIT_SMOOTHING * (wait_ms - self.checkout_wait_ms)
+            self.last_checkout_at = now
+
+    def statement_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def statement_finished(self) -> None:
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def overload_reason(self) -> str | None:
+        """ Reason why the connection is overloaded, None when it isn't """
+        recent = time.monotonic() - self.last_checkout_at <= CHECKOUT_WAIT_WINDOW_SECONDS
+        if recent and self.checkout_wait_ms > self.max_wait_ms:
+            return f"checkout wait {self.checkout_wait_ms:.0f} ms"
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return f"{self.in_flight} statements in flight"
+        return None
+
+    def admit(self, priority: Priority = Priority.NORMAL) -> None:
+        """ Admit a request or raise the reason of the rejection
+
+        Args:
+            priority (Priority, optional): Priority of the request. Defaults to Priority.NORMAL.
+
+        Raises:
+            LoadShed: Low priority request while the connection is overloaded
+            CircuitOpen: The circuit of the connection is open
+        """
+        if priority < Priority.NORMAL:
+            reason = self.overload_reason()
+            if reason is not None:
+                raise LoadShed(f"Database connection {self.name} overloaded ({reason})", ADMISSION_RETRY_AFTER)
+        if not self.breaker.allow():
+            raise CircuitOpen(f"Database connection {self.name} unavailable", self.breaker.retry_after())
+
+    def summary(self) -> dict:
+        return {
+            'db_circuit': self.breaker.state,
+            'db_checkout_wait_ms': round(self.checkout_wait_ms, 2),
+            'db_in_flight': self.in_flight,
+        }
+
+
+def get_admission_controller(config_name: str, config=None) -> AdmissionController | None:
+    """ Admission controller of a connection, created from its DBConfig on first use
+
+    Args:
+        config_name (str): Connection name
+        config (DBConfig, optional): Configuration of the connection. Defaults to None.
+
+    Returns:
+        AdmissionController | None: Controller or None if the connection has none yet
+    """
+    if config_name not in ADMISSION_CONTROLLERS and config is not None:
+        ADMISSION_CONTROLLERS[config_name] = AdmissionController(
+            config_name,
+            max_wait_ms=config.DATABASE_ADMISSION_MAX_WAIT_MS,
+            max_in_flight=config.DATABASE_ADMISSION_MAX_IN_FLIGHT,
+            failure_threshold=config.DATABASE_CIRCUIT_FAILURES,
+            reset_seconds=config.DATABASE_CIRCUIT_RESET_SECONDS
+        )
+    return ADMISSION_CONTROLLERS.get(config_name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    controller = _ENGINE_CONTROLLERS.get(conn.engine)
+    if controller is not None and not conn.info.get(IN_FLIGHT_KEY):
+        conn.info[IN_FLIGHT_KEY] = True
+        controller.statement_started()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    controller = _ENGINE_CONTROLLERS.get(conn.engine)
+    if controller is not None and conn.info.pop(IN_FLIGHT_KEY, False):
+        controller.statement_finished()
+
+
+def _handle_error(context):
+    controller = _ENGINE_CONTROLLERS.get(context.engine)
+    if controller is None:
+        return
+    if context.connection is not None and context.connection.info.pop(IN_FLIGHT_KEY, False):
+        controller.statement_finished()
+    # The database can't be reached: the connect failed or the connection was lost
+    if context.connection is None or context.is_disconnect:
+        controller.breaker.record_failure()
+
+
+def _after_transaction_create(session, transaction):
+    if transaction.parent is None and CHECKOUT_START_KEY not in session.info:
+        session.info[CHECKOUT_START_KEY] = time.perf_counter()
+
+
+def _after_begin(session, transaction, connection):
+    start = session.info.pop(CHECKOUT_START_KEY, None)
+    controller = _ENGINE_CONTROLLERS.get(connection.engine)
+    if controller is None:
+        return
+    if start is not None:
+        controller.observe_checkout((time.perf_counter() - start) * 1000)
+    controller.breaker.record_success()
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(CHECKOUT_START_KEY, None)
+
+
+def _register_session_events() -> None:
+    # The checkout wait is the time between the start of the session transaction and its connection
+    global _SESSION_EVENTS
+    if _SESSION_EVENTS:
+        return
+    _SESSION_EVENTS = True
+    event.listen(ORMSession, 'after_transaction_create', _after_transaction_create)
+    event.listen(ORMSession, 'after_begin', _after_begin)
+    event.listen(ORMSession, 'after_transaction_end', _after_transaction_end)
@@ -0,0 +1,122 @@
+"""
+Aggregations pushed down to the database: the groups, their aggregates and the date buckets are computed by a
+single GROUP BY over the filtered rows, only the groups travel to the function.
+
+Date buckets are returned as text with the start of the interval in the time zone of the database
+(hour "2024-05-01 13:00:00", day/week/month/year "2024-05-01", weeks start on Monday).
+"""
+from typing import Any
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, func, literal
+from sqlalchemy.sql.elements import ColumnElement
+
+from core_utils.aggregates import AggregateExpression, DateBucket
+from core_utils.constants import AGGREGATE_NUMERIC_FUNCTIONS
+from core_utils.environment import env
+
+## Max groups returned by an aggregation, the rest are cut (X-Partial-Result: groups)
+AGGREGATE_MAX_GROUPS = env("AGGREGATE_MAX_GROUPS", 1000)
+
+_FUNCTIONS = {
+    'count': func.count,
+    'sum': func.sum,
+    'avg': func.avg,
+    'min': func.min,
+    'max': func.max,
+}
+
+## Format of the start of each interval by dialect
+_MYSQL_FORMATS = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m-01',
+    'year': '%Y-01-01',
+}
+_SQLITE_FORMATS = _MYSQL_FORMATS
+_POSTGRESQL_FORMATS = {
+    'hour': 'YYYY-MM-DD HH24:00:00',
+    'day': 'YYYY-MM-DD',
+    'week': 'YYYY-MM-DD',
+    'month': 'YYYY-MM-DD',
+    'year': 'YYYY-MM-DD',
+}
+
+
+def _constant(value: str) -> ColumnElement:
+    # Rendered in the SQL: the expression of the bucket is the same in the SELECT and in the GROUP BY, also with
+    # drivers that send the parameters apart (asyncpg)
+    return literal(value, literal_execute=True)
+
+
+def get_column(model: Any, name: str) -> Any:
+    """ Mapped column of a model
+
+    Raises:
+        ValueError: The model doesn't have the column
+    """
+    if name not in model.__mapper__.column_attrs:
+        raise ValueError(f"Unknown column {name}")
+    return getattr(model, name)
+
+
+def aggregate_column(model: Any, aggregate: AggregateExpression) -> ColumnElement:
+    """ Aggregate function of a column labeled with the key of the response
+
+    Args:
+        model (Any): Model class
+        aggregate (AggregateExpression): Parsed aggregate
+
+    Raises:
+        ValueError: Unknown column or numeric function over a column that is not numeric
+
+    Returns:
+        ColumnElement: Labeled aggregate
+    """
+    if aggregate.column is None:
+        return func.count().label(aggregate.label)
+
+    column = get_column(model, aggregate.column)
+    if aggregate.function in AGGREGATE_NUMERIC_FUNCTIONS and not isinstance(column.type, (Integer, Numeric)):
+        raise ValueError(f"The aggregate {aggregate.label} needs a numeric column")
+    return _FUNCTIONS[aggregate.function](column).label(aggregate.label)
+
+
+def date_bucket(column: Any, interval: str, dialect: str) -> ColumnElement:
+    """ Start of the interval of a date column, as text
+
+    Args:
+        column (Any): Date or datetime column
+        interval (str): hour, day, week, month or year
+        dialect (str): Dialect of the database
+
+    Raises:
+        ValueError: The column is not a date or the dialect is not supported
+
+    Returns:
+        ColumnElement: Bucket expression
+    """
+    if not isinstance(column.type, (Date, DateTime)):
+        raise ValueError(f"The bucket {column.key} needs a date column")
+
+    if dialect in ('mysql', 'mariadb'):
+        # WEEKDAY is 0 on Monday
+        value = func.subdate(column, func.weekday(column)) if interval == 'week' else column
+        return func.date_format(value, _constant(_MYSQL_FORMATS[interval]))
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc(_constant(interval), column), _constant(_POSTGRESQL_FORMATS[interval]))
+    if dialect == 'sqlite':
+        if interval == 'week':
+            # Next Sunday (or the same day) minus six days is the Monday of the week
+            return func.date(column, _constant('weekday 0'), _constant('-6 days'))
+        return func.strftime(_constant(_SQLITE_FORMATS[interval]), column)
+    raise ValueError(f"Date buckets are not supported in {dialect}")
+
+
+def bucket_column(model: Any, bucket: DateBucket, dialect: str, label: str) -> ColumnElement:
+    """ Labeled date bucket of a column of the model
+
+    Raises:
+        ValueError: Unknown column, not a date or dialect not supported
+    """
+    return date_bucket(get_column(model, bucket.column), bucket.interval, dialect).label(label)
@@ -0,0 +1,450 @@
+import time
+import uuid
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from aws_lambda_powertools import Logger
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row, RowMapping
+from sqlalchemy.orm import InstanceState, Mapper, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from .cache_backends import CacheBackend, get_shared_cache_backend
+
+LOGGER = Logger('layers.core.core_db.cache')
+
+SHARED_CACHE_PREFIX = "core_db"
+
+## Caches by model name, they live as long as the container (warm invocations share them)
+QUERY_CACHES: dict[str, 'QueryCache'] = {}
+
+_MISSING = object()
+
+
+class QueryCache:
+    """ Read-through cache of query results with TTL and size-bounded LRU eviction.
+
+    It is meant for reference data (catalogs, statuses) that changes rarely: each container keeps its own copy,
+    so writes made by other containers are only seen after the TTL expires. ORM results are stored as plain
+    copies (snapshot_instances) and merged back into the session of each request (restore_instances).
+    """
+
+    def __init__(self, name: str, ttl: int, max_size: int = 256, shared: 'SharedQueryCache | None' = None) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.shared = shared
+
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ Get a value from the cache if it is not expired
+
+        Args:
+            key (Hashable): Normalized key of the query
+            default (Any, optional): Value to return when the key is not cached. Defaults to None.
+
+        Returns:
+            Any: Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """ Store a value in the cache evicting the least recently used entries when it is full
+
+        Args:
+            key (Hashable): Normalized key of the query
+            value (Any): Query result
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """ Get the value from the cache or load it with the loader and store it.
+        When the model has a shared cache, misses are resolved through it before going to the database
+
+        Args:
+            key (Hashable): Normalized key of the query
+            loader (Callable[[], Any]): Function that executes the query
+
+        Returns:
+            Any: Query result
+        """
+        value = self.get(key, _MISSING) if self.ttl > 0 else _MISSING
+        if value is _MISSING:
+            value = self.shared.get_or_load(key, loader) if self.shared is not None else loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self) -> None:
+        """ Remove all the entries of the cache (and bump the version of the shared cache) """
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+        if self.shared is not None:
+            self.shared.invalidate()
+
+    def stats(self) -> dict:
+        """ Counters of the cache
+
+        Returns:
+            dict: Hits, misses, evictions, invalidations and size of the cache
+        """
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'shared': self.shared.stats() if self.shared is not None else None
+        }
+
+
+class SharedQueryCache:
+    """ Second level cache shared by all the containers (Redis/ElastiCache).
+
+    Keys are namespaced with a version per model, so a write invalidates every cached query of the model by bumping
+    the version. Values keep a soft expiration: when it passes, a single container (the one that takes the lock)
+    recomputes the key while the rest keep serving the stale value, and when the key doesn't exist the other
+    containers wait for the one recomputing it instead of querying the database.
+
+    Values are converted to plain python types (plain_value) and pickled, the backend must be a private store of
+    the application.
+    """
+
+    def __init__(self, name: str, backend: CacheBackend, ttl: int, stale_ttl: int | None = None, lock_timeout: float = 5.0, wait_interval: float = 0.05) -> None:
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl if stale_ttl is not None else ttl
+        self.lock_timeout = lock_timeout
+        self.wait_interval = wait_interval
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @property
+    def version_key(self) -> str:
+        return f"{SHARED_CACHE_PREFIX}:{self.name}:version"
+
+    def _data_key(self, key: Hashable) -> str:
+        version = self.backend.get(self.version_key)
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return f"{SHARED_CACHE_PREFIX}:{self.name}:v{int(version or 0)}:{digest}"
+
+    def _read(self, data_key: str):
+        raw = self.backend.get(data_key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def _load_and_store(self, data_key: str, loader: Callable[[], Any]) -> Any:
+        value = loader()
+        try:
+            value = plain_value(value)
+            payload = pickle.dumps((time.time() + self.ttl, value), protocol=pickle.HIGHEST_PROTOCOL)
+            self.backend.set(data_key, payload, self.ttl + self.stale_ttl)
+        except Exception:
+            LOGGER.exception(f"Cannot store the result in the shared cache {self.name}")
+            self.errors += 1
+        return value
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """ Get the value from the shared cache, coalescing the recomputation between containers
+
+        Args:
+            key (Hashable): Normalized key of the query
+            loader (Callable[[], Any]): Function that executes the query
+
+        Returns:
+            Any: Query result
+        """
+        try:
+            data_key = self._data_key(key)
+            entry = self._read(data_key)
+        except Exception:
+            LOGGER.exception(f"Shared cache {self.name} is not available")
+            self.errors += 1
+            return loader()
+
+        if entry is not None and entry[0] >= time.time():
+            self.hits += 1
+            return entry[1]
+
+        lock_key = f"{data_key}:lock"
+        token = uuid.uuid4().hex.encode()
+        try:
+            acquired = self.backend.add(lock_key, token, int(self.lock_timeout) + 1)
+        except Exception:
+            LOGGER.exception(f"Shared cache {self.name} is not available")
+            self.errors += 1
+            return loader()
+
+        if acquired:
+            self.misses += 1
+            try:
+                return self._load_and_store(data_key, loader)
+            finally:
+                try:
+                    if self.backend.get(lock_key) == token:
+                        self.backend.delete(lock_key)
+                except Exception:
+                    LOGGER.exception(f"Cannot release the lock of the shared cache {self.name}")
+
+        if entry is not None:
+            # Other container is recomputing the key, the stale value is still useful
+            self.stale_hits += 1
+            return entry[1]
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.wait_interval)
+            try:
+                entry = self._read(data_key)
+            except Exception:
+                LOGGER.exception(f"Shared cache {self.name} is not available")
+                self.errors += 1
+                return loader()
+            if entry is not None:
+                self.coalesced += 1
+                return entry[1]
+
+        self.misses += 1
+        return self._load_and_store(data_key, loader)
+
+    def invalidate(self) -> None:
+        """ Bump the version of the model namespace, the previous keys are never read again and expire by TTL """
+        try:
+            self.backend.incr(self.version_key)
+        except Exception:
+            LOGGER.exception(f"Cannot invalidate the shared cache {self.name}")
+            self.errors += 1
+
+    def stats(self) -> dict:
+        """ Counters of the shared cache in this container
+
+        Returns:
+            dict: Hits, stale hits, misses, coalesced waits and errors
+        """
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'ttl': self.ttl
+        }
+
+
+def get_query_cache(name: str, ttl: int, max_size: int = 256, shared_ttl: int = 0) -> QueryCache | None:
+    """ Get (or create) the cache of a model. Caching is disabled when both ttl are 0
+
+    Args:
+        name (str): Cache name (model name)
+        ttl (int): Seconds that a result is valid in the container
+        max_size (int, optional): Max number of results stored in the container. Defaults to 256.
+        shared_ttl (int, optional): Seconds that a result is valid in the shared cache
+            (DATABASE_SHARED_CACHE_URL). Defaults to 0.
+
+    Returns:
+        QueryCache | None: Cache of the model or None if it is disabled
+    """
+    if name in QUERY_CACHES:
+        return QUERY_CACHES[name]
+
+    shared = None
+    if shared_ttl and shared_ttl > 0:
+        backend = get_shared_cache_backend()
+        if backend is not None:
+            shared = SharedQueryCache(name, backend, shared_ttl)
+
+    if (not ttl or ttl <= 0) and shared is None:
+        return None
+    QUERY_CACHES[name] = QueryCache(name, ttl or 0, max_size, shared)
+    return QUERY_CACHES[name]
+
+
+def invalidate_query_cache(name: str) -> None:
+    """ Invalidate the cache of a model, if it exists
+
+    Args:
+        name (str): Cache name (model name)
+    """
+    if name in QUERY_CACHES:
+        LOGGER.debug(f"Invalidating query cache {name}")
+        QUERY_CACHES[name].invalidate()
+
+
+def get_cache_stats() -> list[dict]:
+    """ Counters of all the query caches of the container
+
+    Returns:
+        list[dict]: Stats of each cache
+    """
+    return [cache.stats() for cache in QUERY_CACHES.values()]
+
+
+def plain_value(value: Any, _copies: dict[int, dict] | None = None) -> Any:
+    """ Copy of a query result with plain python types to store it out of the container: row mappings as dicts
+    and rows as tuples. ORM instances are rejected, the services cache them as snapshot_instances copies
+
+    Args:
+        value (Any): Query result
+
+    Raises:
+        TypeError: The result contains ORM instances
+
+    Returns:
+        Any: Plain copy of the result
+    """
+    copies = {} if _copies is None else _copies
+    if isinstance(value, (RowMapping, dict)):
+        # The snapshots of related instances reference each other, the copy keeps the cycles
+        if id(value) in copies:
+            return copies[id(value)]
+        copy = copies[id(value)] = {}
+        copy.update((key, plain_value(item, copies)) for key, item in value.items())
+        return copy
+    if isinstance(value, (Row, tuple)):
+        return tuple(plain_value(item, copies) for item in value)
+    if isinstance(value, list):
+        return [plain_value(item, copies) for item in value]
+    if isinstance(inspect(value, raiseerr=False), InstanceState):
+        raise TypeError(f"ORM instances of {type(value).__name__} can't be stored in the shared cache, use snapshot_instances")
+    return value
+
+
+def snapshot_instances(result: Any) -> Any:
+    """ Plain copy of ORM results (an instance, a list of them or None) to store in the caches: the loaded column
+    values and relationships of each instance. The instances themselves belong to the session that loaded them,
+    which is closed at the end of the request, so they are never cached
+
+    Args:
+        result (Any): Instance, list of instances or None
+
+    Returns:
+        Any: Dict of values per instance (list of them for a list) or None
+    """
+    snapshots: dict[int, dict] = {}
+
+    def snapshot(instance: Any) -> dict:
+        if id(instance) in snapshots:
+            return snapshots[id(instance)]
+
+        state = inspect(instance)
+        values = snapshots[id(instance)] = {}
+        for attribute in state.mapper.column_attrs:
+            if attribute.key in state.dict:
+                values[attribute.key] = state.dict[attribute.key]
+        for relationship in state.mapper.relationships:
+            if relationship.key not in state.dict:
+                continue
+            related = state.dict[relationship.key]
+            if related is None:
+                values[relationship.key] = None
+            elif relationship.uselist:
+                values[relationship.key] = [snapshot(item) for item in related]
+            else:
+                values[relationship.key] = snapshot(related)
+        return values
+
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple)):
+        return [snapshot(instance) for instance in result]
+    return snapshot(result)
+
+
+def restore_instances(session: Session, model: type, cached: Any) -> Any:
+    """ Instances of the caller session from a snapshot_instances copy. They are merged without loading
+    (merge(load=False)), so there are no queries and the lazy loads use the session of the request
+
+    Args:
+        session (Session): Session of the request (the sync_session of an AsyncSession)
+        model (type): Model of the cached instances
+        cached (Any): Copy returned by snapshot_instances
+
+    Returns:
+        Any: Instance, list of instances or None
+    """
+    instances: dict[int, Any] = {}
+
+    def restore(mapper: Mapper, values: dict) -> Any:
+        if id(values) in instances:
+            return instances[id(values)]
+
+        instance = instances[id(values)] = mapper.class_manager.new_instance()
+        for key, value in values.items():
+            relationship = mapper.relationships.get(key)
+            if relationship is not None and value is not None:
+                value = [restore(relationship.mapper, item) for item in value] if relationship.uselist else restore(relationship.mapper, value)
+            set_committed_value(instance, key, value)
+        make_transient_to_detached(instance)
+        return instance
+
+    if cached is None:
+        return None
+    mapper = inspect(model)
+    if isinstance(cached, list):
+        return [session.merge(restore(mapper, values), load=False) for values in cached]
+    return session.merge(restore(mapper, cached), load=False)
+
+
+def make_cache_key(*parts: Any) -> tuple:
+    """ Normalize the arguments of a query (filters, search, order, page) into a hashable key.
+    Dicts and lists are sorted (tuples keep their order) so the same filters in different order share the entry, and mapped columns use their key.
+
+    Returns:
+        tuple: Hashable key
+    """
+    def normalize(value: Any) -> Hashable:
+        if isinstance(value, dict):
+            return tuple(sorted(((str(k), normalize(v)) for k, v in value.items()), key=lambda item: item[0]))
+        if isinstance(value, (list, set, frozenset)):
+            # Filters are combined with AND/OR, their order doesn't change the result
+            return tuple(sorted((normalize(v) for v in value), key=repr))
+        if isinstance(value, tuple):
+            return tuple(normalize(v) for v in value)
+        if hasattr(value, 'key') and hasattr(value, 'class_'):
+            return f"{value.class_.__name__}.{value.key}"
+        if isinstance(value, Hashable):
+            return value
+        return repr(value)
+
+    return tuple(normalize(part) for part in parts)
@@ -0,0 +1,216 @@
+import os
+import time
+import fcntl
+import hashlib
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+from aws_lambda_powertools import Logger
+from core_utils.environment import env
+
+LOGGER = Logger('layers.core.core_db.cache_backends')
+
+## Url of the cache shared between containers: redis://host:6379/0, rediss://..., file:///tmp/query-cache or memory://
+SHARED_CACHE_URL = env("DATABASE_SHARED_CACHE_URL", "")
+
+SHARED_CACHE_BACKEND: 'CacheBackend | None' = None
+
+
+class CacheBackend:
+    """ Minimal protocol of a key/value store used as second level cache (Redis/ElastiCache semantics)
+    """
+
+    def get(self, key: str) -> bytes | None:
+        raise NotImplementedError()
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError()
+
+    def add(self, key: str, value: bytes, ttl: int) -> bool:
+        """ Set the key only if it doesn't exist (SET NX). Used as a lock to coalesce recomputations
+
+        Returns:
+            bool: True if the key was created
+        """
+        raise NotImplementedError()
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError()
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """ In-process stand-in of the shared cache, useful for tests and local development
+    """
+
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[float | None, bytes]] = {}
+        self._lock = threading.RLock()
+
+    def _get_entry(self, key: str):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] < time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._get_entry(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl if ttl else None, value)
+
+    def add(self, key: str, value: bytes, ttl: int) -> bool:
+        with self._lock:
+            if self._get_entry(key) is not None:
+                return False
+            self.set(key, value, ttl)
+            return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._get_entry(key)
+            value = int(entry[1]) + 1 if entry is not None else 1
+            self._data[key] = (entry[0] if entry is not None else None, str(value).encode())
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileCacheBackend(CacheBackend):
+    """ Local-file stand-in of the shared cache: processes in the same host (e.g. several local lambdas) share it
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _read(self, path: Path) -> bytes | None:
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        expires_at, _, value = raw.partition(b"\n")
+        if expires_at and float(expires_at) < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return value
+
+    def _encode(self, value: bytes, ttl: int) -> bytes:
+        return (str(time.time() + ttl).encode() if ttl else b"") + b"\n" + value
+
+    def get(self, key: str) -> bytes | None:
+        return self._read(self._path(key))
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(self._encode(value, ttl))
+        os.replace(tmp_path, path)
+
+    def add(self, key: str, value: bytes, ttl: int) -> bool:
+        path = self._path(key)
+        self._read(path)  # Removes the file if it is expired
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "wb") as file:
+            file.write(self._encode(value, ttl))
+        return True
+
+    def incr(self, key: str) -> int:
+        path = self._path(key)
+        with open(path.with_suffix(".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                current = self._read(path)
+                value = int(current) + 1 if current else 1
+                self.set(key, str(value).encode(), 0)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return value
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+class RedisCacheBackend(CacheBackend):
+    """ Redis/ElastiCache backend. Requires the redis package in the layer
+    """
+
+    def __init__(self, url: str, socket_timeout: float = 0.25) -> None:
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl or None)
+
+    def add(self, key: str, value: bytes, ttl: int) -> bool:
+        return bool(self.client.set(key, value, ex=ttl or None, nx=True))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+def create_cache_backend(url: str) -> CacheBackend | None:
+    """ Build a backend from its url
+
+    Args:
+        url (str): redis://, rediss://, file:// or memory:// url
+
+    Returns:
+        CacheBackend | None: Backend or None if the url is empty
+    """
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    if parsed.scheme in ('redis', 'rediss'):
+        return RedisCacheBackend(url)
+    if parsed.scheme == 'file':
+        return FileCacheBackend(parsed.path)
+    if parsed.scheme == 'memory':
+        return MemoryCacheBackend()
+    raise ValueError(f"Unsupported shared cache url: {url}")
+
+
+def get_shared_cache_backend() -> CacheBackend | None:
+    """ Get the backend configured with DATABASE_SHARED_CACHE_URL (created once per container)
+
+    Returns:
+        CacheBackend | None: Shared backend or None if it is not configured
+    """
+    global SHARED_CACHE_BACKEND
+    if SHARED_CACHE_BACKEND is None and SHARED_CACHE_URL:
+        LOGGER.info(f"Shared query cache backend: {urlparse(SHARED_CACHE_URL).scheme}")
+        SHARED_CACHE_BACKEND = create_cache_backend(SHARED_CACHE_URL)
+    return SHARED_CACHE_BACKEND
+
+
+def set_shared_cache_backend(backend: CacheBackend | None) -> None:
+    """ Replace the shared backend (e.g. a MemoryCacheBackend in tests)
+
+    Args:
+        backend (CacheBackend | None): Backend to use, None to disable the shared cache
+    """
+    global SHARED_CACHE_BACKEND
+    SHARED_CACHE_BACKEND = backend
@@ -1,3 +1,4 @@
+import copy
 from typing import cast, Self
 
 from core_utils.environment import env, APP_NAME, ENVIRONMENT
@@ -10,7 +11,11 @@ CONNECTIONS: dict[str, str] = {
         'config_name': 'default',
         'secret_name': f'{ENVIRONMENT}-{APP_NAME}-{{ cookiecutter.db_secret_name }}',
         'driver': '{{ cookiecutter._dbDriver }}',
-        'prefix': 'DEFAULT'
+        'prefix': 'DEFAULT',
+        # Hosts of the read replicas, they share credentials, port and database with the primary
+        'replicas': [],
+        # Map of tenants to shards ("secret:<name>", "ssm:<name>" or JSON), empty to serve every tenant from this database
+        'tenant_map': ''
     }
 }
 
@@ -20,6 +25,8 @@ class DBConfig:
     def __init__(self, connection_name: str, secret_name:str, prefix = 'default') -> Self:
         LOGGER.info("Database configuration")
         self.conn_name = connection_name
+        # Connection declared in CONNECTIONS, the shards of the tenant routing keep the one they come from
+        self.base_conn_name = connection_name
         self.secret_name = secret_name
         self.prefix = prefix
 
@@ -32,12 +39,29 @@ class DBConfig:
         self.DATABASE_DRIVER               = env(f"{self.prefix}_DATABASE_DRIVER", None)
         self.DATABASE_NAME                 = env(f"{self.prefix}_DATABASE_NAME", None)
         self.DATABASE_CONNECTION_STRING    = env(f"{self.prefix}_DATABASE_CONNECTION_STRING", None)
-        self.DATABASE_DEBUG_MODE           = env(f"{self.prefix}_DATABASE_DEBUG_MODE", True)
+        self.DATABASE_INSTRUMENTATION      = env(f"{self.prefix}_DATABASE_INSTRUMENTATION", True)
+        # Echo of every statement only by default when the statements are not instrumented
+        self.DATABASE_DEBUG_MODE           = env(f"{self.prefix}_DATABASE_DEBUG_MODE", not self.DATABASE_INSTRUMENTATION)
         self.DATABASE_POOL_SIZE            = env(f"{self.prefix}_DATABASE_POOL_SIZE", 20)
         self.DATABASE_MAX_OVERFLOW         = env(f"{self.prefix}_DATABASE_MAX_OVERFLOW", 5)
         self.DATABASE_POOL_RECYCLE         = env(f"{self.prefix}_DATABASE_POOL_RECYCLE", 3600)
         self.DATABASE_POOL_PRE_PING        = env(f"{self.prefix}_DATABASE_POOL_PRE_PING", True)
         self.DATABASE_POOL_USE_LIFO        = env(f"{self.prefix}_DATABASE_POOL_USE_LIFO", True)
+        # Compiled statements kept by each engine, every query shape of the models must fit to avoid recompiling
+        self.DATABASE_QUERY_CACHE_SIZE     = env(f"{self.prefix}_DATABASE_QUERY_CACHE_SIZE", 500)
+        # Server side timeout of the statements from the remaining time of the invocation (core_db.deadlines)
+        self.DATABASE_STATEMENT_TIMEOUTS   = env(f"{self.prefix}_DATABASE_STATEMENT_TIMEOUTS", True)
+        # Load shedding of the low priority requests and circuit breaker of the connection errors (core_db.admission)
+        self.DATABASE_ADMISSION_CONTROL    = env(f"{self.prefix}_DATABASE_ADMISSION_CONTROL", True)
+        self.DATABASE_ADMISSION_MAX_WAIT_MS = env(f"{self.prefix}_DATABASE_ADMISSION_MAX_WAIT_MS", 200)
+        self.DATABASE_ADMISSION_MAX_IN_FLIGHT = env(f"{self.prefix}_DATABASE_ADMISSION_MAX_IN_FLIGHT", 0)
+        self.DATABASE_CIRCUIT_FAILURES     = env(f"{self.prefix}_DATABASE_CIRCUIT_FAILURES", 5)
+        self.DATABASE_CIRCUIT_RESET_SECONDS = env(f"{self.prefix}_DATABASE_CIRCUIT_RESET_SECONDS", 15)
+        self.DATABASE_REPLICA_CONNECTION_STRINGS = env(f"{self.prefix}_DATABASE_REPLICA_CONNECTION_STRINGS", "")
+        self.DATABASE_REPLICA_EJECT_SECONDS = env(f"{self.prefix}_DATABASE_REPLICA_EJECT_SECONDS", 30)
+        self.DATABASE_READ_YOUR_WRITES     = env(f"{self.prefix}_DATABASE_READ_YOUR_WRITES", True)
+        # Tenants -> shards of the connection (core_db.tenancy): "secret:<name>", "ssm:<name>" or the JSON itself
+        self.DATABASE_TENANT_MAP           = env(f"{self.prefix}_DATABASE_TENANT_MAP", CONNECTIONS.get(self.conn_name, {}).get('tenant_map', ''))
         
         if not self.DATABASE_CONNECTION_STRING:
             self.get_db_from_secrets()
@@ -52,14 +76,47 @@ class DBConfig:
         prefix_lower = self.prefix.lower()
         credentials = get_secret(self.secret_name, is_dict=True, use_prefix=False)
         self.DATABASE_ENGINE = credentials.get(f'{prefix_lower}-db-engine', 'mysql')
-        self.DATABASE_DRIVER = CONNECTIONS[self.conn_name]['driver']
+        self.DATABASE_DRIVER = CONNECTIONS[self.base_conn_name]['driver']
         self.DATABASE_USERNAME = credentials.get(f'{prefix_lower}-db-username', 'root')
         self.DATABASE_PASSWORD = credentials.get(f'{prefix_lower}-db-password', 'root')
         self.DATABASE_HOST = credentials.get(f'{prefix_lower}-db-host', 'localhost')
         self.DATABASE_PORT = credentials.get(f'{prefix_lower}-db-port', '3306')
         self.DATABASE_NAME = credentials.get(f'{prefix_lower}-db-name', 'test')
 
-        self.DATABASE_CONNECTION_STRING = f"{self.DATABASE_ENGINE}+{self.DATABASE_DRIVER}://{self.DATABASE_USERNAME}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
+        self.DATABASE_CONNECTION_STRING = self.build_connection_string(self.DATABASE_HOST)
+
+        if not self.DATABASE_REPLICA_CONNECTION_STRINGS:
+            replica_hosts = credentials.get(f'{prefix_lower}-db-replica-hosts', '')
+            declared_hosts = CONNECTIONS[self.base_conn_name].get('replicas', []) if self.conn_name == self.base_conn_name else []
+            replica_hosts = [host.strip() for host in replica_hosts.split(',') if host.strip()] if replica_hosts else declared_hosts
+            self.DATABASE_REPLICA_CONNECTION_STRINGS = ','.join(self.build_connection_string(host) for host in replica_hosts)
+
+    def build_connection_string(self, host: str) -> str:
+        return f"{self.DATABASE_ENGINE}+{self.DATABASE_DRIVER}://{self.DATABASE_USERNAME}:{self.DATABASE_PASSWORD}@{host}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
+
+    def for_shard(self, shard_name: str, shard: dict) -> Self:
+        """ Configuration of a shard of the connection: same pool and layer settings with its own database
+
+        Args:
+            shard_name (str): Shard name
+            shard (dict): 'connection_string' or 'secret_name' (a secret with the same keys than the one of the
+                connection) and optionally 'replica_connection_strings'
+
+        Returns:
+            DBConfig: Configuration of the shard (not registered in CONNECTIONS_CONFIG)
+        """
+        if not shard.get('connection_string') and not shard.get('secret_name'):
+            raise ValueError(f"The shard {shard_name} of {self.conn_name} needs a connection_string or a secret_name")
+
+        config = copy.copy(self)
+        config.conn_name = f"{self.base_conn_name}@{shard_name}"
+        config.secret_name = shard.get('secret_name', self.secret_name)
+        config.DATABASE_CONNECTION_STRING = shard.get('connection_string')
+        config.DATABASE_REPLICA_CONNECTION_STRINGS = shard.get('replica_connection_strings', '')
+        config.DATABASE_TENANT_MAP = ''
+        if not config.DATABASE_CONNECTION_STRING:
+            config.get_db_from_secrets()
+        return config
 
     @classmethod
     def get_config(cls, conn_name: str, secret_name: str = None, prefix: str = 'default') -> Self:
@@ -78,5 +135,20 @@ class DBConfig:
             'max_overflow': self.DATABASE_MAX_OVERFLOW,
             'pool_recycle': self.DATABASE_POOL_RECYCLE,
             'pool_pre_ping': self.DATABASE_POOL_PRE_PING,
-            'pool_use_lifo': self.DATABASE_POOL_USE_LIFO
+            'pool_use_lifo': self.DATABASE_POOL_USE_LIFO,
+            'query_cache_size': self.DATABASE_QUERY_CACHE_SIZE
     }
+
+    def get_replica_connection_strings(self) -> list[str]:
+        return [url.strip() for url in str(self.DATABASE_REPLICA_CONNECTION_STRINGS or '').split(',') if url.strip()]
+
+    def has_replicas(self) -> bool:
+        return len(self.get_replica_connection_strings()) > 0
+
+    def get_replica_engine_configs(self) -> list[dict[str, str | int | bool]]:
+        """ Engine configuration of each read replica, same pool settings than the primary
+
+        Returns:
+            list[dict[str, str | int | bool]]: create_engine kwargs by replica
+        """
+        return [{**self.get_engine_config(), 'url': url} for url in self.get_replica_connection_strings()]
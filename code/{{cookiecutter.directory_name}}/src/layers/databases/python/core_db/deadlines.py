@@ -0,0 +1,123 @@
+"""
+Statement timeouts from the deadline of the invocation (core_utils.deadline). Before the first statement of an
+invocation on a connection, the remaining time is set as the server side timeout of the session:
+
+- MySQL: max_execution_time (milliseconds, read-only SELECT statements)
+- MariaDB: max_statement_time (seconds)
+- PostgreSQL: statement_timeout (milliseconds)
+
+A cancelled statement leaves the connection usable, the handler answers 503 and keeps the warm container and pool
+instead of being killed by the Lambda timeout. Statements started without time left fail before reaching the database.
+Other dialects only get this last check.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+
+from core_utils.deadline import DeadlineExceeded, get_deadline
+
+## Key of the connection info with the deadline id and timeout set in the session
+TIMEOUT_INFO_KEY = 'core_db_statement_timeout'
+## Lowest timeout sent to the database (ms)
+MIN_STATEMENT_TIMEOUT_MS = 1
+
+## Error codes of a statement cancelled by its timeout
+MYSQL_TIMEOUT_ERRORS = (3024, 1969)
+POSTGRESQL_TIMEOUT_SQLSTATE = '57014'
+
+
+def get_timeout_statement(dialect, timeout_ms: int | None) -> str | None:
+    """ SQL that sets (or resets with None) the statement timeout of the session
+
+    Args:
+        dialect (Dialect): Dialect of the connection
+        timeout_ms (int | None): Timeout in milliseconds, None to restore the default
+
+    Returns:
+        str | None: Statement, None if the dialect has no session timeout
+    """
+    if dialect.name in ('mysql', 'mariadb'):
+        if getattr(dialect, 'is_mariadb', False) or dialect.name == 'mariadb':
+            return f"SET SESSION max_statement_time = {timeout_ms / 1000 if timeout_ms else 0}"
+        return f"SET SESSION max_execution_time = {int(timeout_ms or 0)}"
+    if dialect.name == 'postgresql':
+        return f"SET statement_timeout = {int(timeout_ms)}" if timeout_ms else "SET statement_timeout = DEFAULT"
+    return None
+
+
+def is_timeout_error(dialect_name: str, error: BaseException | None) -> bool:
+    """ Check if a DBAPI error is a statement cancelled by its timeout """
+    if error is None:
+        return False
+    if dialect_name in ('mysql', 'mariadb'):
+        return bool(getattr(error, 'args', None)) and error.args[0] in MYSQL_TIMEOUT_ERRORS
+    if dialect_name == 'postgresql':
+        return POSTGRESQL_TIMEOUT_SQLSTATE in (getattr(error, 'pgcode', None), getattr(error, 'sqlstate', None))
+    return False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    deadline = get_deadline()
+    applied = conn.info.get(TIMEOUT_INFO_KEY)
+
+    if deadline is None:
+        # The connection comes back from an invocation with deadline, its timeout is restored
+        if applied is not None:
+            sql = get_timeout_statement(conn.dialect, None)
+            if sql is not None:
+                cursor.execute(sql)
+            conn.info.pop(TIMEOUT_INFO_KEY, None)
+        return
+
+    deadline.check("database statement")
+    if applied is not None and applied[0] == deadline.id:
+        return
+
+    timeout_ms = max(deadline.remaining_ms(), MIN_STATEMENT_TIMEOUT_MS)
+    sql = get_timeout_statement(conn.dialect, timeout_ms)
+    if sql is not None:
+        cursor.execute(sql)
+        conn.info[TIMEOUT_INFO_KEY] = (deadline.id, timeout_ms)
+
+
+def _forget_timeout(info: dict) -> None:
+    # The rollback may have reverted the SET (PostgreSQL) or kept it (MySQL, MariaDB): the next statement sets the
+    # timeout of its deadline again, or restores the default without one
+    applied = info.get(TIMEOUT_INFO_KEY)
+    if applied is not None:
+        info[TIMEOUT_INFO_KEY] = (None, applied[1])
+
+
+def _rollback(conn):
+    _forget_timeout(conn.info)
+
+
+def _reset(dbapi_connection, connection_record, reset_state):
+    # The reset on return to the pool rolls back the DBAPI connection without the rollback event of the engine
+    _forget_timeout(connection_record.info)
+
+
+def _handle_error(context):
+    connection = context.connection
+    if connection is None or connection.info.get(TIMEOUT_INFO_KEY) is None:
+        return
+    if is_timeout_error(context.dialect.name, context.original_exception):
+        timeout_ms = connection.info[TIMEOUT_INFO_KEY][1]
+        raise DeadlineExceeded(f"The statement was cancelled after {timeout_ms} ms (invocation deadline)") from context.original_exception
+
+
+def apply_deadlines(engine: Engine) -> Engine:
+    """ Register the statement timeouts of the invocation deadline in an engine (once per engine)
+
+    Args:
+        engine (Engine): Sync engine (use AsyncEngine.sync_engine for async engines)
+
+    Returns:
+        Engine: Same engine
+    """
+    if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        return engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'rollback', _rollback)
+    event.listen(engine.pool, 'reset', _reset)
+    event.listen(engine, 'handle_error', _handle_error)
+    return engine
@@ -0,0 +1,316 @@
+"""
+Export engine of the models: the rows of the filtered select are read from the database cursor in batches
+(EXPORT_BATCH_ROWS, yield_per) and every batch goes straight to the writer of the format:
+
+- csv: text/csv, the same values as the former csv.DictWriter export
+- ndjson: one JSON object per line (AlchemyEncoder values)
+- arrow: Arrow IPC file, typed columns
+- parquet: compressed columnar file, typed columns (row groups of EXPORT_PARQUET_ROW_GROUP_ROWS)
+
+The Arrow and Parquet types come from the SQLAlchemy mapper of the model. Both formats need pyarrow, it isn't part
+of the databases layer (add it to the layer of the functions that export them).
+
+The exported columns follow the column_aliases of the controllers:
+
+    {"amount": {"alias": "Amount"}, "customer": {"alias": "Customer", "relation": "customer", "attr": "name"}}
+
+Exports of mapped columns only select those columns (no ORM objects), relations and properties load the objects with
+their relations in the same batches.
+"""
+import io
+import csv
+import json
+import datetime
+from typing import Any, BinaryIO, Iterator, List, NamedTuple, Type
+
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, Integer, LargeBinary, Numeric, SmallInteger, Time, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.session import Session
+from sqlalchemy.sql import Select
+
+from core_utils.environment import env
+from .DBConnection import AlchemyEncoder
+
+## Rows read from the cursor and written per batch
+EXPORT_BATCH_ROWS = env("EXPORT_BATCH_ROWS", 5000)
+## Rows of each Parquet row group (the batches are buffered until they fill one)
+EXPORT_PARQUET_ROW_GROUP_ROWS = env("EXPORT_PARQUET_ROW_GROUP_ROWS", 100000)
+## Compression of the Parquet files (snappy, zstd, gzip or none)
+EXPORT_PARQUET_COMPRESSION = env("EXPORT_PARQUET_COMPRESSION", "snappy")
+
+
+class ExportColumn(NamedTuple):
+    """ Exported column: name in the file and attribute of the model (or attribute of a relation) """
+    alias: str
+    field: str
+    relation: str | None = None
+    attr: str | None = None
+
+
+class ExportFormatUnavailable(Exception):
+    """ The format is unknown or its library is not installed """
+
+
+def get_export_columns(column_aliases: dict) -> List[ExportColumn]:
+    """ Columns of a column_aliases mapping (field -> alias, and optionally relation and attr)
+
+    Args:
+        column_aliases (dict): Columns of the export
+
+    Returns:
+        List[ExportColumn]: Exported columns in order
+    """
+    return [
+        ExportColumn(info.get("alias", field), info.get("field", field), info.get("relation"), info.get("attr"))
+        for field, info in column_aliases.items()
+    ]
+
+
+def is_row_export(model: Any, columns: List[ExportColumn]) -> bool:
+    """ Check if the export only has mapped columns of the model (read as rows, without ORM objects) """
+    column_attrs = model.__mapper__.column_attrs
+    return all(column.relation is None and column.field in column_attrs for column in columns)
+
+
+def export_query(model: Any, columns: List[ExportColumn], filters: List[dict], search_filters: dict = {}, search_method: str = 'AND', order_by: str | None = None, order_dir: str = "asc") -> tuple[Select, bool]:
+    """ Select of an export with the filters and order of the listing
+
+    Returns:
+        tuple[Select, bool]: Select and whether it returns rows of the columns (True) or ORM objects (False)
+    """
+    if is_row_export(model, columns):
+        statement = select(*[getattr(model, column.field) for column in columns]).select_from(model)
+        row_export = True
+    else:
+        relations = {column.relation for column in columns if column.relation is not None}
+        statement = select(model).options(*[selectinload(getattr(model, relation)) for relation in relations])
+        row_export = False
+    statement = model.apply_filters(statement, filters, search_filters, search_method)
+    return model.apply_order(statement, order_by, order_dir), row_export
+
+
+def get_column_value(obj: Any, column: ExportColumn) -> Any:
+    if column.relation is not None:
+        related = getattr(obj, column.relation, None)
+        return getattr(related, column.attr, None) if related is not None else None
+    return getattr(obj, column.field, None)
+
+
+def iter_batches(session: Session, statement: Select, columns: List[ExportColumn], row_export: bool, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[List[tuple]]:
+    """ Read the rows of an export from the cursor in batches (the whole result is never loaded)
+
+    Yields:
+        List[tuple]: Values of each row in the order of the columns
+    """
+    statement = statement.execution_options(yield_per=batch_rows)
+    if row_export:
+        for partition in session.execute(statement).partitions():
+            yield [tuple(row) for row in partition]
+        return
+
+    for partition in session.scalars(statement).partitions():
+        yield [tuple(get_column_value(obj, column) for column in columns) for obj in partition]
+
+
+class ExportWriter:
+    """ Writer of an export format, receives the batches of rows and writes them to the output
+
+    Args:
+        model (Any): Exported model
+        columns (List[ExportColumn]): Exported columns
+        output (BinaryIO): Destination of the file
+    """
+    format = ''
+    content_type = 'application/octet-stream'
+    extension = 'bin'
+    ## Binary formats are returned base64 encoded and without compression
+    binary = True
+
+    def __init__(self, model: Any, columns: List[ExportColumn], output: BinaryIO) -> None:
+        self.model = model
+        self.columns = columns
+        self.output = output
+
+    def write_batch(self, rows: List[tuple]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """ Write the end of the file, the output is kept open """
+        pass
+
+
+class CsvExportWriter(ExportWriter):
+    format = 'csv'
+    content_type = 'text/csv'
+    extension = 'csv'
+    binary = False
+
+    def __init__(self, model: Any, columns: List[ExportColumn], output: BinaryIO) -> None:
+        super().__init__(model, columns, output)
+        self.text = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+        self.writer = csv.writer(self.text)
+        self.writer.writerow([column.alias for column in columns])
+
+    def write_batch(self, rows: List[tuple]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        # The wrapper would close the output with it
+        self.text.detach()
+
+
+class NdjsonExportWriter(ExportWriter):
+    format = 'ndjson'
+    content_type = 'application/x-ndjson'
+    extension = 'ndjson'
+    binary = False
+
+    def __init__(self, model: Any, columns: List[ExportColumn], output: BinaryIO) -> None:
+        super().__init__(model, columns, output)
+        self.aliases = [column.alias for column in columns]
+        self.encoder = AlchemyEncoder(separators=(',', ':'))
+
+    def write_batch(self, rows: List[tuple]) -> None:
+        lines = [self.encoder.encode(dict(zip(self.aliases, row))) for row in rows]
+        self.output.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def _get_pyarrow():
+    """ pyarrow is optional, it is only needed by the arrow and parquet formats """
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportFormatUnavailable("The arrow and parquet exports need pyarrow in the layer")
+    return pyarrow
+
+
+def get_column_type(model: Any, column: ExportColumn) -> Any:
+    """ SQLAlchemy type of an exported column, None for properties """
+    target = model
+    name = column.field
+    if column.relation is not None:
+        relationship = model.__mapper__.relationships.get(column.relation)
+        if relationship is None:
+            return None
+        target, name = relationship.mapper.class_, column.attr
+    attribute = target.__mapper__.column_attrs.get(name)
+    return attribute.columns[0].type if attribute is not None else None
+
+
+def arrow_type(pa: Any, column_type: Any) -> Any:
+    """ Arrow type of a SQLAlchemy type, text for the types without equivalent """
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, SmallInteger):
+        return pa.int16()
+    if isinstance(column_type, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, Numeric):
+        # Decimals keep their precision, numerics without precision are exported as floats
+        if column_type.precision is None or not column_type.asdecimal or column_type.precision > 38:
+            return pa.float64()
+        return pa.decimal128(column_type.precision, column_type.scale or 0)
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us', tz='UTC' if column_type.timezone else None)
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Time):
+        return pa.time64('us')
+    if isinstance(column_type, LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+def _as_text(value: Any) -> Any:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=AlchemyEncoder)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class ArrowExportWriter(ExportWriter):
+    format = 'arrow'
+    content_type = 'application/vnd.apache.arrow.file'
+    extension = 'arrow'
+
+    def __init__(self, model: Any, columns: List[ExportColumn], output: BinaryIO) -> None:
+        super().__init__(model, columns, output)
+        self.pa = _get_pyarrow()
+        self.schema = self.pa.schema([
+            self.pa.field(column.alias, arrow_type(self.pa, get_column_type(model, column))) for column in columns
+        ])
+        self.text_columns = [i for i, field in enumerate(self.schema) if field.type == self.pa.string()]
+        self.writer = self.open()
+
+    def open(self) -> Any:
+        return self.pa.ipc.new_file(self.output, self.schema)
+
+    def to_record_batch(self, rows: List[tuple]) -> Any:
+        values = [list(column) for column in zip(*rows)]
+        for i in self.text_columns:
+            values[i] = [_as_text(value) for value in values[i]]
+        return self.pa.RecordBatch.from_arrays([self.pa.array(column, type=field.type) for column, field in zip(values, self.schema)], schema=self.schema)
+
+    def write_batch(self, rows: List[tuple]) -> None:
+        if rows:
+            self.writer.write_batch(self.to_record_batch(rows))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ParquetExportWriter(ArrowExportWriter):
+    format = 'parquet'
+    content_type = 'application/vnd.apache.parquet'
+    extension = 'parquet'
+
+    def open(self) -> Any:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportFormatUnavailable("The parquet export needs pyarrow with parquet support in the layer")
+        self.pending = []
+        self.pending_rows = 0
+        compression = None if EXPORT_PARQUET_COMPRESSION == 'none' else EXPORT_PARQUET_COMPRESSION
+        return pq.ParquetWriter(self.output, self.schema, compression=compression)
+
+    def write_batch(self, rows: List[tuple]) -> None:
+        if not rows:
+            return
+        self.pending.append(self.to_record_batch(rows))
+        self.pending_rows += len(rows)
+        if self.pending_rows >= EXPORT_PARQUET_ROW_GROUP_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.writer.write_table(self.pa.Table.from_batches(self.pending, schema=self.schema), row_group_size=self.pending_rows)
+        self.pending = []
+        self.pending_rows = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+## Writers by format
+EXPORT_WRITERS: dict[str, Type[ExportWriter]] = {
+    writer.format: writer for writer in (CsvExportWriter, NdjsonExportWriter, ArrowExportWriter, ParquetExportWriter)
+}
+
+
+def get_export_writer(export_format: str) -> Type[ExportWriter]:
+    """ Writer of a format
+
+    Raises:
+        ExportFormatUnavailable: Unknown format
+    """
+    writer = EXPORT_WRITERS.get(str(export_format).lower())
+    if writer is None:
+        raise ExportFormatUnavailable(f"Unsupported export format {export_format}, use one of {', '.join(EXPORT_WRITERS)}")
+    return writer
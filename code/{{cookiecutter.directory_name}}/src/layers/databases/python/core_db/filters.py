@@ -0,0 +1,98 @@
+import datetime
+import decimal
+from typing import Any
+
+from sqlalchemy.sql.elements import ColumnElement
+
+from core_utils.filters import FilterExpression
+
+_TRUE_VALUES = ('1', 'true', 'yes')
+_FALSE_VALUES = ('0', 'false', 'no')
+
+
+def coerce_value(column: Any, value: Any) -> Any:
+    """ Convert a value of the query string to the python type of the column, so the database compares
+    the column with a value of its own type (and the index of the column can be used)
+
+    Args:
+        column (Any): Mapped column
+        value (Any): Raw value
+
+    Raises:
+        ValueError: The value can't be converted to the type of the column
+
+    Returns:
+        Any: Typed value
+    """
+    if value is None or not isinstance(value, str):
+        return value
+
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+
+    try:
+        if python_type is bool:
+            if value.lower() not in _TRUE_VALUES + _FALSE_VALUES:
+                raise ValueError(value)
+            return value.lower() in _TRUE_VALUES
+        if python_type is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+        if python_type is datetime.date:
+            return datetime.date.fromisoformat(value)
+        if python_type is datetime.time:
+            return datetime.time.fromisoformat(value)
+        if python_type in (int, float, decimal.Decimal):
+            return python_type(value)
+    except (ValueError, decimal.InvalidOperation):
+        raise ValueError(f"Invalid value '{value}' for the filter {column.key}")
+    return value
+
+
+def compile_filter(model: Any, expression: FilterExpression) -> ColumnElement:
+    """ Compile a filter expression to a predicate over the bare column (sargable)
+
+    Args:
+        model (Any): Model class
+        expression (FilterExpression): Parsed filter
+
+    Raises:
+        ValueError: Unknown column, wrong number of values or values that don't match the column type
+
+    Returns:
+        ColumnElement: Predicate of the filter
+    """
+    column = getattr(model, expression.column, None)
+    if column is None or not hasattr(column, 'type'):
+        raise ValueError(f"Unknown filter column {expression.column}")
+
+    operator = expression.operator
+    if operator == 'isnull':
+        is_null = str(expression.value[0]).lower() not in _FALSE_VALUES
+        return column.is_(None) if is_null else column.is_not(None)
+
+    values = [coerce_value(column, value) for value in expression.value]
+    if operator == 'in':
+        if not values:
+            raise ValueError(f"The filter {expression.column}__in needs at least one value")
+        return column.in_(values)
+    if operator == 'between':
+        if len(values) != 2:
+            raise ValueError(f"The filter {expression.column}__between needs two values")
+        return column.between(values[0], values[1])
+
+    value = values[0]
+    if operator == 'eq':
+        return column.is_(None) if value is None else column == value
+    if operator == 'ne':
+        return column.is_not(None) if value is None else column != value
+    if operator == 'gt':
+        return column > value
+    if operator == 'gte':
+        return column >= value
+    if operator == 'lt':
+        return column < value
+    if operator == 'lte':
+        return column <= value
+    raise ValueError(f"Unsupported filter operator {operator}")
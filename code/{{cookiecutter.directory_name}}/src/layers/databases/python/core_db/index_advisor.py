@@ -0,0 +1,313 @@
+"""
+Index advisor of the models: compares the columns that the API filters, searches and orders by
+with the indexes of the live schema, explains the queries that BaseModel.filters generates and
+recommends the missing (composite) indexes.
+
+    python -m core_db.index_advisor --models core_db.models [--json]
+"""
+import sys
+import json
+import time
+import argparse
+import importlib
+import pkgutil
+from typing import Any, NamedTuple, Type
+
+from aws_lambda_powertools import Logger
+from sqlalchemy import Index, func, inspect, select
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm.session import Session
+from sqlalchemy.schema import CreateIndex
+
+from .BaseModel import BaseModel
+from .DBConnection import DBConnection
+from .search import SEARCH_CONTAINS, SEARCH_FULLTEXT, SEARCH_PREFIX, SEARCH_TRIGRAM
+
+LOGGER = Logger('layers.core.core_db.index_advisor')
+
+## EXPLAIN statement by dialect
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+    'mariadb': 'EXPLAIN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+
+class IndexRecommendation(NamedTuple):
+    model: str
+    table: str
+    columns: tuple
+    reason: str
+    ddl: str
+
+
+class QueryReport(NamedTuple):
+    model: str
+    description: str
+    sql: str
+    plan: list
+    full_scan: bool
+    elapsed_ms: float | None
+
+
+def iter_models(base: Type[BaseModel] = BaseModel) -> list[Type[BaseModel]]:
+    """ Mapped subclasses of the base model (the modules of the models must be imported before)
+
+    Returns:
+        list[Type[BaseModel]]: Model classes
+    """
+    return sorted({mapper.class_ for mapper in base.registry.mappers if hasattr(mapper.class_, '__table__')}, key=lambda model: model.__name__)
+
+
+def import_models(package_name: str) -> None:
+    """ Import a module or every module of a package so its models are registered
+
+    Args:
+        package_name (str): Module or package name (e.g. core_db.models)
+    """
+    package = importlib.import_module(package_name)
+    for module in pkgutil.walk_packages(getattr(package, '__path__', []), prefix=f"{package_name}."):
+        importlib.import_module(module.name)
+
+
+def get_column_name(model: Type[BaseModel], attribute: str) -> str | None:
+    """ Name of the table column of a mapped attribute
+    """
+    prop = model.__mapper__.attrs.get(attribute) if attribute in model.__mapper__.attrs else None
+    columns = getattr(prop, 'columns', None)
+    return columns[0].name if columns else None
+
+
+def get_live_indexes(engine: Engine, table_name: str, schema: str | None = None) -> list[tuple]:
+    """ Column lists of the indexes of a table in the database (primary key and unique constraints included)
+
+    Returns:
+        list[tuple]: Columns of each index in order
+    """
+    inspector = inspect(engine)
+    indexes = [tuple(index['column_names']) for index in inspector.get_indexes(table_name, schema=schema) if None not in index['column_names']]
+    primary_key = inspector.get_pk_constraint(table_name, schema=schema).get('constrained_columns') or []
+    if primary_key:
+        indexes.append(tuple(primary_key))
+    for constraint in inspector.get_unique_constraints(table_name, schema=schema):
+        indexes.append(tuple(constraint['column_names']))
+    return indexes
+
+
+def is_covered(columns: tuple, indexes: list[tuple]) -> bool:
+    """ Check if an index starts with the columns (in any order for the equality columns but the last one)
+    """
+    for index in indexes:
+        if len(index) < len(columns):
+            continue
+        head = index[:len(columns)]
+        if set(head[:-1]) == set(columns[:-1]) and head[-1] == columns[-1]:
+            return True
+    return False
+
+
+def get_wanted_indexes(model: Type[BaseModel]) -> list[tuple[tuple, str]]:
+    """ Indexes that the listing queries of the model need: every filter is combined with the soft delete
+    condition, the listing is ordered by id (or the order columns) and searches in prefix mode use B-tree indexes
+
+    Returns:
+        list[tuple[tuple, str]]: Columns and reason of each wanted index
+    """
+    soft_delete = get_column_name(model, model.SOFT_DELETE_COLUMN) if model.has_soft_delete() else None
+    base = (soft_delete,) if soft_delete else ()
+    id_column = get_column_name(model, 'id') or 'id'
+    wanted = []
+
+    if soft_delete:
+        wanted.append(((soft_delete, id_column), f"listing filters {soft_delete} IS NULL and orders by {id_column}"))
+
+    for attribute in model.filter_columns:
+        column = get_column_name(model, attribute)
+        if column:
+            wanted.append(((column,) + base, f"filter {attribute}" + (" with soft delete" if soft_delete else "")))
+
+    for attribute in model.search_columns:
+        column = get_column_name(model, attribute)
+        mode = model.get_search_mode(attribute)
+        if column and mode == SEARCH_PREFIX:
+            wanted.append(((column,), f"prefix search {attribute}"))
+
+    for attribute in getattr(model, 'order_columns', []):
+        column = get_column_name(model, attribute)
+        if column:
+            wanted.append((base + (column,), f"order by {attribute}"))
+
+    if model.has_updated_at():
+        column = get_column_name(model, model.UPDATED_AT_COLUMN)
+        if column:
+            wanted.append((base + (column,), "ETag versions (max updated at)"))
+            # Tombstones included: the delta sync doesn't filter the soft delete column
+            wanted.append(((column, id_column), f"delta sync (updated_since) orders by {model.UPDATED_AT_COLUMN} and {id_column}"))
+
+    return wanted
+
+
+def recommend_indexes(model: Type[BaseModel], engine: Engine) -> list[IndexRecommendation]:
+    """ Compare the wanted indexes of the model with the live schema
+
+    Returns:
+        list[IndexRecommendation]: Missing indexes with their DDL
+    """
+    table = model.__table__
+    live = get_live_indexes(engine, table.name, table.schema)
+    recommendations = []
+    seen = set()
+    for columns, reason in get_wanted_indexes(model):
+        # Wanted indexes are also served by the recommended ones that start with the same columns
+        if columns in seen or is_covered(columns, live + list(seen)):
+            continue
+        seen.add(columns)
+        index = Index(f"ix_{table.name}_{'_'.join(columns)}", *[table.c[column] for column in columns])
+        ddl = str(CreateIndex(index).compile(dialect=engine.dialect))
+        # The index is only rendered, it must not be created with the metadata
+        table.indexes.discard(index)
+        recommendations.append(IndexRecommendation(model.__name__, table.name, columns, reason, ddl))
+
+    for attribute in model.search_columns:
+        mode = model.get_search_mode(attribute)
+        if mode == SEARCH_CONTAINS:
+            LOGGER.warning(f"{model.__name__}.{attribute} uses the contains search mode, no index can serve it")
+        elif mode in (SEARCH_FULLTEXT, SEARCH_TRIGRAM):
+            LOGGER.info(f"{model.__name__}.{attribute} uses the {mode} search mode, declare its index with core_db.search")
+    return recommendations
+
+
+def get_sample_value(session: Session, column: Any) -> Any:
+    return session.execute(select(column).where(column.is_not(None)).limit(1)).scalar()
+
+
+def explain(session: Session, statement: Any) -> tuple[str, list, float]:
+    """ Explain and time a statement with the dialect of the session
+
+    Returns:
+        tuple[str, list, float]: SQL, rows of the plan and elapsed milliseconds of the statement
+    """
+    connection = session.connection()
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect)
+    params = compiled.construct_params()
+    for key, bind in compiled.binds.items():
+        processor = bind.type._cached_bind_processor(dialect)
+        if processor is not None and key in params:
+            params[key] = processor(params[key])
+    if compiled.positional:
+        params = tuple(params[key] for key in compiled.positiontup)
+
+    start = time.perf_counter()
+    connection.exec_driver_sql(compiled.string, params).fetchall()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    prefix = EXPLAIN_PREFIX.get(dialect.name, 'EXPLAIN ')
+    plan = [tuple(row) for row in connection.exec_driver_sql(prefix + compiled.string, params).fetchall()]
+    return compiled.string, plan, elapsed
+
+
+def is_full_scan(dialect_name: str, plan: list) -> bool:
+    """ Detect a full scan of a table in the plan of each dialect
+    """
+    text = ' '.join(str(value) for row in plan for value in row)
+    if dialect_name == 'sqlite':
+        return any(str(row[-1]).startswith('SCAN ') and 'INDEX' not in str(row[-1]) for row in plan)
+    if dialect_name in ('mysql', 'mariadb'):
+        return any('ALL' in [str(value) for value in row] for row in plan)
+    if dialect_name == 'postgresql':
+        return 'Seq Scan' in text
+    return False
+
+
+def explain_model(model: Type[BaseModel], session: Session, per_page: int = 10) -> list[QueryReport]:
+    """ Explain the first page of the listing and of every filter of the model, as BaseModel.filters builds them,
+    and the delta sync of the models with updated at
+
+    Returns:
+        list[QueryReport]: Plan of each query
+    """
+    dialect_name = session.get_bind().dialect.name
+    base_filters = [{model.SOFT_DELETE_COLUMN: None}] if model.has_soft_delete() else []
+    cases = [('listing', base_filters)]
+    for attribute in model.filter_columns:
+        column = getattr(model, attribute, None)
+        if column is None:
+            continue
+        value = get_sample_value(session, column)
+        if value is not None:
+            cases.append((f"filter {attribute}", [{attribute: value}] + base_filters))
+
+    statements = [(description, model.filters_query(session, filters).limit(per_page)) for description, filters in cases]
+    if model.has_updated_at():
+        # Steady state sync: a recent watermark, the index must skip the rows that didn't change
+        since = session.execute(select(func.max(getattr(model, model.UPDATED_AT_COLUMN)))).scalar()
+        if since is not None:
+            statements.append(('delta sync', model.sync_query((since, None), [], limit=per_page)))
+
+    reports = []
+    for description, statement in statements:
+        sql, plan, elapsed = explain(session, statement)
+        reports.append(QueryReport(model.__name__, description, sql, plan, is_full_scan(dialect_name, plan), round(elapsed, 3)))
+    return reports
+
+
+def advise(models: list[Type[BaseModel]] | None = None, explain_queries: bool = True) -> dict:
+    """ Build the report of all the models
+
+    Args:
+        models (list[Type[BaseModel]] | None, optional): Models to check. Defaults to all the imported models.
+        explain_queries (bool, optional): Explain the queries of the models. Defaults to True.
+
+    Returns:
+        dict: Recommendations and query plans
+    """
+    report = {'recommendations': [], 'queries': []}
+    for model in models if models is not None else iter_models():
+        connection = DBConnection(**model.get_connection_params())
+        engine = connection.get_engine()
+        report['recommendations'].extend(recommend_indexes(model, engine))
+        if explain_queries:
+            session = connection.get_session()
+            try:
+                report['queries'].extend(explain_model(model, session))
+            finally:
+                session.rollback()
+                session.close()
+    return report
+
+
+def print_report(report: dict, output=sys.stdout) -> None:
+    for query in report['queries']:
+        flag = 'FULL SCAN' if query.full_scan else 'ok'
+        output.write(f"[{flag}] {query.model} {query.description}: {query.elapsed_ms} ms\n")
+        for row in query.plan:
+            output.write(f"    {' | '.join(str(value) for value in row)}\n")
+
+    if not report['recommendations']:
+        output.write("All the filter, search and order columns are indexed\n")
+    for recommendation in report['recommendations']:
+        output.write(f"-- {recommendation.model}: {recommendation.reason}\n{recommendation.ddl};\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Recommend indexes for the filter, search and order columns of the models")
+    parser.add_argument('--models', action='append', default=[], help="Module or package with the models (repeatable)")
+    parser.add_argument('--no-explain', action='store_true', help="Only compare the schema indexes")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    for package_name in args.models or ['core_db.models']:
+        import_models(package_name)
+
+    report = advise(explain_queries=not args.no_explain)
+    if args.json:
+        print(json.dumps({key: [item._asdict() for item in items] for key, items in report.items()}, default=str, indent=2))
+    else:
+        print_report(report)
+    return 1 if report['recommendations'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import re
+import time
+import inspect
+import functools
+from contextvars import ContextVar
+from typing import Any, Callable
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.engine.interfaces import CacheStats
+
+from core_utils.environment import env, APP_NAME
+
+LOGGER = Logger('layers.core.core_db.instrumentation')
+
+## Namespace of the EMF metrics of the database
+METRICS_NAMESPACE = env("POWERTOOLS_METRICS_NAMESPACE", APP_NAME)
+## Statements slower than this are logged and counted as slow
+SLOW_QUERY_MS = env("DATABASE_SLOW_QUERY_MS", 200)
+## Max number of slow statements kept in the summary of an invocation
+MAX_SLOW_QUERIES = 10
+## Max length of a normalized statement
+MAX_STATEMENT_LENGTH = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    """ Database usage of an invocation: number of statements, time, rows, slow statements, hits of the
+    compiled statement cache of the engine (a miss means that SQLAlchemy compiled the statement) and retries of
+    the units of work (core_db.retries)
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.queries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_queries: list[dict] = []
+        self.slow_count = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = 0
+        self.retries_exhausted = 0
+
+    def record(self, statement: str, elapsed_ms: float, rows: int, cache_hit: CacheStats | None = None) -> None:
+        self.queries += 1
+        if cache_hit == CacheStats.CACHE_HIT:
+            self.cache_hits += 1
+        elif cache_hit == CacheStats.CACHE_MISS:
+            self.cache_misses += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows > 0:
+            self.rows += rows
+
+        if elapsed_ms >= self.slow_query_ms:
+            self.slow_count += 1
+            normalized = normalize_statement(statement)
+            LOGGER.warning("Slow query", extra={'db_query_ms': round(elapsed_ms, 2), 'db_statement': normalized})
+            if len(self.slow_queries) < MAX_SLOW_QUERIES:
+                self.slow_queries.append({'statement': normalized, 'ms': round(elapsed_ms, 2)})
+
+    def record_retry(self, exhausted: bool = False) -> None:
+        """ Count a retry of a unit of work, or a transient error that was raised after the last attempt """
+        if exhausted:
+            self.retries_exhausted += 1
+        else:
+            self.retries += 1
+
+    def summary(self) -> dict:
+        return {
+            'db_queries': self.queries,
+            'db_time_ms': round(self.total_ms, 2),
+            'db_max_query_ms': round(self.max_ms, 2),
+            'db_rows': self.rows,
+            'db_slow_queries': self.slow_count,
+            'db_cache_hits': self.cache_hits,
+            'db_cache_misses': self.cache_misses,
+            'db_cache_hit_ratio': self.cache_hit_ratio(),
+            'db_retries': self.retries,
+            'db_retries_exhausted': self.retries_exhausted,
+        }
+
+    def cache_hit_ratio(self) -> float | None:
+        """ Hits of the compiled statement cache over the cacheable statements (text() and driver SQL are not)
+
+        Returns:
+            float | None: Ratio between 0 and 1, None if no statement was cacheable
+        """
+        cacheable = self.cache_hits + self.cache_misses
+        return round(self.cache_hits / cacheable, 4) if cacheable else None
+
+
+_CURRENT_STATS: ContextVar[QueryStats | None] = ContextVar('core_db_query_stats', default=None)
+_DEPTH: ContextVar[int] = ContextVar('core_db_query_stats_depth', default=0)
+
+
+def normalize_statement(statement: str) -> str:
+    """ Normalize a statement to group the same query with different values: literals and lists of parameters
+    are replaced by placeholders and the whitespace is collapsed
+
+    Args:
+        statement (str): SQL statement
+
+    Returns:
+        str: Normalized statement
+    """
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _PLACEHOLDER_LIST.sub('(...)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return normalized[:MAX_STATEMENT_LENGTH]
+
+
+def get_current_stats() -> QueryStats | None:
+    return _CURRENT_STATS.get()
+
+
+def start_invocation(slow_query_ms: float = SLOW_QUERY_MS) -> QueryStats:
+    """ Reset the database stats for a new invocation
+
+    Returns:
+        QueryStats: Stats of the invocation
+    """
+    stats = QueryStats(slow_query_ms)
+    _CURRENT_STATS.set(stats)
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('core_db_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('core_db_query_start')
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    stats = _CURRENT_STATS.get()
+    if stats is not None:
+        # Drivers with buffered cursors (PyMySQL, psycopg2) report the fetched rows of a select in rowcount
+        rows = getattr(cursor, 'rowcount', -1) if cursor.description is not None else 0
+        stats.record(statement, elapsed_ms, rows or 0, getattr(context, 'cache_hit', None))
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """ Register the timing events in an engine (once per engine)
+
+    Args:
+        engine (Engine): Sync engine (use AsyncEngine.sync_engine for async engines)
+
+    Returns:
+        Engine: Same engine
+    """
+    # event.contains instead of a set of ids: the id of an engine disposed by the tenant routing can be reused
+    if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        return engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    return engine
+
+
+def emit_stats(stats: QueryStats, logger: Logger | None = None, metrics: bool = True) -> dict:
+    """ Attach the summary to the logger context, log it and emit it as EMF metrics
+
+    Args:
+        stats (QueryStats): Stats of the invocation
+        logger (Logger | None, optional): Logger of the handler, its next entries include the summary. Defaults to None.
+        metrics (bool, optional): Emit the EMF metrics. Defaults to True.
+
+    Returns:
+        dict: Summary
+    """
+    summary = stats.summary()
+    if logger is not None:
+        logger.append_keys(**summary)
+    LOGGER.info("Database usage", extra={**summary, 'db_slow_statements': stats.slow_queries})
+
+    if metrics and stats.queries > 0:
+        emf = EphemeralMetrics(namespace=METRICS_NAMESPACE)
+        emf.add_metric(name="DBQueries", unit=MetricUnit.Count, value=stats.queries)
+        emf.add_metric(name="DBTime", unit=MetricUnit.Milliseconds, value=summary['db_time_ms'])
+        emf.add_metric(name="DBMaxQueryTime", unit=MetricUnit.Milliseconds, value=summary['db_max_query_ms'])
+        emf.add_metric(name="DBRows", unit=MetricUnit.Count, value=stats.rows)
+        emf.add_metric(name="DBSlowQueries", unit=MetricUnit.Count, value=stats.slow_count)
+        emf.add_metric(name="DBStatementCacheHits", unit=MetricUnit.Count, value=stats.cache_hits)
+        emf.add_metric(name="DBStatementCacheMisses", unit=MetricUnit.Count, value=stats.cache_misses)
+        emf.add_metric(name="DBRetries", unit=MetricUnit.Count, value=stats.retries)
+        emf.add_metric(name="DBRetriesExhausted", unit=MetricUnit.Count, value=stats.retries_exhausted)
+        emf.flush_metrics()
+    return summary
+
+
+def log_db_stats(handler: Callable | None = None, *, logger: Logger | None = None, metrics: bool = True, slow_query_ms: float | None = None):
+    """ Decorator that measures the database usage of an invocation. Nested decorated functions (a handler calling
+    a controller) share the stats of the outermost one, which is the only one that emits the summary.
+    Works with sync and async functions.
+
+        @log_db_stats(logger=logger)
+        def lambda_handler(event, context): ...
+
+    Args:
+        handler (Callable | None, optional): Decorated function. Defaults to None.
+        logger (Logger | None, optional): Logger of the handler to attach the summary, reset when an invocation starts. Defaults to None.
+        metrics (bool, optional): Emit EMF metrics. Defaults to True.
+        slow_query_ms (float | None, optional): Slow statement threshold. Defaults to DATABASE_SLOW_QUERY_MS.
+    """
+    if handler is None:
+        return functools.partial(log_db_stats, logger=logger, metrics=metrics, slow_query_ms=slow_query_ms)
+
+    threshold = slow_query_ms if slow_query_ms is not None else SLOW_QUERY_MS
+
+    def begin():
+        depth = _DEPTH.get()
+        _DEPTH.set(depth + 1)
+        if depth == 0:
+            stats = start_invocation(float(threshold))
+            if logger is not None:
+                # Keys appended by the previous invocation of the container
+                logger.remove_keys(list(stats.summary()))
+        return depth
+
+    def end(depth):
+        _DEPTH.set(depth)
+        stats = _CURRENT_STATS.get()
+        if depth == 0 and stats is not None:
+            try:
+                emit_stats(stats, logger, metrics)
+            except Exception:
+                LOGGER.exception("Cannot emit the database stats")
+            _CURRENT_STATS.set(None)
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            depth = begin()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                end(depth)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs) -> Any:
+        depth = begin()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            end(depth)
+    return wrapper
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from typing import Any
+
+from aws_lambda_powertools import Logger
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm.session import Session as ORMSession
+from sqlalchemy.sql.dml import UpdateBase
+
+LOGGER = Logger('layers.core.core_db.replicas')
+
+## Invocation that made the last write by connection name (read-your-writes)
+PRIMARY_PINS: dict[str, str] = {}
+
+PIN_PRIMARY_KEY = 'core_db_pin_primary'
+
+
+def get_invocation_id() -> str | None:
+    """ Identifier of the current Lambda invocation. The runtime changes _X_AMZN_TRACE_ID on every invocation
+
+    Returns:
+        str | None: Invocation identifier or None outside Lambda
+    """
+    return os.environ.get('_X_AMZN_TRACE_ID')
+
+
+def pin_primary(config_name: str) -> None:
+    """ Route the reads of the connection to the primary during the rest of the current invocation
+
+    Args:
+        config_name (str): Connection name
+    """
+    invocation_id = get_invocation_id()
+    if invocation_id:
+        PRIMARY_PINS[config_name] = invocation_id
+
+
+def is_primary_pinned(config_name: str) -> bool:
+    """ Check if the connection made a write in the current invocation
+
+    Args:
+        config_name (str): Connection name
+
+    Returns:
+        bool: True if the reads should go to the primary
+    """
+    invocation_id = get_invocation_id()
+    return invocation_id is not None and PRIMARY_PINS.get(config_name) == invocation_id
+
+
+def reset_primary_pins() -> None:
+    """ Forget the writes made by the previous invocations """
+    PRIMARY_PINS.clear()
+
+
+def use_primary(session: ORMSession) -> ORMSession:
+    """ Force all the statements of the session to the primary (write paths read the rows they are going to change)
+
+    Args:
+        session (Session): Database session
+
+    Returns:
+        Session: Same session
+    """
+    session.info[PIN_PRIMARY_KEY] = True
+    return session
+
+
+class ReplicaPool:
+    """ Round-robin over the replica engines, ejecting for a while the replicas that fail to connect
+    """
+
+    def __init__(self, engines: list[Engine], eject_seconds: int = 30) -> None:
+        self.engines = engines
+        self.eject_seconds = eject_seconds
+        self._ejected_until: dict[int, float] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+        for engine in engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or context.connection is None:
+            engine = context.engine
+            LOGGER.warning(f"Ejecting replica {engine.url.host} for {self.eject_seconds}s")
+            self.eject(engine)
+
+    def eject(self, engine: Engine) -> None:
+        with self._lock:
+            self._ejected_until[id(engine)] = time.monotonic() + self.eject_seconds
+
+    def healthy_engines(self) -> list[Engine]:
+        now = time.monotonic()
+        return [engine for engine in self.engines if self._ejected_until.get(id(engine), 0) <= now]
+
+    def next_engine(self) -> Engine | None:
+        """ Next healthy replica
+
+        Returns:
+            Engine | None: Replica engine or None when all of them are ejected
+        """
+        with self._lock:
+            healthy = self.healthy_engines()
+            if not healthy:
+                return None
+            engine = healthy[self._next % len(healthy)]
+            self._next += 1
+            return engine
+
+
+class RoutingSession(ORMSession):
+    """ Session that sends reads to the replicas and writes (flushes, DML, SELECT ... FOR UPDATE) to the primary.
+    Once the session flushes, or the connection wrote in the current invocation, the reads stay in the primary.
+    """
+
+    def __init__(self, *args, replicas: ReplicaPool | None = None, config_name: str = 'default', read_your_writes: bool = True, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.config_name = config_name
+        self.read_your_writes = read_your_writes
+        self._replica_engine: Engine | None = None
+
+    def _is_write(self, clause: Any) -> bool:
+        if clause is None:
+            return False
+        if isinstance(clause, UpdateBase):
+            return True
+        return getattr(clause, '_for_update_arg', None) is not None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.replicas is None or self._flushing or self.info.get(PIN_PRIMARY_KEY) or self._is_write(clause):
+            return primary
+        if self.read_your_writes and is_primary_pinned(self.config_name):
+            return primary
+
+        # One replica per session so the reads of a request see a consistent snapshot
+        if self._replica_engine is None:
+            self._replica_engine = self.replicas.next_engine()
+        return self._replica_engine or primary
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_after_write(session: RoutingSession, flush_context) -> None:
+    session.info[PIN_PRIMARY_KEY] = True
+    if session.read_your_writes:
+        pin_primary(session.config_name)
@@ -0,0 +1,184 @@
+"""
+Retry of the units of work that fail with a transient database error: deadlocks, lock wait timeouts, serialization
+failures and dropped connections. The whole function is run again after a rollback, with exponential backoff and
+full jitter, while the invocation deadline (core_utils.deadline) leaves time for another attempt.
+
+    @retry_transient
+    def transfer(self, session: Session, ...): ...
+
+Nested decorated functions run inside the attempts of the outermost one. A dropped connection during the commit
+can hide a write that was applied, the units of work retried on disconnects should be idempotent.
+"""
+import time
+import random
+import asyncio
+import inspect
+import functools
+from contextvars import ContextVar
+from typing import Any, Callable
+
+from aws_lambda_powertools import Logger
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.session import Session as ORMSession
+
+from core_db.instrumentation import get_current_stats
+from core_utils.deadline import DeadlineExceeded, has_time_for
+from core_utils.environment import env
+
+LOGGER = Logger('layers.core.core_db.retries')
+
+## Attempts of a unit of work (the first one included)
+DATABASE_RETRY_ATTEMPTS = env("DATABASE_RETRY_ATTEMPTS", 3)
+## Backoff of the retries: random between 0 and base * 2^retry, capped to the max (ms)
+DATABASE_RETRY_BASE_DELAY_MS = env("DATABASE_RETRY_BASE_DELAY_MS", 50)
+DATABASE_RETRY_MAX_DELAY_MS = env("DATABASE_RETRY_MAX_DELAY_MS", 1000)
+## Time that an attempt needs besides the backoff, without it the error is raised as DeadlineExceeded (ms)
+DATABASE_RETRY_MIN_ATTEMPT_MS = env("DATABASE_RETRY_MIN_ATTEMPT_MS", 200)
+
+## Transient errors by MySQL/MariaDB error code and by PostgreSQL SQLSTATE
+MYSQL_TRANSIENT_ERRORS = {
+    1213: 'deadlock',
+    1205: 'lock wait timeout',
+    2006: 'server has gone away',
+    2013: 'lost connection',
+    4031: 'disconnected by the server',
+}
+POSTGRESQL_TRANSIENT_SQLSTATES = {
+    '40001': 'serialization failure',
+    '40P01': 'deadlock',
+    '55P03': 'lock not available',
+}
+## SQLite (local databases) returns SQLITE_BUSY as this message
+SQLITE_BUSY_MESSAGE = 'database is locked'
+
+_IN_RETRY: ContextVar[bool] = ContextVar('core_db_in_retry', default=False)
+
+
+def transient_reason(error: BaseException) -> str | None:
+    """ Classify a database error
+
+    Args:
+        error (BaseException): Error raised by SQLAlchemy or by the driver
+
+    Returns:
+        str | None: Reason of a transient error, None if retrying wouldn't help
+    """
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return 'dropped connection'
+
+    original = getattr(error, 'orig', None) or error
+    args = getattr(original, 'args', None) or ()
+    if args and isinstance(args[0], int) and args[0] in MYSQL_TRANSIENT_ERRORS:
+        return MYSQL_TRANSIENT_ERRORS[args[0]]
+
+    sqlstate = getattr(original, 'pgcode', None) or getattr(original, 'sqlstate', None)
+    if sqlstate in POSTGRESQL_TRANSIENT_SQLSTATES:
+        return POSTGRESQL_TRANSIENT_SQLSTATES[sqlstate]
+
+    if isinstance(error, DBAPIError) and SQLITE_BUSY_MESSAGE in str(original):
+        return 'database is locked'
+    return None
+
+
+def backoff_ms(retry: int, base_ms: float = DATABASE_RETRY_BASE_DELAY_MS, max_ms: float = DATABASE_RETRY_MAX_DELAY_MS) -> float:
+    """ Delay before a retry (full jitter) so the transactions that collided don't collide again
+
+    Args:
+        retry (int): Number of the retry, from 1
+    """
+    return random.uniform(0, min(max_ms, base_ms * 2 ** retry))
+
+
+def _find_session(args: tuple, kwargs: dict) -> ORMSession | AsyncSession | None:
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (ORMSession, AsyncSession)):
+            return value
+    return None
+
+
+def _next_delay(error: Exception, attempt: int, attempts: int) -> float | None:
+    """ Backoff of the next attempt, None when the error must be raised """
+    reason = transient_reason(error)
+    if reason is None or attempt >= attempts:
+        return None
+
+    delay_ms = backoff_ms(attempt)
+    if not has_time_for(delay_ms + DATABASE_RETRY_MIN_ATTEMPT_MS):
+        raise DeadlineExceeded(f"No time left to retry the {reason}") from error
+
+    stats = get_current_stats()
+    if stats is not None:
+        stats.record_retry()
+    LOGGER.warning("Retrying transient database error", extra={'reason': reason, 'attempt': attempt, 'delay_ms': round(delay_ms, 2)})
+    return delay_ms
+
+
+def _exhausted(error: Exception) -> None:
+    stats = get_current_stats()
+    if stats is not None and transient_reason(error) is not None:
+        stats.record_retry(exhausted=True)
+
+
+def retry_transient(function: Callable | None = None, *, attempts: int | None = None):
+    """ Decorator that runs again a unit of work (a function that receives the session and commits) when it fails
+    with a transient database error. The session is rolled back between the attempts. Works with sync and async
+    functions.
+
+    Args:
+        function (Callable | None, optional): Decorated function. Defaults to None.
+        attempts (int | None, optional): Attempts including the first one. Defaults to DATABASE_RETRY_ATTEMPTS.
+    """
+    if function is None:
+        return functools.partial(retry_transient, attempts=attempts)
+
+    max_attempts = attempts if attempts is not None else DATABASE_RETRY_ATTEMPTS
+
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            if _IN_RETRY.get():
+                return await function(*args, **kwargs)
+            session = _find_session(args, kwargs)
+            token = _IN_RETRY.set(True)
+            try:
+                attempt = 1
+                while True:
+                    try:
+                        return await function(*args, **kwargs)
+                    except Exception as e:
+                        if session is not None:
+                            await session.rollback()
+                        delay_ms = _next_delay(e, attempt, max_attempts)
+                        if delay_ms is None:
+                            _exhausted(e)
+                            raise
+                        await asyncio.sleep(delay_ms / 1000)
+                        attempt += 1
+            finally:
+                _IN_RETRY.reset(token)
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs) -> Any:
+        if _IN_RETRY.get():
+            return function(*args, **kwargs)
+        session = _find_session(args, kwargs)
+        token = _IN_RETRY.set(True)
+        try:
+            attempt = 1
+            while True:
+                try:
+                    return function(*args, **kwargs)
+                except Exception as e:
+                    if session is not None:
+                        session.rollback()
+                    delay_ms = _next_delay(e, attempt, max_attempts)
+                    if delay_ms is None:
+                        _exhausted(e)
+                        raise
+                    time.sleep(delay_ms / 1000)
+                    attempt += 1
+        finally:
+            _IN_RETRY.reset(token)
+    return wrapper
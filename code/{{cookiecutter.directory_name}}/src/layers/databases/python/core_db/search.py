@@ -0,0 +1,144 @@
+import re
+from typing import Any
+
+from sqlalchemy import Index, String, cast, func, literal_column, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+## Search modes by column (BaseModel.search_modes)
+## contains: ILIKE '%v%' (legacy behaviour, can't use indexes)
+SEARCH_CONTAINS = 'contains'
+## prefix: LIKE 'v%', served by a B-tree index of the column (text_pattern_ops in PostgreSQL, case sensitive)
+SEARCH_PREFIX = 'prefix'
+## fulltext: MySQL MATCH ... AGAINST (FULLTEXT index) / PostgreSQL tsvector @@ tsquery (GIN index)
+SEARCH_FULLTEXT = 'fulltext'
+## trigram: PostgreSQL ILIKE '%v%' served by a pg_trgm GIN index (contains in other dialects)
+SEARCH_TRIGRAM = 'trigram'
+
+SEARCH_MODES = [SEARCH_CONTAINS, SEARCH_PREFIX, SEARCH_FULLTEXT, SEARCH_TRIGRAM]
+
+## Dialect of the project, used to declare the search indexes
+DEFAULT_DIALECT = '{{ cookiecutter.dbDialect }}'
+
+## Text search configuration of PostgreSQL. The GIN index and the queries must use the same expression
+POSTGRESQL_TS_CONFIG = literal_column("'simple'::regconfig")
+
+LIKE_ESCAPE = '\\'
+
+_FULLTEXT_OPERATORS = re.compile(r'[+\-<>()~*"@&|!:\'\\]')
+
+
+def escape_like(value: str) -> str:
+    """ Escape the LIKE wildcards of a user value so they are matched literally
+
+    Args:
+        value (str): Search value
+
+    Returns:
+        str: Escaped value
+    """
+    return value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace('%', f'{LIKE_ESCAPE}%').replace('_', f'{LIKE_ESCAPE}_')
+
+
+def get_search_terms(value: str) -> list[str]:
+    """ Split a search value in words without the operators of the full-text syntax
+
+    Args:
+        value (str): Search value
+
+    Returns:
+        list[str]: Words to search
+    """
+    return _FULLTEXT_OPERATORS.sub(' ', value).split()
+
+
+def contains_condition(column: Any, value: Any) -> ColumnElement:
+    """ Legacy search: digits are compared by equality and the rest with ILIKE '%v%'
+    """
+    if str(value).isdigit():
+        return column == value
+    target = column if isinstance(getattr(column, 'type', None), String) else cast(column, String)
+    return target.ilike(f"%{escape_like(str(value))}%", escape=LIKE_ESCAPE)
+
+
+def search_condition(column: Any, value: Any, mode: str = SEARCH_CONTAINS, dialect: str | None = None) -> ColumnElement:
+    """ Build the condition of a search over a column. Modes that the dialect doesn't support fall back to contains
+
+    Args:
+        column (Any): Mapped column
+        value (Any): Search value as it comes in the request (without wildcards)
+        mode (str, optional): Search mode of the column. Defaults to SEARCH_CONTAINS.
+        dialect (str | None, optional): Dialect name of the connection (mysql, postgresql...). Defaults to None.
+
+    Returns:
+        ColumnElement: Condition of the search
+    """
+    value = str(value)
+
+    if mode == SEARCH_PREFIX:
+        return column.like(f"{escape_like(value)}%", escape=LIKE_ESCAPE)
+
+    if mode == SEARCH_FULLTEXT:
+        terms = get_search_terms(value)
+        if not terms:
+            return contains_condition(column, value)
+        if dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import match
+
+            # All the words are required and each one matches as prefix, like the contains search did
+            return match(column, against=' '.join(f"+{term}*" for term in terms)).in_boolean_mode()
+        if dialect == 'postgresql':
+            tsquery = ' & '.join(f"{term}:*" for term in terms)
+            return func.to_tsvector(POSTGRESQL_TS_CONFIG, column).bool_op('@@')(func.to_tsquery(POSTGRESQL_TS_CONFIG, tsquery))
+
+    if mode == SEARCH_TRIGRAM and dialect == 'postgresql' and not str(value).isdigit():
+        return column.ilike(f"%{escape_like(value)}%", escape=LIKE_ESCAPE)
+
+    return contains_condition(column, value)
+
+
+def legacy_search_condition(column: Any, value: Any) -> ColumnElement:
+    """ Search with the values of get_search_params(wrap_like=True): '%v%' is matched with ILIKE and the rest by equality
+    """
+    if isinstance(value, str) and '%' in value:
+        return cast(column, String).ilike(value)
+    return column == value
+
+
+def combine_conditions(conditions: list[ColumnElement], method: str = 'AND') -> ColumnElement | None:
+    if not conditions:
+        return None
+    if method == 'OR':
+        return or_(*conditions)
+    condition = conditions[0]
+    for other in conditions[1:]:
+        condition = condition & other
+    return condition
+
+
+def fulltext_index(name: str, *columns: Any, dialect: str = DEFAULT_DIALECT) -> Index:
+    """ Index for the fulltext search mode, declare it in __table_args__
+
+    Args:
+        name (str): Index name
+        columns (Any): Columns of the index (one index per searched column)
+        dialect (str, optional): Dialect of the database. Defaults to the dialect of the project.
+
+    Returns:
+        Index: FULLTEXT index in MySQL, GIN over to_tsvector in PostgreSQL
+    """
+    if dialect == 'postgresql':
+        return Index(name, *[func.to_tsvector(POSTGRESQL_TS_CONFIG, column) for column in columns], postgresql_using='gin')
+    return Index(name, *columns, mysql_prefix='FULLTEXT', mariadb_prefix='FULLTEXT')
+
+
+def trigram_index(name: str, column: Any) -> Index:
+    """ Index for the trigram search mode (PostgreSQL, requires CREATE EXTENSION pg_trgm)
+
+    Args:
+        name (str): Index name
+        column (Any): Searched column
+
+    Returns:
+        Index: GIN index with gin_trgm_ops
+    """
+    return Index(name, column, postgresql_using='gin', postgresql_ops={column.name: 'gin_trgm_ops'})
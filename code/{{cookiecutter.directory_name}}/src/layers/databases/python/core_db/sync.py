@@ -0,0 +1,141 @@
+"""
+Delta sync of the models with an updated at column (BaseModel.UPDATED_AT_COLUMN). The clients keep a watermark and
+ask for the rows changed after it (index?updated_since=<watermark>):
+
+- The changes are ordered by (updated at, id) and continued by keyset, a page never skips or repeats rows that
+  share their updated at. An index over (updated at, id) serves it, a sync without changes reads no rows.
+- Soft deleted rows are returned as tombstones ({"<id>": 1, "deleted": true}), rows removed with a hard delete
+  are not reported.
+- The first sync sends a date (updated_since=1970-01-01T00:00:00), the next ones the returned next_watermark.
+  Dates with a time zone (2024-01-01T00:00:00Z) are compared in UTC with the updated at columns without time zone.
+
+The watermark relies on the updated at of the writes: a transaction that commits after a newer one can be missed by
+a sync that ran between both commits, clients that need it can sync again from an older watermark (the changes are
+upserts, applying a row twice is harmless).
+"""
+import json
+import base64
+import binascii
+import datetime
+from typing import Any
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from core_utils.environment import env
+
+## Max changes returned by a sync page (the per_page of the request is capped to it)
+SYNC_PAGE_SIZE = env("SYNC_PAGE_SIZE", 500)
+
+## Keys of the internal columns of the sync rows, removed before the response
+SYNC_UPDATED_AT_KEY = '_sync_updated_at'
+SYNC_ID_KEY = '_sync_id'
+## Key of the tombstone flag in the response
+SYNC_DELETED_KEY = 'deleted'
+
+
+def encode_watermark(updated_at: Any, id: int | None) -> str:
+    """ Opaque watermark of the last change seen by a client
+
+    Args:
+        updated_at (Any): Updated at of the last change
+        id (int | None): Identifier of the last change, None for a date sent by the client
+
+    Returns:
+        str: URL safe watermark
+    """
+    value = updated_at.isoformat() if isinstance(updated_at, (datetime.date, datetime.datetime)) else str(updated_at)
+    raw = json.dumps([value, id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_watermark(watermark: str) -> tuple[datetime.datetime, int | None]:
+    """ Read the watermark of a request: a watermark returned by a sync or an ISO date (first sync)
+
+    Args:
+        watermark (str): updated_since parameter
+
+    Raises:
+        ValueError: Invalid watermark
+
+    Returns:
+        tuple[datetime.datetime, int | None]: Updated at and identifier of the last change seen
+    """
+    watermark = str(watermark).strip()
+    try:
+        return datetime.datetime.fromisoformat(watermark), None
+    except ValueError:
+        pass
+
+    try:
+        raw = base64.urlsafe_b64decode(watermark + '=' * (-len(watermark) % 4))
+        value, id = json.loads(raw)
+        return datetime.datetime.fromisoformat(value), None if id is None else int(id)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError(f"Invalid updated_since {watermark}")
+
+
+def align_timezone(updated_at: Any, value: datetime.datetime) -> datetime.datetime:
+    """ Express a watermark like the values of the updated at column: naive UTC for columns without time zone,
+    aware (UTC when the watermark is naive) for the ones with time zone
+
+    Args:
+        updated_at (Any): Updated at column
+        value (datetime.datetime): Updated at of the watermark
+
+    Returns:
+        datetime.datetime: Comparable updated at
+    """
+    timezone = getattr(getattr(updated_at, 'type', None), 'timezone', False)
+    if value.tzinfo is not None and not timezone:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    if value.tzinfo is None and timezone:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def changed_since(updated_at: Any, id: Any, since: tuple[datetime.datetime, int | None]) -> ColumnElement:
+    """ Keyset condition of the changes after a watermark, (updated at, id) > (since, last id) expanded so every
+    dialect serves it with the (updated at, id) index
+
+    Args:
+        updated_at (Any): Updated at column
+        id (Any): Identifier column
+        since (tuple[datetime.datetime, int | None]): Decoded watermark
+
+    Returns:
+        ColumnElement: Condition
+    """
+    since_updated_at, since_id = since
+    since_updated_at = align_timezone(updated_at, since_updated_at)
+    if since_id is None:
+        return updated_at > since_updated_at
+    return or_(updated_at > since_updated_at, and_(updated_at == since_updated_at, id > since_id))
+
+
+def split_changes(rows: list, id_key: str, since: tuple, limit: int) -> tuple[list[dict], tuple, bool]:
+    """ Build the page of changes from the rows of BaseModel.sync_query (fetched with limit + 1)
+
+    Args:
+        rows (list): Row mappings
+        id_key (str): Key of the identifier in the response (property_map name)
+        since (tuple): Decoded watermark of the request
+        limit (int): Changes of the page
+
+    Returns:
+        tuple[list[dict], tuple, bool]: Changes, watermark of the last change (the same one without changes) and
+            whether there are more changes
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = []
+    for row in rows:
+        if row.get(SYNC_DELETED_KEY):
+            changes.append({id_key: row[SYNC_ID_KEY], SYNC_DELETED_KEY: True})
+            continue
+        change = {key: value for key, value in row.items() if key not in (SYNC_UPDATED_AT_KEY, SYNC_ID_KEY)}
+        change[SYNC_DELETED_KEY] = False
+        changes.append(change)
+
+    watermark = (rows[-1][SYNC_UPDATED_AT_KEY], rows[-1][SYNC_ID_KEY]) if rows else since
+    return changes, watermark, has_more
@@ -0,0 +1,253 @@
+"""
+Routing of the connections by tenant. The handlers open a tenant scope with the tenant of the request
+(core_http.tenancy.tenant_handler) and, inside it, BaseModel.get_connection_params returns the connection of the
+shard of the tenant, so DBConnection, the services and the caches of the models use it without changes.
+
+The map of a connection comes from its DATABASE_TENANT_MAP ("secret:<name>", "ssm:<name>" or the JSON itself):
+
+    {
+        "tenants": {"acme": "cluster-a", "globex": "cluster-b"},
+        "shards": {
+            "cluster-a": {"secret_name": "dev-app-cluster-a"},
+            "cluster-b": {"connection_string": "mysql+pymysql://...", "replica_connection_strings": "..."}
+        }
+    }
+
+Secrets and parameters are cached by core_aws (SECRETS_CACHE_TTL / PARAMETERS_CACHE_TTL). The tenants that are not
+in the map use the connection itself. Every shard gets its own engines with the pool settings of the connection,
+at most DATABASE_TENANT_MAX_ENGINES shards are kept in the container: the least recently used pools without
+checked out connections are disposed, also the ones unused for DATABASE_TENANT_IDLE_SECONDS. The settings of a
+shard are read again after its disposal.
+"""
+import re
+import sys
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aws_lambda_powertools import Logger
+
+from core_db.config import DBConfig, CONNECTIONS_CONFIG
+from core_utils.environment import env
+
+LOGGER = Logger('layers.core.core_db.tenancy')
+
+## Shards with engines kept in the container
+DATABASE_TENANT_MAX_ENGINES = env("DATABASE_TENANT_MAX_ENGINES", 8)
+## Seconds without use after which the pools of a shard are disposed
+DATABASE_TENANT_IDLE_SECONDS = env("DATABASE_TENANT_IDLE_SECONDS", 300)
+
+## Valid tenant identifiers (they are part of connection and cache names)
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,62}$")
+
+## Routed connections (<connection>@<shard>) by last use, the oldest first
+TENANT_CONNECTIONS: OrderedDict[str, float] = OrderedDict()
+
+_CURRENT_TENANT: ContextVar[str | None] = ContextVar('core_db_tenant', default=None)
+_PARSED_MAPS: dict[str, dict] = {}
+_PENDING_DISPOSALS: set[asyncio.Task] = set()
+
+
+class TenantRoutingError(Exception):
+    """ The map of tenants of a connection can't be loaded or is invalid """
+
+
+@contextmanager
+def tenant_scope(tenant: str | None):
+    """ Route the connections of the block to the shard of the tenant (None keeps the default connections)
+
+    Args:
+        tenant (str | None): Tenant identifier
+
+    Raises:
+        ValueError: The identifier is not valid
+    """
+    if tenant is not None and not TENANT_PATTERN.match(tenant):
+        raise ValueError(f"Invalid tenant {tenant!r}")
+    token = _CURRENT_TENANT.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _CURRENT_TENANT.reset(token)
+
+
+def get_current_tenant() -> str | None:
+    return _CURRENT_TENANT.get()
+
+
+def load_tenant_map(source: str) -> dict:
+    """ Read a map of tenants
+
+    Args:
+        source (str): "secret:<name>", "ssm:<name>" or the JSON of the map
+
+    Raises:
+        TenantRoutingError: The map can't be read or doesn't have tenants and shards
+
+    Returns:
+        dict: Map with 'tenants' (tenant -> shard) and 'shards' (shard -> connection settings)
+    """
+    try:
+        if source.startswith('secret:'):
+            from core_aws.secret_manager import get_secret
+            raw = get_secret(source[len('secret:'):])
+        elif source.startswith('ssm:'):
+            from core_aws.ssm import get_parameter
+            raw = get_parameter(source[len('ssm:'):], is_dict=False)
+        else:
+            raw = source
+
+        # Secrets and parameters are cached as text by core_aws, the parsed map is reused while the text doesn't change
+        if raw not in _PARSED_MAPS:
+            tenant_map = json.loads(raw)
+            if not isinstance(tenant_map.get('tenants'), dict) or not isinstance(tenant_map.get('shards'), dict):
+                raise ValueError("the map needs 'tenants' and 'shards'")
+            _PARSED_MAPS.clear()
+            _PARSED_MAPS[raw] = tenant_map
+        return _PARSED_MAPS[raw]
+    except Exception as e:
+        raise TenantRoutingError(f"Cannot load the tenant map {source.split(':')[0]}: {e}") from e
+
+
+def get_shard(config: DBConfig, tenant: str) -> tuple[str, dict] | None:
+    """ Shard of a tenant in a connection
+
+    Args:
+        config (DBConfig): Configuration of the connection
+        tenant (str): Tenant identifier
+
+    Returns:
+        tuple[str, dict] | None: Shard name and settings, None if the tenant uses the connection itself
+    """
+    if not config.DATABASE_TENANT_MAP:
+        return None
+    tenant_map = load_tenant_map(str(config.DATABASE_TENANT_MAP))
+    shard_name = tenant_map['tenants'].get(tenant)
+    if shard_name is None:
+        return None
+    if shard_name not in tenant_map['shards']:
+        raise TenantRoutingError(f"The shard {shard_name} of the tenant {tenant} is not declared")
+    return shard_name, tenant_map['shards'][shard_name]
+
+
+def route_connection(params: dict) -> dict:
+    """ Connection parameters for the current tenant
+
+    Args:
+        params (dict): Parameters of the connection (CONNECTIONS entry)
+
+    Returns:
+        dict: Same parameters outside a tenant scope or for tenants without shard, otherwise the parameters of the
+            routed connection (config_name <connection>@<shard> and shard)
+    """
+    tenant = _CURRENT_TENANT.get()
+    if tenant is None or not params:
+        return params
+
+    config = DBConfig.get_config(conn_name=params['config_name'], secret_name=params.get('secret_name'), prefix=params.get('prefix', 'default'))
+    shard = get_shard(config, tenant) if config is not None else None
+    if shard is None:
+        return params
+
+    shard_name, shard_settings = shard
+    routed_name = f"{config.conn_name}@{shard_name}"
+    if routed_name not in CONNECTIONS_CONFIG:
+        CONNECTIONS_CONFIG[routed_name] = config.for_shard(shard_name, shard_settings)
+    touch_connection(routed_name)
+    return {**params, 'config_name': routed_name, 'shard': shard_name}
+
+
+def touch_connection(routed_name: str) -> None:
+    """ Mark a routed connection as used and dispose the pools that exceed the limits """
+    TENANT_CONNECTIONS[routed_name] = time.monotonic()
+    TENANT_CONNECTIONS.move_to_end(routed_name)
+    evict_connections(keep=routed_name)
+
+
+def evict_connections(keep: str | None = None) -> list[str]:
+    """ Dispose the least recently used routed connections over DATABASE_TENANT_MAX_ENGINES and the ones idle for
+    DATABASE_TENANT_IDLE_SECONDS. Connections with checked out connections are skipped
+
+    Args:
+        keep (str | None, optional): Connection that is never disposed (the one being routed). Defaults to None.
+
+    Returns:
+        list[str]: Disposed connections
+    """
+    now = time.monotonic()
+    evicted = []
+    for routed_name, last_used in list(TENANT_CONNECTIONS.items()):
+        over_limit = len(TENANT_CONNECTIONS) > DATABASE_TENANT_MAX_ENGINES
+        if not over_limit and now - last_used < DATABASE_TENANT_IDLE_SECONDS:
+            break
+        if routed_name == keep or not dispose_connection(routed_name):
+            continue
+        del TENANT_CONNECTIONS[routed_name]
+        evicted.append(routed_name)
+
+    if evicted:
+        LOGGER.info("Disposed tenant connections", extra={'connections': evicted})
+    if len(TENANT_CONNECTIONS) > DATABASE_TENANT_MAX_ENGINES:
+        LOGGER.warning(f"{len(TENANT_CONNECTIONS)} tenant connections in use, over DATABASE_TENANT_MAX_ENGINES")
+    return evicted
+
+
+def _is_idle(engines: list) -> bool:
+    # Only the queue pools count their checked out connections
+    return all(getattr(engine.pool, 'checkedout', lambda: 0)() == 0 for engine in engines)
+
+
+def dispose_connection(routed_name: str) -> bool:
+    """ Dispose the sync and async engines of a routed connection when none of its connections is checked out
+
+    Args:
+        routed_name (str): Routed connection name
+
+    Returns:
+        bool: True if it was disposed (or had no engines)
+    """
+    from core_db.DBConnection import CONNECTION_HANDLERS
+
+    handler = CONNECTION_HANDLERS.get(routed_name)
+    sync_engines = handler.get_engines() if handler is not None and handler.engine is not None else []
+
+    # The async layer is only inspected when the function imported it
+    async_module = sys.modules.get('core_db.AsyncDBConnection')
+    async_handler = async_module.ASYNC_CONNECTION_HANDLERS.get(routed_name) if async_module is not None else None
+    async_engines = []
+    if async_handler is not None:
+        async_engines = [async_handler.engine.sync_engine] if async_handler.engine is not None else []
+        async_engines += list(async_handler.replicas.engines) if async_handler.replicas is not None else []
+
+    if not _is_idle(sync_engines + async_engines):
+        return False
+
+    for engine in sync_engines:
+        engine.dispose()
+    if handler is not None:
+        del CONNECTION_HANDLERS[routed_name]
+    CONNECTIONS_CONFIG.pop(routed_name, None)
+
+    if async_handler is not None:
+        for engine in async_engines:
+            _dispose_async(async_module, engine)
+        del async_module.ASYNC_CONNECTION_HANDLERS[routed_name]
+    return True
+
+
+def _dispose_async(async_module, engine) -> None:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+    coroutine = AsyncEngine(engine).dispose()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        async_module.run(coroutine)
+        return
+    # Inside a handler the pool is closed in the background by the loop of the container
+    task = loop.create_task(coroutine)
+    _PENDING_DISPOSALS.add(task)
+    task.add_done_callback(_PENDING_DISPOSALS.discard)
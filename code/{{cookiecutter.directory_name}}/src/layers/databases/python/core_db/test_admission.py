@@ -0,0 +1,88 @@
+import pytest
+
+from core_db import admission
+from core_db.admission import ADMISSION_RETRY_AFTER, AdmissionController, CircuitBreaker, CircuitOpen, LoadShed, Priority
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ Monotonic clock of the module moved by the tests """
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_circuit_opens_after_the_failure_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=15)
+
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == 15
+    clock[0] += 4
+    assert breaker.retry_after() == 11
+    clock[0] += 10.5
+    assert breaker.retry_after() == 1
+
+
+def test_one_probe_after_the_reset_time(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=15)
+    breaker.record_failure()
+
+    clock[0] += 15
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    # The failed probe reopens the circuit for another reset time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert breaker.retry_after() == 15
+
+    clock[0] += 15
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_that_never_reported_is_replaced(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=15)
+    breaker.record_failure()
+    clock[0] += 15
+    assert breaker.allow()
+
+    clock[0] += 14
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+
+
+def test_low_priority_requests_are_shed_while_overloaded(clock):
+    controller = AdmissionController('admission-tests', max_wait_ms=200)
+    controller.observe_checkout(500)
+
+    with pytest.raises(LoadShed) as shed:
+        controller.admit(Priority.LOW)
+    assert shed.value.retry_after == ADMISSION_RETRY_AFTER
+    assert "checkout wait 500 ms" in str(shed.value)
+    controller.admit(Priority.NORMAL)
+
+    # The wait of an old checkout doesn't keep the connection overloaded
+    clock[0] += admission.CHECKOUT_WAIT_WINDOW_SECONDS + 1
+    controller.admit(Priority.LOW)
+
+
+def test_every_request_is_rejected_while_the_circuit_is_open(clock):
+    controller = AdmissionController('admission-tests', failure_threshold=1, reset_seconds=15)
+    controller.breaker.record_failure()
+    clock[0] += 5
+
+    for priority in (Priority.LOW, Priority.NORMAL):
+        with pytest.raises(CircuitOpen) as rejected:
+            controller.admit(priority)
+        assert rejected.value.retry_after == 10
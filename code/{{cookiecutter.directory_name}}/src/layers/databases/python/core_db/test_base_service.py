@@ -0,0 +1,132 @@
+import json
+import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.DBConnection import AlchemyEncoder
+from core_db.instrumentation import start_invocation, _CURRENT_STATS
+
+
+class RowNote(BaseModel):
+    __tablename__ = 'row_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+    priority = Column(Integer)
+    body = Column(String(200))
+
+    @classmethod
+    def property_map(cls_):
+        return {"id": "IdNote", "title": "Title"}
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "title", "priority"]
+
+
+class RowNoteService(BaseService):
+    def __init__(self):
+        super().__init__(RowNote)
+
+
+class LambdaPart(BaseModel):
+    __tablename__ = 'lambda_parts'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdPart", Integer, primary_key=True)
+    name = Column(String(50))
+    updated_at = Column(DateTime)
+
+
+class LambdaTool(BaseModel):
+    """ Same shape as LambdaPart, the lambda statements must not share their cached SQL """
+    __tablename__ = 'lambda_tools'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdTool", Integer, primary_key=True)
+    name = Column(String(50))
+    updated_at = Column(DateTime)
+
+
+@pytest.fixture
+def session(create_tables):
+    connection = create_tables(RowNote)
+    session = connection.get_session()
+    session.add_all([RowNote(id=index, title=f"note {index}", priority=index % 2, body="hidden") for index in range(1, 6)])
+    session.commit()
+    session.close()
+    session = connection.get_session()
+    yield session
+    session.close()
+
+
+def test_rows_are_keyed_by_the_property_map_labels(session):
+    _, rows = RowNoteService().multiple_filters_rows(session, [{"priority": 1}], paginate=True, per_page=2, order_by="id")
+
+    assert [dict(row) for row in rows] == [
+        {"IdNote": 1, "Title": "note 1", "priority": 1},
+        {"IdNote": 3, "Title": "note 3", "priority": 1},
+    ]
+    # Same body as the ORM objects serialized by AlchemyEncoder
+    _, objects = RowNoteService().multiple_filters(session, [{"priority": 1}], paginate=True, per_page=2, order_by="id")
+    assert json.loads(json.dumps(rows, cls=AlchemyEncoder)) == json.loads(json.dumps(objects, cls=AlchemyEncoder))
+
+
+def test_rows_of_the_given_columns_keep_their_names(session):
+    query, rows = RowNoteService().multiple_filters_rows(session, [], order_by="id", order_dir="desc", columns=["id", "body", "missing"])
+
+    assert [dict(row) for row in rows][:2] == [{"id": 5, "body": "hidden"}, {"id": 4, "body": "hidden"}]
+    assert len(rows) == 5
+    assert RowNoteService().count_with_query(query, session) == 5
+
+
+def test_count_with_query_needs_the_session_of_a_select(session):
+    query, _ = RowNoteService().multiple_filters(session, [{"priority": 1}])
+
+    with pytest.raises(TypeError, match="needs the session"):
+        RowNoteService().count_with_query(query)
+    assert RowNoteService().count_with_query(query, session) == 3
+
+
+@pytest.fixture
+def stats():
+    stats = start_invocation()
+    yield stats
+    _CURRENT_STATS.set(None)
+
+
+def test_next_pages_hit_the_compiled_statement_cache(session, stats):
+    service = RowNoteService()
+    # Filter shape that no other test compiles
+    filters = [{"priority": 0}, {"title": "note 2"}]
+
+    service.multiple_filters(session, filters, paginate=True, page=1, per_page=1, order_by="title")
+    assert (stats.cache_hits, stats.cache_misses) == (0, 1)
+
+    _, rows = service.multiple_filters(session, [{"priority": 0}, {"title": "note 4"}], paginate=True, page=2, per_page=1, order_by="title")
+    assert rows == []
+    assert (stats.cache_hits, stats.cache_misses) == (1, 1)
+    assert stats.summary()["db_cache_hit_ratio"] == 0.5
+
+
+def test_lambda_statements_are_cached_per_model(create_tables):
+    connection = create_tables(LambdaPart, LambdaTool)
+    session = connection.get_session()
+    session.add_all([LambdaPart(id=index, name=f"part {index}", updated_at=datetime.datetime(2024, 1, index)) for index in range(1, 4)])
+    session.add_all([LambdaTool(id=index, name=f"tool {index}", updated_at=datetime.datetime(2024, 2, index)) for index in range(1, 3)])
+    session.commit()
+
+    try:
+        assert [part.name for part in LambdaPart.get_paginated(session, page=1, per_page=2)] == ["part 3", "part 2"]
+        assert [tool.name for tool in LambdaTool.get_paginated(session, page=1, per_page=2)] == ["tool 2", "tool 1"]
+        assert [part.name for part in LambdaPart.get_paginated(session, page=2, per_page=2)] == ["part 1"]
+        assert (LambdaPart.count(session), LambdaTool.count(session)) == (3, 2)
+        assert LambdaPart.version_of(session, 2) == (2, datetime.datetime(2024, 1, 2))
+        assert LambdaTool.version_of(session, 2) == (2, datetime.datetime(2024, 2, 2))
+        assert LambdaTool.version_of(session, 3) is None
+    finally:
+        session.close()
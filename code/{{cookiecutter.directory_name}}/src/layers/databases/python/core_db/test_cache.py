@@ -0,0 +1,200 @@
+import pickle
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, String, select
+from sqlalchemy.orm import relationship
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.cache import QUERY_CACHES, SharedQueryCache, plain_value, restore_instances, snapshot_instances
+from core_db.cache_backends import MemoryCacheBackend, set_shared_cache_backend
+
+
+class CacheCategory(BaseModel):
+    __tablename__ = 'cache_categories'
+    __connection_config_name__ = 'tests'
+    CACHE_TTL = 60
+
+    id = Column("IdCategory", Integer, primary_key=True)
+    name = Column(String(50))
+    products = relationship("CacheProduct", back_populates="category", order_by="CacheProduct.id")
+
+
+class CacheProduct(BaseModel):
+    __tablename__ = 'cache_products'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdProduct", Integer, primary_key=True)
+    name = Column(String(50))
+    category_id = Column("IdCategory", Integer, ForeignKey("cache_categories.IdCategory"))
+    category = relationship("CacheCategory", back_populates="products")
+
+
+class SharedCacheCategory(BaseModel):
+    __tablename__ = 'shared_cache_categories'
+    __connection_config_name__ = 'tests'
+    SHARED_CACHE_TTL = 60
+
+    id = Column("IdCategory", Integer, primary_key=True)
+    name = Column(String(50))
+
+
+class CacheCategoryService(BaseService):
+    def __init__(self, model=CacheCategory):
+        super().__init__(model)
+
+
+class UnavailableBackend(MemoryCacheBackend):
+    """ The lock of the key is held by other container and the backend fails after the first reads """
+
+    def __init__(self, failing_after: int) -> None:
+        super().__init__()
+        self.reads = 0
+        self.failing_after = failing_after
+
+    def get(self, key):
+        self.reads += 1
+        if self.reads > self.failing_after:
+            raise ConnectionError("cache is down")
+        return super().get(key)
+
+    def add(self, key, value, ttl):
+        return False
+
+
+def populate(connection):
+    QUERY_CACHES.pop(CacheCategory.__name__, None)
+    session = connection.get_session()
+    session.add_all([
+        CacheCategory(id=1, name="fruits", products=[CacheProduct(name="apple"), CacheProduct(name="pear")]),
+        CacheCategory(id=2, name="vegetables"),
+    ])
+    session.commit()
+    session.close()
+
+
+def test_cached_instance_belongs_to_the_request_session(create_tables):
+    connection = create_tables(CacheCategory, CacheProduct)
+    populate(connection)
+    service = CacheCategoryService()
+
+    first = connection.get_session()
+    service.get_one(first, 1)
+    first.close()
+
+    second = connection.get_session()
+    try:
+        category = service.get_one(second, 1)
+        assert service.get_query_cache().hits == 1
+        assert category in second
+        # Lazy load through the session of the request, the one that loaded the row is closed
+        assert [product.name for product in category.products] == ["apple", "pear"]
+
+        category.name = "fruit"
+        second.commit()
+    finally:
+        second.close()
+
+    check = connection.get_session()
+    try:
+        assert check.get(CacheCategory, 1).name == "fruit"
+    finally:
+        check.close()
+
+
+def test_cached_lists_keep_plain_values(create_tables):
+    connection = create_tables(CacheCategory, CacheProduct)
+    populate(connection)
+    service = CacheCategoryService()
+
+    session = connection.get_session()
+    service.multiple_filters(session, [], order_by="id")
+    session.close()
+
+    cache = service.get_query_cache()
+    for _, value in cache._entries.values():
+        assert value == [{"id": 1, "name": "fruits"}, {"id": 2, "name": "vegetables"}]
+
+    session = connection.get_session()
+    try:
+        _, categories = service.multiple_filters(session, [], order_by="id")
+        assert [category.name for category in categories] == ["fruits", "vegetables"]
+        assert all(category in session for category in categories)
+    finally:
+        session.close()
+
+
+def test_snapshot_of_loaded_relationships(create_tables):
+    connection = create_tables(CacheCategory, CacheProduct)
+    populate(connection)
+
+    session = connection.get_session()
+    category = session.get(CacheCategory, 1)
+    # Loaded relationships in both directions (the snapshot keeps the cycle)
+    assert all(product.category is category for product in category.products)
+    cached = snapshot_instances(category)
+    session.close()
+
+    assert [product["name"] for product in cached["products"]] == ["apple", "pear"]
+    assert cached["products"][0]["category"] is cached
+
+    session = connection.get_session()
+    try:
+        restored = restore_instances(session, CacheCategory, cached)
+        assert [product.category for product in restored.products] == [restored, restored]
+        assert snapshot_instances(None) is None and restore_instances(session, CacheCategory, None) is None
+    finally:
+        session.close()
+
+
+def test_shared_cache_wait_falls_back_to_the_loader():
+    # Version and entry are read, then the backend fails while waiting for the container with the lock
+    cache = SharedQueryCache("unavailable", UnavailableBackend(failing_after=2), ttl=60, lock_timeout=1, wait_interval=0.01)
+
+    assert cache.get_or_load(("key",), lambda: "loaded") == "loaded"
+    assert cache.errors == 1
+
+
+def test_shared_cache_stores_plain_values(create_tables):
+    connection = create_tables(SharedCacheCategory)
+    session = connection.get_session()
+    session.add(SharedCacheCategory(id=1, name="fruits"))
+    session.commit()
+    session.close()
+
+    backend = MemoryCacheBackend()
+    set_shared_cache_backend(backend)
+    QUERY_CACHES.pop(SharedCacheCategory.__name__, None)
+    service = CacheCategoryService(SharedCacheCategory)
+    try:
+        session = connection.get_session()
+        try:
+            category = service.get_one(session, 1)
+            _, rows = service.multiple_filters_rows(session, [], columns=["id", "name"])
+            assert category.name == "fruits" and category in session
+        finally:
+            session.close()
+
+        # Only the entries of the two queries are left (the locks are released)
+        values = [pickle.loads(payload)[1] for _, payload in backend._data.values()]
+        assert {"id": 1, "name": "fruits"} in values
+        assert [{"id": 1, "name": "fruits"}] in values
+        assert rows == [{"id": 1, "name": "fruits"}]
+    finally:
+        set_shared_cache_backend(None)
+        QUERY_CACHES.pop(SharedCacheCategory.__name__, None)
+
+
+def test_plain_value_rejects_orm_instances(create_tables):
+    connection = create_tables(SharedCacheCategory)
+    session = connection.get_session()
+    try:
+        session.add(SharedCacheCategory(id=1, name="fruits"))
+        session.commit()
+        row = session.execute(select(SharedCacheCategory.id, SharedCacheCategory.name)).first()
+
+        assert plain_value([row, row._mapping]) == [(1, "fruits"), {"id": 1, "name": "fruits"}]
+        with pytest.raises(TypeError):
+            plain_value([session.get(SharedCacheCategory, 1)])
+    finally:
+        session.close()
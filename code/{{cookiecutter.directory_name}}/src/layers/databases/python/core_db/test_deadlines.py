@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from core_db import deadlines
+from core_db.deadlines import TIMEOUT_INFO_KEY, apply_deadlines
+from core_utils.deadline import deadline_scope
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    # SQLite has no session timeout, the SET is replaced by a statement it runs
+    statements = []
+
+    def get_timeout_statement(dialect, timeout_ms):
+        statements.append(timeout_ms)
+        return "SELECT 1"
+
+    monkeypatch.setattr(deadlines, 'get_timeout_statement', get_timeout_statement)
+    engine = apply_deadlines(create_engine(f"sqlite:///{tmp_path / 'deadlines.db'}", pool_size=1))
+    engine.statements = statements
+    yield engine
+    engine.dispose()
+
+
+def test_timeout_is_set_once_per_deadline(engine):
+    with deadline_scope(remaining=60000, margin_ms=0) as deadline:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+            assert conn.info[TIMEOUT_INFO_KEY][0] == deadline.id
+
+    assert len(engine.statements) == 1
+    assert 0 < engine.statements[0] <= 60000
+
+
+def test_pool_reset_forgets_the_timeout(engine):
+    with deadline_scope(remaining=60000, margin_ms=0):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.commit()
+            timeout_ms = conn.info[TIMEOUT_INFO_KEY][1]
+
+        # Same connection of the pool, only its reset on return ran (no rollback event of the engine)
+        with engine.connect() as conn:
+            assert conn.info[TIMEOUT_INFO_KEY] == (None, timeout_ms)
+            conn.execute(text("SELECT 1"))
+
+    assert len(engine.statements) == 2
+
+
+def test_connection_without_deadline_restores_the_default(engine):
+    with deadline_scope(remaining=60000, margin_ms=0):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert TIMEOUT_INFO_KEY not in conn.info
+
+    assert engine.statements[-1] is None
@@ -0,0 +1,136 @@
+import io
+import csv
+import json
+import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy.orm import relationship
+
+from core_db import export
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.export import ArrowExportWriter, CsvExportWriter, ExportFormatUnavailable, NdjsonExportWriter, ParquetExportWriter, get_export_columns, get_export_writer
+
+COLUMN_ALIASES = {
+    "id": {"alias": "Id"},
+    "amount": {"alias": "Amount"},
+    "paid": {"alias": "Paid"},
+    "placed_on": {"alias": "Placed"},
+    "created_at": {"alias": "Created"},
+    "shipped_at": {"alias": "Shipped"},
+    "customer": {"alias": "Customer", "relation": "customer", "attr": "name"},
+}
+
+
+class ExportCustomer(BaseModel):
+    __tablename__ = 'export_customers'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdCustomer", Integer, primary_key=True)
+    name = Column(String(50))
+
+
+class ExportOrder(BaseModel):
+    __tablename__ = 'export_orders'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdOrder", Integer, primary_key=True)
+    amount = Column(Numeric(10, 2))
+    paid = Column(Boolean)
+    placed_on = Column(Date)
+    created_at = Column(DateTime(timezone=True))
+    shipped_at = Column(DateTime, nullable=True)
+    customer_id = Column("IdCustomer", Integer, ForeignKey("export_customers.IdCustomer"))
+    customer = relationship("ExportCustomer")
+
+
+class ExportOrderService(BaseService):
+    def __init__(self):
+        super().__init__(ExportOrder)
+
+
+@pytest.fixture
+def session(create_tables):
+    connection = create_tables(ExportCustomer, ExportOrder)
+    session = connection.get_session()
+    acme = ExportCustomer(id=1, name="acme")
+    session.add_all([
+        ExportOrder(id=1, amount=Decimal("10.50"), paid=True, placed_on=datetime.date(2024, 5, 1), created_at=datetime.datetime(2024, 5, 1, 9, 30), shipped_at=datetime.datetime(2024, 5, 2, 8, 0), customer=acme),
+        ExportOrder(id=2, amount=Decimal("3.25"), paid=False, placed_on=datetime.date(2024, 5, 2), created_at=datetime.datetime(2024, 5, 2, 10, 0), shipped_at=None, customer=None),
+        ExportOrder(id=3, amount=Decimal("99.99"), paid=True, placed_on=datetime.date(2024, 5, 3), created_at=datetime.datetime(2024, 5, 3, 11, 15), shipped_at=None, customer=acme),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def export_to_bytes(session, writer_class, column_aliases: dict = COLUMN_ALIASES, batch_rows: int = 2) -> tuple[bytes, int]:
+    columns = get_export_columns(column_aliases)
+    output = io.BytesIO()
+    writer = writer_class(ExportOrder, columns, output)
+    rows = ExportOrderService().export(session, writer, [], columns, order_by="id", batch_rows=batch_rows)
+    writer.close()
+    return output.getvalue(), rows
+
+
+def test_ndjson_export(session):
+    content, rows = export_to_bytes(session, NdjsonExportWriter)
+
+    lines = [json.loads(line) for line in content.decode("utf-8").splitlines()]
+    assert rows == 3 and len(lines) == 3
+    assert lines[0] == {
+        "Id": 1, "Amount": 10.5, "Paid": True, "Placed": "2024-05-01", "Created": "2024-05-01T09:30:00",
+        "Shipped": "2024-05-02T08:00:00", "Customer": "acme"
+    }
+    assert lines[1]["Customer"] is None and lines[1]["Shipped"] is None
+
+
+def test_relation_columns(session):
+    aliases = {"id": {"alias": "Id"}, "customer": {"alias": "Customer", "relation": "customer", "attr": "name"}}
+
+    content, _ = export_to_bytes(session, CsvExportWriter, aliases, batch_rows=1)
+
+    assert list(csv.DictReader(io.StringIO(content.decode("utf-8")))) == [
+        {"Id": "1", "Customer": "acme"},
+        {"Id": "2", "Customer": ""},
+        {"Id": "3", "Customer": "acme"},
+    ]
+
+
+def test_unavailable_formats(monkeypatch):
+    with pytest.raises(ExportFormatUnavailable):
+        get_export_writer("xml")
+    assert get_export_writer("NDJSON") is NdjsonExportWriter
+
+    def missing_pyarrow():
+        raise ExportFormatUnavailable("The arrow and parquet exports need pyarrow in the layer")
+
+    monkeypatch.setattr(export, '_get_pyarrow', missing_pyarrow)
+    with pytest.raises(ExportFormatUnavailable):
+        ArrowExportWriter(ExportOrder, get_export_columns(COLUMN_ALIASES), io.BytesIO())
+
+
+@pytest.mark.parametrize('writer_class', [ArrowExportWriter, ParquetExportWriter], ids=["arrow", "parquet"])
+def test_columnar_schema_from_the_column_types(session, writer_class):
+    pa = pytest.importorskip("pyarrow")
+    content, _ = export_to_bytes(session, writer_class)
+
+    if writer_class is ArrowExportWriter:
+        table = pa.ipc.open_file(pa.BufferReader(content)).read_all()
+    else:
+        table = pytest.importorskip("pyarrow.parquet").read_table(pa.BufferReader(content))
+
+    assert table.schema == pa.schema([
+        pa.field("Id", pa.int64()),
+        pa.field("Amount", pa.decimal128(10, 2)),
+        pa.field("Paid", pa.bool_()),
+        pa.field("Placed", pa.date32()),
+        pa.field("Created", pa.timestamp("us", tz="UTC")),
+        pa.field("Shipped", pa.timestamp("us")),
+        pa.field("Customer", pa.string()),
+    ])
+    assert table.column("Amount").to_pylist() == [Decimal("10.50"), Decimal("3.25"), Decimal("99.99")]
+    assert table.column("Created").to_pylist()[0] == datetime.datetime(2024, 5, 1, 9, 30, tzinfo=datetime.timezone.utc)
+    assert table.column("Customer").to_pylist() == ["acme", None, "acme"]
@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+from sqlalchemy import Boolean, Column, Date, Integer, String
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.filters import coerce_value, compile_filter
+from core_utils.filters import FilterExpression, parse_filter
+
+
+class FilterInvoice(BaseModel):
+    __tablename__ = 'filter_invoices'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdInvoice", Integer, primary_key=True)
+    amount = Column(Integer)
+    due = Column(Date)
+    paid = Column(Boolean)
+    note = Column(String(100), nullable=True)
+
+    filter_columns = ["amount", "due", "paid", "note"]
+
+
+class FilterInvoiceService(BaseService):
+    def __init__(self):
+        super().__init__(FilterInvoice)
+
+
+@pytest.fixture
+def invoices(create_tables):
+    connection = create_tables(FilterInvoice)
+    session = connection.get_session()
+    session.add_all([
+        FilterInvoice(id=1, amount=10, due=datetime.date(2024, 1, 10), paid=True, note="urgent"),
+        FilterInvoice(id=2, amount=25, due=datetime.date(2024, 2, 10), paid=False, note=None),
+        FilterInvoice(id=3, amount=50, due=datetime.date(2024, 3, 10), paid=True, note=None),
+        FilterInvoice(id=4, amount=100, due=datetime.date(2024, 4, 10), paid=False, note="late"),
+    ])
+    session.commit()
+    session.close()
+    session = connection.get_session()
+    yield session
+    session.close()
+
+
+def filtered_ids(session, *filters: tuple[str, str]) -> list[int]:
+    expressions = [parse_filter(key, value) for key, value in filters]
+    _, rows = FilterInvoiceService().multiple_filters(session, expressions, order_by="id")
+    return [row.id for row in rows]
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ([("amount__gte", "25")], [2, 3, 4]),
+    ([("amount__lt", "50")], [1, 2]),
+    ([("amount__in", "10, 50,100")], [1, 3, 4]),
+    ([("due__between", "2024-02-01,2024-03-31")], [2, 3]),
+    ([("note__isnull", "true")], [2, 3]),
+    ([("note__isnull", "false")], [1, 4]),
+    ([("amount__ne", "25")], [1, 3, 4]),
+    ([("paid__eq", "yes"), ("amount__gte", "50")], [3]),
+    ([("due__lte", "2024-02-10"), ("paid", "false")], [2]),
+], ids=["gte", "lt", "in", "between", "isnull", "not-null", "ne", "bool", "date"])
+def test_operators_return_the_matching_rows(invoices, filters, expected):
+    assert filtered_ids(invoices, *filters) == expected
+
+
+def test_values_are_coerced_to_the_column_type():
+    assert coerce_value(FilterInvoice.due, "2024-02-10") == datetime.date(2024, 2, 10)
+    assert coerce_value(FilterInvoice.paid, "TRUE") is True
+    assert coerce_value(FilterInvoice.paid, "0") is False
+    assert coerce_value(FilterInvoice.amount, "25") == 25
+    assert coerce_value(FilterInvoice.note, "25") == "25"
+
+    predicate = compile_filter(FilterInvoice, FilterExpression("due", "gte", ("2024-02-10",)))
+    assert predicate.right.value == datetime.date(2024, 2, 10)
+
+    for column, value in (("paid", "maybe"), ("due", "10/02/2024"), ("amount", "ten")):
+        with pytest.raises(ValueError):
+            compile_filter(FilterInvoice, FilterExpression(column, "eq", (value,)))
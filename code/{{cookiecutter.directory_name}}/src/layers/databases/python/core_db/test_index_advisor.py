@@ -0,0 +1,102 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, text
+
+from core_db.BaseModel import BaseModel
+from core_db.index_advisor import advise, explain, is_full_scan, recommend_indexes
+from core_db.search import SEARCH_PREFIX
+
+
+class AdvisorOrder(BaseModel):
+    __tablename__ = 'advisor_orders'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdOrder", Integer, primary_key=True)
+    name = Column(String(50))
+    status = Column(String(20))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+
+    filter_columns = ["status"]
+    search_columns = ["name"]
+    search_modes = {"name": SEARCH_PREFIX}
+    order_columns = ["created_at"]
+
+
+def populate(connection):
+    session = connection.get_session()
+    start = datetime.datetime(2024, 1, 1)
+    session.add_all([
+        AdvisorOrder(name=f"order {i}", status=["new", "paid"][i % 2], created_at=start, updated_at=start + datetime.timedelta(hours=i))
+        for i in range(20)
+    ])
+    session.commit()
+    session.close()
+
+
+def test_recommends_the_indexes_of_filters_search_and_order(create_tables):
+    connection = create_tables(AdvisorOrder)
+    engine = connection.get_engine()
+
+    recommendations = recommend_indexes(AdvisorOrder, engine)
+    assert [recommendation.columns for recommendation in recommendations] == [
+        ("deleted_at", "IdOrder"),
+        ("status", "deleted_at"),
+        ("name",),
+        ("deleted_at", "created_at"),
+        ("deleted_at", "updated_at"),
+        ("updated_at", "IdOrder"),
+    ]
+    assert recommendations[1].ddl.strip() == "CREATE INDEX ix_advisor_orders_status_deleted_at ON advisor_orders (status, deleted_at)"
+    # The DDL is only rendered, the table of the model keeps its own indexes
+    assert not AdvisorOrder.__table__.indexes
+
+    with engine.begin() as conn:
+        for recommendation in recommendations:
+            conn.execute(text(recommendation.ddl))
+    assert recommend_indexes(AdvisorOrder, engine) == []
+
+
+def test_explain_detects_the_full_scans(create_tables):
+    connection = create_tables(AdvisorOrder)
+    populate(connection)
+
+    report = advise([AdvisorOrder])
+    queries = {query.description: query for query in report['queries']}
+    assert list(queries) == ["listing", "filter status", "delta sync"]
+    assert "WHERE advisor_orders.status = ?" in queries["filter status"].sql
+    assert queries["filter status"].full_scan
+    assert queries["delta sync"].full_scan
+
+    with connection.get_engine().begin() as conn:
+        for recommendation in report['recommendations']:
+            conn.execute(text(recommendation.ddl))
+
+    report = advise([AdvisorOrder])
+    assert report['recommendations'] == []
+    assert not any(query.full_scan for query in report['queries'])
+    assert all("INDEX" in str(query.plan[-1][-1]) for query in report['queries'])
+
+
+def test_explain_returns_the_plan_rows(create_tables):
+    connection = create_tables(AdvisorOrder)
+    session = connection.get_session()
+    try:
+        sql, plan, elapsed = explain(session, AdvisorOrder.filters_query(session, [{"status": "new"}]).limit(5))
+    finally:
+        session.close()
+
+    assert sql.startswith("SELECT")
+    assert elapsed >= 0
+    assert any(str(row[-1]).startswith("SCAN advisor_orders") for row in plan)
+
+
+def test_full_scan_of_each_dialect():
+    assert is_full_scan('sqlite', [(2, 0, 0, 'SCAN advisor_orders')])
+    assert not is_full_scan('sqlite', [(2, 0, 0, 'SCAN advisor_orders USING INDEX ix_advisor_orders_deleted_at_IdOrder')])
+    assert not is_full_scan('sqlite', [(3, 0, 0, 'SEARCH advisor_orders USING INDEX ix_advisor_orders_status_deleted_at (status=?)')])
+    assert is_full_scan('mysql', [(1, 'SIMPLE', 'advisor_orders', None, 'ALL', None, None, None, None, 20, 10.0, 'Using where')])
+    assert not is_full_scan('mysql', [(1, 'SIMPLE', 'advisor_orders', None, 'ref', 'ix_status', 'ix_status', '82', 'const', 10, 10.0, None)])
+    assert is_full_scan('postgresql', [('Limit  (cost=0.00..1.20 rows=5 width=60)',), ('  ->  Seq Scan on advisor_orders',)])
+    assert not is_full_scan('postgresql', [('Index Scan using ix_advisor_orders_status_deleted_at on advisor_orders',)])
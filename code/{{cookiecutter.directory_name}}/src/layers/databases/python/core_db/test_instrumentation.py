@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from aws_lambda_powertools import Logger
+from sqlalchemy.engine.interfaces import CacheStats
+
+from core_db import instrumentation
+from core_db.instrumentation import QueryStats, get_current_stats, log_db_stats, normalize_statement
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ("SELECT * FROM notes WHERE title = 'it''s' AND id = 42", "SELECT * FROM notes WHERE title = ? AND id = ?"),
+    ("SELECT * FROM notes WHERE price > 10.5", "SELECT * FROM notes WHERE price > ?"),
+    ("SELECT * FROM notes WHERE id IN (?, ?, ?)", "SELECT * FROM notes WHERE id IN (...)"),
+    ("SELECT * FROM notes WHERE id IN (%(id_1)s, %(id_2)s)", "SELECT * FROM notes WHERE id IN (...)"),
+    ("SELECT *\n  FROM notes\n  WHERE id IN ($1,$2)", "SELECT * FROM notes WHERE id IN (...)"),
+    ("SELECT * FROM notes_2024 WHERE id = :id", "SELECT * FROM notes_2024 WHERE id = :id"),
+], ids=["strings", "decimals", "qmark-list", "pyformat-list", "numeric-list", "identifiers"])
+def test_normalize_statement(statement, expected):
+    assert normalize_statement(statement) == expected
+
+
+def test_query_stats_summary():
+    stats = QueryStats(slow_query_ms=100)
+    stats.record("SELECT 1", 20.0, 1, CacheStats.CACHE_MISS)
+    stats.record("SELECT * FROM notes WHERE id = 7", 150.0, 3, CacheStats.CACHE_HIT)
+    stats.record("UPDATE notes SET title = 'x'", 5.0, -1, CacheStats.CACHE_HIT)
+    stats.record("PRAGMA busy_timeout = 0", 1.0, 0, CacheStats.NO_CACHE_KEY)
+    stats.record_retry()
+    stats.record_retry(exhausted=True)
+
+    assert stats.summary() == {
+        'db_queries': 4,
+        'db_time_ms': 176.0,
+        'db_max_query_ms': 150.0,
+        'db_rows': 4,
+        'db_slow_queries': 1,
+        'db_cache_hits': 2,
+        'db_cache_misses': 1,
+        'db_cache_hit_ratio': 0.6667,
+        'db_retries': 1,
+        'db_retries_exhausted': 1,
+    }
+    assert stats.slow_queries == [{'statement': "SELECT * FROM notes WHERE id = ?", 'ms': 150.0}]
+    assert QueryStats().cache_hit_ratio() is None
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    """ Summaries emitted by log_db_stats, with the logger they were given """
+    calls = []
+
+    def emit_stats(stats, logger=None, metrics=True):
+        calls.append((stats, logger))
+        return stats.summary()
+
+    monkeypatch.setattr(instrumentation, 'emit_stats', emit_stats)
+    return calls
+
+
+def test_only_the_outermost_decorator_emits(emitted):
+    handler_logger = Logger('tests.handler')
+
+    @log_db_stats
+    def controller():
+        stats = get_current_stats()
+        stats.record("SELECT 1", 1.0, 1)
+        return stats
+
+    @log_db_stats(logger=handler_logger)
+    def handler():
+        return controller(), controller()
+
+    first, second = handler()
+
+    assert first is second and first.queries == 2
+    assert emitted == [(first, handler_logger)]
+    assert get_current_stats() is None
+
+
+def test_async_handlers_are_measured(emitted):
+    @log_db_stats
+    async def handler():
+        return get_current_stats()
+
+    stats = asyncio.run(handler())
+    assert emitted == [(stats, None)]
+
+
+def test_summary_keys_of_the_handler_logger():
+    logger = Logger('tests.handler')
+
+    @log_db_stats(logger=logger, metrics=False)
+    def handler(queries):
+        for _ in range(queries):
+            get_current_stats().record("SELECT 1", 1.0, 1)
+        return dict(logger.get_current_keys())
+
+    # The keys of the previous invocation are removed when the next one starts
+    assert 'db_queries' not in handler(2)
+    assert logger.get_current_keys()['db_queries'] == 2
+    assert 'db_queries' not in handler(1)
+    assert logger.get_current_keys()['db_queries'] == 1
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from core_db import replicas
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.replicas import ReplicaPool, RoutingSession, reset_primary_pins
+
+
+class ReplicaNote(BaseModel):
+    __tablename__ = 'replica_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+
+
+class ReplicaNoteService(BaseService):
+    def __init__(self):
+        super().__init__(ReplicaNote)
+
+
+def create_database(path, title: str):
+    """ Same table in every database, the title of the row tells which one answered the read """
+    engine = create_engine(f"sqlite:///{path}")
+    BaseModel.metadata.create_all(engine, tables=[ReplicaNote.__table__])
+    with engine.begin() as connection:
+        connection.execute(ReplicaNote.__table__.insert(), {"IdNote": 1, "title": title})
+    return engine
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    monkeypatch.setenv('_X_AMZN_TRACE_ID', 'Root=1-invocation-1')
+    reset_primary_pins()
+    primary = create_database(tmp_path / 'primary.db', "primary")
+    replica = create_database(tmp_path / 'replica.db', "replica")
+    pool = ReplicaPool([replica], eject_seconds=30)
+    factory = sessionmaker(primary, class_=RoutingSession, replicas=pool, config_name='replicas-tests', expire_on_commit=False)
+    yield factory, pool
+    reset_primary_pins()
+    primary.dispose()
+    replica.dispose()
+
+
+def read_title(factory) -> str:
+    session = factory()
+    try:
+        return ReplicaNoteService().get_one(session, 1).title
+    finally:
+        session.close()
+
+
+def test_reads_go_to_the_replica(databases):
+    factory, _ = databases
+
+    assert read_title(factory) == "replica"
+
+
+def test_writes_go_to_the_primary(databases):
+    factory, _ = databases
+
+    session = factory()
+    try:
+        locked = session.scalars(select(ReplicaNote).where(ReplicaNote.id == 1).with_for_update()).one()
+        assert locked.title == "primary"
+
+        session.add(ReplicaNote(id=2, title="written"))
+        session.flush()
+        # After the flush the session reads its own write
+        assert session.get(ReplicaNote, 2).title == "written"
+        session.commit()
+    finally:
+        session.close()
+
+    primary, replica = factory.kw['bind'], factory.kw['replicas'].engines[0]
+    with primary.connect() as connection:
+        assert connection.execute(select(ReplicaNote.title).where(ReplicaNote.id == 2)).scalar() == "written"
+    with replica.connect() as connection:
+        assert connection.execute(select(ReplicaNote.title).where(ReplicaNote.id == 2)).scalar() is None
+
+
+def test_reads_stay_on_the_primary_during_the_invocation_of_a_write(databases, monkeypatch):
+    factory, _ = databases
+
+    session = factory()
+    try:
+        session.add(ReplicaNote(id=2, title="written"))
+        session.commit()
+    finally:
+        session.close()
+
+    assert read_title(factory) == "primary"
+    assert read_title(factory) == "primary"
+
+    monkeypatch.setenv('_X_AMZN_TRACE_ID', 'Root=1-invocation-2')
+    assert read_title(factory) == "replica"
+
+
+def test_failed_replica_is_ejected(tmp_path, databases, monkeypatch):
+    factory, _ = databases
+    now = [1000.0]
+    monkeypatch.setattr(replicas.time, 'monotonic', lambda: now[0])
+    # The directory of the database doesn't exist, the replica fails to connect
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    pool = ReplicaPool([broken], eject_seconds=30)
+    factory.configure(replicas=pool)
+
+    with pytest.raises(OperationalError):
+        read_title(factory)
+    assert pool.healthy_engines() == []
+
+    # No healthy replica, the reads fall back to the primary
+    assert read_title(factory) == "primary"
+
+    now[0] += 31
+    assert pool.healthy_engines() == [broken]
+    with pytest.raises(OperationalError):
+        read_title(factory)
+    broken.dispose()
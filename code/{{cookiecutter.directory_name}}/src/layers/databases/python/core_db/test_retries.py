@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, String, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from core_db import retries
+from core_db.BaseModel import BaseModel
+from core_db.instrumentation import start_invocation
+from core_db.retries import backoff_ms, retry_transient, transient_reason
+from core_utils.deadline import DeadlineExceeded, deadline_scope, get_deadline
+
+
+class RetryNote(BaseModel):
+    __tablename__ = 'retry_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+
+
+class MySQLError(Exception):
+    """ Driver error of MySQL, the code is the first argument (pymysql, mysqlclient) """
+
+
+class PostgreSQLError(Exception):
+    """ Driver error of PostgreSQL with its SQLSTATE (psycopg2 pgcode) """
+
+    def __init__(self, pgcode: str) -> None:
+        super().__init__(f"SQLSTATE {pgcode}")
+        self.pgcode = pgcode
+
+
+def mysql_deadlock() -> OperationalError:
+    return OperationalError("UPDATE accounts", {}, MySQLError(1213, "Deadlock found when trying to get lock"))
+
+
+def postgresql_serialization_failure() -> OperationalError:
+    return OperationalError("UPDATE accounts", {}, PostgreSQLError('40001'))
+
+
+class CountingSession(Session):
+    rollbacks = 0
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+        super().rollback()
+
+
+class UnitOfWork:
+    """ Fails with the error of the factory the given number of times, then returns "done" """
+
+    def __init__(self, error_factory, failures: int) -> None:
+        self.error_factory = error_factory
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, session: Session | None = None) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error_factory()
+        return "done"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """ Backoffs of the retries (seconds), the sleep consumes the time of the current deadline """
+    delays = []
+
+    def sleep(seconds: float) -> None:
+        delays.append(seconds)
+        deadline = get_deadline()
+        if deadline is not None:
+            deadline.expires_at -= seconds
+
+    monkeypatch.setattr(retries.time, 'sleep', sleep)
+    monkeypatch.setattr(retries, 'backoff_ms', lambda retry: 100 * 2 ** (retry - 1))
+    monkeypatch.setattr(retries, 'DATABASE_RETRY_MIN_ATTEMPT_MS', 200)
+    return delays
+
+
+def test_transient_reasons():
+    assert transient_reason(mysql_deadlock()) == 'deadlock'
+    assert transient_reason(postgresql_serialization_failure()) == 'serialization failure'
+    assert transient_reason(OperationalError("SELECT 1", {}, MySQLError(1064, "Syntax error"))) is None
+
+
+def test_backoff_has_full_jitter_capped():
+    for retry in range(1, 10):
+        assert 0 <= backoff_ms(retry, base_ms=50, max_ms=1000) <= min(1000, 50 * 2 ** retry)
+
+
+@pytest.mark.parametrize('error_factory', [mysql_deadlock, postgresql_serialization_failure])
+def test_transient_error_is_retried(sleeps, error_factory):
+    work = UnitOfWork(error_factory, failures=2)
+    session = CountingSession()
+
+    assert retry_transient(work, attempts=3)(session) == "done"
+    assert work.calls == 3
+    assert session.rollbacks == 2
+    assert sleeps == [0.1, 0.2]
+
+
+@pytest.mark.parametrize('error_factory', [mysql_deadlock, postgresql_serialization_failure])
+def test_error_is_raised_after_the_attempts(sleeps, error_factory):
+    work = UnitOfWork(error_factory, failures=10)
+
+    with pytest.raises(OperationalError) as raised:
+        retry_transient(work, attempts=3)()
+    assert transient_reason(raised.value) is not None
+    assert work.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_non_transient_error_is_not_retried(sleeps):
+    work = UnitOfWork(lambda: OperationalError("SELECT 1", {}, MySQLError(1064, "Syntax error")), failures=1)
+
+    with pytest.raises(OperationalError):
+        retry_transient(work, attempts=3)()
+    assert work.calls == 1
+    assert sleeps == []
+
+
+def test_backoff_stays_within_the_deadline(sleeps):
+    # The retries stop when the backoff and another attempt don't fit in the time left
+    work = UnitOfWork(mysql_deadlock, failures=10)
+
+    with deadline_scope(remaining=1000, margin_ms=0):
+        with pytest.raises(DeadlineExceeded) as raised:
+            retry_transient(work, attempts=10)()
+
+    assert isinstance(raised.value.__cause__, OperationalError)
+    assert sleeps == [0.1, 0.2, 0.4]
+    assert work.calls == 4
+    assert sum(sleeps) * 1000 + retries.DATABASE_RETRY_MIN_ATTEMPT_MS <= 1000
+
+
+def test_async_transient_error_is_retried(sleeps, monkeypatch):
+    async def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(retries.asyncio, 'sleep', sleep)
+    calls = []
+
+    @retry_transient(attempts=3)
+    async def work():
+        calls.append(1)
+        if len(calls) < 3:
+            raise postgresql_serialization_failure()
+        return "done"
+
+    assert asyncio.run(work()) == "done"
+    assert len(calls) == 3
+    assert sleeps == [0.1, 0.2]
+
+
+def test_locked_sqlite_database_is_retried(create_tables, monkeypatch):
+    # Other connection holds the write lock of the database until the second retry
+    connection = create_tables(RetryNote)
+    locker = connection.get_engine().connect()
+    locker.exec_driver_sql("BEGIN IMMEDIATE")
+    delays = []
+
+    def sleep(seconds: float) -> None:
+        delays.append(seconds)
+        if len(delays) == 2:
+            locker.rollback()
+
+    monkeypatch.setattr(retries.time, 'sleep', sleep)
+    calls = []
+
+    @retry_transient(attempts=5)
+    def add_note(session: Session, title: str) -> None:
+        calls.append(title)
+        # Fail right away with SQLITE_BUSY instead of waiting for the lock (5 seconds of pysqlite)
+        session.execute(text("PRAGMA busy_timeout = 0"))
+        session.add(RetryNote(title=title))
+        session.commit()
+
+    stats = start_invocation()
+    session = connection.get_session()
+    try:
+        add_note(session, "after the lock")
+    finally:
+        session.close()
+        locker.close()
+
+    assert len(calls) == 3
+    assert stats.retries == 2 and stats.retries_exhausted == 0
+    check = connection.get_session()
+    try:
+        assert [note.title for note in check.query(RetryNote).all()] == ["after the lock"]
+    finally:
+        check.close()
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.dialects import sqlite
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.search import SEARCH_CONTAINS, SEARCH_PREFIX, search_condition
+
+
+class SearchPart(BaseModel):
+    __tablename__ = 'search_parts'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdPart", Integer, primary_key=True)
+    code = Column(String(20))
+    name = Column(String(100))
+
+    search_columns = ["code", "name"]
+    search_modes = {"code": SEARCH_PREFIX}
+
+
+class SearchPartService(BaseService):
+    def __init__(self):
+        super().__init__(SearchPart)
+
+
+def compile_sql(condition) -> str:
+    return str(select(SearchPart.id).where(condition).compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_search_modes_compile_to_their_like_pattern():
+    assert SearchPart.get_search_mode("code") == SEARCH_PREFIX
+    assert SearchPart.get_search_mode("name") == SEARCH_CONTAINS
+
+    assert "search_parts.code LIKE 'ab%' ESCAPE '\\'" in compile_sql(search_condition(SearchPart.code, "ab", SEARCH_PREFIX))
+    assert "lower(search_parts.name) LIKE lower('%ab%') ESCAPE '\\'" in compile_sql(search_condition(SearchPart.name, "ab", SEARCH_CONTAINS))
+    # The wildcards of the value are matched literally
+    assert "LIKE '10\\%\\_off%'" in compile_sql(search_condition(SearchPart.code, "10%_off", SEARCH_PREFIX))
+
+
+@pytest.fixture
+def session(create_tables):
+    connection = create_tables(SearchPart)
+    session = connection.get_session()
+    session.add_all([
+        SearchPart(id=1, code="ab-100", name="bomba"),
+        SearchPart(id=2, code="x-ab", name="cable"),
+        SearchPart(id=3, code="abc", name="tabla"),
+        SearchPart(id=4, code="a%b", name="hoja"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize('column, value, expected', [
+    ("code", "ab", [1, 3]),
+    ("code", "a%", [4]),
+    ("name", "ab", [2, 3]),
+    ("name", "oj", [4]),
+], ids=["prefix", "prefix-escaped", "contains", "contains-middle"])
+def test_search_modes_return_the_matching_rows(session, column, value, expected):
+    service = SearchPartService()
+    search_filters = [{'column': getattr(SearchPart, column), 'value': value, 'mode': service.get_search_mode(column)}]
+
+    _, rows = service.multiple_filters(session, [], search_filters=search_filters, order_by="id")
+
+    assert [row.id for row in rows] == expected
@@ -0,0 +1,101 @@
+import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String
+
+from core_db.BaseModel import BaseModel
+from core_db.BaseService import BaseService
+from core_db.sync import decode_watermark, encode_watermark
+
+SHARED = datetime.datetime(2024, 5, 1, 12, 0)
+LATER = datetime.datetime(2024, 5, 1, 12, 30)
+
+
+class SyncItem(BaseModel):
+    __tablename__ = 'sync_items'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdItem", Integer, primary_key=True)
+    name = Column(String(50))
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+
+    @classmethod
+    def display_members(cls_):
+        return ["id", "name"]
+
+
+class SyncItemService(BaseService):
+    def __init__(self):
+        super().__init__(SyncItem)
+
+
+@pytest.fixture
+def session(create_tables):
+    connection = create_tables(SyncItem)
+    session = connection.get_session()
+    # Five rows share their updated at, more than a page
+    session.add_all([SyncItem(id=id, name=f"item {id}", updated_at=SHARED) for id in range(1, 6)])
+    session.add(SyncItem(id=6, name="item 6", updated_at=LATER, deleted_at=LATER))
+    session.add(SyncItem(id=7, name="item 7", updated_at=datetime.datetime(2024, 4, 30)))
+    session.commit()
+    yield session
+    session.close()
+
+
+def sync(session, updated_since: str, limit: int):
+    changes, watermark, has_more = SyncItemService().get_changes(session, decode_watermark(updated_since), [], limit=limit)
+    return changes, encode_watermark(*watermark), has_more
+
+
+def test_pages_never_skip_or_repeat_rows(session):
+    watermark, seen, pages = "2024-05-01T00:00:00", [], 0
+    has_more = True
+    while has_more:
+        changes, watermark, has_more = sync(session, watermark, limit=2)
+        seen += [change["id"] for change in changes]
+        pages += 1
+
+    assert seen == [1, 2, 3, 4, 5, 6]
+    assert pages == 3
+    assert decode_watermark(watermark) == (LATER, 6)
+
+
+def test_soft_deleted_rows_are_tombstones(session):
+    changes, _, has_more = sync(session, "2024-05-01T12:00:00", limit=10)
+
+    assert changes == [{"id": 6, "deleted": True}]
+    assert has_more is False
+
+
+def test_unchanged_watermark_returns_no_rows(session):
+    _, watermark, _ = sync(session, "2024-05-01T00:00:00", limit=10)
+
+    changes, next_watermark, has_more = sync(session, watermark, limit=10)
+    assert changes == [] and has_more is False
+    assert next_watermark == watermark
+
+
+def test_row_changes_are_returned_after_the_last_watermark(session):
+    _, watermark, _ = sync(session, "2024-05-01T00:00:00", limit=10)
+    item = session.get(SyncItem, 2)
+    item.name, item.updated_at = "renamed", datetime.datetime(2024, 5, 2)
+    session.commit()
+
+    changes, _, _ = sync(session, watermark, limit=10)
+    assert changes == [{"id": 2, "name": "renamed", "deleted": False}]
+
+
+@pytest.mark.parametrize('updated_since', ["2024-05-01T12:00:00Z", "2024-05-01T14:00:00+02:00"])
+def test_timezone_aware_dates_are_compared_in_utc(session, updated_since):
+    # Same instant as the naive (UTC) updated at of the shared rows
+    changes, _, _ = sync(session, updated_since, limit=10)
+
+    assert [change["id"] for change in changes] == [6]
+
+
+def test_invalid_watermark():
+    for updated_since in ("yesterday", "WyJub3QgYSBkYXRlIiwxXQ", ""):
+        with pytest.raises(ValueError):
+            decode_watermark(updated_since)
+    assert decode_watermark(encode_watermark(SHARED, 3)) == (SHARED, 3)
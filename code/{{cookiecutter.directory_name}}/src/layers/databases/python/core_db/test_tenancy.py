@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+
+from core_db import tenancy
+from core_db.BaseModel import DIALECT_NAMES, BaseModel
+from core_db.config import CONNECTIONS, DBConfig
+from core_db.DBConnection import CONNECTION_HANDLERS, DBConnection
+from core_db.tenancy import TENANT_CONNECTIONS, dispose_connection, tenant_scope
+
+
+class TenantNote(BaseModel):
+    __tablename__ = 'tenant_notes'
+    __connection_config_name__ = 'tests'
+
+    id = Column("IdNote", Integer, primary_key=True)
+    title = Column(String(100))
+
+
+def create_shard(path, title: str) -> str:
+    """ Database of a shard with one row, its title tells which shard answered the read """
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    BaseModel.metadata.create_all(engine, tables=[TenantNote.__table__])
+    with engine.begin() as connection:
+        connection.execute(TenantNote.__table__.insert(), {"IdNote": 1, "title": title})
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def tenant_map(tmp_path, monkeypatch):
+    """ Tenants acme and globex in two SQLite shards of the tests connection """
+    config = DBConfig.get_config(conn_name='tests', secret_name='tests', prefix='TESTS')
+    monkeypatch.setattr(config, 'DATABASE_TENANT_MAP', json.dumps({
+        "tenants": {"acme": "cluster-a", "globex": "cluster-b"},
+        "shards": {
+            "cluster-a": {"connection_string": create_shard(tmp_path / 'cluster-a.db', "acme")},
+            "cluster-b": {"connection_string": create_shard(tmp_path / 'cluster-b.db', "globex")},
+        }
+    }))
+    yield config
+    for routed_name in list(TENANT_CONNECTIONS):
+        dispose_connection(routed_name)
+        DIALECT_NAMES.pop(routed_name, None)
+    TENANT_CONNECTIONS.clear()
+
+
+def read_title(tenant: str | None) -> str:
+    with tenant_scope(tenant):
+        session = DBConnection(**TenantNote.get_connection_params()).get_session()
+        try:
+            return session.get(TenantNote, 1).title
+        finally:
+            session.close()
+
+
+def test_each_tenant_reads_its_shard(tenant_map):
+    assert read_title("acme") == "acme"
+    assert read_title("globex") == "globex"
+    assert read_title("acme") == "acme"
+
+    with tenant_scope("acme"):
+        assert TenantNote.get_connection_params() == {**CONNECTIONS['tests'], 'config_name': 'tests@cluster-a', 'shard': 'cluster-a'}
+    # Tenants that are not in the map and requests without tenant use the connection itself
+    with tenant_scope("initech"):
+        assert TenantNote.get_connection_params() == CONNECTIONS['tests']
+    assert TenantNote.get_connection_params() == CONNECTIONS['tests']
+
+
+def test_least_recently_used_idle_shard_is_disposed(tenant_map, monkeypatch):
+    monkeypatch.setattr(tenancy, 'DATABASE_TENANT_MAX_ENGINES', 1)
+
+    assert read_title("acme") == "acme"
+    assert read_title("globex") == "globex"
+    assert list(TENANT_CONNECTIONS) == ['tests@cluster-b']
+    assert 'tests@cluster-a' not in CONNECTION_HANDLERS
+
+    # A request of globex still has its connection checked out while acme is routed
+    with tenant_scope("globex"):
+        busy = DBConnection(**TenantNote.get_connection_params()).get_session()
+        busy.connection()
+    try:
+        assert read_title("acme") == "acme"
+        assert list(TENANT_CONNECTIONS) == ['tests@cluster-b', 'tests@cluster-a']
+        assert 'tests@cluster-b' in CONNECTION_HANDLERS
+        assert busy.get(TenantNote, 1).title == "globex"
+    finally:
+        busy.close()
+
+    # Once returned to the pool, globex is the least recently used shard and it is disposed
+    assert read_title("acme") == "acme"
+    assert list(TENANT_CONNECTIONS) == ['tests@cluster-a']
+    assert 'tests@cluster-b' not in CONNECTION_HANDLERS